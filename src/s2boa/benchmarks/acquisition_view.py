@@ -0,0 +1,367 @@
+"""
+Benchmark of the rendering of the acquisition view
+
+Compares the rendering of the table of the completeness of the planned playbacks and of the
+timeline of the received playbacks joining, per row, the related events with selectattr over
+the whole lists (O(n²) on the number of playbacks) with the rendering of the view model built by
+s2vboa.views.acquisition.build_acquisition_view_model, on synthetic playbacks with their
+corrections, validities, completeness, schedules and station reports
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import argparse
+import datetime
+import re
+import sys
+import time
+import uuid
+
+# Import jinja2
+import jinja2
+
+# Import views
+import s2vboa
+import s2vboa.views.acquisition as acquisition
+
+START = datetime.datetime(2018, 7, 21, 0, 0, 0)
+
+# Rows rendered joining the events per row before build_acquisition_view_model
+LEGACY_TEMPLATES = {
+    "details": """
+          {% for event in acquisition_events["playback_correction"] %}
+          {% set original_playback_uuid = event.eventLinks|selectattr("name", "equalto", "PLANNED_EVENT")|map(attribute='event_uuid_link')|first %}
+          {% set original_playback = acquisition_events["playback"]|selectattr("event_uuid", "equalto", original_playback_uuid)|first %}
+
+          <!-- Analyze if playback suffered by gaps at MSI -->
+          {% set playback_with_gaps_msi = acquisition_events["planned_playbacks_gaps_msi"]|selectattr("event_uuid", "equalto", original_playback_uuid)|list %}
+          <!-- Analyze if there are missing packets -->
+          {% set playback_validity_uuids = original_playback.eventLinks|selectattr("name", "match", "PLAYBACK_VALIDITY")|map(attribute='event_uuid_link')|unique|list %}
+          {% set playback_validity_explicit_refs = acquisition_events["playback_validity"]|selectattr("event_uuid", "in", playback_validity_uuids)|map(attribute='explicitRef')|map(attribute='explicit_ref')|unique|list %}
+          {% set raw_isp_validities_with_packet_status_nok = acquisition_events["raw_isp_validity_events_with_packet_status_nok"]|selectattr("explicitRef.explicit_ref", "in", playback_validity_explicit_refs)|list %}
+          
+          {% set playback_validity_uuid = original_playback.eventLinks|selectattr("name", "match", "PLAYBACK_VALIDITY")|map(attribute='event_uuid_link')|first %}
+          {% set playback_validity = acquisition_events["playback_validity"]|selectattr("event_uuid", "equalto", playback_validity_uuid)|first %}
+          <!-- DFEP, station and SRA schedule -->
+          {% set dfep_schedule_event = None %}
+          {% set station_schedule_event = None %}
+          {% set sra_schedule_event = None %}
+          {% set dfep_schedule_uuid = original_playback.eventLinks|selectattr("name", "match", "DFEP_SCHEDULE")|map(attribute='event_uuid_link')|first %}
+          {% set station_schedule_uuid = original_playback.eventLinks|selectattr("name", "match", "STATION_SCHEDULE")|map(attribute='event_uuid_link')|first %}
+          {% set sra_schedule_uuid = original_playback.eventLinks|selectattr("name", "match", "SLOT_REQUEST_EDRS")|map(attribute='event_uuid_link')|first %}
+          <!-- DFEP schedule -->
+          {% if dfep_schedule_uuid %}
+          {% set dfep_schedule_event = acquisition_events["dfep_schedule"]|selectattr("event_uuid", "equalto", dfep_schedule_uuid)|first %}
+          {% elif sra_schedule_uuid %}
+          {% set dfep_schedule_event = acquisition_events["slot_request_edrs"]|selectattr("event_uuid", "equalto", sra_schedule_uuid)|first %}
+          {% endif %}
+          <!-- Station schedule -->
+          {% if station_schedule_uuid %}
+          {% set station_schedule_event = acquisition_events["station_schedule"]|selectattr("event_uuid", "equalto", station_schedule_uuid)|first %}
+          {% elif sra_schedule_uuid %}
+          {% set station_schedule_event = acquisition_events["slot_request_edrs"]|selectattr("event_uuid", "equalto", sra_schedule_uuid)|first %}
+          {% endif %}
+          {% set type = original_playback.eventTexts|selectattr("name", "equalto", "playback_type")|map(attribute='value')|first|string %}
+          {% set satellite = original_playback.eventTexts|selectattr("name", "equalto", "satellite")|map(attribute='value')|first|string %}
+          {% set orbit = original_playback.eventDoubles|selectattr("name", "equalto", "start_orbit")|map(attribute='value')|first|int %}
+          {% set station = original_playback.eventTexts|selectattr("name", "equalto", "station")|map(attribute='value')|first|string %}
+          {% set parameters_object = original_playback.eventObjects|selectattr("name", "equalto", "parameters")|first %}
+          {% set parameters = original_playback.get_structured_values(parameters_object.position, parameters_object.parent_level, parameters_object.parent_position) %}
+          <!--Playback Status-->
+          {% if not playback_validity_uuid %}
+          {% set playback_status = "MISSING" %}
+          {% set playback_status_class = "bold-red" %}
+          {% else %}
+          {% set playback_status = "RECEIVED" %}
+          {% set playback_status_class = "bold-green" %}
+          {% set playback_completeness_channel_uuids = original_playback.eventLinks|selectattr("name", "match", "PLAYBACK_COMPLETENESS")|map(attribute='event_uuid_link')|list %}
+          {% set playback_completeness_events = acquisition_events["playback_completeness_channel"]|selectattr("event_uuid", "in", playback_completeness_channel_uuids)|list %}
+          {% set playback_completeness_group_by_status = playback_completeness_events|events_group_by_text_value("status") %}
+          {% if "MISSING" in playback_completeness_group_by_status %}
+          {% set playback_status = "PARTIAL" %}
+          {% set playback_status_class = "bold-red" %}
+          {% elif "INCOMPLETE" in playback_completeness_group_by_status %}
+          {% set playback_status = "GAPS" %}
+          {% set playback_status_class = "bold-orange" %}
+          {% endif %}
+          {% endif %}
+
+          <!--Station schedule Status-->
+          {% set station_schedule_status = "MISSING" %}
+          {% set station_schedule_status_class = "bold-red" %}
+          {% if station_schedule_event %}
+          {% set station_schedule_status = "OK" %}
+          {% set station_schedule_status_class = "bold-green" %}
+          {% endif %}
+          <!--DFEP schedule Status-->
+          {% set dfep_schedule_status = "MISSING" %}
+          {% set dfep_schedule_status_class = "bold-red" %}
+          {% if dfep_schedule_event %}
+          {% set dfep_schedule_status = "OK" %}
+          {% set dfep_schedule_status_class = "bold-green" %}
+          {% endif %}
+          <!--Values-->
+          <tr>
+            <td>{{ satellite }}</td>
+            <td>{{ orbit }}</td>
+            <td>{{ station }}</td>
+            <td>{{ type }}</td>
+            {% if playback_status == "GAPS" %}
+            <td><a href="/views/specific-acquisition/{{ event.event_uuid }}" class="{{ playback_status_class }}">{{ playback_status }}</a></td>
+            {% else %}
+            <td><a href="/views/specific-acquisition/{{ event.event_uuid }}" class="{{ playback_status_class }}">{{ playback_status }}</a></td>
+            {% endif %}
+            {% if type not in ["NOMINAL", "REGULAR", "RT", "NRT"] or playback_status == "MISSING" %}
+            <td>N/A</td>            
+            {% elif playback_with_gaps_msi|length > 0 %}
+            <td><a href="/eboa_nav/query-events-by-er/{{ playback_validity_explicit_refs|first }}" class="bold-orange">INCOMPLETE</a></td>
+            {% else %}
+            <td class="bold-green">OK</td>
+            {% endif %}
+            {% if type not in ["NOMINAL", "REGULAR", "RT", "NRT"] or playback_status == "MISSING" %}
+            <td>N/A</td>            
+            {% elif raw_isp_validities_with_packet_status_nok|length > 0 %}
+            {% set missing_packets = raw_isp_validities_with_packet_status_nok|map(attribute="eventDoubles")|flatten|selectattr("name", "equalto", "diff_expected_received")|sum(attribute='value') %}
+            <td><a href="/eboa_nav/query-events-by-er/{{ playback_validity_explicit_refs|first }}" class="bold-red">{{ missing_packets }}</a></td>
+            {% else %}
+            <td class="bold-green">0</td>
+            {% endif %}
+            <td>{{ event.start.isoformat() }}</td>
+            <td>{{ event.stop.isoformat() }}</td>
+            <td>{{ (event.stop - event.start).total_seconds()|round(3) }}</td>
+            <td>{{ (((event.stop - event.start).total_seconds()) / 60)|round(3) }}</td>
+            <td>
+              {% include "views/common/parameters.html" %}
+            </td>
+            <td class="{{ station_schedule_status_class }}">{{ station_schedule_status }}</td>
+            <td class="{{ dfep_schedule_status_class }}">{{ dfep_schedule_status }}</td>
+            {% if playback_validity %}
+            <td>{{ (event.start - playback_validity.start).total_seconds()|round(3) }}</td>
+            <td>{{ (event.stop - playback_validity.stop).total_seconds()|round(3) }}</td>
+            {% else %}
+            <td>N/A</td>
+            <td>N/A</td>
+            {% endif %}
+            {% if station_schedule_event %}
+            <td>{{ (event.start - station_schedule_event.start).total_seconds()|round(3) }}</td>
+            <td>{{ (event.stop - station_schedule_event.stop).total_seconds()|round(3) }}</td>
+            {% else %}
+            <td>N/A</td>
+            <td>N/A</td>
+            {% endif %}
+            {% if dfep_schedule_event %}
+            <td>{{ (event.start - dfep_schedule_event.start).total_seconds()|round(3) }}</td>
+            <td>{{ (event.stop - dfep_schedule_event.stop).total_seconds()|round(3) }}</td>
+            {% else %}
+            <td>N/A</td>
+            <td>N/A</td>
+            {% endif %}
+            <td><a href="/eboa_nav/query-source/{{ original_playback.source.source_uuid }}">{{ original_playback.source.name }}</a></td>
+            <td><a href="/eboa_nav/query-event-links/{{ original_playback.event_uuid }}"><i class="fa fa-link"></i></a></td>
+            <td>{{original_playback.event_uuid}}</td>
+          </tr>
+          {% endfor %}
+""",
+    "received_timeline": """
+var received_playbacks_timeline = [
+    {% for event in events %}
+    {% set original_playback_uuids = event.eventLinks|selectattr("name", "equalto", "PLANNED_PLAYBACK")|map(attribute='event_uuid_link')|list %}
+    {% if not original_playback_uuids %}
+    {% set original_playback_uuid = event.eventLinks|selectattr("name", "equalto", "PLANNED_EVENT")|map(attribute='event_uuid_link')|list %}
+    {% endif %}
+    {% set original_playback_uuid = original_playback_uuids|first %}
+    {% set original_playback = acquisition_events["playback"]|selectattr("event_uuid", "in", original_playback_uuids)|first %}
+    {% set orbit = original_playback.eventDoubles|selectattr("name", "equalto", "start_orbit")|map(attribute='value')|first|int %}
+    {% set station = original_playback.eventTexts|selectattr("name", "equalto", "station")|map(attribute='value')|first|string %}
+    {% set satellite = original_playback.eventTexts|selectattr("name", "equalto", "satellite")|map(attribute='value')|first|string %}
+    {% set playback_type = original_playback.eventTexts|selectattr("name", "equalto", "playback_type")|map(attribute='value')|first|string %}
+    {% set playback_mean = original_playback.eventTexts|selectattr("name", "equalto", "playback_mean")|map(attribute='value')|first|string %}
+    {% set status = event.eventTexts|selectattr("name", "equalto", "status")|map(attribute='value')|first|string %}
+    {
+        "id": "{{ event.event_uuid }}",
+        "group": "{{ satellite }}",
+        "timeline": "{{ station }}",
+        "start": "{{ event.start.isoformat() }}",
+        "stop": "{{ event.stop.isoformat() }}",
+        "tooltip": create_acquisition_tooltip_text("{{ satellite }}", "{{ orbit }}", "{{ station }}", "<span class='bold-green'>RECEIVED</span>", "{{ event.start.isoformat() }}", "{{ event.stop.isoformat() }}", "{{ playback_type }}", "{{ playback_mean }}", "{{ original_playback.source.name }}", "{{ original_playback.event_uuid }}", "/eboa_nav/query-event-links/{{ original_playback.event_uuid }}"),
+        "className": "background-green"
+    },
+    {% endfor %}
+]
+"""
+}
+
+PLAYBACK_TYPES = ["NOMINAL", "REGULAR", "NRT", "RT", "HKTM", "SAD"]
+
+class Value():
+    def __init__(self, name, value, position = 0, parent_level = -1, parent_position = 0):
+        self.name = name
+        self.value = value
+        self.position = position
+        self.parent_level = parent_level
+        self.parent_position = parent_position
+
+class Link():
+    def __init__(self, name, event_uuid_link):
+        self.name = name
+        self.event_uuid_link = event_uuid_link
+
+class Event():
+    """
+    Event with the attributes of the datamodel of EBOA used by the acquisition view
+    """
+    def __init__(self, start, stop, texts = {}, doubles = {}, explicit_ref = None):
+        self.event_uuid = uuid.uuid1()
+        self.source = Value("S2__OPER_REP_OPDAM1_" + str(self.event_uuid), None)
+        self.source.source_uuid = uuid.uuid1()
+        self.start = start
+        self.stop = stop
+        self.eventTexts = [Value(name, value) for name, value in texts.items()]
+        self.eventDoubles = [Value(name, value) for name, value in doubles.items()]
+        self.eventObjects = [Value("parameters", None)]
+        self.eventLinks = []
+        self.eventGeometries = []
+        self.explicitRef = Value(None, None)
+        self.explicitRef.explicit_ref = explicit_ref
+
+    def get_structured_values(self, position = 0, parent_level = -1, parent_position = 0):
+        return [{"name": "parameters", "values": [{"name": "channel", "type": "double", "value": 1}]}]
+
+    def link(self, name, event):
+        self.eventLinks.append(Link(name, event.event_uuid))
+
+def build_acquisition_events(number_of_playbacks):
+    """
+    Method to build the events returned by query_acquisition_events for the given number of playbacks
+    (one of each 10 playbacks is not received, one of each 7 has gaps and one of each 5 misses packets)
+    """
+    events = {name: [] for name in ["playback_correction", "playback", "playback_completeness_channel", "playback_validity", "station_report",
+                                    "station_schedule", "dfep_schedule", "slot_request_edrs", "planned_playbacks_gaps_msi", "playback_gaps",
+                                    "raw_isp_validity_events_with_packet_status_nok"]}
+    for i in range(number_of_playbacks):
+        start = START - datetime.timedelta(seconds = i * 3000)
+        stop = start + datetime.timedelta(seconds = 600)
+        playback = Event(start, stop, {"satellite": "S2" + "AB"[i % 2], "station": "SGS_", "playback_type": PLAYBACK_TYPES[i % len(PLAYBACK_TYPES)], "playback_mean": "XBAND"}, {"start_orbit": 16000 + i})
+        correction = Event(start + datetime.timedelta(seconds = 1), stop + datetime.timedelta(seconds = 1))
+        correction.link("PLANNED_EVENT", playback)
+        playback.link("TIME_CORRECTION", correction)
+        events["playback_correction"].append(correction)
+        events["playback"].append(playback)
+
+        for (name, schedules) in [("STATION_SCHEDULE", events["station_schedule"]), ("DFEP_SCHEDULE", events["dfep_schedule"])]:
+            schedule = Event(start - datetime.timedelta(seconds = 5), stop + datetime.timedelta(seconds = 5))
+            playback.link(name, schedule)
+            schedules.append(schedule)
+        # end for
+
+        if i % 10 == 0:
+            continue
+        # end if
+        validity = Event(start + datetime.timedelta(seconds = 2), stop, explicit_ref = "DCS_" + str(i))
+        playback.link("PLAYBACK_VALIDITY", validity)
+        events["playback_validity"].append(validity)
+        for channel in [1, 2]:
+            status = "INCOMPLETE" if i % 7 == 0 and channel == 2 else "RECEIVED"
+            completeness = Event(start, stop, {"status": status})
+            completeness.link("PLANNED_PLAYBACK", playback)
+            playback.link("PLAYBACK_COMPLETENESS", completeness)
+            events["playback_completeness_channel"].append(completeness)
+        # end for
+        if i % 7 == 0:
+            events["planned_playbacks_gaps_msi"].append(playback)
+        # end if
+        if i % 5 == 0:
+            events["raw_isp_validity_events_with_packet_status_nok"].append(Event(start, stop, doubles = {"diff_expected_received": 10}, explicit_ref = "DCS_" + str(i)))
+        # end if
+        station_report = Event(start, stop, {"status": "OK"})
+        playback.link("STATION_ACQUISITION_REPORT", station_report)
+        events["station_report"].append(station_report)
+    # end for
+
+    return events
+
+def events_group_by_text_value(events, name):
+    """
+    Filter of the views grouping events by the value of a text
+    """
+    groups = {}
+    for event in events:
+        for value in event.eventTexts:
+            if value.name == name:
+                groups.setdefault(value.value, []).append(event)
+            # end if
+        # end for
+    # end for
+
+    return groups
+
+def get_table_body(template_path, table_id):
+    """
+    Method to extract the body of a table of a template
+    """
+    with open(template_path) as template_file:
+        template = template_file.read()
+    # end with
+    table = template[template.index('id="{}"'.format(table_id)):]
+
+    return table[table.index("<tbody>") + len("<tbody>"):table.index("</tbody>")]
+
+def measure(method, iterations):
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        result = method()
+    # end for
+
+    return ((time.perf_counter() - start) / iterations, result)
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the rendering of the acquisition view")
+    args_parser.add_argument("-p", dest="number_of_playbacks", type=int, nargs=1,
+                             help="number of planned playbacks", default=[1200])
+    args_parser.add_argument("-n", dest="iterations", type=int, nargs=1,
+                             help="number of renderings per method", default=[1])
+    args = args_parser.parse_args()
+
+    events = build_acquisition_events(args.number_of_playbacks[0])
+    templates_path = os.path.dirname(s2vboa.__file__) + "/templates"
+    environment = jinja2.Environment(loader = jinja2.FileSystemLoader(templates_path))
+    environment.filters["events_group_by_text_value"] = events_group_by_text_value
+    environment.filters["flatten"] = lambda lists: [item for items in lists for item in items]
+    environment.tests["match"] = lambda value, pattern: re.match(pattern, value) != None
+
+    (build_time, dummy) = measure(lambda: acquisition.build_acquisition_view_model(events), args.iterations[0])
+    templates = {
+        "details": environment.from_string(get_table_body(templates_path + "/views/acquisition/acquisition_content.html", "acquisition-details-table")),
+        "received_timeline": environment.get_template("js/acquisition/received_acquisition_to_timeline.js")
+    }
+
+    def normalize(rendered):
+        return re.sub(r"\s+", " ", re.sub(r"<!--.*?-->", "", rendered)).strip()
+    # end def
+
+    received_events = events_group_by_text_value(events["playback_completeness_channel"], "status")["RECEIVED"]
+
+    print("{} planned playbacks (view model built in {:.3f} s)".format(args.number_of_playbacks[0], build_time))
+    print("{:<20} {:>12} {:>12} {:>10}".format("rendering", "legacy (s)", "model (s)", "speedup"))
+    exit_status = 0
+    for name in ["details", "received_timeline"]:
+        legacy_template = environment.from_string(LEGACY_TEMPLATES[name])
+        (legacy_time, legacy_rendered) = measure(lambda: legacy_template.render(acquisition_events = events, events = received_events), args.iterations[0])
+        (model_time, rendered) = measure(lambda: templates[name].render(acquisition_events = events, rows = events["completeness_rows"]["RECEIVED"]), args.iterations[0])
+
+        print("{:<20} {:>12.3f} {:>12.3f} {:>9.1f}x".format(name, legacy_time, model_time, legacy_time / model_time))
+        if normalize(legacy_rendered) != normalize(rendered):
+            print("The rendering of {} differs from the legacy one".format(name))
+            exit_status = 1
+        # end if
+    # end for
+
+    return exit_status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Harness for comparing the footprints obtained by the EOP CFI and the NumPy backends
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import argparse
+import sys
+import time
+import numpy
+
+# Import footprint helpers
+import s2boa.ingestions.footprints as footprint_functions
+import s2boa.ingestions.orbit as orbit_functions
+
+# Mean radius of the Earth (km)
+EARTH_RADIUS = 6371.0088
+
+DEFAULT_ORBPRE_FILE_PATH = os.path.dirname(os.path.abspath(__file__)) + "/../ingestions/tests/inputs/S2A_ORBPRE.EOF"
+DEFAULT_SWATH_DEFINITION_FILE_PATH = os.path.dirname(os.path.abspath(__file__)) + "/../../boa_config/SDF_MSI.xml"
+
+def build_intervals(osvs, duration):
+    """
+    Method to split the coverage of the OSVs in consecutive intervals
+    :param osvs: OSVs of the ORBPRE (see orbit.build_osvs)
+    :type osvs: dict
+    :param duration: duration of the intervals in seconds
+    :type duration: float
+
+    :return: list of tuples (start_mjd, stop_mjd, iterations)
+    :rtype: list
+
+    """
+    iterations = min(int(duration / 3.608) + 1, 200)
+    starts = numpy.arange(osvs["utc"][0], osvs["utc"][-1], duration / 86400.0)
+
+    return [(start, min(start + duration / 86400.0, osvs["utc"][-1]), iterations) for start in starts]
+
+def parse_coordinates(coordinates):
+    """
+    Method to obtain the longitudes and latitudes of a footprint
+    :param coordinates: longitude,latitude pairs separated by spaces
+    :type coordinates: str
+
+    :return: array of (longitude, latitude)
+    :rtype: numpy.ndarray
+
+    """
+    return numpy.array([[float(value) for value in coordinate.split(",")] for coordinate in coordinates.split(" ")])
+
+def haversine(first_points, second_points):
+    """
+    Method to obtain the distances over the Earth between two arrays of points
+    :param first_points: array of (longitude, latitude) in degrees
+    :type first_points: numpy.ndarray
+    :param second_points: array of (longitude, latitude) in degrees
+    :type second_points: numpy.ndarray
+
+    :return: distances in km
+    :rtype: numpy.ndarray
+
+    """
+    first_points = numpy.radians(first_points)
+    second_points = numpy.radians(second_points)
+    delta = second_points - first_points
+    a = numpy.sin(delta[:, 1] / 2)**2 + numpy.cos(first_points[:, 1]) * numpy.cos(second_points[:, 1]) * numpy.sin(delta[:, 0] / 2)**2
+
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0, 1)))
+
+def compare(orbpre_file_path, swath_definition_file_path, duration):
+    """
+    Method to compare the footprints of both backends
+    :param orbpre_file_path: path to the ORBPRE file
+    :type orbpre_file_path: str
+    :param swath_definition_file_path: path to the swath definition file
+    :type swath_definition_file_path: str
+    :param duration: duration of the intervals in seconds
+    :type duration: float
+
+    :return: exit status
+    :rtype: int
+
+    """
+    osvs = orbit_functions.read_orbpre_file(orbpre_file_path)
+    intervals = build_intervals(osvs, duration)
+
+    start = time.perf_counter()
+    numpy_footprints = footprint_functions.get_footprints_numpy(intervals, osvs, footprint_functions.read_swath_definition(swath_definition_file_path))
+    numpy_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cfi_footprints = footprint_functions.get_footprints_cfi(intervals, orbpre_file_path, swath_definition_file_path)
+    cfi_duration = time.perf_counter() - start
+
+    print("Intervals: {} of {} seconds".format(len(intervals), duration))
+    print("NumPy backend: {:.3f} seconds".format(numpy_duration))
+
+    if all(footprint is None for footprint in cfi_footprints):
+        print("CFI backend: not available (the get_footprint tool could not provide the footprints)")
+        return 1
+    # end if
+    print("CFI backend: {:.3f} seconds".format(cfi_duration))
+
+    print("{:>4} {:>12} {:>12}".format("#", "max (km)", "mean (km)"))
+    deviations = []
+    for i, (cfi_footprint, numpy_footprint) in enumerate(zip(cfi_footprints, numpy_footprints)):
+        if cfi_footprint is None:
+            print("{:>4} {:>12} {:>12}".format(i, "-", "-"))
+            continue
+        # end if
+        interval_deviations = haversine(parse_coordinates(cfi_footprint), parse_coordinates(numpy_footprint))
+        deviations.append(interval_deviations)
+        print("{:>4} {:>12.3f} {:>12.3f}".format(i, interval_deviations.max(), interval_deviations.mean()))
+    # end for
+
+    deviations = numpy.concatenate(deviations)
+    print("Polygon deviation over {} vertices: max {:.3f} km, mean {:.3f} km".format(len(deviations), deviations.max(), deviations.mean()))
+
+    return 0
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Compare the footprints obtained by the EOP CFI and the NumPy backends")
+    args_parser.add_argument("-o", dest="orbpre_file_path", type=str, nargs=1,
+                             help="path to the ORBPRE file", default=[DEFAULT_ORBPRE_FILE_PATH])
+    args_parser.add_argument("-s", dest="swath_definition_file_path", type=str, nargs=1,
+                             help="path to the swath definition file", default=[DEFAULT_SWATH_DEFINITION_FILE_PATH])
+    args_parser.add_argument("-d", dest="duration", type=float, nargs=1,
+                             help="duration of the intervals in seconds", default=[600.0])
+    args = args_parser.parse_args()
+
+    return compare(args.orbpre_file_path[0], args.swath_definition_file_path[0], args.duration[0])
+
+if __name__ == "__main__":
+    sys.exit(main())
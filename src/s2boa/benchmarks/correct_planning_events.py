@@ -0,0 +1,142 @@
+"""
+Benchmark of the correction of the planning events during the ingestion of the ORBPRE files
+
+Compares the correction scanning the ORBPRE events per planning event with the
+correction using the index of ascending nodes and the vectorized Berthyl's algorithm
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import datetime
+import math
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+from dateutil import parser
+
+# Import ingestion of the ORBPRE files
+import s2boa.ingestions.ingestion_orbpre.ingestion_orbpre as ingestion_orbpre
+
+ANX = datetime.datetime(2018, 7, 21, 9, 50, 51, 776833)
+ORBITAL_PERIOD = 6032.4393
+FIRST_ORBIT = 16076
+ORBITS_PER_DAY = 86400 / ORBITAL_PERIOD
+
+def build_orbpre_events(days):
+    """
+    Method to build the ORBIT_PREDICTION events (ingestion format) of an ORBPRE file covering the given days
+    """
+    orbpre_events = []
+    for i in range(int(days * ORBITS_PER_DAY) + 2):
+        start = ANX + datetime.timedelta(seconds = i * (ORBITAL_PERIOD + 0.001 * math.sin(i)))
+        orbpre_events.append({
+            "start": start.isoformat(),
+            "stop": start.isoformat(),
+            "values": [{"name": "tai", "type": "timestamp", "value": (start + datetime.timedelta(seconds=37)).isoformat()},
+                       {"name": "ut1", "type": "timestamp", "value": start.isoformat()},
+                       {"name": "orbit", "type": "double", "value": str(FIRST_ORBIT + i)},
+                       {"name": "satellite", "type": "text", "value": "S2A"}]
+        })
+    # end for
+
+    return orbpre_events
+
+def build_planning_events(days, events_per_orbit):
+    """
+    Method to build the planning events (with the structure of the events of the DDBB) of a NPPF covering the given days
+    """
+    planning_events = []
+    for orbit in range(FIRST_ORBIT, FIRST_ORBIT + int(days * ORBITS_PER_DAY)):
+        for j in range(events_per_orbit):
+            start_angle = 360.0 * j / events_per_orbit
+            stop_angle = start_angle + 180.0 / events_per_orbit
+            start = ANX + datetime.timedelta(seconds = (orbit - FIRST_ORBIT + start_angle / 360.0) * ORBITAL_PERIOD)
+            stop = ANX + datetime.timedelta(seconds = (orbit - FIRST_ORBIT + stop_angle / 360.0) * ORBITAL_PERIOD)
+            values = [SimpleNamespace(name = "start_orbit", value = float(orbit)),
+                      SimpleNamespace(name = "start_angle", value = start_angle),
+                      SimpleNamespace(name = "stop_orbit", value = float(orbit)),
+                      SimpleNamespace(name = "stop_angle", value = stop_angle)]
+            planning_events.append(SimpleNamespace(event_uuid = uuid.uuid1(), start = start, stop = stop,
+                                                   gauge = SimpleNamespace(name = "PLANNED_CUT_IMAGING", system = "S2A"),
+                                                   eventDoubles = values, eventTimestamps = [], eventTexts = [], eventBooleans = [],
+                                                   get_structured_values = lambda: []))
+        # end for
+    # end for
+
+    return planning_events
+
+def correct_planning_events_scanning(orbpre_events, planning_events):
+    """
+    Reference correction scanning the ORBPRE events per orbit of the planning events (timings only)
+    """
+    start_orbpre_infos = {}
+    next_start_orbpre_infos = {}
+    stop_orbpre_infos = {}
+    next_stop_orbpre_infos = {}
+    corrected_timings = []
+    for planning_event in planning_events:
+        start_orbit = [obj.value for obj in planning_event.eventDoubles if obj.name == "start_orbit"][0]
+        stop_orbit = [obj.value for obj in planning_event.eventDoubles if obj.name == "stop_orbit"][0]
+        start_angle = [obj.value for obj in planning_event.eventDoubles if obj.name == "start_angle"][0]
+        stop_angle = [obj.value for obj in planning_event.eventDoubles if obj.name == "stop_angle"][0]
+
+        if not start_orbit in start_orbpre_infos:
+            start_orbpre_infos[start_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(start_orbit)]
+        # end if
+        if not start_orbit in next_start_orbpre_infos:
+            next_start_orbpre_infos[start_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(start_orbit) + 1]
+        # end if
+        if not stop_orbit in stop_orbpre_infos:
+            stop_orbpre_infos[stop_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(stop_orbit)]
+        # end if
+        if not stop_orbit in next_stop_orbpre_infos:
+            next_stop_orbpre_infos[stop_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(stop_orbit) + 1]
+        # end if
+
+        if len(next_start_orbpre_infos[start_orbit]) == 0 or len(next_stop_orbpre_infos[stop_orbit]) == 0:
+            corrected_timings.append((planning_event.start, planning_event.stop))
+        else:
+            start_orbital_period = (parser.parse(next_start_orbpre_infos[start_orbit][0]["start"]) - parser.parse(start_orbpre_infos[start_orbit][0]["start"])).total_seconds()
+            stop_orbital_period = (parser.parse(next_stop_orbpre_infos[stop_orbit][0]["start"]) - parser.parse(stop_orbpre_infos[stop_orbit][0]["start"])).total_seconds()
+            corrected_timings.append((ingestion_orbpre._get_date_from_angle(start_angle, start_orbital_period, start_orbpre_infos[start_orbit][0]["start"]),
+                                      ingestion_orbpre._get_date_from_angle(stop_angle, stop_orbital_period, stop_orbpre_infos[stop_orbit][0]["start"])))
+        # end if
+    # end for
+
+    return corrected_timings
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the correction of the planning events during the ingestion of the ORBPRE files")
+    args_parser.add_argument("-d", dest="days", type=float, nargs="+",
+                             help="days covered by the ORBPRE and the NPPF", default=[1, 2, 5, 10])
+    args_parser.add_argument("-e", dest="events_per_orbit", type=int, nargs=1,
+                             help="planning events per orbit", default=[20])
+    args = args_parser.parse_args()
+
+    print("{:>6} {:>6} {:>8} {:>14} {:>14} {:>8}".format("days", "OSVs", "planning", "scanning (s)", "indexing (s)", "speedup"))
+    for days in args.days:
+        orbpre_events = build_orbpre_events(days)
+        planning_events = build_planning_events(days, args.events_per_orbit[0])
+
+        start = time.perf_counter()
+        expected_timings = correct_planning_events_scanning(orbpre_events, planning_events)
+        scanning_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corrected_planning_events = ingestion_orbpre._correct_planning_events(orbpre_events, planning_events)
+        indexing_time = time.perf_counter() - start
+
+        assert [(event["start"], event["stop"]) for event in corrected_planning_events] == [(start.isoformat(), stop.isoformat()) for (start, stop) in expected_timings]
+
+        print("{:>6} {:>6} {:>8} {:>14.3f} {:>14.3f} {:>7.1f}x".format(days, len(orbpre_events), len(planning_events), scanning_time, indexing_time, scanning_time / indexing_time))
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
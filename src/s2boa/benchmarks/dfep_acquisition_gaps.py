@@ -0,0 +1,116 @@
+"""
+Benchmark of the classification of the ISP gaps in the ingestion of the DFEP acquisition files
+
+Compares, per input file of s2boa.ingestions.ingestion_dfep_acquisition, the classification of
+the gaps using python functions called from the XPATH predicates (XPATH) with the classification
+in a single python pass over the information extracted from the nodes (PYTHON)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Import xml parser
+from lxml import etree
+
+# Import ingestion of the DFEP acquisition files
+import s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition as ingestion_dfep_acquisition
+import s2boa.ingestions.xpath_functions as xpath_functions
+
+INPUT_FILES_PATHS = [os.path.dirname(os.path.abspath(ingestion_dfep_acquisition.__file__)) + "/input_files",
+                     os.path.dirname(os.path.abspath(ingestion_dfep_acquisition.__file__)) + "/tests/inputs"]
+
+VCIDS_XPATH = "/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[number(NumFrames) > 0 and (@VCID = 4 or @VCID = 5 or @VCID = 6)]"
+APIDS_XPATH = "/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[number(@VCID) = $vcid_number or number(@VCID) = $corresponding_vcid_number]/ISP_Status/Status[NumPackets > 0]"
+
+def get_gap(gap):
+    return {"pre_sens_time": gap.xpath("string(PreSensTime)"),
+            "post_sens_time": gap.xpath("string(PostSensTime)"),
+            "pre_counter": gap.xpath("string(PreCounter)"),
+            "post_counter": gap.xpath("string(PostCounter)")}
+
+def classify_gaps_xpath(parsed_xml):
+    """
+    Method to classify the gaps with python functions called from the XPATH predicates
+    (classification used by the ingestion before the single python pass)
+    """
+    ns = etree.FunctionNamespace(None)
+    ns["three_letter_to_iso_8601"] = xpath_functions.three_letter_to_iso_8601
+    ns["dates_difference"] = xpath_functions.dates_difference
+    ns["get_counter_threshold_from_apid"] = xpath_functions.get_counter_threshold_from_apid
+    xpath_xml = etree.XPathEvaluator(parsed_xml)
+
+    classification = []
+    for vcid in xpath_xml(VCIDS_XPATH):
+        vcid_number = int(vcid.get("VCID"))
+        sensing_gaps_per_apid = []
+        for apid in xpath_xml(APIDS_XPATH, vcid_number = vcid_number, corresponding_vcid_number = vcid_number + 16):
+            band_detector = xpath_functions.s2_functions.get_band_detector(apid.get("APID"))
+            counter_threshold = xpath_functions.s2_functions.get_counter_threshold(band_detector["band"])
+            sensing_gaps = apid.xpath("Gaps/Gap[dates_difference(three_letter_to_iso_8601(string(PostSensTime)),three_letter_to_iso_8601(string(PreSensTime))) > 4 and number(PreCounter) = $counter_threshold and number(PostCounter) = 0]", counter_threshold=counter_threshold)
+            sensing_gaps_per_apid.append([get_gap(gap) for gap in sensing_gaps])
+        # end for
+        gaps_smaller_than_scene = xpath_xml("/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[number(@VCID) = $vcid_number or number(@VCID) = $corresponding_vcid_number]/ISP_Status/Status[NumPackets > 0]/Gaps/Gap[(not (PreCounter = get_counter_threshold_from_apid(string(../../@APID))) and not (PostCounter = 0)) or not (PostCounter = 0)]", vcid_number = vcid_number, corresponding_vcid_number = vcid_number + 16)
+        classification.append((sensing_gaps_per_apid, [(gap.xpath("../../@APID")[0], get_gap(gap)) for gap in gaps_smaller_than_scene]))
+    # end for
+
+    return classification
+
+def classify_gaps_python(parsed_xml):
+    """
+    Method to classify the gaps in a single python pass (classification used by the ingestion)
+    """
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
+
+    classification = []
+    for vcid in xpath_xml(VCIDS_XPATH):
+        vcid_number = int(vcid.get("VCID"))
+        apids = xpath_xml(APIDS_XPATH, vcid_number = vcid_number, corresponding_vcid_number = vcid_number + 16)
+        classification.append(ingestion_dfep_acquisition._classify_gaps(apids))
+    # end for
+
+    return classification
+
+def measure(method, parsed_xml, iterations):
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        result = method(parsed_xml)
+    # end for
+
+    return ((time.perf_counter() - start) / iterations, result)
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the classification of the ISP gaps in the ingestion of the DFEP acquisition files")
+    args_parser.add_argument("-n", dest="iterations", type=int, nargs=1,
+                             help="number of classifications per file", default=[5])
+    args = args_parser.parse_args()
+
+    iterations = args.iterations[0]
+
+    file_paths = []
+    for input_files_path in INPUT_FILES_PATHS:
+        file_paths += sorted(glob.glob(input_files_path + "/*REP_PASS*"))
+    # end for
+
+    print("{:<86} {:>6} {:>10} {:>10} {:>8}".format("file", "gaps", "XPATH (s)", "PYTHON (s)", "speedup"))
+    for file_path in file_paths:
+        parsed_xml = etree.parse(file_path)
+        (xpath_time, xpath_classification) = measure(classify_gaps_xpath, parsed_xml, iterations)
+        (python_time, python_classification) = measure(classify_gaps_python, parsed_xml, iterations)
+        assert xpath_classification == python_classification
+        number_of_gaps = len(parsed_xml.xpath("//ISP_Status/Status/Gaps/Gap"))
+        print("{:<86} {:>6} {:>10.4f} {:>10.4f} {:>8.1f}".format(os.path.basename(file_path), number_of_gaps, xpath_time, python_time, xpath_time / python_time if python_time > 0 else float("nan")))
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Benchmark of the peak memory (RSS) and time needed for reading the workplan report of the DPC files
+
+Compares the parsing of the whole document (DOM) with the incremental parsing (STREAMING) of
+s2boa.ingestions.ingestion_dpc on the input files of the ingestion. Each file is read in a
+separate process, so that the peak RSS of each reading is isolated
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import ingestion of the DPC files
+import s2boa.ingestions.ingestion_dpc.ingestion_dpc as ingestion_dpc
+
+INPUT_FILES_PATH = os.path.dirname(os.path.abspath(ingestion_dpc.__file__)) + "/input_files"
+
+READERS = {
+    "DOM": ingestion_dpc.read_workplan_report,
+    "STREAMING": ingestion_dpc.read_workplan_report_streaming
+}
+
+def get_peak_rss():
+    """
+    Method to obtain the peak RSS of the process in MB
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def read(mode, file_path):
+    """
+    Method to read the workplan report in the current process and print the measurements in JSON format
+    """
+    # The reading of the whole document modifies the file
+    working_directory = tempfile.mkdtemp()
+    working_file_path = working_directory + "/" + os.path.basename(file_path)
+    shutil.copy(file_path, working_file_path)
+
+    initial_peak_rss = get_peak_rss()
+    start = time.perf_counter()
+    workplan_report = READERS[mode](working_file_path)
+    elapsed = time.perf_counter() - start
+    peak_rss = get_peak_rss()
+
+    shutil.rmtree(working_directory)
+
+    print(json.dumps({"time": elapsed,
+                      "rss": peak_rss - initial_peak_rss,
+                      "workplan_report": workplan_report}))
+
+def read_in_subprocess(mode, file_path):
+    output = subprocess.run([sys.executable, "-W", "ignore::SyntaxWarning", "-m", "s2boa.benchmarks.dpc_parsing", "-c", mode, "-f", file_path],
+                            stdout = subprocess.PIPE, check = True).stdout
+
+    return json.loads(output)
+
+def inflate(file_path, factor, output_path):
+    """
+    Method to generate a bigger DPC file repeating the steps of the workplan report
+    """
+    with open(file_path) as dpc_file:
+        content = dpc_file.read()
+    # end with
+    match = re.search(r"(<DATA>)(.*)(</DATA>)", content, re.DOTALL)
+    with open(output_path, "w") as inflated_file:
+        inflated_file.write(content[:match.start(2)] + match.group(2) * factor + content[match.end(2):])
+    # end with
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the peak memory (RSS) and time needed for reading the workplan report of the DPC files")
+    args_parser.add_argument("-n", dest="number_of_files", type=int, nargs=1,
+                             help="number of input files to read (the biggest ones)", default=[5])
+    args_parser.add_argument("-i", dest="inflation_factor", type=int, nargs=1,
+                             help="number of times the steps of the biggest input file are repeated to generate an additional bigger file", default=[3])
+    args_parser.add_argument("-c", dest="child_mode", type=str, nargs=1,
+                             help="(internal) read the file in this process with the given mode", default=[None])
+    args_parser.add_argument("-f", dest="file_path", type=str, nargs=1,
+                             help="(internal) file to read in this process", default=[None])
+    args = args_parser.parse_args()
+
+    if args.child_mode[0] != None:
+        read(args.child_mode[0], args.file_path[0])
+        return 0
+    # end if
+
+    file_paths = sorted(glob.glob(INPUT_FILES_PATH + "/*.EOF"), key = os.path.getsize, reverse = True)[:args.number_of_files[0]]
+
+    inflation_directory = tempfile.mkdtemp()
+    inflation_factor = args.inflation_factor[0]
+    if inflation_factor > 1 and len(file_paths) > 0:
+        inflated_file_path = inflation_directory + "/" + os.path.basename(file_paths[0]).replace(".EOF", "_x{}.EOF".format(inflation_factor))
+        inflate(file_paths[0], inflation_factor, inflated_file_path)
+        file_paths.insert(0, inflated_file_path)
+    # end if
+
+    print("{:<86} {:>9} {:>10} {:>10} {:>9} {:>9}".format("file", "size (MB)", "DOM (MB)", "STRM (MB)", "DOM (s)", "STRM (s)"))
+    for file_path in file_paths:
+        dom = read_in_subprocess("DOM", file_path)
+        streaming = read_in_subprocess("STREAMING", file_path)
+        assert dom["workplan_report"] == streaming["workplan_report"]
+        print("{:<86} {:>9.2f} {:>10.1f} {:>10.1f} {:>9.3f} {:>9.3f}".format(os.path.basename(file_path), os.path.getsize(file_path) / 1024 / 1024,
+                                                                           dom["rss"], streaming["rss"], dom["time"], streaming["time"]))
+    # end for
+
+    shutil.rmtree(inflation_directory)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of the access to the values of the events of a full ORBPRE file
+
+Compares the scans of the list of values per requested value with the index of values per event (s2boa.ingestions.event_values)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import datetime
+import sys
+import timeit
+from types import SimpleNamespace
+
+# Import event value helpers
+import s2boa.ingestions.event_values as event_values
+
+OSV_DOUBLES = ["orbit", "x", "y", "z", "vx", "vy", "vz", "quality"]
+OSV_TIMESTAMPS = ["tai", "ut1"]
+
+def build_orbpre_events(number_of_osvs):
+    """
+    Method to build the ORBIT_PREDICTION events of an ORBPRE file with the given number of OSVs
+    Events in ingestion format and events with the structure of the events of the DDBB are returned
+    """
+    anx = datetime.datetime(2018, 7, 21, 9, 50, 51, 776833)
+    orbital_period = datetime.timedelta(seconds=6032.439300)
+    dict_events = []
+    ddbb_events = []
+    for i in range(number_of_osvs):
+        start = anx + i * orbital_period
+        doubles = [str(16076 + i), "-7100511.606", "-1198306.408", "0.023", "-276.063175", "1629.749795", "7358.720211", "0"]
+        timestamps = [start + datetime.timedelta(seconds=37), start + datetime.timedelta(seconds=0.0256)]
+        values = [{"name": name, "type": "timestamp", "value": value.isoformat()} for name, value in zip(OSV_TIMESTAMPS, timestamps)]
+        values += [{"name": name, "type": "double", "value": value} for name, value in zip(OSV_DOUBLES, doubles)]
+        values.append({"name": "satellite", "type": "text", "value": "S2A"})
+        dict_events.append({"start": start.isoformat(), "stop": (start + orbital_period).isoformat(), "values": values})
+        ddbb_events.append(SimpleNamespace(start = start, stop = start + orbital_period,
+                                           eventDoubles = [SimpleNamespace(name = name, value = float(value)) for name, value in zip(OSV_DOUBLES, doubles)],
+                                           eventTimestamps = [SimpleNamespace(name = name, value = value) for name, value in zip(OSV_TIMESTAMPS, timestamps)],
+                                           eventTexts = [SimpleNamespace(name = "satellite", value = "S2A")],
+                                           eventBooleans = []))
+    # end for
+
+    return (dict_events, ddbb_events)
+
+def osvs_scanning_dicts(events):
+    osvs = []
+    for event in events:
+        osvs.append([event["start"]] + [[value["value"] for value in event["values"] if value["name"] == name][0] for name in OSV_TIMESTAMPS + OSV_DOUBLES])
+    # end for
+    return osvs
+
+def osvs_scanning_ddbb(events):
+    osvs = []
+    for event in events:
+        osvs.append([event.start] + [[value.value for value in event.eventTimestamps if value.name == name][0] for name in OSV_TIMESTAMPS] +
+                    [[value.value for value in event.eventDoubles if value.name == name][0] for name in OSV_DOUBLES])
+    # end for
+    return osvs
+
+def osvs_indexing(events):
+    osvs = []
+    for event in events:
+        values = event_values.index_values(event, ["double", "timestamp"])
+        osvs.append([event["start"] if type(event) == dict else event.start] + [values[name] for name in OSV_TIMESTAMPS + OSV_DOUBLES])
+    # end for
+    return osvs
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Micro-benchmark of the access to the values of the events of a full ORBPRE file")
+    args_parser.add_argument("-n", dest="number_of_osvs", type=int, nargs=1,
+                             help="number of OSVs of the ORBPRE file (one per orbit)", default=[143])
+    args_parser.add_argument("-r", dest="repetitions", type=int, nargs=1,
+                             help="number of repetitions", default=[50])
+    args = args_parser.parse_args()
+
+    number_of_osvs = args.number_of_osvs[0]
+    repetitions = args.repetitions[0]
+    (dict_events, ddbb_events) = build_orbpre_events(number_of_osvs)
+
+    assert osvs_scanning_dicts(dict_events) == osvs_indexing(dict_events)
+    assert osvs_scanning_ddbb(ddbb_events) == osvs_indexing(ddbb_events)
+
+    print("ORBPRE events: {} ({} repetitions)".format(number_of_osvs, repetitions))
+    print("{:<12} {:>14} {:>14} {:>8}".format("events", "scanning (ms)", "indexing (ms)", "speedup"))
+    for (label, events, scanning) in [("ingestion", dict_events, osvs_scanning_dicts), ("ddbb", ddbb_events, osvs_scanning_ddbb)]:
+        scanning_time = timeit.timeit(lambda: scanning(events), number = repetitions) / repetitions * 1000
+        indexing_time = timeit.timeit(lambda: osvs_indexing(events), number = repetitions) / repetitions * 1000
+        print("{:<12} {:>14.3f} {:>14.3f} {:>7.1f}x".format(label, scanning_time, indexing_time, scanning_time / indexing_time))
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
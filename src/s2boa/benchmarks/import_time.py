@@ -0,0 +1,77 @@
+"""
+Profile of the time spent importing the entry points of s2boa and s2vboa
+
+Imports each entry point in a new python process with -X importtime and shows the
+wall time of the cold import and the modules spending more time in their own import
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = [
+    "s2boa.ingestions.functions",
+    "s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition",
+    "s2boa.ingestions.ingestion_dpc.ingestion_dpc",
+    "s2boa.ingestions.ingestion_nppf.ingestion_nppf",
+    "s2vboa"
+]
+
+def profile_import(module, iterations):
+    """
+    Method to import a module in a new python process
+
+    :return: tuple with the minimum wall time of the import, the list of tuples (self time in seconds, cumulative time in seconds, module)
+    of the last execution sorted by self time and the exit code of the last execution
+    :rtype: tuple
+    """
+    wall_times = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        completed_process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, universal_newlines = True)
+        wall_times.append(time.perf_counter() - start)
+    # end for
+
+    imports = []
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # end if
+        (self_time, cumulative_time, imported_module) = line[len("import time:"):].split("|")
+        imports.append((int(self_time) / 1e6, int(cumulative_time) / 1e6, imported_module.strip()))
+    # end for
+    imports.sort(reverse = True)
+
+    return (min(wall_times), imports, completed_process.returncode)
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Profile of the time spent importing the entry points of s2boa and s2vboa")
+    args_parser.add_argument("-n", dest="iterations", type=int, nargs=1,
+                             help="number of imports per entry point", default=[3])
+    args_parser.add_argument("-t", dest="top", type=int, nargs=1,
+                             help="number of modules to show per entry point", default=[8])
+    args = args_parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        (wall_time, imports, returncode) = profile_import(module, args.iterations[0])
+        if returncode != 0:
+            print("{}: the import failed".format(module))
+            continue
+        # end if
+        print("{}: {:.3f} s".format(module, wall_time))
+        print("    {:>10} {:>10}  {}".format("self (s)", "total (s)", "module"))
+        for (self_time, cumulative_time, imported_module) in imports[:args.top[0]]:
+            print("    {:>10.3f} {:>10.3f}  {}".format(self_time, cumulative_time, imported_module))
+        # end for
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
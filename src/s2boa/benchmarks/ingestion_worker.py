@@ -0,0 +1,102 @@
+"""
+Benchmark of the ingestion of small files with a process per file and with the persistent ingestion worker
+
+Ingests the inputs of the tests of the station acquisition reports, station schedules and DHUS
+reports launching a process per file (eboa_ingestion.py) and sending them to a running
+s2boa.ingestions.ingestion_worker, and shows the part of the time spent in the startup of
+the process (time per file minus the processing time measured by the worker)
+
+The files are inserted into the DDBB configured for EBOA, which is cleared before each mode
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import query
+from eboa.engine.query import Query
+
+# Import ingestion worker
+import s2boa.ingestions.ingestion_worker as ingestion_worker
+
+INGESTIONS_PATH = os.path.dirname(os.path.abspath(ingestion_worker.__file__))
+
+PROCESSORS = {
+    "ingestion_station_acquisition_report": "REPORT_*.EOF",
+    "ingestion_station_schedule": "*MPL_SP*",
+    "ingestion_dhus": "*REP_OPDHUS*"
+}
+
+def get_inputs():
+    inputs = []
+    for processor in PROCESSORS:
+        for file_path in sorted(glob.glob(INGESTIONS_PATH + "/" + processor + "/tests/inputs/" + PROCESSORS[processor])):
+            inputs.append(("s2boa.ingestions." + processor + "." + processor, file_path))
+        # end for
+    # end for
+
+    return inputs
+
+def clear_db():
+    query = Query()
+    query.clear_db()
+    query.close_session()
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the ingestion of small files with a process per file and with the persistent ingestion worker")
+    args_parser.parse_args()
+
+    inputs = get_inputs()
+
+    # A process per file
+    clear_db()
+    process_times = []
+    for (processor, file_path) in inputs:
+        start = time.perf_counter()
+        subprocess.run(["eboa_ingestion.py", "-p", processor, "-f", file_path], stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        process_times.append(time.perf_counter() - start)
+    # end for
+
+    # Persistent worker
+    clear_db()
+    socket_path = tempfile.gettempdir() + "/s2boa_ingestion_worker_benchmark.sock"
+    start = time.perf_counter()
+    worker = subprocess.Popen([sys.executable, "-m", "s2boa.ingestions.ingestion_worker", "-s", socket_path], stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    while not os.path.exists(socket_path):
+        time.sleep(0.01)
+    # end while
+    worker_startup_time = time.perf_counter() - start
+    worker_times = []
+    processing_times = []
+    try:
+        for (processor, file_path) in inputs:
+            start = time.perf_counter()
+            result = ingestion_worker.submit(socket_path, file_path, processor)
+            worker_times.append(time.perf_counter() - start)
+            processing_times.append(result["processing_time"])
+        # end for
+    finally:
+        worker.terminate()
+        worker.wait()
+    # end try
+
+    print("{:<70} {:>12} {:>12} {:>14}".format("file", "process (s)", "worker (s)", "processing (s)"))
+    for ((processor, file_path), process_time, worker_time, processing_time) in zip(inputs, process_times, worker_times, processing_times):
+        print("{:<70} {:>12.3f} {:>12.3f} {:>14.3f}".format(os.path.basename(file_path)[:70], process_time, worker_time, processing_time))
+    # end for
+    print("{} files: process per file {:.3f} s (startup {:.3f} s), worker {:.3f} s (startup once {:.3f} s)".format(
+        len(inputs), sum(process_times), sum(process_times) - sum(processing_times), sum(worker_times), worker_startup_time))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
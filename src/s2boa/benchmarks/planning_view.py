@@ -0,0 +1,196 @@
+"""
+Benchmark of the rendering of the planning view
+
+Compares the rendering of the timelines of the planning view looking up, per row, the event
+linked as TIME_CORRECTION and the values of the planned event with selectattr (O(n²) on the
+number of events) with the rendering of the rows prebuilt by s2vboa.views.functions.build_event_rows,
+on synthetic planning events with the shape of a plan of 7 days of S2A and S2B
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import argparse
+import datetime
+import re
+import sys
+import time
+import uuid
+
+# Import jinja2
+import jinja2
+
+# Import views helpers
+import s2vboa
+import s2vboa.views.functions as s2vboa_functions
+
+START = datetime.datetime(2018, 7, 21, 0, 0, 0)
+ORBIT_DURATION = 6060
+
+# Timelines rendered per row before build_event_rows
+LEGACY_TEMPLATES = {
+    "imaging": """
+var imaging_events = [
+    {% for imaging in events %}
+    {% set correction_uuid = imaging.eventLinks|selectattr("name", "equalto", "TIME_CORRECTION")|map(attribute='event_uuid_link')|first %}
+    {% if correction_uuid %}
+    {% set event = planning_events["imaging"]["linked_events"]|selectattr("event_uuid", "equalto", correction_uuid)|first %}
+    {% else %}
+    {% set event = imaging %}
+    {% endif %}
+    {% set satellite = imaging.eventTexts|selectattr("name", "equalto", "satellite")|map(attribute='value')|first|string %}
+    {% set orbit = imaging.eventDoubles|selectattr("name", "equalto", "start_orbit")|map(attribute='value')|first|int %}
+    {% set imaging_mode = imaging.eventTexts|selectattr("name", "equalto", "imaging_mode")|map(attribute='value')|first|string %}
+    {% set record_type = imaging.eventTexts|selectattr("name", "equalto", "record_type")|map(attribute='value')|first|string %}
+    {
+        "id": "{{ imaging.event_uuid }}",
+        "group": "{{ satellite }}",
+        "timeline": "{{ imaging.gauge.name }}",
+        "start": "{{ event.start.isoformat() }}",
+        "stop": "{{ event.stop.isoformat() }}",
+        "tooltip": create_imaging_tooltip_text("{{ satellite }}", "{{ orbit }}", "{{ event.start.isoformat() }}", "{{ event.stop.isoformat() }}", "{{ imaging_mode }}", "{{ record_type }}", "{{ imaging.source.name }}", "{{ imaging.event_uuid }}", "/eboa_nav/query-event-links/{{ imaging.event_uuid }}")
+    },
+    {% endfor %}
+]
+""",
+    "playback": """
+var playback_events = [
+    {% for playback in events %}
+    {% set correction_uuid = playback.eventLinks|selectattr("name", "equalto", "TIME_CORRECTION")|map(attribute='event_uuid_link')|first %}
+    {% if correction_uuid %}
+    {% set event = planning_events["playback"]["linked_events"]|selectattr("event_uuid", "equalto", correction_uuid)|first %}
+    {% else %}
+    {% set event = playback %}
+    {% endif %}
+    {% set satellite = playback.eventTexts|selectattr("name", "equalto", "satellite")|map(attribute='value')|first|string %}
+    {% set orbit = playback.eventDoubles|selectattr("name", "equalto", "start_orbit")|map(attribute='value')|first|int %}
+    {% set station = playback.eventTexts|selectattr("name", "equalto", "station")|map(attribute='value')|first|string %}
+    {% set playback_type = playback.eventTexts|selectattr("name", "equalto", "playback_type")|map(attribute='value')|first|string %}
+    {% set playback_mean = playback.eventTexts|selectattr("name", "equalto", "playback_mean")|map(attribute='value')|first|string %}
+    {
+        "id": "{{ playback.event_uuid }}",
+        "group": "{{ satellite }}",
+        "timeline": "{{ playback.gauge.name }}",
+        "start": "{{ event.start.isoformat() }}",
+        "stop": "{{ event.stop.isoformat() }}",
+        "tooltip": create_playback_tooltip_text("{{ satellite }}", "{{ orbit }}", "{{ station }}", "{{ event.start.isoformat() }}", "{{ event.stop.isoformat() }}", "{{ playback_type }}", "{{ playback_mean }}", "{{ playback.source.name }}", "{{ playback.event_uuid }}", "/eboa_nav/query-event-links/{{ playback.event_uuid }}")
+    },
+    {% endfor %}
+]
+"""
+}
+
+VALUES = {
+    "imaging": {"text": ["satellite", "imaging_mode", "record_type"], "double": ["start_orbit"]},
+    "playback": {"text": ["satellite", "station", "playback_type", "playback_mean"], "double": ["start_orbit"]}
+}
+
+class Value():
+    def __init__(self, name, value, position = 0, parent_level = -1, parent_position = 0):
+        self.name = name
+        self.value = value
+        self.position = position
+        self.parent_level = parent_level
+        self.parent_position = parent_position
+
+class Event():
+    """
+    Event with the attributes of the datamodel of EBOA used by the planning view
+    """
+    def __init__(self, gauge_name, source_name, start, stop, texts = {}, doubles = {}):
+        self.event_uuid = uuid.uuid1()
+        self.gauge = Value(gauge_name, None)
+        self.source = Value(source_name, None)
+        self.source.source_uuid = uuid.uuid1()
+        self.start = start
+        self.stop = stop
+        self.eventTexts = [Value(name, value) for name, value in texts.items()]
+        self.eventDoubles = [Value(name, value) for name, value in doubles.items()]
+        self.eventObjects = [Value("parameters", None)]
+        self.eventLinks = []
+        self.eventGeometries = []
+
+    def get_duration(self):
+        return (self.stop - self.start).total_seconds()
+
+    def get_structured_values(self, position = 0, parent_level = -1, parent_position = 0):
+        return [{"name": value.name, "type": "text", "value": value.value} for value in self.eventTexts]
+
+def build_planning_events(days):
+    """
+    Method to build the planned imagings and playbacks (with their events corrected with the
+    predicted orbit) of S2A and S2B for the given number of days
+    """
+    planning_events = {"imaging": {"prime_events": [], "linked_events": []},
+                       "playback": {"prime_events": [], "linked_events": []}}
+    orbits = int(days * 86400 / ORBIT_DURATION)
+    for satellite in ["S2A", "S2B"]:
+        for orbit in range(orbits):
+            orbit_start = START + datetime.timedelta(seconds = orbit * ORBIT_DURATION)
+            # Imagings and playbacks per orbit
+            for (kind, number, gauge_name, texts) in [("imaging", 3, "PLANNED_CUT_IMAGING", {"satellite": satellite, "imaging_mode": "NOMINAL", "record_type": "NOMINAL"}),
+                                                      ("playback", 2, "PLANNED_PLAYBACK", {"satellite": satellite, "station": "SGS_", "playback_type": "NOMINAL", "playback_mean": "XBAND"})]:
+                for i in range(number):
+                    start = orbit_start + datetime.timedelta(seconds = i * 1500)
+                    prime_event = Event(gauge_name, satellite + "_NPPF.EOF", start, start + datetime.timedelta(seconds = 600), texts, {"start_orbit": orbit})
+                    correction = Event(gauge_name + "_CORRECTION", satellite + "_NPPF.EOF", start + datetime.timedelta(seconds = 1.5), start + datetime.timedelta(seconds = 601.5))
+                    prime_event.eventLinks.append(Value("TIME_CORRECTION", None))
+                    prime_event.eventLinks[0].event_uuid_link = correction.event_uuid
+                    planning_events[kind]["prime_events"].append(prime_event)
+                    planning_events[kind]["linked_events"].append(correction)
+                # end for
+            # end for
+        # end for
+    # end for
+
+    return planning_events
+
+def measure(method, iterations):
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        result = method()
+    # end for
+
+    return ((time.perf_counter() - start) / iterations, result)
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the rendering of the planning view")
+    args_parser.add_argument("-d", dest="days", type=float, nargs=1,
+                             help="number of days of the plan", default=[7])
+    args_parser.add_argument("-n", dest="iterations", type=int, nargs=1,
+                             help="number of renderings per method", default=[3])
+    args = args_parser.parse_args()
+
+    planning_events = build_planning_events(args.days[0])
+    environment = jinja2.Environment(loader = jinja2.FileSystemLoader(os.path.dirname(s2vboa.__file__) + "/templates"))
+
+    def normalize(rendered):
+        return re.sub(r"\s+", " ", rendered).strip()
+    # end def
+
+    print("Plan of {} days: {} imagings and {} playbacks".format(args.days[0], len(planning_events["imaging"]["prime_events"]), len(planning_events["playback"]["prime_events"])))
+    print("{:<10} {:>12} {:>12} {:>12} {:>10}".format("events", "legacy (s)", "rows (s)", "build (s)", "speedup"))
+    exit_status = 0
+    for kind in ["imaging", "playback"]:
+        legacy_template = environment.from_string(LEGACY_TEMPLATES[kind])
+        template = environment.get_template("js/planning/{}_planning_to_timeline.js".format(kind))
+
+        (legacy_time, legacy_rendered) = measure(lambda: legacy_template.render(events = planning_events[kind]["prime_events"], planning_events = planning_events), args.iterations[0])
+        (build_time, rows) = measure(lambda: s2vboa_functions.build_event_rows(planning_events[kind], text_names = VALUES[kind]["text"], double_names = VALUES[kind]["double"], object_names = ["parameters"]), args.iterations[0])
+        (rows_time, rendered) = measure(lambda: template.render(rows = rows.values()), args.iterations[0])
+
+        print("{:<10} {:>12.3f} {:>12.3f} {:>12.3f} {:>9.1f}x".format(kind, legacy_time, rows_time, build_time, legacy_time / (rows_time + build_time)))
+        if normalize(legacy_rendered) != normalize(rendered):
+            print("The rendering of the {} events differs from the legacy one".format(kind))
+            exit_status = 1
+        # end if
+    # end for
+
+    return exit_status
+
+if __name__ == "__main__":
+    sys.exit(main())
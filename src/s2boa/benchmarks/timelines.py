@@ -0,0 +1,119 @@
+"""
+Benchmark of the operations on timelines used by the completeness analysis
+
+Compares the helpers of eboa.ingestion.functions called once per key (per APID or per detector)
+with the operations of s2boa.ingestions.timeline resolved for all the keys at once, on
+synthetic timelines with the shape of the analysis of the DFEP acquisitions (156 APIDs with
+sensing gaps) and of the processing of the datastrips (12 detectors with granules)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import argparse
+import datetime
+import random
+import sys
+import time
+
+# Import ingestion helpers
+import eboa.ingestion.functions as ingestion_functions
+
+# Import timeline helpers
+import s2boa.ingestions.timeline as timeline_functions
+
+START = datetime.datetime(2018, 7, 21, 8, 52, 30)
+SCENE_DURATION = 3.608
+
+def build_timelines(number_of_keys, number_of_scenes, gap_probability, duration, prefix):
+    """
+    Method to build a timeline per key with one segment per scene and random missing scenes
+    """
+    timelines = {}
+    for key in range(number_of_keys):
+        timeline = []
+        for scene in range(number_of_scenes):
+            if random.random() >= gap_probability:
+                start = START + datetime.timedelta(seconds=scene * SCENE_DURATION)
+                timeline.append({"id": prefix + "_" + str(key) + "_" + str(scene),
+                                 "start": start,
+                                 "stop": start + datetime.timedelta(seconds=duration)})
+            # end if
+        # end for
+        timelines[str(key)] = timeline
+    # end for
+
+    return timelines
+
+def canonical(timelines):
+    """
+    Method to compare timelines regardless of the order of the segments
+    """
+    return {key: sorted([sorted(segment.items(), key = str) for segment in timelines[key]], key = str) for key in timelines}
+
+def per_key(operation, timelines1, timelines2 = None):
+    if timelines2 == None:
+        return {key: operation(timelines1[key]) for key in timelines1}
+    # end if
+    return {key: operation(timelines1[key], timelines2.get(key, [])) for key in timelines1}
+
+def measure(method, iterations):
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        result = method()
+    # end for
+
+    return ((time.perf_counter() - start) / iterations, result)
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Benchmark of the operations on timelines used by the completeness analysis")
+    args_parser.add_argument("-s", dest="number_of_scenes", type=int, nargs=1,
+                             help="number of scenes per timeline", default=[400])
+    args_parser.add_argument("-n", dest="iterations", type=int, nargs=1,
+                             help="number of executions per operation", default=[3])
+    args = args_parser.parse_args()
+
+    random.seed(0)
+    number_of_scenes = args.number_of_scenes[0]
+    iterations = args.iterations[0]
+
+    # Granules per detector (segments of 5 seconds every scene) and sensing gaps per APID (segments shorter than a scene)
+    granules = build_timelines(12, number_of_scenes, 0.05, 5, "GRANULE")
+    sensing_gaps = build_timelines(156, number_of_scenes, 0.9, 3, "GAP")
+    covered_sensing = {key: [{"id": "covered_sensing", "start": START, "stop": START + datetime.timedelta(seconds=number_of_scenes * SCENE_DURATION)}] for key in sensing_gaps}
+    datablocks = per_key(ingestion_functions.merge_timeline, granules)
+
+    cases = [
+        ("merge (12 detectors)",
+         lambda: per_key(ingestion_functions.merge_timeline, granules),
+         lambda: timeline_functions.merge_timelines_per_key(granules)),
+        ("intersect (12 detectors)",
+         lambda: per_key(ingestion_functions.intersect_timelines, {key: covered_sensing["0"] for key in granules}, datablocks),
+         lambda: timeline_functions.intersect_timelines_per_key({key: covered_sensing["0"] for key in granules}, datablocks)),
+        ("difference (156 APIDs)",
+         lambda: per_key(ingestion_functions.difference_timelines, covered_sensing, sensing_gaps),
+         lambda: timeline_functions.difference_timelines_per_key(covered_sensing, sensing_gaps)),
+        ("difference (1 timeline)",
+         lambda: ingestion_functions.difference_timelines(covered_sensing["0"], sensing_gaps["0"]),
+         lambda: timeline_functions.difference_timelines(covered_sensing["0"], sensing_gaps["0"]))
+    ]
+
+    print("{:<26} {:>12} {:>12} {:>8}".format("operation", "EBOA (s)", "S2BOA (s)", "speedup"))
+    for (name, eboa_operation, s2boa_operation) in cases:
+        (eboa_time, eboa_result) = measure(eboa_operation, iterations)
+        (s2boa_time, s2boa_result) = measure(s2boa_operation, iterations)
+        if type(eboa_result) == list:
+            eboa_result = {None: eboa_result}
+            s2boa_result = {None: s2boa_result}
+        # end if
+        assert canonical(eboa_result) == canonical(s2boa_result), "Different results for the operation " + name
+        print("{:<26} {:>12.4f} {:>12.4f} {:>8.1f}".format(name, eboa_time, s2boa_time, eboa_time / s2boa_time))
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Driver for the ingestion of batches of files of Sentinel-2 (e.g. catch-up after an outage)
+
+The files of a directory are associated to their ingestion module using the triggering rules
+(triggering.xml in the resources path) and ingested concurrently in a pool of processes.
+The dependencies of the triggering rules are honoured: the files of a source type are not
+ingested until all the files of the batch of the source types it depends on (directly or
+indirectly) have been ingested. The processes of the pool are reused for several files, so
+the shared state (centres configuration, orbit predictions...) is loaded once per process
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import sys
+import re
+import argparse
+import datetime
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Import xml parser
+from lxml import etree
+
+# Import engine
+import eboa.engine.engine as eboa_engine
+from eboa.engine.functions import get_resources_path
+
+# Import ingestion
+import eboa.ingestion.eboa_ingestion as eboa_ingestion
+
+# Import helpers
+import s2boa.ingestions.functions as functions
+import s2boa.ingestions.pending_ingestions as pending_ingestions
+import s2boa.ingestions.progress as progress_functions
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+# Pattern of the commands of the triggering rules using the ingestion of EBOA
+INGESTION_COMMAND_PATTERN = re.compile(r"eboa_ingestion\.py\s+-p\s+(\S+)")
+
+def read_triggering_rules(triggering_path = None):
+    """
+    Method to read the triggering rules associating the files to their ingestion module
+
+    :param triggering_path: path to the triggering configuration (triggering.xml in the resources path by default)
+    :type triggering_path: str
+
+    :return: list of rules in order of evaluation ({"source_mask": compiled regular expression, "source_type": str,
+    "skip": bool, "processor": ingestion module or None, "dependencies": list of source types})
+    :rtype: list
+    """
+    if triggering_path == None:
+        triggering_path = get_resources_path() + "/triggering.xml"
+    # end if
+
+    rules = []
+    for rule in etree.parse(triggering_path).xpath("/triggering_rules/rule"):
+        processor = None
+        command = rule.xpath("string(tool/command)")
+        match = INGESTION_COMMAND_PATTERN.search(command)
+        if match != None:
+            processor = match.group(1)
+        # end if
+        rules.append({
+            "source_mask": re.compile(rule.xpath("string(source_mask)")),
+            "source_type": rule.xpath("string(source_type)"),
+            "skip": rule.get("skip") == "true",
+            "processor": processor,
+            "dependencies": [source_type.text for source_type in rule.xpath("dependencies/source_type")]
+        })
+    # end for
+
+    return rules
+
+def get_rule(rules, file_path):
+    """
+    Method to obtain the rule applying to a file (the first rule whose mask matches the name of the file)
+
+    :param rules: triggering rules (see read_triggering_rules)
+    :type rules: list
+    :param file_path: path to the file
+    :type file_path: str
+
+    :return: rule or None if no rule applies
+    :rtype: dict
+    """
+    file_name = os.path.basename(file_path)
+    for rule in rules:
+        if rule["source_mask"].match(file_name):
+            return rule
+        # end if
+    # end for
+
+    return None
+
+def get_blocking_source_types(rules):
+    """
+    Method to obtain the source types which have to be ingested before each source type
+    (the dependencies of the triggering rules followed transitively)
+
+    :param rules: triggering rules (see read_triggering_rules)
+    :type rules: list
+
+    :return: sets of source types indexed by source type
+    :rtype: dict
+    """
+    dependencies = {}
+    for rule in rules:
+        dependencies.setdefault(rule["source_type"], set()).update(rule["dependencies"])
+    # end for
+
+    blocking_source_types = {}
+    for source_type in dependencies:
+        blocking = set()
+        to_visit = list(dependencies[source_type])
+        while len(to_visit) > 0:
+            dependency = to_visit.pop()
+            if dependency not in blocking and dependency != source_type:
+                blocking.add(dependency)
+                to_visit += list(dependencies.get(dependency, []))
+            # end if
+        # end while
+        blocking_source_types[source_type] = blocking
+    # end for
+
+    return blocking_source_types
+
+def ingest_file(processor, file_path):
+    """
+    Method to ingest a file in the process of the pool
+
+    :param processor: ingestion module
+    :type processor: str
+    :param file_path: path to the file
+    :type file_path: str
+
+    :return: tuple with the statuses returned by the ingestion (None if the ingestion raised an exception), the error message and the duration of the ingestion in seconds
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    statuses = None
+    error = None
+    try:
+        returned_values = eboa_ingestion.command_process_file(processor, file_path, datetime.datetime.now().isoformat())
+        statuses = [returned_value["status"] for returned_value in returned_values]
+    except Exception as e:
+        error = str(e)
+        logger.error("The ingestion of {} by {} raised the exception: {}".format(file_path, processor, e))
+    finally:
+        # The sources of the failed ingestions are not completed, so their stages are dropped
+        progress_functions.get_progress_reporter().discard()
+    # end try
+
+    # The process of the pool does not finish after the ingestion, so the
+    # parked ingestions waiting for the ingested datastrips are resumed here
+    if len(pending_ingestions.sensing_identifiers_to_resume) > 0:
+        pending_ingestions.resume_pending_ingestions()
+    # end if
+
+    return (statuses, error, time.perf_counter() - start)
+
+def initialize_worker():
+    """
+    Method to load the state shared by the ingestions once per process of the pool
+    The orbit predictions are kept by the cache of the process (s2boa.ingestions.orbpre_cache)
+    """
+    try:
+        functions.get_centres_conf()
+    except Exception as e:
+        logger.warning("The centres configuration could not be loaded by the process of the pool: {}".format(e))
+    # end try
+
+def ingest_files(file_paths, rules, executor, ingest = ingest_file):
+    """
+    Method to ingest a batch of files honouring the dependencies of the triggering rules
+    The files of the same source type are submitted in order of name
+
+    :param file_paths: paths to the files
+    :type file_paths: list
+    :param rules: triggering rules (see read_triggering_rules)
+    :type rules: list
+    :param executor: executor running the ingestions
+    :type executor: concurrent.futures.Executor
+    :param ingest: function ingesting a file with the signature of ingest_file
+    :type ingest: function
+
+    :return: list of results ({"file_path", "source_type", "processor", "statuses", "error", "duration"}) in order of completion
+    and list of results of the files without ingestion (no rule applies or the rule is skipped)
+    :rtype: tuple
+    """
+    blocking_source_types = get_blocking_source_types(rules)
+
+    pending_files = {}
+    not_ingested = []
+    for file_path in sorted(file_paths, key = os.path.basename):
+        rule = get_rule(rules, file_path)
+        if rule == None or rule["skip"] or rule["processor"] == None:
+            not_ingested.append({"file_path": file_path,
+                                 "source_type": rule["source_type"] if rule != None else None,
+                                 "processor": None})
+            continue
+        # end if
+        pending_files.setdefault(rule["source_type"], []).append((file_path, rule["processor"]))
+    # end for
+
+    # Number of files not yet ingested per source type
+    remaining_files = {source_type: len(pending_files[source_type]) for source_type in pending_files}
+
+    results = []
+    running = {}
+    while len(pending_files) > 0 or len(running) > 0:
+        ready_source_types = [source_type for source_type in pending_files
+                              if all([remaining_files.get(blocking_source_type, 0) == 0 for blocking_source_type in blocking_source_types.get(source_type, [])])]
+        if len(ready_source_types) == 0 and len(running) == 0:
+            # The dependencies are cyclic, so they cannot be honoured
+            logger.warning("The dependencies of the source types {} are cyclic, so their files are ingested without honouring them".format(sorted(pending_files)))
+            ready_source_types = list(pending_files)
+        # end if
+        for source_type in ready_source_types:
+            for (file_path, processor) in pending_files.pop(source_type):
+                running[executor.submit(ingest, processor, file_path)] = {"file_path": file_path,
+                                                                          "source_type": source_type,
+                                                                          "processor": processor}
+            # end for
+        # end for
+
+        (completed, _) = wait(list(running), return_when = FIRST_COMPLETED)
+        for future in completed:
+            result = running.pop(future)
+            try:
+                (result["statuses"], result["error"], result["duration"]) = future.result()
+            except Exception as e:
+                # The process of the pool died
+                (result["statuses"], result["error"], result["duration"]) = (None, str(e), None)
+            # end try
+            remaining_files[result["source_type"]] -= 1
+            results.append(result)
+        # end for
+    # end while
+
+    return (results, not_ingested)
+
+def get_report(results, elapsed_time):
+    """
+    Method to summarize the results of the ingestion of a batch
+
+    :param results: results of the ingestions (see ingest_files)
+    :type results: list
+    :param elapsed_time: duration of the ingestion of the batch in seconds
+    :type elapsed_time: float
+
+    :return: report with the throughput (files per minute) and the latency of the ingestions per processor
+    :rtype: dict
+    """
+    ok_status = eboa_engine.exit_codes["OK"]["status"]
+    processors = {}
+    for result in results:
+        processor = processors.setdefault(result["processor"], {"files": 0, "failed": 0, "durations": []})
+        processor["files"] += 1
+        if result["statuses"] == None or any([status != ok_status for status in result["statuses"]]):
+            processor["failed"] += 1
+        # end if
+        if result["duration"] != None:
+            processor["durations"].append(result["duration"])
+        # end if
+    # end for
+
+    report = {
+        "files": len(results),
+        "elapsed_time": elapsed_time,
+        "throughput": len(results) * 60 / elapsed_time if elapsed_time > 0 else None,
+        "processors": {}
+    }
+    for processor_name in sorted(processors):
+        processor = processors[processor_name]
+        durations = processor["durations"]
+        report["processors"][processor_name] = {
+            "files": processor["files"],
+            "failed": processor["failed"],
+            "mean_latency": sum(durations) / len(durations) if len(durations) > 0 else None,
+            "max_latency": max(durations) if len(durations) > 0 else None
+        }
+    # end for
+
+    return report
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Ingest the files of a directory concurrently honouring the dependencies of the triggering rules")
+    args_parser.add_argument("-d", dest="directory", type=str, nargs=1,
+                             help="directory with the files to ingest", required=True)
+    args_parser.add_argument("-w", dest="workers", type=int, nargs=1,
+                             help="number of processes ingesting files", default=[os.cpu_count()])
+    args_parser.add_argument("-t", dest="triggering_path", type=str, nargs=1,
+                             help="path to the triggering configuration", default=[None])
+    args = args_parser.parse_args()
+
+    directory = args.directory[0]
+    file_paths = [directory + "/" + file_name for file_name in os.listdir(directory) if os.path.isfile(directory + "/" + file_name)]
+    rules = read_triggering_rules(args.triggering_path[0])
+
+    start = time.perf_counter()
+    # The processes are spawned, so that the connections to the DDBB of this process are not shared
+    with ProcessPoolExecutor(max_workers = args.workers[0], mp_context = multiprocessing.get_context("spawn"), initializer = initialize_worker) as executor:
+        (results, not_ingested) = ingest_files(file_paths, rules, executor)
+    # end with
+    report = get_report(results, time.perf_counter() - start)
+
+    for result in not_ingested:
+        if result["source_type"] == None:
+            print("{} not ingested (no triggering rule applies)".format(os.path.basename(result["file_path"])))
+        else:
+            print("{} not ingested (no ingestion configured for the source type {})".format(os.path.basename(result["file_path"]), result["source_type"]))
+        # end if
+    # end for
+    print("{:<80} {:>6} {:>7} {:>12} {:>12}".format("processor", "files", "failed", "mean (s)", "max (s)"))
+    for (processor_name, processor) in report["processors"].items():
+        print("{:<80} {:>6} {:>7} {:>12.3f} {:>12.3f}".format(processor_name, processor["files"], processor["failed"],
+                                                               processor["mean_latency"] or 0, processor["max_latency"] or 0))
+    # end for
+    print("{} files ingested in {:.1f} seconds ({:.1f} files/min)".format(report["files"], report["elapsed_time"], report["throughput"] or 0))
+
+    return 0 if all([processor["failed"] == 0 for processor in report["processors"].values()]) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Helper module for the conversion of the dates received by the ingestions of Sentinel-2
+
+The dates in three letter format (DD-MMM-YYYY HH:MM:SS.ssssss) and in ISO 8601 format have a
+fixed layout, so they are converted by position instead of using the generic parser of dateutil,
+which is kept as fallback. The GPS dates are converted to UTC using the table of leap seconds,
+which is also used for converting the UTC dates to MJD2000
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import bisect
+import datetime
+import numpy
+from dateutil import parser
+
+MONTHS = {
+    "JAN": 1,
+    "FEB": 2,
+    "MAR": 3,
+    "APR": 4,
+    "MAY": 5,
+    "JUN": 6,
+    "JUL": 7,
+    "AUG": 8,
+    "SEP": 9,
+    "OCT": 10,
+    "NOV": 11,
+    "DEC": 12
+}
+MONTHS_ISO_8601 = {month: "{:02d}".format(MONTHS[month]) for month in MONTHS}
+
+# Leap seconds introduced since the GPS epoch (1980-01-06)
+# UTC date from which the offset applies and offset GPS - UTC (seconds)
+LEAP_SECONDS = [
+    (datetime.datetime(1981, 7, 1), 1),
+    (datetime.datetime(1982, 7, 1), 2),
+    (datetime.datetime(1983, 7, 1), 3),
+    (datetime.datetime(1985, 7, 1), 4),
+    (datetime.datetime(1988, 1, 1), 5),
+    (datetime.datetime(1990, 1, 1), 6),
+    (datetime.datetime(1991, 1, 1), 7),
+    (datetime.datetime(1992, 7, 1), 8),
+    (datetime.datetime(1993, 7, 1), 9),
+    (datetime.datetime(1994, 7, 1), 10),
+    (datetime.datetime(1996, 1, 1), 11),
+    (datetime.datetime(1997, 7, 1), 12),
+    (datetime.datetime(1999, 1, 1), 13),
+    (datetime.datetime(2006, 1, 1), 14),
+    (datetime.datetime(2009, 1, 1), 15),
+    (datetime.datetime(2012, 7, 1), 16),
+    (datetime.datetime(2015, 7, 1), 17),
+    (datetime.datetime(2017, 1, 1), 18)
+]
+
+# GPS dates from which each offset applies (the UTC date of the leap second expressed in GPS time)
+LEAP_SECONDS_GPS_DATES = [date + datetime.timedelta(seconds=offset) for (date, offset) in LEAP_SECONDS]
+
+MJD2000_EPOCH = numpy.datetime64("2000-01-01T00:00:00", "us")
+MICROSECONDS_PER_DAY = 86400000000
+
+# MJD2000 days ending with a leap second (the day before the date from which each offset applies)
+LEAP_SECOND_DAYS = numpy.array([(date - datetime.datetime(2000, 1, 1)).days - 1 for (date, offset) in LEAP_SECONDS], dtype=numpy.int64)
+
+def get_gps_utc_offset(date):
+    """
+    Method to obtain the offset between GPS and UTC at a GPS date
+
+    :param date: date in GPS time
+    :type date: datetime
+
+    :return: offset GPS - UTC in seconds
+    :rtype: int
+    """
+    index = bisect.bisect_right(LEAP_SECONDS_GPS_DATES, date)
+    if index == 0:
+        return 0
+    # end if
+
+    return LEAP_SECONDS[index - 1][1]
+
+def gps_to_utc(date):
+    """
+    Method to convert a GPS date to UTC
+
+    :param date: date in GPS time
+    :type date: datetime
+
+    :return: date in UTC
+    :rtype: datetime
+    """
+
+    return date - datetime.timedelta(seconds=get_gps_utc_offset(date))
+
+def three_letter_to_iso_8601(date):
+    """
+    Method to convert a date in three letter format to a date in ISO 8601 format
+
+    :param date: date in three letter format (DD-MMM-YYYY HH:MM:SS.ssssss)
+    :type date: str
+
+    :return: date in ISO 8601 format (YYYY-MM-DDTHH:MM:SS.ssssss)
+    :rtype: str
+    """
+
+    return date[7:11] + "-" + MONTHS_ISO_8601[date[3:6]] + "-" + date[0:2] + "T" + date[12:14] + ":" + date[15:17] + ":" + date[18:20] + "." + date[21:27]
+
+def parse_three_letter(date):
+    """
+    Method to convert a date in three letter format to datetime
+
+    :param date: date in three letter format (DD-MMM-YYYY HH:MM:SS.ssssss)
+    :type date: str
+
+    :return: date
+    :rtype: datetime
+    """
+    try:
+        return datetime.datetime(int(date[7:11]), MONTHS[date[3:6]], int(date[0:2]),
+                                 int(date[12:14]), int(date[15:17]), int(date[18:20]),
+                                 int(date[21:27].ljust(6, "0")))
+    except (KeyError, ValueError):
+        return parser.parse(three_letter_to_iso_8601(date))
+    # end try
+
+def parse_iso_8601(date):
+    """
+    Method to convert a date in ISO 8601 format to datetime
+
+    :param date: date in ISO 8601 format
+    :type date: str
+
+    :return: date
+    :rtype: datetime
+    """
+    try:
+        return datetime.datetime.fromisoformat(date)
+    except ValueError:
+        return parser.parse(date)
+    # end try
+
+def three_letter_gps_to_utc(date):
+    """
+    Method to convert a GPS date in three letter format to UTC
+
+    :param date: date in GPS time and three letter format (DD-MMM-YYYY HH:MM:SS.ssssss)
+    :type date: str
+
+    :return: date in UTC
+    :rtype: datetime
+    """
+
+    return gps_to_utc(parse_three_letter(date))
+
+def dates_to_mjd2000(dates):
+    """
+    Method to convert a list of UTC dates into days since 2000-01-01T00:00:00 UTC (MJD2000) at once
+    The result is equivalent to Time(date, format='isot', scale='utc').mjd - Time("2000-01-01T00:00:00", format='isot', scale='utc').mjd
+    of astropy (the days ending with a leap second last 86401 seconds), without building a Time object per date
+
+    :param dates: dates in ISO 8601 format
+    :type dates: list
+
+    :return: MJD2000 dates
+    :rtype: numpy.ndarray
+    """
+    microseconds = (numpy.array(dates, dtype="datetime64[us]") - MJD2000_EPOCH).astype(numpy.int64)
+    days = microseconds // MICROSECONDS_PER_DAY
+    day_lengths = numpy.where(numpy.isin(days, LEAP_SECOND_DAYS), MICROSECONDS_PER_DAY + 1000000, MICROSECONDS_PER_DAY)
+
+    return days + (microseconds - days * MICROSECONDS_PER_DAY) / day_lengths
@@ -29,3 +29,12 @@ class CentresConfigDoesNotPassSchema(Error):
     def __init__(self, message):
         self.message = message
 
+class WorkplanReportIsNotComplete(Error):
+    """Exception raised when the workplan report of a DPC file does not contain the mandatory nodes.
+
+    Attributes:
+        message -- explanation of the error
+    """
+
+    def __init__(self, message):
+        self.message = message
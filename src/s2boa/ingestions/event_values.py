@@ -0,0 +1,103 @@
+"""
+Helper module for accessing the values of the events of Sentinel-2
+
+The values are indexed by name once per event, so that obtaining several
+values of the same event does not scan the list of values each time.
+Both the events of the DDBB and the events in ingestion format (dicts) are supported
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+
+# Relationships of the events of the DDBB with the values per type
+EVENT_VALUE_RELATIONSHIPS = {
+    "double": "eventDoubles",
+    "timestamp": "eventTimestamps",
+    "text": "eventTexts",
+    "boolean": "eventBooleans",
+    "geometry": "eventGeometries",
+    "object": "eventObjects"
+}
+
+DEFAULT_VALUE_TYPES = ["double", "timestamp", "text", "boolean"]
+
+def index_values(event, value_types = None):
+    """
+    Method to obtain the values of an event indexed by name
+    When several values share the name, the first one is kept (as done by the
+    expressions [value.value for value in event.eventDoubles if value.name == name][0])
+
+    :param event: event of the DDBB or event in ingestion format
+    :type event: Event or dict
+    :param value_types: types of the values to index (double, timestamp, text, boolean, geometry, object). All but geometries and objects by default
+    :type value_types: list
+
+    :return: values indexed by name
+    :rtype: dict
+    """
+    if value_types == None:
+        value_types = DEFAULT_VALUE_TYPES
+    # end if
+
+    values = {}
+    if type(event) == dict:
+        for value in event.get("values", []):
+            if value["type"] in value_types and value["name"] not in values:
+                values[value["name"]] = value.get("value")
+            # end if
+        # end for
+    else:
+        for value_type in value_types:
+            for value in getattr(event, EVENT_VALUE_RELATIONSHIPS[value_type]):
+                if value.name not in values:
+                    values[value.name] = getattr(value, "value", None)
+                # end if
+            # end for
+        # end for
+    # end if
+
+    return values
+
+def index_values_per_event(events, value_types = None):
+    """
+    Method to obtain the values of a list of events indexed by name
+
+    :param events: events of the DDBB or events in ingestion format
+    :type events: list
+    :param value_types: types of the values to index (see index_values)
+    :type value_types: list
+
+    :return: list of values indexed by name (in the same order as the events)
+    :rtype: list
+    """
+
+    return [index_values(event, value_types) for event in events]
+
+def index_events_by_value(events, name, value_types = None):
+    """
+    Method to index a list of events by one of their values
+    Events without the value are discarded
+
+    :param events: events of the DDBB or events in ingestion format
+    :type events: list
+    :param name: name of the value
+    :type name: str
+    :param value_types: types of the values to index (see index_values)
+    :type value_types: list
+
+    :return: lists of events indexed by the value (keeping the order of the events)
+    :rtype: dict
+    """
+    events_by_value = {}
+    for event in events:
+        values = index_values(event, value_types)
+        if name in values:
+            if values[name] not in events_by_value:
+                events_by_value[values[name]] = []
+            # end if
+            events_by_value[values[name]].append(event)
+        # end if
+    # end for
+
+    return events_by_value
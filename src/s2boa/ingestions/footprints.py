@@ -0,0 +1,165 @@
+"""
+Helper module for the generation of footprints of Sentinel-2
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import subprocess
+import numpy
+
+# Import xml parser
+from lxml import etree
+
+# Import orbit helpers
+import s2boa.ingestions.orbit as orbit_functions
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+def get_footprint_command(start_mjd, stop_mjd, orbpre_file_path, swath_definition_file_path, iterations):
+    """
+    Method to obtain the command of the get_footprint tool for computing the footprint of one interval
+    :param start_mjd: start of the interval in MJD2000
+    :type start_mjd: float
+    :param stop_mjd: stop of the interval in MJD2000
+    :type stop_mjd: float
+    :param orbpre_file_path: path to the ORBPRE file
+    :type orbpre_file_path: str
+    :param swath_definition_file_path: path to the swath definition file
+    :type swath_definition_file_path: str
+    :param iterations: number of points per side of the swath
+    :type iterations: int
+
+    :return: get_footprint_command
+    :rtype: str
+
+    """
+
+    return "get_footprint -b {} -e {} -o '{} {}' -s {} -n {}".format(start_mjd, stop_mjd, orbpre_file_path, orbpre_file_path, swath_definition_file_path, iterations)
+
+def get_footprints_cfi(intervals, orbpre_file_path, swath_definition_file_path):
+    """
+    Method to obtain the coordinates of the footprints of a batch of intervals
+    The get_footprint tool is executed once in batch mode, so that the orbit
+    and the swath definition are loaded only once for all the intervals
+
+    :param intervals: list of tuples (start_mjd, stop_mjd, iterations)
+    :type intervals: list
+    :param orbpre_file_path: path to the ORBPRE file
+    :type orbpre_file_path: str
+    :param swath_definition_file_path: path to the swath definition file
+    :type swath_definition_file_path: str
+
+    :return: list of coordinates (longitude,latitude pairs separated by spaces) per interval. None when the footprint of the interval could not be computed
+    :rtype: list
+
+    """
+    if len(intervals) == 0:
+        return []
+    # end if
+
+    batch_request = "".join(["{} {} {}\n".format(start_mjd, stop_mjd, iterations) for (start_mjd, stop_mjd, iterations) in intervals])
+
+    FNULL = open(os.devnull, 'w')
+    try:
+        process = subprocess.Popen(["get_footprint", "-o", orbpre_file_path + " " + orbpre_file_path, "-s", swath_definition_file_path, "-i"],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=FNULL)
+        (output, _) = process.communicate(batch_request.encode("utf-8"))
+    except OSError as e:
+        logger.error("The footprints of the events could not be built because the get_footprint tool could not be executed: {}".format(e))
+        return [None] * len(intervals)
+    finally:
+        FNULL.close()
+    # end try
+
+    if process.returncode != 0:
+        logger.error("The get_footprint tool ended in error with code {} after processing the batch of {} intervals".format(process.returncode, len(intervals)))
+    # end if
+
+    lines = output.decode("utf-8").split("\n")
+
+    footprints = []
+    for i, interval in enumerate(intervals):
+        if i < len(lines) and lines[i] != "" and not lines[i].startswith("ERROR"):
+            footprints.append(lines[i].rstrip(" "))
+        else:
+            footprints.append(None)
+        # end if
+    # end for
+
+    return footprints
+
+def read_swath_definition(swath_definition_file_path):
+    """
+    Method to obtain the pointing of the swath points defined in a swath definition file
+    :param swath_definition_file_path: path to the swath definition file
+    :type swath_definition_file_path: str
+
+    :return: list of tuples (azimuth, elevation) in degrees per swath point
+    :rtype: list
+
+    """
+    parsed_xml = etree.parse(swath_definition_file_path)
+    pointing_geometries = parsed_xml.xpath("//*[local-name()='Swath_Point']/*[local-name()='Pointing_Geometry']")
+
+    return [(float(pointing_geometry.xpath("string(*[local-name()='Azimuth'])")),
+             float(pointing_geometry.xpath("string(*[local-name()='Elevation'])"))) for pointing_geometry in pointing_geometries]
+
+def get_footprints_numpy(intervals, osvs, swath_definition):
+    """
+    Method to obtain the coordinates of the footprints of a batch of intervals without the EOP CFI
+    The orbit is propagated from the OSVs of the ascending nodes and the edges of the swath
+    (first and last swath points) are projected over the WGS84 ellipsoid for all the intervals at once
+
+    :param intervals: list of tuples (start_mjd, stop_mjd, iterations)
+    :type intervals: list
+    :param osvs: OSVs of the ORBPRE (see orbit.build_osvs)
+    :type osvs: dict
+    :param swath_definition: list of tuples (azimuth, elevation) per swath point (see read_swath_definition)
+    :type swath_definition: list
+
+    :return: list of coordinates (longitude,latitude pairs separated by spaces) per interval, in the same format returned by get_footprints_cfi
+    :rtype: list
+
+    """
+    if len(intervals) == 0:
+        return []
+    # end if
+
+    # Times of every interval (same sampling as the get_footprint tool)
+    iterations = numpy.array([interval[2] for interval in intervals], dtype=int)
+    starts = numpy.array([interval[0] for interval in intervals], dtype=float)
+    stops = numpy.array([interval[1] for interval in intervals], dtype=float)
+    interval_indexes = numpy.repeat(numpy.arange(len(intervals)), iterations)
+    offsets = numpy.arange(iterations.sum()) - numpy.repeat(numpy.cumsum(iterations) - iterations, iterations)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        steps = numpy.where(iterations > 1, (stops - starts) / (iterations - 1), 0.0)
+    # end with
+    times = starts[interval_indexes] + offsets * steps[interval_indexes]
+    last_offsets = offsets == iterations[interval_indexes] - 1
+    times[last_offsets] = stops[interval_indexes[last_offsets]]
+
+    (positions, velocities) = orbit_functions.propagate(osvs, times)
+
+    (first_azimuth, first_elevation) = swath_definition[0]
+    (last_azimuth, last_elevation) = swath_definition[-1]
+    (first_longitudes, first_latitudes) = orbit_functions.get_swath_points(positions, velocities, first_azimuth, first_elevation)
+    (last_longitudes, last_latitudes) = orbit_functions.get_swath_points(positions, velocities, last_azimuth, last_elevation)
+
+    footprints = []
+    position = 0
+    for number_of_points in iterations:
+        first_side = ["{:f},{:f}".format(longitude, latitude) for (longitude, latitude) in zip(first_longitudes[position:position + number_of_points], first_latitudes[position:position + number_of_points])]
+        last_side = ["{:f},{:f}".format(longitude, latitude) for (longitude, latitude) in zip(last_longitudes[position:position + number_of_points], last_latitudes[position:position + number_of_points])]
+        last_side.reverse()
+        footprints.append(" ".join(first_side + last_side))
+        position += number_of_points
+    # end for
+
+    return footprints
@@ -8,19 +8,18 @@ module eboa
 
 # Import python utilities
 import math
+import bisect
 import datetime
 from dateutil import parser
-import subprocess
 import os
-from tempfile import mkstemp
 import re
+import json
+import copy
+import numpy
 
 # Import xml parser
 from lxml import etree
 
-# Import astropy
-from astropy.time import Time
-
 # Import helpers
 import eboa.ingestion.functions as ingestion_functions
 import eboa.engine.functions as eboa_functions
@@ -36,6 +35,26 @@ from eboa.debugging import debug
 from eboa.logging import Log
 import logging
 
+# Import footprint helpers
+import s2boa.ingestions.footprints as footprint_functions
+import s2boa.ingestions.orbit as orbit_functions
+import s2boa.ingestions.orbpre_cache as orbpre_cache_functions
+
+# Import event value helpers
+import s2boa.ingestions.event_values as event_values
+
+# Import timeline helpers
+import s2boa.ingestions.timeline as timeline_functions
+
+# Import date helpers
+import s2boa.ingestions.dates as date_functions
+
+# Import progress helpers
+import s2boa.ingestions.progress as progress_functions
+
+# Import profiling helpers
+import s2boa.ingestions.profiling as profiling_functions
+
 # Import errors
 from s2boa.ingestions.errors import CentresConfigCannotBeRead, CentresConfigDoesNotPassSchema
 
@@ -46,9 +65,21 @@ logger = logging_module.logger
 # Functions for controling the ingestion
 ###########
 def insert_ingestion_progress(session, source, progress):
+    """
+    Method to register the progress of the ingestion of a source
+    The progress is written to the DDBB in background by the reporter of the process (see s2boa.ingestions.progress),
+    so the ingestion does not wait for the commit
+
+    :param session: session of the source (not used, the reporter writes with its own session)
+    :type session: sqlalchemy.orm.Session
+    :param source: source registering the progress of the ingestion (nothing is registered if not provided)
+    :type source: Source
+    :param progress: progress of the ingestion (percentage)
+    :type progress: float
+    """
+    profiling_functions.mark_progress(progress)
     if source:
-        source.processor_progress = progress
-        session.commit()
+        progress_functions.get_progress_reporter().report(source.source_uuid, progress)
     # end if
 
     return
@@ -168,38 +199,149 @@ def convert_from_gps_to_utc(date):
 
     """
 
-    date_datetime = parser.parse(date)
-
-    if date_datetime > datetime.datetime(2015, 6, 30, 23, 59, 59) and date_datetime <= datetime.datetime(2016, 12, 31, 23, 59, 59):
-        correction = -17
-    elif date_datetime > datetime.datetime(2016, 12, 31, 23, 59, 59):
-        correction = -18
-    else:
-        correction = -16
-
-    return (date_datetime + datetime.timedelta(seconds=correction)).isoformat()
+    return date_functions.gps_to_utc(date_functions.parse_iso_8601(date)).isoformat()
 
 # Uncomment for debugging reasons
 #@debug
 def convert_from_datetime_gps_to_datetime_utc(date):
     """
     Method to convert a date in GPS precission to UTC
-    :param date: date in GPS precission and ISO format
-    :type date: str
+    :param date: date in GPS precission
+    :type date: datetime
 
-    :return: date coverted in ISO 8601
-    :rtype: str
+    :return: date coverted to UTC
+    :rtype: datetime
+
+    """
+
+    return date_functions.gps_to_utc(date)
+
+###########
+# S2 instrument geometry
+###########
 
+# Storage mode per VCID
+VCID_MODES = {
+    "2": "SAD",
+    "3": "HKTM",
+    "4": "NOMINAL",
+    "5": "NRT",
+    "6": "RT",
+    "20": "NOMINAL",
+    "21": "NRT",
+    "22": "RT"
+}
+
+# APIDs of each half swath
+HALF_SWATH_APID_CONFIGURATIONS = {
+    "SECOND": {
+        "min_apid": 0,
+        "max_apid": 92,
+    },
+    "FIRST": {
+        "min_apid": 256,
+        "max_apid": 348,
+    }
+}
+
+# Half swath per VCID
+VCID_HALF_SWATHS = {
+    "4": "SECOND",
+    "5": "SECOND",
+    "6": "SECOND",
+    "20": "FIRST",
+    "21": "FIRST",
+    "22": "FIRST"
+}
+
+# Counter threshold per band (the rest of bands use 71)
+BAND_COUNTER_THRESHOLDS = {
+    "1": 23,
+    "2": 143,
+    "3": 143,
+    "4": 143,
+    "8": 143,
+    "9": 23,
+    "10": 23
+}
+
+def _compute_band_detector(apid):
     """
+    Method to compute the detector and band numbers of an APID (see get_band_detector)
 
-    if date > datetime.datetime(2015, 6, 30, 23, 59, 59) and date <= datetime.datetime(2016, 12, 31, 23, 59, 59):
-        correction = -17
-    elif date > datetime.datetime(2016, 12, 31, 23, 59, 59):
-        correction = -18
+    :param apid: APID number
+    :type apid: int
+
+    :return: tuple with the detector and the band
+    :rtype: tuple
+    """
+    if apid < 256:
+        detector = 12 - math.floor(apid/16)
+    else:
+        detector = 12 - (math.floor((apid - 256)/16) + 6)
+    # end if
+
+    raw_band = (apid % 16) + 1
+    if raw_band == 9:
+        band = "8a"
+    elif raw_band > 9:
+        band = raw_band - 1
     else:
-        correction = -16
+        band = raw_band
+    # end if
 
-    return date + datetime.timedelta(seconds=correction)
+    return (str(detector), str(band))
+
+def _build_apid_table():
+    """
+    Method to build the table with the geometry of the instrument per APID
+    The table covers the ranges of APIDs of both half swaths (0-95 and 256-351)
+
+    :return: tuple with the list of entries indexed by APID and the list of APID numbers used
+    :rtype: tuple
+    """
+    apid_table = [None] * 352
+    apid_numbers = []
+    for (half_swath, first_apid) in [("SECOND", 0), ("FIRST", 256)]:
+        for i in range(6):
+            for j in range(16):
+                apid = first_apid + i*16 + j
+                (detector, band) = _compute_band_detector(apid)
+                apid_table[apid] = (detector, band, BAND_COUNTER_THRESHOLDS.get(band, 71), half_swath)
+                # Only the 13 first APIDs of each detector carry bands
+                if j < 13:
+                    apid_numbers.append(apid)
+                # end if
+            # end for
+        # end for
+    # end for
+
+    return (apid_table, apid_numbers)
+
+# Entries (detector, band, counter threshold, half swath) indexed by APID
+(APID_TABLE, APID_NUMBERS) = _build_apid_table()
+
+# Entries indexed by the APID number and its text representation (as received from the XML files)
+APID_ENTRIES = {key: entry for (apid, entry) in enumerate(APID_TABLE) if entry != None for key in (apid, str(apid))}
+
+def _get_apid_entry(apid):
+    """
+    Method to obtain the entry of the table of the instrument geometry of an APID
+    APIDs out of the table are computed
+
+    :param apid: APID number
+    :type apid: str or int
+
+    :return: tuple with the detector, the band, the counter threshold and the half swath (None for APIDs out of the table)
+    :rtype: tuple
+    """
+    entry = APID_ENTRIES.get(apid)
+    if entry == None:
+        (detector, band) = _compute_band_detector(int(apid))
+        entry = (detector, band, BAND_COUNTER_THRESHOLDS.get(band, 71), None)
+    # end if
+
+    return entry
 
 # Uncomment for debugging reasons
 #@debug
@@ -214,18 +356,7 @@ def get_vcid_mode(vcid):
 
     """
 
-    correspondence = {
-        "2": "SAD",
-        "3": "HKTM",
-        "4": "NOMINAL",
-        "5": "NRT",
-        "6": "RT",
-        "20": "NOMINAL",
-        "21": "NRT",
-        "22": "RT"
-    }
-
-    return correspondence[vcid]
+    return VCID_MODES[vcid]
 
 
 # Uncomment for debugging reasons
@@ -241,27 +372,7 @@ def get_vcid_apid_configuration(vcid):
 
     """
 
-    # Second half swath
-    apids_second_half_swath = {
-        "min_apid": 0,
-        "max_apid": 92,
-    }
-    # First half swath
-    apids_first_half_swath = {
-        "min_apid": 256,
-        "max_apid": 348,
-    }
-
-    correspondence = {
-        "4": apids_second_half_swath,
-        "5": apids_second_half_swath,
-        "6": apids_second_half_swath,
-        "20": apids_first_half_swath,
-        "21": apids_first_half_swath,
-        "22": apids_first_half_swath
-    }
-
-    return correspondence[vcid]
+    return dict(HALF_SWATH_APID_CONFIGURATIONS[VCID_HALF_SWATHS[vcid]])
 
 # Uncomment for debugging reasons
 #@debug
@@ -308,22 +419,9 @@ def get_band_detector(apid):
 
     """
 
-    if int(apid) < 256:
-        detector = 12 - math.floor(int(apid)/16)
-    else:
-        detector = 12 - (math.floor((int(apid) - 256)/16) + 6)
-    # end if
+    entry = _get_apid_entry(apid)
 
-    raw_band = (int(apid) % 16) + 1
-    if raw_band == 9:
-        band = "8a"
-    elif raw_band > 9:
-        band = raw_band - 1
-    else:
-        band = raw_band
-    # end if
-
-    return {"detector": str(detector), "band": str(band)}
+    return {"detector": entry[0], "band": entry[1]}
 
 # Uncomment for debugging reasons
 #@debug
@@ -347,15 +445,7 @@ def get_counter_threshold(band):
 
     """
 
-    if band == "2" or band == "3" or band == "4" or band == "8":
-        counter_threshold = 143
-    elif band == "1" or band == "9" or band == "10":
-        counter_threshold = 23
-    else:
-        counter_threshold = 71
-    # end if
-
-    return counter_threshold
+    return BAND_COUNTER_THRESHOLDS.get(band, 71)
 
 # Uncomment for debugging reasons
 #@debug
@@ -371,9 +461,7 @@ def get_counter_threshold_from_apid(apid):
 
     """
 
-    band_detector = get_band_detector(apid)
-
-    return get_counter_threshold(band_detector["band"])
+    return _get_apid_entry(apid)[2]
 
 def get_apid_numbers():
     """
@@ -383,18 +471,8 @@ def get_apid_numbers():
     :rtype: list
 
     """
-    apids = []
-    for i in range(6):
-        for j in range (13):
-            apids.append(i*16 + j)
-        # end for
-    # end for
-    for i in range(6):
-        for j in range (13):
-            apids.append((i*16 + j) + 256)
-        # end for
-    # end for
-    return apids
+
+    return list(APID_NUMBERS)
 
 #########
 # Date helpers
@@ -412,29 +490,8 @@ def three_letter_to_iso_8601(date):
     :rtype: str
 
     """
-    month = {
-        "JAN": "01",
-        "FEB": "02",
-        "MAR": "03",
-        "APR": "04",
-        "MAY": "05",
-        "JUN": "06",
-        "JUL": "07",
-        "AUG": "08",
-        "SEP": "09",
-        "OCT": "10",
-        "NOV": "11",
-        "DEC": "12"
-    }
-    year = date[7:11]
-    month = month[date[3:6]]
-    day = date[0:2]
-    hours = date[12:14]
-    minutes = date[15:17]
-    seconds = date[18:20]
-    microseconds = date[21:27]
 
-    return year + "-" + month + "-" + day + "T" + hours + ":" + minutes + ":" + seconds + "." + microseconds
+    return date_functions.three_letter_to_iso_8601(date)
 
 
 ###########
@@ -472,8 +529,7 @@ def L0_L1A_L1B_processing(source, engine, query, granule_timeline, list_of_event
 
     """
     general_status = "COMPLETE"
-    granule_timeline_sorted = ingestion_functions.sort_timeline_by_start(granule_timeline)
-    datablocks = ingestion_functions.merge_timeline(granule_timeline_sorted)
+    datablocks = timeline_functions.merge_timeline(granule_timeline)
 
     # Obtain the production level from the datastrip
     level = datastrip[13:16].replace("_","")
@@ -499,68 +555,78 @@ def L0_L1A_L1B_processing(source, engine, query, granule_timeline, list_of_event
         "events": []
     }
 
+    # Merge the granules per detector (independent of the datablocks)
+    datablocks_per_detector = timeline_functions.merge_timelines_per_key(granule_timeline_per_detector)
+
+    # Obtain the gaps existing during the reception covering all the datablocks at once
+    isp_gaps_datastrip = []
+    if len(datablocks) > 0:
+        isp_gaps_datastrip = query.get_events(gauge_names = {"filter": "ISP_GAP", "op": "=="},
+                                              value_filters = [{"name": {"filter": "satellite", "op": "=="}, "type": "text", "value": {"op": "==", "filter": satellite}}],
+                                              start_filters = [{"date": max([datablock["stop"] for datablock in datablocks]).isoformat(), "op": "<"}],
+                                              stop_filters = [{"date": min([datablock["start"] for datablock in datablocks]).isoformat(), "op": ">"}])
+    # end if
+
+    # Sort the gaps by start, with the detector of each gap, so that the gaps of each datablock are bisected
+    isp_gaps_datastrip = sorted([(gap.start, gap.stop, str(int(event_values.index_values(gap, ["double"])["detector"])), gap) for gap in isp_gaps_datastrip], key = lambda isp_gap: isp_gap[0])
+    isp_gaps_starts = [isp_gap[0] for isp_gap in isp_gaps_datastrip]
+    isp_gaps_max_duration = max([isp_gap[1] - isp_gap[0] for isp_gap in isp_gaps_datastrip], default = datetime.timedelta(0))
+
     for datablock in datablocks:
         status = "COMPLETE"
 
-        # Obtain the gaps from the processing per detector
-        processing_gaps = {}
-        granule_timeline_per_detector_sorted = {}
-        datablocks_per_detector = {}
-        intersected_datablock_per_detector = {}
-        for detector in granule_timeline_per_detector:
-            granule_timeline_per_detector_sorted[detector] = ingestion_functions.sort_timeline_by_start(granule_timeline_per_detector[detector])
-            datablocks_per_detector[detector] = ingestion_functions.merge_timeline(granule_timeline_per_detector_sorted[detector])
-            datablock_start_with_margin = datablock["start"] + datetime.timedelta(seconds=6)
-            datablock_stop_with_margin = datablock["stop"] - datetime.timedelta(seconds=6)
-            if datablock_start_with_margin > datablock_stop_with_margin:
-                datablock_start_with_margin = datablock["start"]
-                datablock_stop_with_margin = datablock["stop"]
-            # end if
+        # Obtain the gaps from the processing per detector (all the detectors at once)
+        datablock_start_with_margin = datablock["start"] + datetime.timedelta(seconds=6)
+        datablock_stop_with_margin = datablock["stop"] - datetime.timedelta(seconds=6)
+        if datablock_start_with_margin > datablock_stop_with_margin:
+            datablock_start_with_margin = datablock["start"]
+            datablock_stop_with_margin = datablock["stop"]
+        # end if
 
-            datablock_for_extracting_gaps = {
+        datablock_for_extracting_gaps_per_detector = {}
+        for detector in granule_timeline_per_detector:
+            datablock_for_extracting_gaps_per_detector[detector] = [{
                 "id": datablock["id"],
                 "start": datablock_start_with_margin,
                 "stop": datablock_stop_with_margin
-            }
-            intersected_datablock_per_detector[detector] = ingestion_functions.intersect_timelines([datablock_for_extracting_gaps], datablocks_per_detector[detector])
-            processing_gaps[detector] = ingestion_functions.difference_timelines(intersected_datablock_per_detector[detector],[datablock_for_extracting_gaps])
-            if len(processing_gaps[detector]) == 0:
-                del processing_gaps[detector]
-            # end if
+            }]
         # end for
+        intersected_datablock_per_detector = timeline_functions.intersect_timelines_per_key(datablock_for_extracting_gaps_per_detector, datablocks_per_detector)
+        processing_gaps = {detector: gaps for (detector, gaps) in timeline_functions.difference_timelines_per_key(intersected_datablock_per_detector, datablock_for_extracting_gaps_per_detector).items() if len(gaps) > 0}
 
         # Obtain the gaps existing during the reception per detector
-        isp_gaps = query.get_events(gauge_names = {"filter": "ISP_GAP", "op": "=="},
-                                    value_filters = [{"name": {"filter": "satellite", "op": "=="}, "type": "text", "value": {"op": "==", "filter": satellite}}],
-                                    start_filters = [{"date": datablock["stop"].isoformat(), "op": "<"}],
-                                    stop_filters = [{"date": datablock["start"].isoformat(), "op": ">"}])
+        # (only the gaps starting after the start of the datablock minus the longest gap can finish after it)
+        first_isp_gap = bisect.bisect_right(isp_gaps_starts, datablock["start"] - isp_gaps_max_duration)
+        last_isp_gap = bisect.bisect_left(isp_gaps_starts, datablock["stop"])
         data_isp_gaps = {}
-        for gap in isp_gaps:
-            detector = [value.value for value in gap.eventDoubles if value.name == "detector"][0]
+        for (gap_start, gap_stop, detector, gap) in isp_gaps_datastrip[first_isp_gap:last_isp_gap]:
+            if gap_stop <= datablock["start"]:
+                continue
+            # end if
             if detector not in data_isp_gaps:
-                data_isp_gaps[str(int(detector))] = []
+                data_isp_gaps[detector] = []
             # end if
-            data_isp_gaps[str(int(detector))].append({
+            data_isp_gaps[detector].append({
                 "id": gap.event_uuid,
-                "start": gap.start,
-                "stop": gap.stop
+                "start": gap_start,
+                "stop": gap_stop
             })
         # end for
 
         # Merge gaps per detector
-        data_merged_isp_gaps = {}
-        for detector in data_isp_gaps:
-            data_merged_isp_gaps[detector] = ingestion_functions.merge_timeline(data_isp_gaps[detector])
-        # end for
+        data_merged_isp_gaps = timeline_functions.merge_timelines_per_key(data_isp_gaps)
+
+        # Classify the processing gaps of the detectors with gaps during the reception (all the detectors at once)
+        processing_gaps_with_isp_gaps = {detector: processing_gaps[detector] for detector in processing_gaps if detector in data_merged_isp_gaps}
+        gaps_due_to_reception_issues = timeline_functions.intersect_timelines_per_key(processing_gaps_with_isp_gaps, data_merged_isp_gaps)
+        gaps_due_to_processing_issues_with_isp_gaps = timeline_functions.difference_timelines_per_key(processing_gaps_with_isp_gaps, gaps_due_to_reception_issues)
 
-        gaps_due_to_reception_issues = {}
         gaps_due_to_processing_issues = {}
         for detector in processing_gaps:
             status="INCOMPLETE"
             general_status = "INCOMPLETE"
-            if detector in data_merged_isp_gaps:
-                gaps_due_to_reception_issues[detector] = ingestion_functions.intersect_timelines(processing_gaps[detector], data_merged_isp_gaps[detector])
-                gaps_due_to_processing_issues[detector] = ingestion_functions.difference_timelines(processing_gaps[detector], gaps_due_to_reception_issues[detector])
+            if detector in gaps_due_to_processing_issues_with_isp_gaps:
+                gaps_due_to_processing_issues[detector] = gaps_due_to_processing_issues_with_isp_gaps[detector]
             else:
                 gaps_due_to_processing_issues[detector] = processing_gaps[detector]
             # end if
@@ -976,6 +1042,70 @@ def L0_L1A_L1B_processing(source, engine, query, granule_timeline, list_of_event
     return general_status
 # end def
 
+def get_linking_events_per_event(query, event_uuids, link_names):
+    """
+    Method to obtain the events linking to a list of events with only one query
+    The linking events are grouped by the event they link to, in the order returned by the query
+
+    :param query: object to access the query interface of the EBOA
+    :type query: Query
+    :param event_uuids: identifiers of the events
+    :type event_uuids: list
+    :param link_names: names of the links
+    :type link_names: list
+
+    :return: linking events per event identifier
+    :rtype: dict
+
+    """
+    linking_events_per_event = {event_uuid: [] for event_uuid in event_uuids}
+    if len(event_uuids) == 0:
+        return linking_events_per_event
+    # end if
+
+    linking_events = query.get_linking_events(event_uuids = {"filter": event_uuids, "op": "in"},
+                                              link_names = {"filter": link_names, "op": "in"})
+
+    for event in linking_events["linking_events"]:
+        for event_uuid in set([link.event_uuid_link for link in event.eventLinks if link.name in link_names and link.event_uuid_link in linking_events_per_event]):
+            linking_events_per_event[event_uuid].append(event)
+        # end for
+    # end for
+
+    logger.info("The events linking to {} events were obtained with 1 query ({} queries saved)".format(len(event_uuids), len(event_uuids) - 1))
+
+    return linking_events_per_event
+
+def get_upper_level_datastrip(query, satellite, sensing_identifier):
+    """
+    Method to obtain the upper level datastrip (L1B preferred over L0) corresponding to a sensing identifier
+    :param query: object to access the query interface of the EBOA
+    :type query: Query
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param sensing_identifier: sensing identifier of the datastrips
+    :type sensing_identifier: str
+
+    :return: upper level datastrip or None if it has not been ingested yet
+    :rtype: str
+
+    """
+    upper_level_ers = query.get_explicit_refs(annotation_cnf_names = {"filter": "SENSING_IDENTIFIER", "op": "=="},
+                                              annotation_cnf_systems = {"filter": satellite, "op": "=="},
+                                              groups = {"filter": ["L0_DS", "L1B_DS"], "op": "in"},
+                                              annotation_value_filters = [{"name": {"filter": "sensing_identifier", "op": "=="}, "type": "text", "value": {"op": "==", "filter": sensing_identifier}}])
+    upper_level_ers = [er.explicit_ref for er in upper_level_ers]
+
+    upper_level_er = [er for er in upper_level_ers if er[13:16] == "L1B"]
+    if len(upper_level_er) == 0:
+        upper_level_er = [er for er in upper_level_ers if er[13:16] == "L0_"]
+    # end if
+    if len(upper_level_er) == 0:
+        return None
+    # end if
+
+    return upper_level_er[0]
+
 def L1C_L2A_processing(source, engine, query, list_of_events, processing_validity_events, datastrip, list_of_operations, system, version, filename, satellite):
     """
     Method to generate the events for the levels L1C and L2A
@@ -1032,13 +1162,18 @@ def L1C_L2A_processing(source, engine, query, list_of_events, processing_validit
         "events": []
     }
 
+    # Obtain the events linking to all the processing validities at once
+    linking_events_per_processing_validity = get_linking_events_per_event(query, [processing_validity_event.event_uuid for processing_validity_event in processing_validity_events],
+                                                                          ["PROCESSING_GAP", "PLANNED_IMAGING", "ISP_VALIDITY"])
+
+    # Structured values of the gaps (the gaps are reported for every following processing validity)
+    gap_structured_values = {}
+
     # Classify the events obtained from the datatrip linked events
     for processing_validity_event in processing_validity_events:
         status = "COMPLETE"
-        linking_to_processing_validity_events = query.get_linking_events(event_uuids = {"filter": [processing_validity_event.event_uuid], "op": "in"},
-                                                              link_names = {"filter": ["PROCESSING_GAP", "PLANNED_IMAGING", "ISP_VALIDITY"], "op": "in"})
 
-        for event in linking_to_processing_validity_events["linking_events"]:
+        for event in linking_events_per_processing_validity[processing_validity_event.event_uuid]:
             if event.gauge.name.startswith("PROCESSING_GAP"):
                 gaps.append(event)
             # end if
@@ -1056,7 +1191,10 @@ def L1C_L2A_processing(source, engine, query, list_of_events, processing_validit
             general_status = "INCOMPLETE"
 
             for gap in gaps:
-                values = gap.get_structured_values()
+                if gap.event_uuid not in gap_structured_values:
+                    gap_structured_values[gap.event_uuid] = gap.get_structured_values()
+                # end if
+                values = copy.deepcopy(gap_structured_values[gap.event_uuid])
                 value_level = [value for value in values if value["name"] == "level"][0]
                 value_level["value"] = level
                 gap_event = {
@@ -1440,173 +1578,161 @@ def L1C_L2A_processing(source, engine, query, list_of_events, processing_validit
 #########
 # EOP CFI
 #########
-def build_orbpre_file(start_events, stop_events, satellite, orbpre_events = None):
+
+def _get_orbpre_osvs(orbpre_events):
     """
-    Method to generate an orbpre file from data inside the DDBB
+    Method to obtain the OSVs (tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality) of a list of ORBIT_PREDICTION events from the DDBB
     """
+    osvs = []
+    for event in orbpre_events:
+        values = event_values.index_values(event, ["double", "timestamp"])
+        osvs.append((values["tai"].isoformat(), event.start.isoformat(), values["ut1"].isoformat(), values["orbit"],
+                     values["x"], values["y"], values["z"], values["vx"], values["vy"], values["vz"], values["quality"]))
+    # end for
 
-    start = (parser.parse(start_events) - datetime.timedelta(minutes=200)).isoformat()
-    stop = (parser.parse(stop_events) + datetime.timedelta(minutes=200)).isoformat()
+    return osvs
 
-    (_, orbpre_file_path) = mkstemp()
+def _get_orbpre_osvs_from_dicts(orbpre_events):
+    """
+    Method to obtain the OSVs (tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality) of a list of ORBIT_PREDICTION events in ingestion format
+    """
+    osvs = []
+    for event in orbpre_events:
+        values = event_values.index_values(event, ["double", "timestamp"])
+        osvs.append((values["tai"], event["start"], values["ut1"], values["orbit"],
+                     values["x"], values["y"], values["z"], values["vx"], values["vy"], values["vz"], values["quality"]))
+    # end for
 
-    f= open(orbpre_file_path,"w+")
+    return osvs
 
-    header = '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
-    <Earth_Explorer_File>
-    
-    <Earth_Explorer_Header>
-    <Fixed_Header>
-    <File_Name>{}_OPER_MPL_ORBPRE_{}_{}_0001</File_Name>
-    <File_Description>FOS Predicted Orbit File</File_Description>
-    <Notes></Notes>
-    <Mission>SENTINEL {}</Mission>
-    <File_Class>OPER</File_Class>
-    <File_Type>MPL_ORBPRE</File_Type>
-    <Validity_Period>
-    <Validity_Start>UTC={}</Validity_Start>
-    <Validity_Stop>UTC={}</Validity_Stop>
-    </Validity_Period>
-    <File_Version>0001</File_Version>
-    <Source>
-    <System>FOS</System>
-    <Creator>NAPEOS</Creator>
-    <Creator_Version>3.0</Creator_Version>
-    <Creation_Date>UTC={}</Creation_Date>
-    </Source>
-    </Fixed_Header>
-    <Variable_Header>
-    <Ref_Frame>EARTH_FIXED</Ref_Frame>
-    <Time_Reference>UTC</Time_Reference>
-    </Variable_Header>
-    </Earth_Explorer_Header>
-    '''.format(satellite, start, stop, satellite, start, stop, datetime.datetime.now().isoformat())
-
-    f.write(header)
-    
-    if orbpre_events == None:
-        query = Query()
+# Margin of the window of the orbit prediction around the events
+ORBPRE_WINDOW_MARGIN = datetime.timedelta(minutes=200)
+
+def get_orbpre_token(query, satellite, start, stop):
+    """
+    Method to obtain the identifier of the ORBPRE sources available in the DDBB for the satellite in the window
+
+    :param query: query interface
+    :type query: Query
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param start: start of the window
+    :type start: datetime
+    :param stop: stop of the window
+    :type stop: datetime
+
+    :return: set of identifiers of the ORBPRE sources
+    :rtype: frozenset
+    """
+    sources = query.get_sources(names = {"filter": satellite + "%", "op": "like"},
+                                dim_signatures = {"filter": "ORBPRE", "op": "=="},
+                                validity_start_filters = [{"date": stop.isoformat(), "op": "<"}],
+                                validity_stop_filters = [{"date": start.isoformat(), "op": ">"}])
 
-        orbpre_events = query.get_events(gauge_names = {"filter": "ORBIT_PREDICTION", "op": "=="},
-                                         start_filters = [{"date": stop, "op": "<"}],
-                                         stop_filters = [{"date": start, "op": ">"}],
-                                         value_filters = [{"name": {"filter": "satellite", "op": "=="},
-                                                           "type": "text",
-                                                           "value": {"filter": satellite, "op": "=="}}])
+    return frozenset([str(source.source_uuid) for source in sources])
+
+def get_orbit_prediction(start_events, stop_events, satellite, orbpre_events = None):
+    """
+    Method to obtain the orbit prediction covering the events from data inside the DDBB
+    The orbit predictions obtained from the DDBB are kept in a process wide cache, so that
+    following requests covered by the same window do not query nor write the ORBPRE again.
+    The cached orbit prediction is refreshed when the ORBPRE sources of the window change
+    The returned orbit prediction has to be released after use (see release_orbit_prediction)
+
+    :param start_events: start of the events
+    :type start_events: str
+    :param stop_events: stop of the events
+    :type stop_events: str
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param orbpre_events: ORBIT_PREDICTION events in ingestion format (the DDBB is not used if provided)
+    :type orbpre_events: list
+
+    :return: orbit_prediction
+    :rtype: OrbitPrediction
 
-        orbpre_events.sort(key=lambda x:x.start)
+    """
+    start_window = parser.parse(start_events) - ORBPRE_WINDOW_MARGIN
+    stop_window = parser.parse(stop_events) + ORBPRE_WINDOW_MARGIN
+
+    if orbpre_events != None:
+        logger.debug("There are {} orbpre events provided".format(len(orbpre_events)))
+        return orbpre_cache_functions.OrbitPrediction(satellite, start_window, stop_window, _get_orbpre_osvs_from_dicts(orbpre_events))
+    # end if
 
-        if len(orbpre_events) == 0:
-            return (0, orbpre_file_path)
+    cache_configuration = get_s2boa_conf().get("ORBPRE_CACHE", {})
+    orbpre_cache = orbpre_cache_functions.get_orbpre_cache(cache_configuration.get("MAX_ENTRIES", orbpre_cache_functions.DEFAULT_MAX_ENTRIES))
+
+    query = Query()
+
+    orbit_prediction = orbpre_cache.get(satellite, start_window, stop_window)
+    if orbit_prediction != None:
+        if orbit_prediction.token == get_orbpre_token(query, satellite, orbit_prediction.start, orbit_prediction.stop):
+            logger.debug("The orbit prediction covering from {} to {} is reused from the cache".format(start_window.isoformat(), stop_window.isoformat()))
+            query.close_session()
+            return orbit_prediction
         # end if
-        
+        orbpre_cache.discard(orbit_prediction)
+        orbpre_cache.release(orbit_prediction)
+    # end if
+
+    token = get_orbpre_token(query, satellite, start_window, stop_window)
+    orbpre_events = query.get_events(gauge_names = {"filter": "ORBIT_PREDICTION", "op": "=="},
+                                     start_filters = [{"date": stop_window.isoformat(), "op": "<"}],
+                                     stop_filters = [{"date": start_window.isoformat(), "op": ">"}],
+                                     value_filters = [{"name": {"filter": "satellite", "op": "=="},
+                                                       "type": "text",
+                                                       "value": {"filter": satellite, "op": "=="}}])
+
+    orbpre_events.sort(key=lambda x:x.start)
+
+    if len(orbpre_events) > 0:
         logger.debug("The orbpre events cover from {} to {}".format(orbpre_events[0].start.isoformat(), orbpre_events[-1].start.isoformat()))
-        
-        number_of_orbpre_events = len(orbpre_events)
-
-        datablock_begin = '''
-        <Data_Block type="xml">
-        <List_of_OSVs count="{}">
-        '''.format(number_of_orbpre_events)
-
-        f.write(datablock_begin)        
-
-        for event in orbpre_events:
-            tai = [value.value for value in event.eventTimestamps if value.name == "tai"][0].isoformat()
-            utc = event.start.isoformat()
-            ut1 = [value.value for value in event.eventTimestamps if value.name == "ut1"][0].isoformat()
-            orbit = [value.value for value in event.eventDoubles if value.name == "orbit"][0]
-            x = [value.value for value in event.eventDoubles if value.name == "x"][0]
-            y = [value.value for value in event.eventDoubles if value.name == "y"][0]
-            z = [value.value for value in event.eventDoubles if value.name == "z"][0]
-            vx = [value.value for value in event.eventDoubles if value.name == "vx"][0]
-            vy = [value.value for value in event.eventDoubles if value.name == "vy"][0]
-            vz = [value.value for value in event.eventDoubles if value.name == "vz"][0]
-            quality = [value.value for value in event.eventDoubles if value.name == "quality"][0]
-            osv = '''
-            <OSV>
-            <TAI>TAI={}</TAI>
-            <UTC>UTC={}</UTC>
-            <UT1>UT1={}</UT1>
-            <Absolute_Orbit>+{}</Absolute_Orbit>
-            <X unit="m">{}</X>
-            <Y unit="m">{}</Y>
-            <Z unit="m">{}</Z>
-            <VX unit="m/s">{}</VX>
-            <VY unit="m/s">{}</VY>
-            <VZ unit="m/s">{}</VZ>
-            <Quality>{}</Quality>
-            </OSV>
-            '''.format(tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality)
-            f.write(osv)        
-        # end for
+    # end if
 
-        query.close_session()
-    else:
-        number_of_orbpre_events = len(orbpre_events)
+    orbit_prediction = orbpre_cache_functions.OrbitPrediction(satellite, start_window, stop_window, _get_orbpre_osvs(orbpre_events), token)
 
-        if len(orbpre_events) == 0:
-            return (0, orbpre_file_path)
-        # end if
-        
-        logger.debug("The orbpre events cover from {} to {}".format(orbpre_events[0]["start"], orbpre_events[-1]["start"]))
-        
-        datablock_begin = '''
-        <Data_Block type="xml">
-        <List_of_OSVs count="{}">
-        '''.format(number_of_orbpre_events)
+    query.close_session()
+
+    if orbit_prediction.number_of_osvs() > 0:
+        orbpre_cache.put(orbit_prediction)
+    # end if
 
-        f.write(datablock_begin)        
+    return orbit_prediction
 
-        logger.debug("The orbpre events cover from {} to {}".format(orbpre_events[0]["start"], orbpre_events[-1]["start"]))
-        
-        for event in orbpre_events:
-            tai = [value["value"] for value in event["values"] if value["name"] == "tai"][0]
-            utc = event["start"]
-            ut1 = [value["value"] for value in event["values"] if value["name"] == "ut1"][0]
-            orbit = [value["value"] for value in event["values"] if value["name"] == "orbit"][0]
-            x = [value["value"] for value in event["values"] if value["name"] == "x"][0]
-            y = [value["value"] for value in event["values"] if value["name"] == "y"][0]
-            z = [value["value"] for value in event["values"] if value["name"] == "z"][0]
-            vx = [value["value"] for value in event["values"] if value["name"] == "vx"][0]
-            vy = [value["value"] for value in event["values"] if value["name"] == "vy"][0]
-            vz = [value["value"] for value in event["values"] if value["name"] == "vz"][0]
-            quality = [value["value"] for value in event["values"] if value["name"] == "quality"][0]
-            osv = '''
-            <OSV>
-            <TAI>TAI={}</TAI>
-            <UTC>UTC={}</UTC>
-            <UT1>UT1={}</UT1>
-            <Absolute_Orbit>+{}</Absolute_Orbit>
-            <X unit="m">{}</X>
-            <Y unit="m">{}</Y>
-            <Z unit="m">{}</Z>
-            <VX unit="m/s">{}</VX>
-            <VY unit="m/s">{}</VY>
-            <VZ unit="m/s">{}</VZ>
-            <Quality>{}</Quality>
-            </OSV>
-            '''.format(tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality)
-            f.write(osv)        
-        # end for        
+def release_orbit_prediction(orbit_prediction):
+    """
+    Method to release an orbit prediction obtained with get_orbit_prediction
+    The ORBPRE file is removed if the orbit prediction is not kept in the cache
+
+    :param orbit_prediction: orbit prediction
+    :type orbit_prediction: OrbitPrediction
+
+    """
+    if orbit_prediction.users > 0:
+        orbpre_cache_functions.get_orbpre_cache().release(orbit_prediction)
+    else:
+        orbit_prediction.remove_files()
     # end if
-        
-    file_end = '''
-    </List_of_OSVs>
-    </Data_Block>
-    </Earth_Explorer_File>
-    '''
 
-    f.write(file_end)
-        
-    f.close()
+def build_orbpre_file(start_events, stop_events, satellite, orbpre_events = None):
+    """
+    Method to generate an orbpre file from data inside the DDBB
+    The generated file has to be removed by the caller
+    """
+    orbit_prediction = get_orbit_prediction(start_events, stop_events, satellite, orbpre_events)
+
+    orbpre_file_path = orbpre_cache_functions.write_orbpre_file(satellite, orbit_prediction.start.isoformat(), orbit_prediction.stop.isoformat(), orbit_prediction.osvs)
+    number_of_orbpre_events = orbit_prediction.number_of_osvs()
+
+    release_orbit_prediction(orbit_prediction)
 
     return (number_of_orbpre_events, orbpre_file_path)
 
 # Uncomment for debugging reasons
 # @debug
+@profiling_functions.stage
 def associate_footprints(events, satellite, orbpre_events = None, return_polygon_format = False):
-    FNULL = open(os.devnull, 'w')
     
     if not type(events) == list:
         raise EventsStructureIncorrect("The parameter events has to be a list. Received events {}".format(events))
@@ -1621,82 +1747,102 @@ def associate_footprints(events, satellite, orbpre_events = None, return_polygon
     logger.debug("The events for associating footprints cover from {} to {}".format(events[0]["start"], events[-1]["stop"]))
     
     events_with_footprint = []
-    
-    t0 = Time("2000-01-01T00:00:00", format='isot', scale='utc')
 
     swath_definition_file_path = eboa_functions.get_resources_path() + "/SDF_MSI.xml"
 
     events.sort(key=lambda x:x["start"])    
     
-    (number_of_orbpre_events, orbpre_file_path) = build_orbpre_file(events[0]["start"], events[-1]["stop"], satellite, orbpre_events)
+    orbit_prediction = get_orbit_prediction(events[0]["start"], events[-1]["stop"], satellite, orbpre_events)
 
-    if number_of_orbpre_events > 1:
-        for event in events:
+    if orbit_prediction.number_of_osvs() > 1:
+        # Obtain the intervals of the events requiring footprint to compute all of them with only one execution of the EOP CFI
+        events_requiring_footprint = []
+        for i, event in enumerate(events):
 
             if not type(event) == dict:
-                os.remove(orbpre_file_path)
+                release_orbit_prediction(orbit_prediction)
                 raise EventsStructureIncorrect("The items of the events list has to be a dict. Received item {}".format(event))
             # end if
             footprint_details = []
             if "values" in event.keys():
                 footprint_details = [value for value in event["values"] if re.match("footprint_details.*", value["name"])]
             # end if
-            event_with_footprint = event.copy()
 
             if len(footprint_details) == 0:
-                start = Time(event["start"], format='isot', scale='utc')
-                stop = Time(event["stop"], format='isot', scale='utc')
-                start_mjd = start.mjd - t0.mjd
-                stop_mjd = stop.mjd - t0.mjd
-                # The footprint is created if the segment duration is less than 100 minutes (other segments are discarded as they are not interesting)
-                if (stop_mjd - start_mjd) < 0.0695:
-                    iterations = int(((stop_mjd - start_mjd) * 24 * 60 * 60) / 3.608) + 1
-                    if iterations > 200:
-                        iterations = 200
-                    # end if
-                    get_footprint_command = "get_footprint -b {} -e {} -o '{} {}' -s {} -n {}".format(start_mjd, stop_mjd, orbpre_file_path, orbpre_file_path, swath_definition_file_path, iterations)
-                    try:
-                        footprint = subprocess.check_output(get_footprint_command, shell=True, stderr=FNULL)
-
-                        # Prepare footprint
-                        coordinates = footprint.decode("utf-8").replace(" \n", "")
-                        footprints = correct_footprint(coordinates)
-
-                        for i, footprint in enumerate(footprints):
-
-                            if not ("values" in event_with_footprint.keys() and len(event_with_footprint["values"]) > 0):
-                                event_with_footprint["values"] = []
-                            # end if
-
-                            footprint_object_name = "footprint_details"
-                            if len(footprints) > 1:
-                                footprint_object_name = "footprint_details_" + str(i)
-                            # end if
-
-                            if return_polygon_format:
-                                footprint = obtain_polygon_format(footprint)
-                            # end if
-
-                            footprint_object = [{"name": "footprint",
-                                                 "type": "geometry",
-                                                 "value": footprint}]
-                            event_with_footprint["values"].append({
-                                "name": footprint_object_name,
-                                "type": "object",
-                                "values": footprint_object
-                            })
-
-                            if logger.getEffectiveLevel() == logging.DEBUG:
-                                footprint_object.append({"name": "get_footprint_command",
-                                                         "type": "text",
-                                                         "value": get_footprint_command})
-                            # end if
-                        # end for
-                    except subprocess.CalledProcessError:
-                        logger.error("The footprint of the events could not be built because the command {} ended in error".format(get_footprint_command))
-                    # end if
+                events_requiring_footprint.append(i)
+            # end if
+        # end for
+
+        # Convert the periods of all the events at once
+        start_mjds = date_functions.dates_to_mjd2000([events[i]["start"] for i in events_requiring_footprint])
+        stop_mjds = date_functions.dates_to_mjd2000([events[i]["stop"] for i in events_requiring_footprint])
+
+        intervals = []
+        intervals_per_event = {}
+        for (i, start_mjd, stop_mjd) in zip(events_requiring_footprint, start_mjds.tolist(), stop_mjds.tolist()):
+            event = events[i]
+            # The footprint is created if the segment duration is less than 100 minutes (other segments are discarded as they are not interesting)
+            if (stop_mjd - start_mjd) < 0.0695:
+                iterations = int(((stop_mjd - start_mjd) * 24 * 60 * 60) / 3.608) + 1
+                if iterations > 200:
+                    iterations = 200
+                # end if
+                intervals_per_event[i] = len(intervals)
+                intervals.append((start_mjd, stop_mjd, iterations))
+            else:
+                logger.info("The event with start {} and stop {} is too large".format(event["start"], event["stop"]))
+            # end if
+        # end for
+
+        footprints_backend = get_s2boa_conf().get("FOOTPRINTS", {}).get("BACKEND", "CFI")
+        if footprints_backend == "NUMPY":
+            coordinates_per_interval = footprint_functions.get_footprints_numpy(intervals, orbit_prediction.get_osv_arrays(), footprint_functions.read_swath_definition(swath_definition_file_path))
+        else:
+            coordinates_per_interval = footprint_functions.get_footprints_cfi(intervals, orbit_prediction.get_orbpre_file_path(), swath_definition_file_path)
+        # end if
+
+        for i, event in enumerate(events):
+            event_with_footprint = event.copy()
+
+            if i in intervals_per_event:
+                (start_mjd, stop_mjd, iterations) = intervals[intervals_per_event[i]]
+                coordinates = coordinates_per_interval[intervals_per_event[i]]
+                if coordinates != None:
+                    # Prepare footprint
+                    footprints = correct_footprint(coordinates)
+
+                    for j, footprint in enumerate(footprints):
+
+                        if not ("values" in event_with_footprint.keys() and len(event_with_footprint["values"]) > 0):
+                            event_with_footprint["values"] = []
+                        # end if
+
+                        footprint_object_name = "footprint_details"
+                        if len(footprints) > 1:
+                            footprint_object_name = "footprint_details_" + str(j)
+                        # end if
+
+                        if return_polygon_format:
+                            footprint = obtain_polygon_format(footprint)
+                        # end if
+
+                        footprint_object = [{"name": "footprint",
+                                             "type": "geometry",
+                                             "value": footprint}]
+                        event_with_footprint["values"].append({
+                            "name": footprint_object_name,
+                            "type": "object",
+                            "values": footprint_object
+                        })
+
+                        if logger.getEffectiveLevel() == logging.DEBUG:
+                            footprint_object.append({"name": "get_footprint_command",
+                                                     "type": "text",
+                                                     "value": footprint_functions.get_footprint_command(start_mjd, stop_mjd, orbit_prediction.get_orbpre_file_path(), swath_definition_file_path, iterations)})
+                        # end if
+                    # end for
                 else:
-                    logger.info("The event with start {} and stop {} is too large".format(event["start"], event["stop"]))
+                    logger.error("The footprint of the events could not be built because the command {} ended in error".format(footprint_functions.get_footprint_command(start_mjd, stop_mjd, orbit_prediction.get_orbpre_file_path(), swath_definition_file_path, iterations)))
                 # end if
             # end if
             events_with_footprint.append(event_with_footprint)
@@ -1707,9 +1853,7 @@ def associate_footprints(events, satellite, orbpre_events = None, return_polygon
         logger.error("The footprint of the events could not be built because there is not enough orbit prediction information")
     # end if
 
-    os.remove(orbpre_file_path)
-        
-    FNULL.close()
+    release_orbit_prediction(orbit_prediction)
 
     logger.info("The number of events generated after associating the footprint is {}".format(len(events_with_footprint)))
     
@@ -1832,10 +1976,62 @@ def correct_footprint(coordinates):
     return footprints
 
 
+###########
+# Functions for helping with the configuration of s2boa
+###########
+# s2boa configuration loaded by the process indexed by path (modification time, configuration)
+s2boa_confs = {}
+
+def get_s2boa_conf():
+    """
+    Method to obtain the configuration of s2boa (s2boa.json in the resources path)
+    The default values apply when the configuration file is not available
+    The configuration is loaded once per process and reloaded when the file changes
+
+    :return: configuration
+    :rtype: dict
+
+    """
+    s2boa_conf_path = get_resources_path() + "/s2boa.json"
+    if not os.path.isfile(s2boa_conf_path):
+        return {}
+    # end if
+    modification_time = os.path.getmtime(s2boa_conf_path)
+    if s2boa_conf_path in s2boa_confs and s2boa_confs[s2boa_conf_path][0] == modification_time:
+        return s2boa_confs[s2boa_conf_path][1]
+    # end if
+
+    with open(s2boa_conf_path) as s2boa_conf_file:
+        s2boa_conf = json.load(s2boa_conf_file)
+    # end with
+    s2boa_confs[s2boa_conf_path] = (modification_time, s2boa_conf)
+
+    return s2boa_conf
+
 ###########
 # Functions for helping with the ingestion of circulation information
 ###########
+# Centres configuration loaded by the process indexed by path (modification time, XPATH evaluator)
+centres_confs = {}
+
 def get_centres_conf():
+    """
+    Method to obtain the centres configuration (centres.xml in the resources path)
+    The configuration is loaded once per process and reloaded when the file changes
+
+    :return: XPATH evaluator of the centres configuration
+    :rtype: etree.XPathEvaluator
+
+    """
+    centres_path = get_resources_path() + "/centres.xml"
+    modification_time = None
+    if os.path.isfile(centres_path):
+        modification_time = os.path.getmtime(centres_path)
+    # end if
+    if centres_path in centres_confs and centres_confs[centres_path][0] == modification_time:
+        return centres_confs[centres_path][1]
+    # end if
+
     schema_path = get_resources_path() + "/centres_schema.xsd"
     parsed_schema = etree.parse(schema_path)
     schema = etree.XMLSchema(parsed_schema)
@@ -1854,5 +2050,6 @@ def get_centres_conf():
     # end if
 
     centres_xpath = etree.XPathEvaluator(centres_xml)
+    centres_confs[centres_path] = (modification_time, centres_xpath)
 
     return centres_xpath
@@ -21,6 +21,7 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -39,6 +40,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -63,7 +65,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     list_of_explicit_references = []
     list_of_annotations = []
@@ -105,9 +107,9 @@ def process_file(file_path, engine, query, reception_time):
     for product in xpath_xml("/Earth_Explorer_File/Data_Block/IngestedProducts/IngestedProduct[not(contains(product_id, '_GR_'))]"):
         ### Corrections made on 2019/11/27 to avoid inserting information regarding granules        
         #Obtain the product ID
-        product_id = product.xpath("product_id")[0].text
+        product_id = xpath_functions.evaluate(product, "product_id")[0].text
         # Obtain the datastrip ID
-        datastrip_id = product.xpath("parent_id")[0].text
+        datastrip_id = xpath_functions.evaluate(product, "parent_id")[0].text
         # Obtain the satellite
         satellite = datastrip_id[0:3]
         # Obtain the baseline
@@ -117,9 +119,9 @@ def process_file(file_path, engine, query, reception_time):
         # Obtain the sensing identifier
         sensing_identifier = datastrip_id[41:57]
         # Obtain the datatake ID
-        datatake_id = product.xpath("datatake_id")[0].text
+        datatake_id = xpath_functions.evaluate(product, "datatake_id")[0].text
         # Obtain the cataloging_time
-        cataloging_time = product.xpath("insertion_time")[0].text
+        cataloging_time = xpath_functions.evaluate(product, "insertion_time")[0].text
 
 
         datatake_exists = len(query.get_explicit_refs(annotation_cnf_names = {"filter": "DATATAKE", "op": "=="},
@@ -181,7 +183,7 @@ def process_file(file_path, engine, query, reception_time):
             }
             list_of_explicit_references.append(datastrip_sensing_explicit_ref)
 
-            for granule in product.xpath("product_id[contains(text(),'_GR')]"):
+            for granule in xpath_functions.evaluate(product, "product_id[contains(text(),'_GR')]"):
                 # Insert the granule explicit reference
                 granule_explicit_reference = {
                     "group": level + "_GR",
@@ -196,7 +198,7 @@ def process_file(file_path, engine, query, reception_time):
                 list_of_explicit_references.append(granule_explicit_reference)
             # end for
 
-            for tile in product.xpath("product_id[contains(text(),'_TL')]"):
+            for tile in xpath_functions.evaluate(product, "product_id[contains(text(),'_TL')]"):
                 # Insert the tile explicit reference
                 tile_explicit_reference = {
                     "group": level + "_TL",
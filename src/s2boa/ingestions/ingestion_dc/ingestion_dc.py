@@ -21,6 +21,7 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 from eboa.engine.functions import get_resources_path
 
 # Import query
@@ -40,6 +41,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -64,7 +66,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     list_of_annotations = []
     list_of_events_hktm = {}
@@ -125,27 +127,27 @@ def process_file(file_path, engine, query, reception_time):
                           "(contains(ProductId, 'MPL_FS') and not(contains(ProductId, 'MPL_FSACK'))) or " +
                           "contains(ProductId, 'MPL_SP'))]"):
         # Obtain the product ID
-        product_id = item.xpath("ProductId")[0].text.replace(".tar", "").replace(".LIST", "")
+        product_id = xpath_functions.evaluate(item, "ProductId")[0].text.replace(".tar", "").replace(".LIST", "")
 
         # Obtain the circulation_time
-        circulation_time = item.xpath("DeliveryTime")[0].text[:-1]
+        circulation_time = xpath_functions.evaluate(item, "DeliveryTime")[0].text[:-1]
 
         # Obtain the source of the circulation
-        source = item.xpath("Centre")[0].text
+        source = xpath_functions.evaluate(item, "Centre")[0].text
 
         # Obtain the destination of the circulation
-        destination_location = item.xpath("DestinationLocation")[0].text
+        destination_location = xpath_functions.evaluate(item, "DestinationLocation")[0].text
 
         # Obtain the destination of the circulation
         destinations = centres_xpath("/centres_configuration/centre[boolean(uris/uri[contains($destination_location, text())])]", destination_location = destination_location)
         if len(destinations) > 0:
-            destination = destinations[0].xpath("name")[0].text
+            destination = xpath_functions.evaluate(destinations[0], "name")[0].text
         else:
             destination = "UNKN"
         # end if
 
         # Obtain the product size
-        product_size = item.xpath("ProductSize")[0].text
+        product_size = xpath_functions.evaluate(item, "ProductSize")[0].text
 
         circulation_annotation = {
             "explicit_reference" : product_id,
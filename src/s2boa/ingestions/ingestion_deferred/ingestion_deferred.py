@@ -0,0 +1,161 @@
+"""
+Ingestion module for the L1C/L2A processing parked waiting for the L0/L1B datastrips of Sentinel-2
+(see s2boa.ingestions.pending_ingestions)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+from dateutil import parser
+import datetime
+import json
+
+# Import ingestion_functions.helpers
+import s2boa.ingestions.functions as functions
+import s2boa.ingestions.pending_ingestions as pending_ingestions
+import s2boa.ingestions.profiling as profiling_functions
+
+# Import query
+from eboa.engine.query import Query
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+version = "1.0"
+
+@profiling_functions.profile_ingestion
+def process_file(file_path, engine, query, reception_time):
+    """
+    Function to process the entry of the queue of pending ingestions and insert the
+    processing information of the L1C/L2A datastrip into the DDBB of the eboa
+    The entry is put back in the queue of pending ingestions when the processing fails
+
+    :param file_path: path to the entry of the queue of pending ingestions
+    :type file_path: str
+    :param engine: Engine instance
+    :type engine: Engine
+    :param query: Query instance
+    :type query: Query
+    :param reception_time: time of the reception of the file by the triggering
+    :type reception_time: str
+    """
+    try:
+        return process_entry(file_path, engine, query, reception_time)
+    except Exception:
+        pending_ingestions.release(file_path)
+        raise
+    # end try
+
+def process_entry(file_path, engine, query, reception_time):
+    """
+    Function to process the entry of the queue of pending ingestions
+
+    :param file_path: path to the entry of the queue of pending ingestions
+    :type file_path: str
+    :param engine: Engine instance
+    :type engine: Engine
+    :param query: Query instance
+    :type query: Query
+    :param reception_time: time of the reception of the file by the triggering
+    :type reception_time: str
+    """
+    file_name = os.path.basename(file_path)
+
+    with open(file_path) as entry_file:
+        entry = json.load(entry_file)
+    # end with
+
+    satellite = entry["satellite"]
+    sensing_identifier = entry["sensing_identifier"]
+    processor = entry["processor"]
+    parameters = entry["parameters"]
+    source = parameters["source"]
+    datastrip = parameters["datastrip"]
+    system = parameters["system"]
+
+    # Get the general source entry (processor = None, version = None, DIM signature = PENDING_SOURCES)
+    # This is for registrering the ingestion progress
+    query_general_source = Query()
+    session_progress = query_general_source.session
+    general_source_progress = query_general_source.get_sources(names = {"filter": file_name, "op": "=="},
+                                                               dim_signatures = {"filter": "PENDING_SOURCES", "op": "=="},
+                                                               processors = {"filter": "", "op": "=="},
+                                                               processor_version_filters = [{"filter": "", "op": "=="}])
+
+    if len(general_source_progress) > 0:
+        general_source_progress = general_source_progress[0]
+    # end if
+
+    functions.insert_ingestion_progress(session_progress, general_source_progress, 10)
+
+    list_of_events = []
+    list_of_operations = []
+
+    upper_level_er = functions.get_upper_level_datastrip(query, satellite, sensing_identifier)
+    if upper_level_er == None:
+        # The upper level production is still not available, park the processing again
+        pending_ingestions.park(satellite, sensing_identifier, processor, parameters)
+        os.remove(file_path)
+
+        functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
+        query.close_session()
+
+        return {"operations": list_of_operations}
+    # end if
+
+    processing_validity_events = query.get_events(gauge_names = {"filter": ["PROCESSING_VALIDITY"], "op": "in"},
+                                                  explicit_refs = {"filter": upper_level_er, "op": "=="})
+
+    functions.insert_ingestion_progress(session_progress, general_source_progress, 40)
+
+    # The operations are associated to the processor which parked the processing
+    functions.L1C_L2A_processing(source, engine, query, list_of_events, processing_validity_events, datastrip, list_of_operations, system, parameters["version"], processor, satellite)
+
+    functions.insert_ingestion_progress(session_progress, general_source_progress, 80)
+
+    if len(list_of_events) > 0:
+        # Adjust the validity period to the events in the operation
+        event_starts = [event["start"] for event in list_of_events]
+        event_starts.sort()
+        source["validity_start"] = event_starts[0]
+        event_stops = [event["stop"] for event in list_of_events]
+        event_stops.sort()
+        source["validity_stop"] = event_stops[-1]
+
+        # Correct generation time to allow the processing information to be inserted always (as done by the ingestion of the REP_ARC files)
+        generation_times = [operation["source"]["generation_time"] for operation in list_of_operations]
+        if processor == "ingestion_rep_arc.py" and len(generation_times) > 0:
+            generation_times.sort()
+            source["generation_time"] = (parser.parse(generation_times[-1]) + datetime.timedelta(seconds=1)).isoformat()
+        # end if
+
+        # Generate the footprint of the events
+        list_of_events_with_footprint = functions.associate_footprints(list_of_events, satellite)
+
+        list_of_operations.append({
+            "mode": "insert",
+            "dim_signature": {
+                "name": "PROCESSING_" + satellite,
+                "exec": "deferred_" + processor,
+                "version": version
+            },
+            "source": source,
+            "annotations": [pending_ingestions.get_pending_ingestion_annotation(satellite, sensing_identifier, processor, datastrip, "RESUMED")],
+            "events": list_of_events_with_footprint
+        })
+    # end if
+
+    os.remove(file_path)
+
+    data = {"operations": list_of_operations}
+
+    functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
+
+    query.close_session()
+
+    return data
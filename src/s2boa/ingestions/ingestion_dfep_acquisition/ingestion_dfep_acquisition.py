@@ -22,6 +22,9 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.timeline as timeline_functions
+import s2boa.ingestions.dates as date_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -40,7 +43,67 @@ logger = logging_module.logger
 
 version = "1.0"
 
+def _number(text):
+    """
+    Method to convert a text into a number as done by the XPATH function number()
+    (NaN if the text does not represent a number)
+    """
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return float("nan")
+    # end try
+
+def _read_gaps(apid):
+    """
+    Method to extract the information of the gaps of an APID
+    :param apid: node with the status of the APID (ISP_Status/Status)
+    :type apid: etree._Element
+
+    :return: list of gaps with the values of PreSensTime, PostSensTime, PreCounter and PostCounter as done by the XPATH function string()
+    :rtype: list
+    """
+
+    return [{"pre_sens_time": gap.findtext("PreSensTime", default = ""),
+             "post_sens_time": gap.findtext("PostSensTime", default = ""),
+             "pre_counter": gap.findtext("PreCounter", default = ""),
+             "post_counter": gap.findtext("PostCounter", default = "")} for gap in apid.iterfind("Gaps/Gap")]
+
+def _classify_gaps(apids):
+    """
+    Method to classify the gaps of the APIDs in a single pass
+    :param apids: nodes with the status of the APIDs (ISP_Status/Status) in document order
+    :type apids: list
+
+    :return: tuple with the list of clean sensing gaps (PreCounter = threshold, PostCounter = 0 and longer than 4 seconds)
+    per APID (in the same order as the APIDs) and the list of tuples (APID, gap) of the gaps smaller than a scene (PostCounter != 0)
+    :rtype: tuple
+    """
+    sensing_gaps_per_apid = []
+    gaps_smaller_than_scene = []
+    for apid in apids:
+        apid_number = apid.get("APID")
+        counter_threshold = functions.get_counter_threshold_from_apid(apid_number)
+        sensing_gaps = []
+        for gap in _read_gaps(apid):
+            pre_counter = _number(gap["pre_counter"])
+            post_counter = _number(gap["post_counter"])
+            # The counters are checked before the conversion of the dates, which is the expensive part
+            if pre_counter == counter_threshold and post_counter == 0 and \
+               (date_functions.parse_three_letter(gap["post_sens_time"]) - date_functions.parse_three_letter(gap["pre_sens_time"])).total_seconds() > 4:
+                sensing_gaps.append(gap)
+            # end if
+            if post_counter != 0:
+                gaps_smaller_than_scene.append((apid_number, gap))
+            # end if
+        # end for
+        sensing_gaps_per_apid.append(sensing_gaps)
+    # end for
+
+    return (sensing_gaps_per_apid, gaps_smaller_than_scene)
+
 @debug
+@profiling_functions.stage
 def _generate_acquisition_data_information(xpath_xml, source, engine, query, list_of_events, list_of_planning_operations):
     """
     Method to generate the events for the idle operation of the satellite
@@ -90,28 +153,28 @@ def _generate_acquisition_data_information(xpath_xml, source, engine, query, lis
     vcids = xpath_xml("/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[NumFrames > 0 and (@VCID = 2 or @VCID = 3 or @VCID = 4 or @VCID = 5 or @VCID = 6 or @VCID = 20 or @VCID = 21 or @VCID = 22)]")
     for vcid in vcids:
         # Obtain channel
-        channel = vcid.xpath("..")[0].tag[6:7]
+        channel = xpath_functions.evaluate(vcid, "..")[0].tag[6:7]
 
         vcid_number = vcid.get("VCID")
         downlink_mode = functions.get_vcid_mode(vcid_number)
         # Acquisition segment
-        acquisition_start = functions.three_letter_to_iso_8601(vcid.xpath("AcqStartTime")[0].text)
-        acquisition_stop = functions.three_letter_to_iso_8601(vcid.xpath("AcqStopTime")[0].text)
+        acquisition_start = functions.three_letter_to_iso_8601(xpath_functions.evaluate(vcid, "AcqStartTime")[0].text)
+        acquisition_stop = functions.three_letter_to_iso_8601(xpath_functions.evaluate(vcid, "AcqStopTime")[0].text)
 
         # Reference to the playback validity event
         playback_validity_event_link_ref = "PLAYBACK_" + downlink_mode + "_VALIDITY_" + vcid_number
 
         status = "COMPLETE"
 
-        gaps = vcid.xpath("Gaps/Gap")
+        gaps = xpath_functions.evaluate(vcid, "Gaps/Gap")
         for gap in gaps:
             general_status = "INCOMPLETE"
             status = "INCOMPLETE"
-            start = functions.three_letter_to_iso_8601(gap.xpath("PreAcqTime")[0].text)
-            stop = functions.three_letter_to_iso_8601(gap.xpath("PostAcqTime")[0].text)
-            estimated_lost = gap.xpath("EstimatedLost")[0].text
-            pre_counter = gap.xpath("PreCounter")[0].text
-            post_counter = gap.xpath("PostCounter")[0].text
+            start = functions.three_letter_to_iso_8601(xpath_functions.evaluate(gap, "PreAcqTime")[0].text)
+            stop = functions.three_letter_to_iso_8601(xpath_functions.evaluate(gap, "PostAcqTime")[0].text)
+            estimated_lost = xpath_functions.evaluate(gap, "EstimatedLost")[0].text
+            pre_counter = xpath_functions.evaluate(gap, "PreCounter")[0].text
+            post_counter = xpath_functions.evaluate(gap, "PostCounter")[0].text
             gap_event = {
                 "explicit_reference": session_id,
                 "key": session_id + "_CHANNEL_" + channel,
@@ -354,6 +417,7 @@ def _generate_acquisition_data_information(xpath_xml, source, engine, query, lis
     return general_status
 
 @debug
+@profiling_functions.stage
 def _generate_received_data_information(xpath_xml, source, engine, query, list_of_events, list_of_planning_operations):
     """
     Method to generate the events for the idle operation of the satellite
@@ -443,54 +507,62 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         sensing_gaps_per_apid = {}
         received_datablocks_per_apid = {}
 
+        covered_sensing_per_apid = {}
+
         timelines_of_sensing_gaps = []
-        for apid in apids:
+        (clean_sensing_gaps_per_apid, gaps_smaller_than_scene) = _classify_gaps(apids)
+        for (apid, clean_sensing_gaps) in zip(apids, clean_sensing_gaps_per_apid):
             apid_number = apid.get("APID")
             sensing_gaps_per_apid[apid_number] = []
             received_datablocks_per_apid[apid_number] = []
-            band_detector = functions.get_band_detector(apid_number)
-            counter_threshold = functions.get_counter_threshold(band_detector["band"])
-            sensing_gaps = apid.xpath("Gaps/Gap[dates_difference(three_letter_to_iso_8601(string(PostSensTime)),three_letter_to_iso_8601(string(PreSensTime))) > 4 and number(PreCounter) = $counter_threshold and number(PostCounter) = 0]", counter_threshold=counter_threshold)
-            for sensing_gap in sensing_gaps:
+            for sensing_gap in clean_sensing_gaps:
                 sensing_gaps_per_apid[apid_number].append({
                     "id": apid_number,
-                    "start": parser.parse(functions.convert_from_gps_to_utc(functions.three_letter_to_iso_8601(sensing_gap.xpath("string(PreSensTime)")))),
-                    "stop": parser.parse(functions.convert_from_gps_to_utc(functions.three_letter_to_iso_8601(sensing_gap.xpath("string(PostSensTime)")))),
+                    "start": date_functions.three_letter_gps_to_utc(sensing_gap["pre_sens_time"]),
+                    "stop": date_functions.three_letter_gps_to_utc(sensing_gap["post_sens_time"]),
                 })
             # end for
             if len(sensing_gaps_per_apid[apid_number]) > 0:
                 timelines_of_sensing_gaps.append(sensing_gaps_per_apid[apid_number])
             # end if
-            covered_sensing_start_three_letter = apid.xpath("Gaps/Gap[1]/PreSensTime")
-            covered_sensing_stop_three_letter = apid.xpath("Gaps/Gap[last()]/PostSensTime")
+            covered_sensing_start_three_letter = xpath_functions.evaluate(apid, "Gaps/Gap[1]/PreSensTime")
+            covered_sensing_stop_three_letter = xpath_functions.evaluate(apid, "Gaps/Gap[last()]/PostSensTime")
             if len(covered_sensing_start_three_letter) > 0 and len(covered_sensing_stop_three_letter) > 0:
                 covered_sensing_start = functions.three_letter_to_iso_8601(covered_sensing_start_three_letter[0].text)
                 covered_sensing_stop = functions.three_letter_to_iso_8601(covered_sensing_stop_three_letter[0].text)
                 covered_sensing = {
                     "id": "covered_sensing",
-                    "start": parser.parse(functions.convert_from_gps_to_utc(covered_sensing_start)),
-                    "stop": parser.parse(functions.convert_from_gps_to_utc(covered_sensing_stop))
+                    "start": date_functions.gps_to_utc(date_functions.parse_iso_8601(covered_sensing_start)),
+                    "stop": date_functions.gps_to_utc(date_functions.parse_iso_8601(covered_sensing_stop))
                 }
-                received_datablocks_per_apid[apid_number] = [segment for segment in ingestion_functions.difference_timelines([covered_sensing], sensing_gaps_per_apid[apid_number]) if segment["id"] == "covered_sensing"]
+                covered_sensing_per_apid[apid_number] = [covered_sensing]
             # end if
         # end for
 
+        # Received datablocks per apid (all the apids at once)
+        received_sensing_per_apid = timeline_functions.difference_timelines_per_key(covered_sensing_per_apid, {apid_number: sensing_gaps_per_apid[apid_number] for apid_number in covered_sensing_per_apid})
+        for apid_number in received_sensing_per_apid:
+            received_datablocks_per_apid[apid_number] = [segment for segment in received_sensing_per_apid[apid_number] if segment["id"] == "covered_sensing"]
+        # end for
+
         # Obtain the sensing gaps common to all apids
         sensing_gaps = ingestion_functions.intersect_many_timelines(timelines_of_sensing_gaps)
 
         # Received datablocks
         covered_sensing = {
             "id": "covered_sensing",
-            "start": parser.parse(corrected_sensing_start),
-            "stop": parser.parse(corrected_sensing_stop)
+            "start": date_functions.parse_iso_8601(corrected_sensing_start),
+            "stop": date_functions.parse_iso_8601(corrected_sensing_stop)
         }
-        received_datablocks = [segment for segment in ingestion_functions.difference_timelines([covered_sensing], sensing_gaps) if segment["id"] == "covered_sensing"]
+        received_datablocks = [segment for segment in timeline_functions.difference_timelines([covered_sensing], sensing_gaps) if segment["id"] == "covered_sensing"]
 
         # Create ISP gaps for complete missing scenes
+        gaps_per_apid = timeline_functions.difference_timelines_per_key({str(apid_number): received_datablocks for apid_number in functions.get_apid_numbers() if str(apid_number) in received_datablocks_per_apid},
+                                                                        received_datablocks_per_apid)
         for apid_number in functions.get_apid_numbers():
             gaps = []
             if str(apid_number) in received_datablocks_per_apid:
-                gaps = ingestion_functions.difference_timelines(received_datablocks, received_datablocks_per_apid[str(apid_number)])
+                gaps = gaps_per_apid[str(apid_number)]
             else:
                 gaps = received_datablocks
             # end if
@@ -558,16 +630,16 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         # end for
 
         # Create ISP gaps for gaps at the beginning of the APIDs (StartCounter != 0)
-        apids_with_gaps_at_the_beginning = xpath_xml("/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[number(@VCID) = $vcid_number or number(@VCID) = $corresponding_vcid_number]/ISP_Status/Status[NumPackets > 0 and not(StartCounter = 0)]", vcid_number = int(vcid_number), corresponding_vcid_number = int(vcid_number) + 16)
+        apids_with_gaps_at_the_beginning = [apid for apid in apids if _number(apid.findtext("StartCounter")) != 0]
         for apid in apids_with_gaps_at_the_beginning:
             apid_number = apid.get("APID")
             status = "INCOMPLETE"
             band_detector = functions.get_band_detector(apid_number)
 
             counter_threshold = functions.get_counter_threshold(band_detector["band"])
-            start = parser.parse(functions.convert_from_gps_to_utc(functions.three_letter_to_iso_8601(apid.xpath("string(SensStartTime)"))))
+            start = date_functions.three_letter_gps_to_utc(xpath_functions.evaluate(apid, "string(SensStartTime)"))
 
-            missing_packets = int(apid.xpath("string(StartCounter)"))
+            missing_packets = int(xpath_functions.evaluate(apid, "string(StartCounter)"))
 
             seconds_gap = (missing_packets / counter_threshold) * 3.608
 
@@ -632,22 +704,20 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         # end for
 
         # Create ISP gaps for gaps smaller than a scene
-        gaps_smaller_than_scene = xpath_xml("/Earth_Explorer_File/Data_Block/*[contains(name(),'data_C')]/Status[number(@VCID) = $vcid_number or number(@VCID) = $corresponding_vcid_number]/ISP_Status/Status[NumPackets > 0]/Gaps/Gap[(not (PreCounter = get_counter_threshold_from_apid(string(../../@APID))) and not (PostCounter = 0)) or not (PostCounter = 0)]", vcid_number = int(vcid_number), corresponding_vcid_number = int(vcid_number) + 16)
-
-        for gap in gaps_smaller_than_scene:
+        # (classified with the clean sensing gaps)
+        for (apid_number, gap) in gaps_smaller_than_scene:
             status = "INCOMPLETE"
-            apid_number = gap.xpath("../../@APID")[0]
             band_detector = functions.get_band_detector(apid_number)
 
             counter_threshold = functions.get_counter_threshold(band_detector["band"])
-            scene_start = parser.parse(functions.convert_from_gps_to_utc(functions.three_letter_to_iso_8601(gap.xpath("string(PreSensTime)"))))
-            scene_stop = parser.parse(functions.convert_from_gps_to_utc(functions.three_letter_to_iso_8601(gap.xpath("string(PostSensTime)"))))
+            scene_start = date_functions.three_letter_gps_to_utc(gap["pre_sens_time"])
+            scene_stop = date_functions.three_letter_gps_to_utc(gap["post_sens_time"])
 
             number_missing_scenes = math.ceil((scene_stop - scene_start).total_seconds() / 3.608)
 
-            counter_start = int(gap.xpath("string(PreCounter)"))
+            counter_start = int(gap["pre_counter"])
 
-            counter_stop = int(gap.xpath("string(PostCounter)"))
+            counter_stop = int(gap["post_counter"])
 
             missing_packets = (counter_stop - counter_start) + number_missing_scenes * counter_threshold
 
@@ -722,7 +792,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         # end for
 
         # Merge timeline of isp gaps
-        merged_timeline_isp_gaps = ingestion_functions.merge_timeline(ingestion_functions.sort_timeline_by_start(timeline_isp_gaps))
+        merged_timeline_isp_gaps = timeline_functions.merge_timeline(timeline_isp_gaps)
 
         # Obtain the planned imaging events from the corrected events which record type corresponds to the downlink mode and are intersecting the segment of the RAW_ISP_VALIDTY
         if downlink_mode != "RT":
@@ -790,7 +860,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
             sensing_orbit = -1
             links_isp_validity = []
             links_isp_completeness = []
-            intersected_planned_imagings_segments = ingestion_functions.intersect_timelines([received_datablock], corrected_planned_imagings_segments)
+            intersected_planned_imagings_segments = timeline_functions.intersect_timelines([received_datablock], corrected_planned_imagings_segments)
             matching_status = "NO_MATCHED_PLANNED_IMAGING"
             if len(intersected_planned_imagings_segments) > 0:
                 matching_status = "MATCHED_PLANNED_IMAGING"
@@ -818,7 +888,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
             # ISP validity event reference
             isp_validity_event_link_ref = "ISP_VALIDITY_" + vcid_number + "_" + str(start)
 
-            isp_gaps_intersected = ingestion_functions.intersect_timelines([received_datablock], merged_timeline_isp_gaps)
+            isp_gaps_intersected = timeline_functions.intersect_timelines([received_datablock], merged_timeline_isp_gaps)
 
             isp_validity_status = "COMPLETE"
             if len(isp_gaps_intersected) > 0:
@@ -1025,7 +1095,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
                  "value": str(received_number_packets)},
                 {"name": "num_frames",
                  "type": "double",
-                 "value": vcid.xpath("NumFrames")[0].text},
+                 "value": xpath_functions.evaluate(vcid, "NumFrames")[0].text},
                 {"name": "expected_num_packets",
                  "type": "double",
                  "value": str(expected_number_packets)},
@@ -1065,6 +1135,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
     return status
 
 @debug
+@profiling_functions.stage
 def _generate_pass_information(xpath_xml, source, engine, query, list_of_annotations, list_of_explicit_references, isp_status, acquisition_status):
     """
     Method to generate the events for the idle operation of the satellite
@@ -1131,6 +1202,7 @@ def _generate_pass_information(xpath_xml, source, engine, query, list_of_annotat
     return
 
 @debug
+@profiling_functions.stage
 def _generate_distribution_information(xpath_xml, source, engine, query, list_of_events):
     """
     Method to generate the events associated to the distribution information
@@ -1474,6 +1546,7 @@ def _generate_distribution_information(xpath_xml, source, engine, query, list_of
     # end if
 
 @debug
+@profiling_functions.stage
 def _generate_acquisition_coverage(xpath_xml, source, engine, query, list_of_events):
     """
     Method to generate the events for associating the planned playbacks even if there is no acquisition
@@ -1548,6 +1621,7 @@ def _generate_acquisition_coverage(xpath_xml, source, engine, query, list_of_eve
     list_of_events.append(distribution_status_event)
     
 @debug
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -1577,12 +1651,7 @@ def process_file(file_path, engine, query, reception_time):
     # Parse file
     parsed_xml = etree.parse(new_file_path)
 
-    # Register functions for using in XPATH
-    ns = etree.FunctionNamespace(None)
-    ns["three_letter_to_iso_8601"] = xpath_functions.three_letter_to_iso_8601
-    ns["dates_difference"] = xpath_functions.dates_difference
-    ns["get_counter_threshold_from_apid"] = xpath_functions.get_counter_threshold_from_apid
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
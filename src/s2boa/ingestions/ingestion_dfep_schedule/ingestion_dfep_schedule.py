@@ -18,6 +18,9 @@ from lxml import etree
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.schedule_matching as schedule_matching
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -37,7 +40,8 @@ logger = logging_module.logger
 version = "1.0"
 
 @debug
-def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_events):
+@profiling_functions.stage
+def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_events, playback_values):
     """
     Method to generate the events of the dfep schedule files
 
@@ -47,6 +51,8 @@ def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_eve
     :type xpath_xml: dict
     :param list_of_events: list to store the events to be inserted into the eboa
     :type list_of_events: list
+    :param playback_values: values to be inserted into the matched planned playbacks (see schedule_matching.add_playback_value)
+    :type playback_values: dict
     """
 
     satellite = source["name"][0:3]
@@ -54,24 +60,25 @@ def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_eve
 
     # schedulings
     schedulings = xpath_xml("/Earth_Explorer_File/Data_Block/sched/station/acq[action = 'ADD']")
+
+    # Obtain the planned playbacks for all the schedulings at once
+    planned_playbacks = schedule_matching.PlannedPlaybacks(query, [(satellite,
+                                                                    xpath_functions.evaluate(schedule, "start")[0].text,
+                                                                    xpath_functions.evaluate(schedule, "stop")[0].text) for schedule in schedulings])
+
     for schedule in schedulings:
 
-        start = schedule.xpath("start")[0].text
-        stop = schedule.xpath("stop")[0].text
+        start = xpath_functions.evaluate(schedule, "start")[0].text
+        stop = xpath_functions.evaluate(schedule, "stop")[0].text
 
-        playbacks = query.get_linked_events(gauge_names = {"filter": "PLANNED_PLAYBACK_CORRECTION", "op": "=="},
-                                            gauge_systems = {"filter": [satellite], "op": "in"},
-                                            start_filters = [{"date": start, "op": ">"}],
-                                            stop_filters = [{"date": stop, "op": "<"}],
-                                            link_names = {"filter": "TIME_CORRECTION", "op": "=="},
-                                            return_prime_events = False)
+        playbacks = planned_playbacks.match(satellite, start, stop)
 
         status = "MATCHED_PLAYBACK"
         links = []
-        if len(playbacks["linked_events"]) == 0:
+        if len(playbacks) == 0:
             status = "NO_MATCHED_PLAYBACK"
         else:
-            for playback in playbacks["linked_events"]:
+            for playback in playbacks:
                 links.append({
                     "link": str(playback.event_uuid),
                     "link_mode": "by_uuid",
@@ -85,15 +92,13 @@ def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_eve
                                 "type": "text",
                                 "value": station}]
                 }
-                engine.insert_event_values(playback.event_uuid, value)
-                planned_playback_correction_uuid = [event_link.event_uuid_link for event_link in playback.eventLinks if event_link.name == "TIME_CORRECTION"][0]
-                engine.insert_event_values(planned_playback_correction_uuid, value)
+                schedule_matching.add_playback_value(playback_values, playback, value)
             # end for
         # end if
 
         # TODO: This could be a place to create an alert as the DFEP schedule would not cover correctly the planned playbacks
 
-        orbit = schedule.xpath("@id")[0].split("_")[1]
+        orbit = xpath_functions.evaluate(schedule, "@id")[0].split("_")[1]
         # DFEP schedule event
         dfep_schedule_event = {
             "gauge": {
@@ -127,6 +132,7 @@ def _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_eve
 
     return
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """Function to process the file and insert its relevant information
     into the DDBB of the eboa
@@ -141,11 +147,12 @@ def process_file(file_path, engine, query, reception_time):
     :type reception_time: str
     """
     list_of_events = []
+    playback_values = {}
     file_name = os.path.basename(file_path)
 
     # Parse file
     parsed_xml = etree.parse(file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -177,7 +184,7 @@ def process_file(file_path, engine, query, reception_time):
     functions.insert_ingestion_progress(session_progress, general_source_progress, 10)
     
     # Generate dfep schedule events
-    _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_events)
+    _generate_dfep_schedule_events(xpath_xml, source, engine, query, list_of_events, playback_values)
 
     functions.insert_ingestion_progress(session_progress, general_source_progress, 90)
     
@@ -193,6 +200,9 @@ def process_file(file_path, engine, query, reception_time):
         "events": list_of_events
     }]}
 
+    # Insert the values into the matched planned playbacks once the file has been processed
+    schedule_matching.insert_playback_values(engine, playback_values)
+
     functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
 
     query.close_session()
@@ -21,6 +21,7 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -39,6 +40,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -63,7 +65,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     list_of_annotations = []
     list_of_datastrips = []
@@ -104,7 +106,7 @@ def process_file(file_path, engine, query, reception_time):
     for tile in xpath_xml("/Earth_Explorer_File/Data_Block/Products/Product/PDI[contains(text(),'_TL')]"):
             #Obtain the product ID
             tile_id = tile.text
-            product_name = str(tile.xpath("../@name")[0])
+            product_name = str(xpath_functions.evaluate(tile, "../@name")[0])
 
             tile_dhus_dissemination_annotation = {
                 "explicit_reference" : tile_id,
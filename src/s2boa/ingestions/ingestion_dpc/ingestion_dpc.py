@@ -12,9 +12,9 @@ import argparse
 from dateutil import parser
 import datetime
 import json
+import re
 import sys
 import tempfile
-import time
 import massedit
 
 # Import xml parser
@@ -23,7 +23,12 @@ from lxml import etree
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.pending_ingestions as pending_ingestions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
+
+# Import errors
+from s2boa.ingestions.errors import WorkplanReportIsNotComplete
 
 # Import query
 from eboa.engine.query import Query
@@ -42,6 +47,182 @@ logger = logging_module.logger
 
 version = "1.0"
 
+# Paths (names of the ancestors) to the nodes of the workplan report used by the ingestion
+PRODUCT_REPORT_PATH = ("Earth_Explorer_File", "Data_Block", "SUP_WORKPLAN_REPORT", "SPECIFIC_HEADER", "SYNTHESIS_INFO", "Product_Report")
+STREAMING_NODE_PATHS = {
+    "Fixed_Header": ("Earth_Explorer_File", "Earth_Explorer_Header"),
+    "SUPERVISION_INFO": ("Earth_Explorer_File", "Data_Block", "SUP_WORKPLAN_REPORT", "SPECIFIC_HEADER"),
+    "Input_Products": PRODUCT_REPORT_PATH,
+    "Output_Products": PRODUCT_REPORT_PATH,
+    "MRF": PRODUCT_REPORT_PATH + ("List_Of_MRFs",),
+    "STEP_INFO": ("Earth_Explorer_File", "Data_Block", "SUP_WORKPLAN_REPORT", "DATA")
+}
+
+def _get_text(node, path):
+    """
+    Method to obtain the text of the node in the path (None if the node does not exist)
+    """
+    child = node.find(path)
+    if child is None:
+        return None
+    # end if
+
+    return child.text
+
+def _init_workplan_report():
+    return {
+        "input_datastrips": [],
+        "output_products": [],
+        "mrfs": [],
+        "steps": []
+    }
+
+def _read_header(workplan_report, fixed_header):
+    workplan_report["system"] = _get_text(fixed_header, "Source/System")
+    workplan_report["creation_date"] = _get_text(fixed_header, "Source/Creation_Date").split("=")[1]
+    workplan_report["validity_start"] = _get_text(fixed_header, "Validity_Period/Validity_Start").split("=")[1]
+    workplan_report["validity_stop"] = _get_text(fixed_header, "Validity_Period/Validity_Stop").split("=")[1]
+
+def _read_supervision_info(workplan_report, supervision_info):
+    for name in ["WORKPLAN_CURRENT_STATUS", "WORKPLAN_MESSAGE", "WORKPLAN_START_DATETIME", "WORKPLAN_END_DATETIME"]:
+        workplan_report[name.lower()] = _get_text(supervision_info, name)
+    # end for
+
+def _read_output_products(output_products):
+    return {
+        "datastrips": [datastrip.text for datastrip in output_products.findall("DATA_STRIP_ID")],
+        "granules": [granule.text for granule in output_products.findall("GRANULES_ID")]
+    }
+
+def _read_mrf(mrf):
+    return {
+        "id": _get_text(mrf, "Id"),
+        "validity_start": _get_text(mrf, "ValidityStart"),
+        "validity_stop": _get_text(mrf, "ValidityStop")
+    }
+
+def _read_step(step):
+    return {
+        "id": step.get("id"),
+        "exec_status": _get_text(step, "EXEC_STATUS"),
+        "processing_start": _get_text(step, "PROCESSING_START_DATETIME"),
+        "processing_end": _get_text(step, "PROCESSING_END_DATETIME"),
+        "exec_mode": _get_text(step, "SUBSYSTEM_INFO/STEP_REPORT/GENERAL_INFO/EXEC_MODE")
+    }
+
+@profiling_functions.stage
+def read_workplan_report(file_path):
+    """
+    Method to read the information of the workplan report used by the ingestion
+    parsing the whole document after removing its namespaces
+
+    :param file_path: path to the DPC file
+    :type file_path: str
+
+    :return: workplan report (header, input datastrips, output products, MRFs and steps)
+    :rtype: dict
+    """
+    # Remove wrong namespace
+    massedit.edit_files([file_path], ["re.sub(r'^.*<Earth_Explorer_File.*>', '<Earth_Explorer_File>', line)"], dry_run=False)
+
+    # Remove namespaces
+    new_file = tempfile.NamedTemporaryFile()
+    new_file_path = new_file.name
+
+    ingestion_functions.remove_namespaces(file_path, new_file_path)
+
+    # Parse file
+    parsed_xml = etree.parse(new_file_path)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
+
+    workplan_report = _init_workplan_report()
+    _read_header(workplan_report, xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header")[0])
+    _read_supervision_info(workplan_report, xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SUPERVISION_INFO")[0])
+    workplan_report["input_datastrips"] = [datastrip.text for datastrip in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/Input_Products/DATA_STRIP_ID")]
+    workplan_report["output_products"] = [_read_output_products(output_products) for output_products in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/*[contains(name(),'Output_Products')]")]
+    workplan_report["mrfs"] = [_read_mrf(mrf) for mrf in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/List_Of_MRFs/MRF")]
+    workplan_report["steps"] = [_read_step(step) for step in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/DATA/STEP_INFO")]
+
+
+    return workplan_report
+
+@profiling_functions.stage
+def read_workplan_report_streaming(file_path):
+    """
+    Method to read the information of the workplan report used by the ingestion
+    parsing the document incrementally. The namespaces are removed on the fly and
+    the nodes are discarded once read, so that the memory used does not depend on
+    the number of steps, output products and MRFs
+
+    :param file_path: path to the DPC file
+    :type file_path: str
+
+    :return: workplan report (header, input datastrips, output products, MRFs and steps)
+    :rtype: dict
+    """
+    workplan_report = _init_workplan_report()
+    xml_parser = etree.XMLPullParser(events = ("end",), remove_comments = True, remove_pis = True)
+
+    def read_nodes():
+        for (event, node) in xml_parser.read_events():
+            name = etree.QName(node).localname
+            if "Output_Products" in name:
+                name = "Output_Products"
+            # end if
+            if name not in STREAMING_NODE_PATHS:
+                continue
+            # end if
+            parent = node.getparent()
+            path = []
+            while parent is not None:
+                path.insert(0, etree.QName(parent).localname)
+                parent = parent.getparent()
+            # end while
+            if tuple(path) != STREAMING_NODE_PATHS[name]:
+                continue
+            # end if
+
+            if name == "Fixed_Header":
+                _read_header(workplan_report, node)
+            elif name == "SUPERVISION_INFO":
+                _read_supervision_info(workplan_report, node)
+            elif name == "Input_Products":
+                workplan_report["input_datastrips"] += [datastrip.text for datastrip in node.findall("DATA_STRIP_ID")]
+            elif name == "Output_Products":
+                workplan_report["output_products"].append(_read_output_products(node))
+            elif name == "MRF":
+                workplan_report["mrfs"].append(_read_mrf(node))
+            elif name == "STEP_INFO":
+                workplan_report["steps"].append(_read_step(node))
+            # end if
+
+            # Discard the node and the previous siblings already read
+            node.clear()
+            while node.getprevious() is not None:
+                del node.getparent()[0]
+            # end while
+        # end for
+    # end def
+
+    with open(file_path, "rb") as dpc_file:
+        for line in dpc_file:
+            # Remove wrong namespace
+            xml_parser.feed(re.sub(rb"^.*<Earth_Explorer_File.*>", b"<Earth_Explorer_File>", line))
+            read_nodes()
+        # end for
+    # end with
+    xml_parser.close()
+    read_nodes()
+
+    for (name, key) in [("Fixed_Header", "system"), ("SUPERVISION_INFO", "workplan_current_status")]:
+        if key not in workplan_report:
+            raise WorkplanReportIsNotComplete("The file {} does not contain the node {}".format(file_path, name))
+        # end if
+    # end for
+
+    return workplan_report
+
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -57,18 +238,13 @@ def process_file(file_path, engine, query, reception_time):
     :type reception_time: str
     """
     file_name = os.path.basename(file_path)
-    # Remove wrong namespace
-    massedit.edit_files([file_path], ["re.sub(r'^.*<Earth_Explorer_File.*>', '<Earth_Explorer_File>', line)"], dry_run=False)
-                        
-    # Remove namespaces
-    new_file = tempfile.NamedTemporaryFile()
-    new_file_path = new_file.name
-
-    ingestion_functions.remove_namespaces(file_path, new_file_path)
 
-    # Parse file
-    parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    # Read the workplan report
+    if functions.get_s2boa_conf().get("INGESTION_DPC", {}).get("PARSING_MODE", "STREAMING") == "DOM":
+        workplan_report = read_workplan_report(file_path)
+    else:
+        workplan_report = read_workplan_report_streaming(file_path)
+    # end if
 
     list_of_explicit_references = []
     list_of_annotations = []
@@ -82,25 +258,17 @@ def process_file(file_path, engine, query, reception_time):
     # Obtain the satellite
     satellite = file_name[0:3]
     # Obtain the station
-    system = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/System")[0].text
+    system = workplan_report["system"]
     # Obtain the creation date
-    creation_date = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
+    creation_date = workplan_report["creation_date"]
     # Obtain the validity start
-    validity_start = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Validity_Period/Validity_Start")[0].text.split("=")[1]
+    validity_start = workplan_report["validity_start"]
     # Obtain the validity stop
-    validity_stop = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Validity_Period/Validity_Stop")[0].text.split("=")[1]
-    # Obtain the workplan current status
-    workplan_current_status = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SUPERVISION_INFO/WORKPLAN_CURRENT_STATUS")[0].text
-    # Obtain the workplan message
-    workplan_message = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SUPERVISION_INFO/WORKPLAN_MESSAGE")[0].text
-    # Obtain the workplan start datetime
-    workplan_start_datetime = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SUPERVISION_INFO/WORKPLAN_START_DATETIME")[0].text
-    # Obtain the workplan end datetime
-    workplan_end_datetime = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SUPERVISION_INFO/WORKPLAN_END_DATETIME")[0].text
+    validity_stop = workplan_report["validity_stop"]
     # Obtain a list of the mrfs
-    mrf_list = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/List_Of_MRFs/MRF")
+    mrf_list = workplan_report["mrfs"]
     # Obtain a list of the steps
-    steps_list = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/DATA/STEP_INFO")
+    steps_list = workplan_report["steps"]
     # Source for the main operation
     source = {
         "name": file_name,
@@ -127,12 +295,12 @@ def process_file(file_path, engine, query, reception_time):
     functions.insert_ingestion_progress(session_progress, general_source_progress, 10)
     
     # Loop through each output node that contains a datastrip (excluding the auxiliary data)
-    for output_msi in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/*[contains(name(),'Output_Products') and boolean(child::DATA_STRIP_ID)]") :
+    for output_msi in [output_products for output_products in workplan_report["output_products"] if len(output_products["datastrips"]) > 0]:
 
         granule_timeline_per_detector = {}
         granule_timeline = []
         # Obtain the datastrip
-        ds_output = output_msi.find("DATA_STRIP_ID").text
+        ds_output = output_msi["datastrips"][0]
         # Obtain the sensing identifier from the datastrip
         sensing_identifier = ds_output[41:57]
         # Obtain the baseline from the datastrip
@@ -141,13 +309,10 @@ def process_file(file_path, engine, query, reception_time):
         level = ds_output[13:16].replace("_","")
 
         # Obtain the input datastrip if exists
-        input = xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/Input_Products/DATA_STRIP_ID")
-        ds_input = input[0].text
+        ds_input = workplan_report["input_datastrips"][0]
 
         # Loop over each granule in the ouput
-        for granule in output_msi.xpath("*[name() = 'GRANULES_ID' and contains(text(),'_GR_')]"):
-            # Obtain the granule id
-            granule_t = granule.text
+        for granule_t in [granule for granule in output_msi["granules"] if granule != None and "_GR_" in granule]:
             level_gr = granule_t[13:16].replace("_","")
             granule_sensing_date = granule_t[42:57]
             detector = granule_t[59:61]
@@ -185,9 +350,7 @@ def process_file(file_path, engine, query, reception_time):
         # end for
 
         # Loop over each tile in the output
-        for tile in output_msi.xpath("*[name() = 'GRANULES_ID' and contains(text(),'_TL_')]"):
-            # Obtain the tile id
-            tile_t = tile.text
+        for tile_t in [granule for granule in output_msi["granules"] if granule != None and "_TL_" in granule]:
             level_tl = tile_t[13:16]
             level_tl.replace("_","")
 
@@ -205,9 +368,7 @@ def process_file(file_path, engine, query, reception_time):
         # end for
 
         # Loop over each TCI in the ouput
-        for true_color in output_msi.xpath("*[name() = 'GRANULES_ID' and contains(text(),'_TC_')]"):
-            # Obtain the true color imaging id
-            true_color_t = true_color.text
+        for true_color_t in [granule for granule in output_msi["granules"] if granule != None and "_TC_" in granule]:
             level_tc = true_color_t[13:16]
             level_tc.replace("_","")
 
@@ -279,36 +440,23 @@ def process_file(file_path, engine, query, reception_time):
 
             if level == "L0" or level == "L1A" or level == "L1B":
                 functions.L0_L1A_L1B_processing(source, engine, query, granule_timeline,list_of_events,ds_output,granule_timeline_per_detector, list_of_operations, system, version, os.path.basename(__file__), satellite)
+                # Resume the L1C/L2A processing parked waiting for this production once it is committed
+                pending_ingestions.resume_at_exit(satellite, sensing_identifier)
             elif (level == "L1C" or level == "L2A"):
-                def get_upper_level_ers():
-                    upper_level_ers = query.get_explicit_refs(annotation_cnf_names = {"filter": "SENSING_IDENTIFIER", "op": "=="},
-                                                              annotation_cnf_systems = {"filter": satellite, "op": "=="},
-                                                              groups = {"filter": ["L0_DS", "L1B_DS"], "op": "in"},
-                                                              annotation_value_filters = [{"name": {"filter": "sensing_identifier", "op": "=="}, "type": "text", "value": {"op": "==", "filter": sensing_identifier}}])
-
-                    upper_level_ers_same_satellite = [er.explicit_ref for er in upper_level_ers if er.explicit_ref[0:3] == satellite]
-                    
-                    return [er.explicit_ref for er in upper_level_ers]
-                # end def
-                i = 0
-                upper_level_ers = get_upper_level_ers()
-                # Wait till the upper level production has been processed 10 minutes
-                while len(upper_level_ers) == 0 and i < 10*60:
-                    time.sleep(10)
-                    i += 10
-                    upper_level_ers = get_upper_level_ers()
-                # end while
-                upper_level_er = [er for er in upper_level_ers if er[13:16] == "L1B"]
-                if len(upper_level_er) == 0:
-                    upper_level_er = [er for er in upper_level_ers if er[13:16] == "L0_"]
-                # end if
-                if len(upper_level_er) > 0:
-                    er = upper_level_er[0]
-
+                upper_level_er = functions.get_upper_level_datastrip(query, satellite, sensing_identifier)
+                if upper_level_er != None:
                     processing_validity_events = query.get_events(gauge_names = {"filter": ["PROCESSING_VALIDITY"], "op": "in"},
-                                                                          explicit_refs = {"filter": er, "op": "=="})
+                                                                  explicit_refs = {"filter": upper_level_er, "op": "=="})
 
                     functions.L1C_L2A_processing(source, engine, query, list_of_events, processing_validity_events, ds_output, list_of_operations, system, version, os.path.basename(__file__), satellite)
+                else:
+                    # The upper level production has not been processed yet. Park the L1C/L2A processing till it is ingested
+                    pending_ingestions.park(satellite, sensing_identifier, os.path.basename(__file__), {
+                        "source": source,
+                        "datastrip": ds_output,
+                        "system": system,
+                        "version": version
+                    }, list_of_annotations)
                 # end if
             # end if
 
@@ -319,8 +467,8 @@ def process_file(file_path, engine, query, reception_time):
                     "name": "TIMELINESS",
                     "system": system
                 },
-                "start": steps_list[0].find("PROCESSING_START_DATETIME").text[:-1],
-                "stop": steps_list[-1].find("PROCESSING_END_DATETIME").text[:-1],
+                "start": steps_list[0]["processing_start"][:-1],
+                "stop": steps_list[-1]["processing_end"][:-1],
                 "values": [
                     {"name": "satellite",
                      "type": "text",
@@ -331,12 +479,12 @@ def process_file(file_path, engine, query, reception_time):
 
             # Steps
             for step in steps_list:
-                if step.find("EXEC_STATUS").text == 'COMPLETED':
+                if step["exec_status"] == 'COMPLETED':
                     values = [
                         {
                             "name": "id",
                             "type": "text",
-                            "value": step.get("id")
+                            "value": step["id"]
                         },
                         {
                             "name": "satellite",
@@ -350,16 +498,15 @@ def process_file(file_path, engine, query, reception_time):
                             "name": "STEP_INFO",
                             "system": system
                         },
-                        "start": step.find("PROCESSING_START_DATETIME").text[:-1],
-                        "stop": step.find("PROCESSING_END_DATETIME").text[:-1],
+                        "start": step["processing_start"][:-1],
+                        "stop": step["processing_end"][:-1],
                         "values": values
                     }
-                    exec_mode_node = step.find("SUBSYSTEM_INFO/STEP_REPORT/GENERAL_INFO/EXEC_MODE")
-                    if exec_mode_node is not None:
+                    if step["exec_mode"] is not None:
                         values.append({
                             "name": "exec_mode",
                             "type": "text",
-                            "value": exec_mode_node.text
+                            "value": step["exec_mode"]
                         })
                     list_of_events.append(event_step)
                 # end if
@@ -374,7 +521,7 @@ def process_file(file_path, engine, query, reception_time):
                         "name": ds_output
                         }
                     ],
-                    "name": mrf.find("Id").text
+                    "name": mrf["id"]
                 }
                 list_of_explicit_references.append(explicit_reference)
             # end for
@@ -387,29 +534,29 @@ def process_file(file_path, engine, query, reception_time):
     
     for mrf in mrf_list:
         # Only if the mrf does not exist in the DB
-        mrfsDB = query.get_events(explicit_refs = {"op": "==", "filter": mrf.find("Id").text})
+        mrfsDB = query.get_events(explicit_refs = {"op": "==", "filter": mrf["id"]})
         if len(mrfsDB) is 0:
             # If the date is correct, else the date is set to a maximum value
             try:
-                stop = str(parser.parse(mrf.find("ValidityStop").text[:-1]))
+                stop = str(parser.parse(mrf["validity_stop"][:-1]))
             # end if
             except:
                 stop = str(datetime.datetime.max)
             # end except
             event_mrf={
-                "key":mrf.find("Id").text,
-                "explicit_reference": mrf.find("Id").text,
+                "key":mrf["id"],
+                "explicit_reference": mrf["id"],
                 "gauge": {
                     "insertion_type": "EVENT_KEYS",
                     "name": "MRF_VALIDITY",
                     "system": system
                 },
-                "start": mrf.find("ValidityStart").text[:-1],
+                "start": mrf["validity_start"][:-1],
                 "stop": stop,
                 "values": [{
                     "name": "generation_time",
                     "type": "timestamp",
-                    "value": mrf.find("Id").text[25:40]
+                    "value": mrf["id"][25:40]
                 }]
                 }
             list_of_configuration_events.append(event_mrf)
@@ -417,8 +564,8 @@ def process_file(file_path, engine, query, reception_time):
     # end for
 
     # Loop through each output node that contains a HKTM (excluding the auxiliary data)
-    for hktm in xpath_xml("/Earth_Explorer_File/Data_Block/SUP_WORKPLAN_REPORT/SPECIFIC_HEADER/SYNTHESIS_INFO/Product_Report/*[contains(name(),'Output_Products') and contains(GRANULES_ID, 'PRD_HKTM__')]/GRANULES_ID"):
-        hktm_name = hktm.text.replace(".SAFE", "")
+    for hktm in [granule for output_products in workplan_report["output_products"] if len(output_products["granules"]) > 0 and "PRD_HKTM__" in (output_products["granules"][0] or "") for granule in output_products["granules"]]:
+        hktm_name = hktm.replace(".SAFE", "")
         event_production_playback_validity_ddbb = query.get_events(explicit_refs = {"op": "==", "filter": hktm_name}, gauge_names = {"op": "==", "filter": "HKTM_PRODUCTION_PLAYBACK_VALIDITY"})
         explicit_reference = {
             "group": "HKTM",
@@ -502,8 +649,8 @@ def process_file(file_path, engine, query, reception_time):
                 "insertion_type": "EVENT_KEYS",
                 "name": "TIMELINESS"
             },
-            "start": steps_list[0].find("PROCESSING_START_DATETIME").text[:-1],
-            "stop": steps_list[-1].find("PROCESSING_END_DATETIME").text[:-1],
+            "start": steps_list[0]["processing_start"][:-1],
+            "stop": steps_list[-1]["processing_end"][:-1],
             "values": values
         }
         list_of_events.append(event_timeliness)
@@ -589,6 +736,5 @@ def process_file(file_path, engine, query, reception_time):
 
     query.close_session()
 
-    new_file.close()
     
     return data
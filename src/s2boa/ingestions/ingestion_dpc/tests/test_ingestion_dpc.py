@@ -10,6 +10,8 @@ import os
 import sys
 import unittest
 import datetime
+import shutil
+import tempfile
 from dateutil import parser
 
 # Import engine of the DDBB
@@ -30,6 +32,7 @@ from eboa.datamodel.annotations import Annotation, AnnotationCnf, AnnotationText
 
 # Import ingestion
 import eboa.ingestion.eboa_ingestion as ingestion
+import s2boa.ingestions.ingestion_dpc.ingestion_dpc as ingestion_dpc
 
 class TestDpcIngestion(unittest.TestCase):
     def setUp(self):
@@ -2707,3 +2710,20 @@ class TestDpcIngestion(unittest.TestCase):
                 "value": "24039.0"
             }
         ]
+
+    def test_read_workplan_report_streaming(self):
+
+        for filename in ["S2A_OPER_REP_OPDPC_L1B_L1C.EOF", "S2A_OPER_REP_OPDPC_HKTM.EOF", "S2A_OPER_REP_OPDPC_L0U_L0_WITH_GAPS.EOF"]:
+            file_path = os.path.dirname(os.path.abspath(__file__)) + "/inputs/" + filename
+
+            # The reading of the whole document modifies the file
+            working_directory = tempfile.mkdtemp()
+            working_file_path = working_directory + "/" + filename
+            shutil.copy(file_path, working_file_path)
+
+            workplan_report = ingestion_dpc.read_workplan_report(working_file_path)
+            shutil.rmtree(working_directory)
+
+            assert ingestion_dpc.read_workplan_report_streaming(file_path) == workplan_report
+            assert len(workplan_report["steps"]) > 0
+        # end for
@@ -11,7 +11,6 @@ import argparse
 import datetime
 import json
 import tempfile
-from dateutil import parser
 
 # Import xml parser
 from lxml import etree
@@ -20,6 +19,8 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.dates as date_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -39,6 +40,7 @@ logger = logging_module.logger
 version = "1.0"
 
 @debug
+@profiling_functions.stage
 def _generate_acquisition_data_information(xpath_xml, source, engine, query, list_of_events, list_of_planning_operations):
     """
     Method to generate the events for the idle operation of the satellite
@@ -88,23 +90,23 @@ def _generate_acquisition_data_information(xpath_xml, source, engine, query, lis
         vcid_number = vcid.get("VCID")
         downlink_mode = functions.get_vcid_mode(vcid_number)
         # Acquisition segment
-        acquisition_start = functions.three_letter_to_iso_8601(vcid.xpath("AcqStartTime")[0].text)
-        acquisition_stop = functions.three_letter_to_iso_8601(vcid.xpath("AcqStopTime")[0].text)
+        acquisition_start = functions.three_letter_to_iso_8601(xpath_functions.evaluate(vcid, "AcqStartTime")[0].text)
+        acquisition_stop = functions.three_letter_to_iso_8601(xpath_functions.evaluate(vcid, "AcqStopTime")[0].text)
 
         # Reference to the playback validity event
         playback_validity_event_link_ref = "PLAYBACK_VALIDITY_" + vcid_number
 
         status = "COMPLETE"
 
-        gaps = vcid.xpath("Gaps/Gap")
+        gaps = xpath_functions.evaluate(vcid, "Gaps/Gap")
         for gap in gaps:
             general_status = "INCOMPLETE"
             status = "INCOMPLETE"
-            start = functions.three_letter_to_iso_8601(gap.xpath("PreAcqTime")[0].text)
-            stop = functions.three_letter_to_iso_8601(gap.xpath("PostAcqTime")[0].text)
-            estimated_lost = gap.xpath("EstimatedLost")[0].text
-            pre_counter = gap.xpath("PreCounter")[0].text
-            post_counter = gap.xpath("PostCounter")[0].text
+            start = functions.three_letter_to_iso_8601(xpath_functions.evaluate(gap, "PreAcqTime")[0].text)
+            stop = functions.three_letter_to_iso_8601(xpath_functions.evaluate(gap, "PostAcqTime")[0].text)
+            estimated_lost = xpath_functions.evaluate(gap, "EstimatedLost")[0].text
+            pre_counter = xpath_functions.evaluate(gap, "PreCounter")[0].text
+            post_counter = xpath_functions.evaluate(gap, "PostCounter")[0].text
             gap_event = {
                 "explicit_reference": session_id,
                 "key": session_id + "_CHANNEL_" + channel,
@@ -291,6 +293,7 @@ def _generate_acquisition_data_information(xpath_xml, source, engine, query, lis
     return status
 
 @debug
+@profiling_functions.stage
 def _generate_received_data_information(xpath_xml, source, engine, query, list_of_events, list_of_planning_operations):
     """
     Method to generate the events for the idle operation of the satellite
@@ -346,7 +349,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         vcid_number = vcid.get("VCID")
         downlink_mode = functions.get_vcid_mode(vcid_number)
         # Obtain the sensing segment received (EFEP reports only give information about the start date of the first and last scenes)
-        sensing_starts = vcid.xpath("ISP_Status/Status/SensStartTime")
+        sensing_starts = xpath_functions.evaluate(vcid, "ISP_Status/Status/SensStartTime")
         sensing_starts_in_iso_8601 = [functions.three_letter_to_iso_8601(sensing_start.text) for sensing_start in sensing_starts]
 
         # Sort list
@@ -354,13 +357,13 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         sensing_start = sensing_starts_in_iso_8601[0]
         corrected_sensing_start = functions.convert_from_gps_to_utc(sensing_start)
 
-        sensing_stops = vcid.xpath("ISP_Status/Status/SensStopTime")
+        sensing_stops = xpath_functions.evaluate(vcid, "ISP_Status/Status/SensStopTime")
         sensing_stops_in_iso_8601 = [functions.three_letter_to_iso_8601(sensing_stop.text) for sensing_stop in sensing_stops]
 
         # Sort list
         sensing_stops_in_iso_8601.sort()
         sensing_stop = sensing_stops_in_iso_8601[-1]
-        corrected_sensing_stop = (parser.parse(functions.convert_from_gps_to_utc(sensing_stop)) + datetime.timedelta(seconds=3.608)).isoformat()
+        corrected_sensing_stop = (date_functions.gps_to_utc(date_functions.parse_iso_8601(sensing_stop)) + datetime.timedelta(seconds=3.608)).isoformat()
 
         # APID configuration
         apid_conf = functions.get_vcid_apid_configuration(vcid_number)
@@ -371,14 +374,14 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         # Received number of packets
         # The packets registered in the APID 2047 have to be discarded
         received_number_packets_apid_2047 = 0
-        received_number_packets_apid_2047_node = vcid.xpath("ISP_Status/Status[@APID = 2047]/NumPackets") 
+        received_number_packets_apid_2047_node = xpath_functions.evaluate(vcid, "ISP_Status/Status[@APID = 2047]/NumPackets") 
         if len(received_number_packets_apid_2047_node) > 0:
             received_number_packets_apid_2047 = int(received_number_packets_apid_2047_node[0].text)
         # end if
-        received_number_packets = int(vcid.xpath("ISP_Status/Summary/NumPackets")[0].text) - int(received_number_packets_apid_2047)
+        received_number_packets = int(xpath_functions.evaluate(vcid, "ISP_Status/Summary/NumPackets")[0].text) - int(received_number_packets_apid_2047)
 
         # Obtain complete missing APIDs
-        complete_missing_apids = vcid.xpath("ISP_Status/Status[number(NumPackets) = 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"])
+        complete_missing_apids = xpath_functions.evaluate(vcid, "ISP_Status/Status[number(NumPackets) = 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"])
         for apid in complete_missing_apids:
             status = "INCOMPLETE"
             apid_number = apid.get("APID")
@@ -441,21 +444,21 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
             # Insert segment for associating the ISP gap
             timeline_isp_gaps.append({
                 "id": "ISP_GAP_" + str(isp_gap_iterator),
-                "start": parser.parse(corrected_sensing_start),
-                "stop": parser.parse(corrected_sensing_stop)
+                "start": date_functions.parse_iso_8601(corrected_sensing_start),
+                "stop": date_functions.parse_iso_8601(corrected_sensing_stop)
             })
 
             isp_gap_iterator += 1
         # end for
 
         # Obtain ISP gaps at the beggining
-        isp_missing_at_begin_apids = vcid.xpath("ISP_Status/Status[number(NumPackets) > 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid) and not(three_letter_to_iso_8601(string(SensStartTime)) = $sensing_start)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"], sensing_start = sensing_start)
+        isp_missing_at_begin_apids = xpath_functions.evaluate(vcid, "ISP_Status/Status[number(NumPackets) > 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid) and not(three_letter_to_iso_8601(string(SensStartTime)) = $sensing_start)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"], sensing_start = sensing_start)
         for apid in isp_missing_at_begin_apids:
             status = "INCOMPLETE"
             apid_number = apid.get("APID")
             band_detector = functions.get_band_detector(apid_number)
 
-            stop = functions.three_letter_to_iso_8601(apid.xpath("SensStartTime")[0].text)
+            stop = functions.three_letter_to_iso_8601(xpath_functions.evaluate(apid, "SensStartTime")[0].text)
             corrected_stop = functions.convert_from_gps_to_utc(stop)
             isp_gap_event = {
                 "link_ref": "ISP_GAP_" + str(isp_gap_iterator),
@@ -514,8 +517,8 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
             # Insert segment for associating the ISP gap
             timeline_isp_gaps.append({
                 "id": "ISP_GAP_" + str(isp_gap_iterator),
-                "start": parser.parse(corrected_sensing_start),
-                "stop": parser.parse(corrected_stop)
+                "start": date_functions.parse_iso_8601(corrected_sensing_start),
+                "stop": date_functions.parse_iso_8601(corrected_stop)
             })
 
             isp_gap_iterator += 1
@@ -523,13 +526,13 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
         # end for
 
         # Obtain ISP gaps at the end
-        isp_missing_at_end_apids = vcid.xpath("ISP_Status/Status[number(NumPackets) > 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid) and not(three_letter_to_iso_8601(string(SensStopTime)) = $sensing_stop)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"], sensing_stop = sensing_stop)
+        isp_missing_at_end_apids = xpath_functions.evaluate(vcid, "ISP_Status/Status[number(NumPackets) > 0 and number(@APID) >= number($min_apid) and number(@APID) <= number($max_apid) and not(three_letter_to_iso_8601(string(SensStopTime)) = $sensing_stop)]", min_apid = apid_conf["min_apid"], max_apid = apid_conf["max_apid"], sensing_stop = sensing_stop)
         for apid in isp_missing_at_end_apids:
             status = "INCOMPLETE"
             apid_number = apid.get("APID")
             band_detector = functions.get_band_detector(apid_number)
 
-            start = functions.three_letter_to_iso_8601(apid.xpath("SensStopTime")[0].text)
+            start = functions.three_letter_to_iso_8601(xpath_functions.evaluate(apid, "SensStopTime")[0].text)
             corrected_start = functions.convert_from_gps_to_utc(start)
 
             isp_gap_event = {
@@ -590,8 +593,8 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
             # Insert segment for associating the ISP gap
             timeline_isp_gaps.append({
                 "id": "ISP_GAP_" + str(isp_gap_iterator),
-                "start": parser.parse(corrected_start),
-                "stop": parser.parse(corrected_sensing_stop)
+                "start": date_functions.parse_iso_8601(corrected_start),
+                "stop": date_functions.parse_iso_8601(corrected_sensing_stop)
             })
 
             isp_gap_iterator += 1
@@ -636,7 +639,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
                  "value": str(received_number_packets)},
                 {"name": "num_frames",
                  "type": "double",
-                 "value": vcid.xpath("NumFrames")[0].text}
+                 "value": xpath_functions.evaluate(vcid, "NumFrames")[0].text}
             ]
         }
 
@@ -899,6 +902,7 @@ def _generate_received_data_information(xpath_xml, source, engine, query, list_o
     return status
 
 @debug
+@profiling_functions.stage
 def _generate_pass_information(xpath_xml, source, engine, query, list_of_annotations, list_of_explicit_references, isp_status, acquisition_status):
     """
     Method to generate the events for the idle operation of the satellite
@@ -969,6 +973,7 @@ def _generate_pass_information(xpath_xml, source, engine, query, list_of_annotat
 
     return
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -1001,7 +1006,7 @@ def process_file(file_path, engine, query, reception_time):
     # Register functions for using in XPATH
     ns = etree.FunctionNamespace(None)
     ns["three_letter_to_iso_8601"] = xpath_functions.three_letter_to_iso_8601
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -21,6 +21,7 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -39,6 +40,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -63,7 +65,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     list_of_annotations = []
 
@@ -102,9 +104,9 @@ def process_file(file_path, engine, query, reception_time):
     
     for product in xpath_xml("/Earth_Explorer_File/Data_Block/productsListOutcome/product[productID/@status = 'ARCHIVED']"):
         #Obtain the product ID
-        product_id = product.xpath("productID")[0].text.replace("_LT_", "_DS_").replace(".zip", "")
+        product_id = xpath_functions.evaluate(product, "productID")[0].text.replace("_LT_", "_DS_").replace(".zip", "")
         # Obtain the archiving_time
-        lt_archiving_time = product.xpath("statusTimestamp")[0].text[:-1]
+        lt_archiving_time = xpath_functions.evaluate(product, "statusTimestamp")[0].text[:-1]
 
         lt_archiving_annotation = {
             "explicit_reference" : product_id,
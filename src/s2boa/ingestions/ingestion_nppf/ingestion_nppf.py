@@ -18,6 +18,8 @@ from lxml import etree
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import debugging
 from eboa.debugging import debug
@@ -70,6 +72,7 @@ playback_means_by_stop={
 }
 
 @debug
+@profiling_functions.stage
 def _generate_record_events(xpath_xml, source, list_of_events):
     """
     Method to generate the events for the MSI operations
@@ -104,55 +107,55 @@ def _generate_record_events(xpath_xml, source, list_of_events):
 
     for record_operation in record_operations:
         # Record start information
-        record_start = record_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        record_start_orbit = record_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        record_start_angle = record_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        record_start_request = record_operation.xpath("RQ/RQ_Name")[0].text
-        record_start_scn_dup = record_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")
+        record_start = xpath_functions.evaluate(record_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        record_start_orbit = xpath_functions.evaluate(record_operation, "RQ/RQ_Absolute_orbit")[0].text
+        record_start_angle = xpath_functions.evaluate(record_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        record_start_request = xpath_functions.evaluate(record_operation, "RQ/RQ_Name")[0].text
+        record_start_scn_dup = xpath_functions.evaluate(record_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")
 
         # Record stop information
-        record_operation_stop = record_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM'][1]")[0]
-        record_stop_orbit = record_operation_stop.xpath("RQ/RQ_Absolute_orbit")[0].text
-        record_stop_angle = record_operation_stop.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        record_stop = record_operation_stop.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        record_stop_request = record_operation_stop.xpath("RQ/RQ_Name")[0].text
-        record_stop_scn_dup = record_operation_stop.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")
+        record_operation_stop = xpath_functions.evaluate(record_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM'][1]")[0]
+        record_stop_orbit = xpath_functions.evaluate(record_operation_stop, "RQ/RQ_Absolute_orbit")[0].text
+        record_stop_angle = xpath_functions.evaluate(record_operation_stop, "RQ/RQ_Deg_from_ANX")[0].text
+        record_stop = xpath_functions.evaluate(record_operation_stop, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        record_stop_request = xpath_functions.evaluate(record_operation_stop, "RQ/RQ_Name")[0].text
+        record_stop_scn_dup = xpath_functions.evaluate(record_operation_stop, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")
 
-        record_type = record_types[record_operation.xpath("RQ/RQ_Name")[0].text]
+        record_type = record_types[xpath_functions.evaluate(record_operation, "RQ/RQ_Name")[0].text]
 
-        following_imaging_operation = record_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS' or RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM'][1]")[0]
-        if following_imaging_operation.xpath("RQ[RQ_Name='MPMSIMID' or RQ_Name='MPMSIDSB' or RQ_Name='MPMMRSTP' or RQ_Name='MPMMRNRT' or RQ_Name='MPMMRNOM']"):
+        following_imaging_operation = xpath_functions.evaluate(record_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS' or RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM'][1]")[0]
+        if xpath_functions.evaluate(following_imaging_operation, "RQ[RQ_Name='MPMSIMID' or RQ_Name='MPMSIDSB' or RQ_Name='MPMMRSTP' or RQ_Name='MPMMRNRT' or RQ_Name='MPMMRNOM']"):
             # The start of the cut imaging is the record operation because the imaging operation was going before this recording
             # The stop of the cut imaging is the start of the following imaging or the stop of this imaging or the stop of this recording
             cut_imaging_start_operation = record_operation
             cut_imaging_stop_operation = following_imaging_operation
-            imaging_start_operation = record_operation.xpath("preceding-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS'][1]")[0]
-            imaging_start = imaging_start_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-            cut_imaging_start_request = imaging_start_operation.xpath("RQ/RQ_Name")[0].text
+            imaging_start_operation = xpath_functions.evaluate(record_operation, "preceding-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS'][1]")[0]
+            imaging_start = xpath_functions.evaluate(imaging_start_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+            cut_imaging_start_request = xpath_functions.evaluate(imaging_start_operation, "RQ/RQ_Name")[0].text
         else:
             # The start of the cut imaging is the start of the current imaging
             # The stop of the cut imaging is the stop of the current imaging or the stop of this recording
             cut_imaging_start_operation = following_imaging_operation
-            cut_imaging_start_request = cut_imaging_start_operation.xpath("RQ/RQ_Name")[0].text
-            cut_imaging_stop_operation = record_operation.xpath("following-sibling::EVRQ[(RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM')][1]")[0]
-            imaging_start = following_imaging_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
+            cut_imaging_start_request = xpath_functions.evaluate(cut_imaging_start_operation, "RQ/RQ_Name")[0].text
+            cut_imaging_stop_operation = xpath_functions.evaluate(record_operation, "following-sibling::EVRQ[(RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP' or RQ/RQ_Name='MPMMRNRT' or RQ/RQ_Name='MPMMRNOM')][1]")[0]
+            imaging_start = xpath_functions.evaluate(following_imaging_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
         # end if
 
         # Imaging start information
-        cut_imaging_start = cut_imaging_start_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        cut_imaging_start_orbit = cut_imaging_start_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        cut_imaging_start_angle = cut_imaging_start_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
+        cut_imaging_start = xpath_functions.evaluate(cut_imaging_start_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        cut_imaging_start_orbit = xpath_functions.evaluate(cut_imaging_start_operation, "RQ/RQ_Absolute_orbit")[0].text
+        cut_imaging_start_angle = xpath_functions.evaluate(cut_imaging_start_operation, "RQ/RQ_Deg_from_ANX")[0].text
 
         cut_imaging_mode = imaging_modes[cut_imaging_start_request]
 
         # Imaging stop information
-        cut_imaging_stop = cut_imaging_stop_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        cut_imaging_stop = xpath_functions.evaluate(cut_imaging_stop_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
         if cut_imaging_mode == "SUN_CAL":
             cut_imaging_stop = cut_imaging_start
         # end if
-        cut_imaging_stop_orbit = cut_imaging_stop_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        cut_imaging_stop_angle = cut_imaging_stop_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        cut_imaging_stop_request = cut_imaging_stop_operation.xpath("RQ/RQ_Name")[0].text
+        cut_imaging_stop_orbit = xpath_functions.evaluate(cut_imaging_stop_operation, "RQ/RQ_Absolute_orbit")[0].text
+        cut_imaging_stop_angle = xpath_functions.evaluate(cut_imaging_stop_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        cut_imaging_stop_request = xpath_functions.evaluate(cut_imaging_stop_operation, "RQ/RQ_Name")[0].text
 
         record_link_id = "record_" + record_start
 
@@ -299,22 +302,22 @@ def _generate_record_events(xpath_xml, source, list_of_events):
 
     for imaging_operation in imaging_operations:
         # Imaging start information
-        imaging_start = imaging_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        imaging_start_orbit = imaging_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        imaging_start_angle = imaging_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        imaging_start_request = imaging_operation.xpath("RQ/RQ_Name")[0].text
+        imaging_start = xpath_functions.evaluate(imaging_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        imaging_start_orbit = xpath_functions.evaluate(imaging_operation, "RQ/RQ_Absolute_orbit")[0].text
+        imaging_start_angle = xpath_functions.evaluate(imaging_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        imaging_start_request = xpath_functions.evaluate(imaging_operation, "RQ/RQ_Name")[0].text
 
         imaging_mode = imaging_modes[imaging_start_request]
 
         # Imaging stop information
-        imaging_stop_operation = imaging_operation.xpath("following-sibling::EVRQ[(RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP')][1]")[0]
-        imaging_stop = imaging_stop_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        imaging_stop_operation = xpath_functions.evaluate(imaging_operation, "following-sibling::EVRQ[(RQ/RQ_Name='MPMSIMID' or RQ/RQ_Name='MPMSIDSB' or RQ/RQ_Name='MPMMRSTP')][1]")[0]
+        imaging_stop = xpath_functions.evaluate(imaging_stop_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
         if imaging_mode == "SUN_CAL":
             imaging_stop = imaging_start
         # end if
-        imaging_stop_orbit = imaging_stop_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        imaging_stop_angle = imaging_stop_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        imaging_stop_request = imaging_stop_operation.xpath("RQ/RQ_Name")[0].text
+        imaging_stop_orbit = xpath_functions.evaluate(imaging_stop_operation, "RQ/RQ_Absolute_orbit")[0].text
+        imaging_stop_angle = xpath_functions.evaluate(imaging_stop_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        imaging_stop_request = xpath_functions.evaluate(imaging_stop_operation, "RQ/RQ_Name")[0].text
 
         imaging_link_id = "imaging_" + imaging_start
 
@@ -364,6 +367,7 @@ def _generate_record_events(xpath_xml, source, list_of_events):
     return
 
 @debug
+@profiling_functions.stage
 def _generate_idle_events(xpath_xml, source, list_of_events):
     """
     Method to generate the events for the idle operation of the satellite
@@ -382,18 +386,18 @@ def _generate_idle_events(xpath_xml, source, list_of_events):
 
     for idle_operation in idle_operations:
         # Idle start information
-        idle_start = idle_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        idle_start_orbit = idle_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        idle_start_angle = idle_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        idle_start_request = idle_operation.xpath("RQ/RQ_Name")[0].text
+        idle_start = xpath_functions.evaluate(idle_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        idle_start_orbit = xpath_functions.evaluate(idle_operation, "RQ/RQ_Absolute_orbit")[0].text
+        idle_start_angle = xpath_functions.evaluate(idle_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        idle_start_request = xpath_functions.evaluate(idle_operation, "RQ/RQ_Name")[0].text
 
         # Idle stop information
-        idle_operation_stop = idle_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS' or RQ/RQ_Name='MPMSIDSB'][1]")
+        idle_operation_stop = xpath_functions.evaluate(idle_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPMSSCAL' or RQ/RQ_Name='MPMSDASC' or RQ/RQ_Name='MPMSDCLO' or RQ/RQ_Name='MPMSIVIC' or RQ/RQ_Name='MPMSNOBS' or RQ/RQ_Name='MPMSIRAW' or RQ/RQ_Name='MPMSIDTS' or RQ/RQ_Name='MPMSIDSB'][1]")
         if len(idle_operation_stop) == 1:
-            idle_stop_orbit = idle_operation_stop[0].xpath("RQ/RQ_Absolute_orbit")[0].text
-            idle_stop_angle = idle_operation_stop[0].xpath("RQ/RQ_Deg_from_ANX")[0].text
-            idle_stop = idle_operation_stop[0].xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-            idle_stop_request = idle_operation_stop[0].xpath("RQ/RQ_Name")[0].text
+            idle_stop_orbit = xpath_functions.evaluate(idle_operation_stop[0], "RQ/RQ_Absolute_orbit")[0].text
+            idle_stop_angle = xpath_functions.evaluate(idle_operation_stop[0], "RQ/RQ_Deg_from_ANX")[0].text
+            idle_stop = xpath_functions.evaluate(idle_operation_stop[0], "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+            idle_stop_request = xpath_functions.evaluate(idle_operation_stop[0], "RQ/RQ_Name")[0].text
             values = [
                 {"name": "start_request",
                  "type": "text",
@@ -458,6 +462,7 @@ def _generate_idle_events(xpath_xml, source, list_of_events):
     return
 
 @debug
+@profiling_functions.stage
 def _generate_playback_events(xpath_xml, source, list_of_events):
     """
     Method to generate the events for the idle operation of the satellite
@@ -489,23 +494,23 @@ def _generate_playback_events(xpath_xml, source, list_of_events):
 
     for playback_operation in playback_operations:
         # Playback start information
-        playback_start = playback_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        playback_start_orbit = playback_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        playback_start_angle = playback_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        playback_start_request = playback_operation.xpath("RQ/RQ_Name")[0].text
+        playback_start = xpath_functions.evaluate(playback_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        playback_start_orbit = xpath_functions.evaluate(playback_operation, "RQ/RQ_Absolute_orbit")[0].text
+        playback_start_angle = xpath_functions.evaluate(playback_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        playback_start_request = xpath_functions.evaluate(playback_operation, "RQ/RQ_Name")[0].text
 
         playback_mean = playback_means[playback_start_request]
 
         # Playback stop information
         if playback_mean == "XBAND":
-            playback_operation_stop = playback_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB'][1]")[0]
+            playback_operation_stop = xpath_functions.evaluate(playback_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB'][1]")[0]
         else:
-            playback_operation_stop = playback_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPOCPRY2'][1]")[0]
+            playback_operation_stop = xpath_functions.evaluate(playback_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPOCPRY2'][1]")[0]
         # end if
-        playback_stop_orbit = playback_operation_stop.xpath("RQ/RQ_Absolute_orbit")[0].text
-        playback_stop_angle = playback_operation_stop.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        playback_stop = playback_operation_stop.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        playback_stop_request = playback_operation_stop.xpath("RQ/RQ_Name")[0].text
+        playback_stop_orbit = xpath_functions.evaluate(playback_operation_stop, "RQ/RQ_Absolute_orbit")[0].text
+        playback_stop_angle = xpath_functions.evaluate(playback_operation_stop, "RQ/RQ_Deg_from_ANX")[0].text
+        playback_stop = xpath_functions.evaluate(playback_operation_stop, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        playback_stop_request = xpath_functions.evaluate(playback_operation_stop, "RQ/RQ_Name")[0].text
 
         playback_mean_link_id = "playback_mean_" + playback_stop
 
@@ -559,35 +564,35 @@ def _generate_playback_events(xpath_xml, source, list_of_events):
     for playback_type_start_operation in playback_type_start_operations:
 
         # Playback_Type start information
-        playback_type_start = playback_type_start_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        playback_type_start_orbit = playback_type_start_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        playback_type_start_angle = playback_type_start_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        playback_type_start_request = playback_type_start_operation.xpath("RQ/RQ_Name")[0].text
+        playback_type_start = xpath_functions.evaluate(playback_type_start_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        playback_type_start_orbit = xpath_functions.evaluate(playback_type_start_operation, "RQ/RQ_Absolute_orbit")[0].text
+        playback_type_start_angle = xpath_functions.evaluate(playback_type_start_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        playback_type_start_request = xpath_functions.evaluate(playback_type_start_operation, "RQ/RQ_Name")[0].text
 
         playback_type = playback_types[playback_type_start_request]
 
         if playback_type in ["HKTM", "SAD", "HKTM_SAD"]:
             playback_type_stop_operation = playback_type_start_operation
         else:
-            playback_type_stop_operation = playback_type_start_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPMMPSTP'][1]")[0]
+            playback_type_stop_operation = xpath_functions.evaluate(playback_type_start_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPMMPSTP'][1]")[0]
         # end if
 
         # Playback_Type stop information
-        playback_type_stop = playback_type_stop_operation.xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
-        playback_type_stop_orbit = playback_type_stop_operation.xpath("RQ/RQ_Absolute_orbit")[0].text
-        playback_type_stop_angle = playback_type_stop_operation.xpath("RQ/RQ_Deg_from_ANX")[0].text
-        playback_type_stop_request = playback_type_stop_operation.xpath("RQ/RQ_Name")[0].text
+        playback_type_stop = xpath_functions.evaluate(playback_type_stop_operation, "RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        playback_type_stop_orbit = xpath_functions.evaluate(playback_type_stop_operation, "RQ/RQ_Absolute_orbit")[0].text
+        playback_type_stop_angle = xpath_functions.evaluate(playback_type_stop_operation, "RQ/RQ_Deg_from_ANX")[0].text
+        playback_type_stop_request = xpath_functions.evaluate(playback_type_stop_operation, "RQ/RQ_Name")[0].text
 
-        playback_mean = playback_type_start_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB' or RQ/RQ_Name='MPOCPRY2'][1]")
+        playback_mean = xpath_functions.evaluate(playback_type_start_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB' or RQ/RQ_Name='MPOCPRY2'][1]")
         if len (playback_mean) > 0:
-            playback_mean_start_request = playback_mean[0].xpath("RQ/RQ_Name")[0].text
+            playback_mean_start_request = xpath_functions.evaluate(playback_mean[0], "RQ/RQ_Name")[0].text
 
             playback_mean = playback_means_by_stop[playback_mean_start_request]
         else:
             playback_mean = "N/A"
         # end if
 
-        playback_mean_stop = playback_type_start_operation.xpath("following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB' or RQ/RQ_Name='MPOCPRY2'][1]")[0].xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        playback_mean_stop = xpath_functions.evaluate(xpath_functions.evaluate(playback_type_start_operation, "following-sibling::EVRQ[RQ/RQ_Name='MPXBOPSB' or RQ/RQ_Name='MPOCPRY2'][1]")[0], "RQ/RQ_Execution_Time")[0].text.split("=")[1]
         playback_mean_link_id = "playback_mean_" + playback_mean_stop
 
         # Playback_Type event
@@ -648,48 +653,48 @@ def _generate_playback_events(xpath_xml, source, list_of_events):
             parameters.append(
                 {"name": "MEM_FRHK",
                  "type": "double",
-                 "value": playback_type_start_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FRHK']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_start_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FRHK']/RQ_Parameter_Value")[0].text},
             )
             parameters.append(
                 {"name": "MEM_FSAD",
                  "type": "double",
-                 "value": playback_type_start_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FSAD']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_start_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FSAD']/RQ_Parameter_Value")[0].text},
             )
         # end if
         if playback_type in ["HKTM", "SAD", "NOMINAL", "REGULAR", "NRT", "RT"]:
             parameters.append(
                 {"name": "MEM_FREE",
                  "type": "double",
-                 "value": playback_type_start_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FREE']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_start_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'MEM_FREE']/RQ_Parameter_Value")[0].text},
             )
         # end if
         if playback_type in ["NOMINAL", "REGULAR", "NRT"]:
             parameters.append(
                 {"name": "SCN_DUP",
                  "type": "double",
-                 "value": playback_type_stop_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_stop_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
             )
             parameters.append(
                 {"name": "SCN_RWD",
                  "type": "double",
-                 "value": playback_type_stop_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_RWD']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_stop_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_RWD']/RQ_Parameter_Value")[0].text},
             )
         # end if
         if playback_type == "RT":
             parameters.append(
                 {"name": "SCN_DUP_START",
                  "type": "double",
-                 "value": playback_type_start_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_start_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
             )
             parameters.append(
                 {"name": "SCN_DUP_STOP",
                  "type": "double",
-                 "value": playback_type_stop_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_stop_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_DUP']/RQ_Parameter_Value")[0].text},
             )
             parameters.append(
                 {"name": "SCN_RWD",
                  "type": "double",
-                 "value": playback_type_stop_operation.xpath("RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_RWD']/RQ_Parameter_Value")[0].text},
+                 "value": xpath_functions.evaluate(playback_type_stop_operation, "RQ/List_of_RQ_Parameters/RQ_Parameter[RQ_Parameter_Name = 'SCN_RWD']/RQ_Parameter_Value")[0].text},
             )
         # end if
 
@@ -700,6 +705,7 @@ def _generate_playback_events(xpath_xml, source, list_of_events):
 
     return
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """Function to process the file and insert its relevant information
     into the DDBB of the eboa
@@ -716,7 +722,7 @@ def process_file(file_path, engine, query, reception_time):
     list_of_events = []
     file_name = os.path.basename(file_path)
     parsed_xml = etree.parse(file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -724,7 +730,7 @@ def process_file(file_path, engine, query, reception_time):
     validity_stop = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Validity_Period/Validity_Stop")[0].text.split("=")[1]
     deletion_queue = xpath_xml("/Earth_Explorer_File/Data_Block/List_of_EVRQs/EVRQ[RQ/RQ_Name='MGSYQDEL']")
     if len(deletion_queue) == 1:
-        validity_start = deletion_queue[0].xpath("RQ/RQ_Execution_Time")[0].text.split("=")[1]
+        validity_start = xpath_functions.evaluate(deletion_queue[0], "RQ/RQ_Execution_Time")[0].text.split("=")[1]
     # end if
 
     source = {
@@ -15,6 +15,7 @@ from s2boa.ingestions.ingestion_nppf import ingestion_nppf
 
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import logging
 from eboa.logging import Log
@@ -22,6 +23,7 @@ from eboa.logging import Log
 logging_module = Log(name = __name__)
 logger = logging_module.logger
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """Function to process the file and insert its relevant information
     into the DDBB of the eboa
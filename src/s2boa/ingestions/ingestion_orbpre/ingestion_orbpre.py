@@ -12,7 +12,7 @@ from dateutil import parser
 import datetime
 import tempfile
 import json
-import math
+import numpy
 
 # Import xml parser
 from lxml import etree, objectify
@@ -20,6 +20,11 @@ from lxml import etree, objectify
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.orbpre_cache as orbpre_cache_functions
+import s2boa.ingestions.event_values as event_values
+import s2boa.ingestions.orbit as orbit_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import debugging
 from eboa.debugging import debug
@@ -38,70 +43,84 @@ version = "1.0"
 def _get_date_from_angle(angle, orbital_period, ascending_node_time):
     """
     """
-    sin1 = math.sin(math.radians(angle))
-    sin2 = math.sin(math.radians(2*angle))
-    cos1 = math.cos(math.radians(angle))
-    cos2 = math.cos(math.radians(2*angle))
-    cos3 = math.cos(math.radians(3*angle))
-    mean_ops = angle - 0.13175612 - 2*(-0.0001529)*sin1 - 2*(-0.0660818)*cos1 - 2*0.16855853*sin2 - 2*(-0.0007759)*cos2 - 2*0.0009872*cos3 - 2*0.00687159*sin2
-    seconds_angle = (mean_ops * orbital_period) / 360.0
+    return _get_dates_from_angles([angle], [orbital_period], [parser.parse(ascending_node_time)])[0]
 
-    return parser.parse(ascending_node_time) + datetime.timedelta(seconds=seconds_angle)
+def _get_dates_from_angles(angles, orbital_periods, ascending_node_times):
+    """
+    Method to obtain the dates related to a list of OPS angles following Berthyl's algorithm
+
+    :param angles: OPS angles (degrees from the ascending node)
+    :type angles: list
+    :param orbital_periods: orbital periods in seconds
+    :type orbital_periods: list
+    :param ascending_node_times: times of the ascending nodes
+    :type ascending_node_times: list of datetime
+
+    :return: dates
+    :rtype: list of datetime
+    """
+    if len(angles) == 0:
+        return []
+    # end if
+
+    mean_ops = orbit_functions.mean_ops_angle(numpy.array(angles, dtype=float))
+    microseconds_angle = numpy.round((mean_ops * numpy.array(orbital_periods, dtype=float) * 1e6) / 360.0).astype("timedelta64[us]")
+
+    return (numpy.array(ascending_node_times, dtype="datetime64[us]") + microseconds_angle).tolist()
 
 @debug
+@profiling_functions.stage
 def _correct_planning_events(orbpre_events, planning_events):
     """
     Method to correct the planning events following Berthyl's algorithm
     """
-    start_orbpre_infos = {}
-    next_start_orbpre_infos = {}
-    stop_orbpre_infos = {}
-    next_stop_orbpre_infos = {}
-    corrected_planning_events = []
-    for planning_event in planning_events:
-        satellite = planning_event.gauge.system
-        start_orbit = [obj.value for obj in planning_event.eventDoubles if obj.name == "start_orbit"][0]
-        stop_orbit = [obj.value for obj in planning_event.eventDoubles if obj.name == "stop_orbit"]
-        start_angle = [obj.value for obj in planning_event.eventDoubles if obj.name == "start_angle"][0]
-        stop_angle = [obj.value for obj in planning_event.eventDoubles if obj.name == "stop_angle"]
-
-        if len(stop_orbit) == 0:
-            stop_orbit = start_orbit
-        else:
-            stop_orbit = stop_orbit[0]
+    # Index the ascending nodes by orbit (first OSV per orbit)
+    ascending_node_times = {}
+    for orbpre_event in orbpre_events:
+        orbit = int(event_values.index_values(orbpre_event, ["double"])["orbit"])
+        if orbit not in ascending_node_times:
+            ascending_node_times[orbit] = parser.parse(orbpre_event["start"])
         # end if
+    # end for
 
-        if len(stop_angle) == 0:
-            stop_angle = start_angle
-        else:
-            stop_angle = stop_angle[0]
+    # Obtain the orbits and angles of the planning events
+    planning_events_to_correct = []
+    angles = []
+    orbital_periods = []
+    ascending_nodes = []
+    for i, planning_event in enumerate(planning_events):
+        planning_event_doubles = event_values.index_values(planning_event, ["double"])
+        start_orbit = int(planning_event_doubles["start_orbit"])
+        stop_orbit = int(planning_event_doubles.get("stop_orbit", start_orbit))
+        start_angle = planning_event_doubles["start_angle"]
+        stop_angle = planning_event_doubles.get("stop_angle", start_angle)
+
+        if all(orbit in ascending_node_times for orbit in [start_orbit, start_orbit + 1, stop_orbit, stop_orbit + 1]):
+            planning_events_to_correct.append(i)
+            for (orbit, angle) in [(start_orbit, start_angle), (stop_orbit, stop_angle)]:
+                angles.append(angle)
+                orbital_periods.append((ascending_node_times[orbit + 1] - ascending_node_times[orbit]).total_seconds())
+                ascending_nodes.append(ascending_node_times[orbit])
+            # end for
         # end if
+    # end for
 
-        # Get predicted orbit information
-        if not start_orbit in start_orbpre_infos:
-            start_orbpre_infos[start_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(start_orbit)]
-        # end if
-        if not start_orbit in next_start_orbpre_infos:
-            next_start_orbpre_infos[start_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(start_orbit) + 1]
-        # end if
-        if not stop_orbit in stop_orbpre_infos:
-            stop_orbpre_infos[stop_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(stop_orbit)]
-        # end if
-        if not stop_orbit in next_stop_orbpre_infos:
-            next_stop_orbpre_infos[stop_orbit] = [event for event in orbpre_events for value in event["values"] if value["name"] == "orbit" and int(value["value"]) == int(stop_orbit) + 1]
-        # end if
+    # Correct the timings of all the planning events at once
+    corrected_dates = _get_dates_from_angles(angles, orbital_periods, ascending_nodes)
+    corrected_timings = {}
+    for j, i in enumerate(planning_events_to_correct):
+        corrected_timings[i] = (corrected_dates[2*j], corrected_dates[2*j + 1])
+    # end for
 
-        if len(next_start_orbpre_infos[start_orbit]) == 0 or len(next_stop_orbpre_infos[stop_orbit]) == 0:
+    corrected_planning_events = []
+    for i, planning_event in enumerate(planning_events):
+        if i in corrected_timings:
+            status = "TIME_CORRECTED"
+            (corrected_start, corrected_stop) = corrected_timings[i]
+        else:
             status = "TIME_NOT_CORRECTED"
             corrected_start = planning_event.start
             corrected_stop = planning_event.stop
-        else:
-            status = "TIME_CORRECTED"
-            start_orbital_period = (parser.parse(next_start_orbpre_infos[start_orbit][0]["start"]) - parser.parse(start_orbpre_infos[start_orbit][0]["start"])).total_seconds()
-            stop_orbital_period = (parser.parse(next_stop_orbpre_infos[stop_orbit][0]["start"]) - parser.parse(stop_orbpre_infos[stop_orbit][0]["start"])).total_seconds()
-            corrected_start = _get_date_from_angle(start_angle, start_orbital_period, start_orbpre_infos[start_orbit][0]["start"])
-            corrected_stop = _get_date_from_angle(stop_angle, stop_orbital_period, stop_orbpre_infos[stop_orbit][0]["start"])
-
         # end if
 
         planning_event_values = planning_event.get_structured_values()
@@ -142,6 +161,7 @@ def _correct_planning_events(orbpre_events, planning_events):
     return corrected_planning_events
 
 @debug
+@profiling_functions.stage
 def _generate_corrected_planning_events(satellite, start_orbit, stop_orbit, list_of_events, query):
     """
     """
@@ -166,6 +186,7 @@ def _generate_corrected_planning_events(satellite, start_orbit, stop_orbit, list
     return events
 
 @debug
+@profiling_functions.stage
 def _generate_orbpre_events(xpath_xml, source, list_of_events):
     """
     Method to generate the events of the orbit predicted files
@@ -186,24 +207,24 @@ def _generate_orbpre_events(xpath_xml, source, list_of_events):
     i = 0
     for orbpre_record in orbpre_records:
         # Orbit predicted information
-        start = orbpre_record.xpath("UTC")[0].text.split("=")[1]
+        start = xpath_functions.evaluate(orbpre_record, "UTC")[0].text.split("=")[1]
         if i+1 < len(orbpre_records):
-            stop = orbpre_records[i+1].xpath("UTC")[0].text.split("=")[1]
+            stop = xpath_functions.evaluate(orbpre_records[i+1], "UTC")[0].text.split("=")[1]
         else:
             stop = start
         # end if
         i += 1
 
-        tai = orbpre_record.xpath("TAI")[0].text.split("=")[1]
-        ut1 = orbpre_record.xpath("UT1")[0].text.split("=")[1]
-        orbit = int(orbpre_record.xpath("Absolute_Orbit")[0].text)
-        x = orbpre_record.xpath("X")[0].text
-        y = orbpre_record.xpath("Y")[0].text
-        z = orbpre_record.xpath("Z")[0].text
-        vx = orbpre_record.xpath("VX")[0].text
-        vy = orbpre_record.xpath("VY")[0].text
-        vz = orbpre_record.xpath("VZ")[0].text
-        quality = orbpre_record.xpath("Quality")[0].text
+        tai = xpath_functions.evaluate(orbpre_record, "TAI")[0].text.split("=")[1]
+        ut1 = xpath_functions.evaluate(orbpre_record, "UT1")[0].text.split("=")[1]
+        orbit = int(xpath_functions.evaluate(orbpre_record, "Absolute_Orbit")[0].text)
+        x = xpath_functions.evaluate(orbpre_record, "X")[0].text
+        y = xpath_functions.evaluate(orbpre_record, "Y")[0].text
+        z = xpath_functions.evaluate(orbpre_record, "Z")[0].text
+        vx = xpath_functions.evaluate(orbpre_record, "VX")[0].text
+        vy = xpath_functions.evaluate(orbpre_record, "VY")[0].text
+        vz = xpath_functions.evaluate(orbpre_record, "VZ")[0].text
+        quality = xpath_functions.evaluate(orbpre_record, "Quality")[0].text
 
         # Orbit predicted event
         orbpre_event = {
@@ -259,6 +280,7 @@ def _generate_orbpre_events(xpath_xml, source, list_of_events):
 
     return
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """Function to process the file and insert its relevant information
     into the DDBB of the eboa
@@ -282,7 +304,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -364,6 +386,9 @@ def process_file(file_path, engine, query, reception_time):
 
     functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
 
+    # The cached orbit predictions of the satellite are outdated by the new predictions
+    orbpre_cache_functions.invalidate(satellite)
+
     query.close_session()
 
     new_file.close()
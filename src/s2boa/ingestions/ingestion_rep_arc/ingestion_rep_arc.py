@@ -13,7 +13,6 @@ import datetime
 import json
 import sys
 import tempfile
-import time
 
 # Import xml parser
 from lxml import etree
@@ -21,7 +20,9 @@ from lxml import etree
 # Import ingestion_functions
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.pending_ingestions as pending_ingestions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -40,6 +41,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -64,7 +66,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     list_of_explicit_references = []
     list_of_explicit_references_for_processing = []
@@ -87,11 +89,11 @@ def process_file(file_path, engine, query, reception_time):
     # Obtain the datastrip
     datastrip_info = xpath_xml("/Earth_Explorer_File/Data_Block/List_of_ItemMetadata/ItemMetadata[Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_Type[contains(text(),'_DS')]]")[0]
     # Obtain the datastrip ID
-    datastrip_id = datastrip_info.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
+    datastrip_id = xpath_functions.evaluate(datastrip_info, "Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
     # Obtain the satellite
     satellite = datastrip_id[0:3]
     # Obtain the datatake ID
-    datatake_id = datastrip_info.xpath("CentralIndex/Datatake-id")[0].text
+    datatake_id = xpath_functions.evaluate(datastrip_info, "CentralIndex/Datatake-id")[0].text
     # Obtain the baseline
     baseline = datastrip_id[58:]
     # Obtain the production level from the datastrip
@@ -156,12 +158,12 @@ def process_file(file_path, engine, query, reception_time):
     for item in xpath_xml("/Earth_Explorer_File/Data_Block/List_of_ItemMetadata/ItemMetadata[not(contains(Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID, '_GR_'))]"):
         ### End Corrections made on 2019/11/27 to avoid inserting information regarding granules
 
-        item_id = item.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
-        data_size = item.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/Data_Size")[0].text
-        cloud_percentage = item.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/CloudPercentage")[0].text
-        physical_url = item.xpath("CentralIndex/PDIPhysicalUrl")[0].text
+        item_id = xpath_functions.evaluate(item, "Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
+        data_size = xpath_functions.evaluate(item, "Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/Data_Size")[0].text
+        cloud_percentage = xpath_functions.evaluate(item, "Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/CloudPercentage")[0].text
+        physical_url = xpath_functions.evaluate(item, "CentralIndex/PDIPhysicalUrl")[0].text
         # Obtain the footprint values
-        footprint = item.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Product_Metadata/Footprint/EXT_POS_LIST")[0].text
+        footprint = xpath_functions.evaluate(item, "Catalogues/S2CatalogueReport/S2EarthObservation/Product_Metadata/Footprint/EXT_POS_LIST")[0].text
 
         # Insert the footprint_annotation
         list_of_lat_long_coordinates = footprint.split(" ")
@@ -348,8 +350,8 @@ def process_file(file_path, engine, query, reception_time):
         list_of_annotations_for_processing.append(sensing_identifier_annotation)
 
         for item in xpath_xml("/Earth_Explorer_File/Data_Block/List_of_ItemMetadata/ItemMetadata"):
-            if '_GR' in item.xpath("CentralIndex/FileType")[0].text:
-                item_id = item.xpath("Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
+            if '_GR' in xpath_functions.evaluate(item, "CentralIndex/FileType")[0].text:
+                item_id = xpath_functions.evaluate(item, "Catalogues/S2CatalogueReport/S2EarthObservation/Inventory_Metadata/File_ID")[0].text
                 # Obtain the granule id
                 granule_t = item_id
                 level_gr = granule_t[13:16].replace("_","")
@@ -388,7 +390,7 @@ def process_file(file_path, engine, query, reception_time):
                 ### End Commented on 2019/11/27
             # end if
 
-            if '_TL' in item.xpath("CentralIndex/FileType")[0].text:
+            if '_TL' in xpath_functions.evaluate(item, "CentralIndex/FileType")[0].text:
                 # Insert the tile explicit reference
                 tile_explicit_reference = {
                     "group": level + "_TL",
@@ -406,36 +408,23 @@ def process_file(file_path, engine, query, reception_time):
 
         if level == "L0" or level == "L1A" or level == "L1B":
             functions.L0_L1A_L1B_processing(source_processing, engine, query, granule_timeline,list_of_events_for_processing,datastrip_id,granule_timeline_per_detector, list_of_operations, system, version, os.path.basename(__file__), satellite)
+            # Resume the L1C/L2A processing parked waiting for this production once it is committed
+            pending_ingestions.resume_at_exit(satellite, sensing_identifier)
         elif (level == "L1C" or level == "L2A"):
-            def get_upper_level_ers():
-                upper_level_ers = query.get_explicit_refs(annotation_cnf_names = {"filter": "SENSING_IDENTIFIER", "op": "=="},
-                                                          annotation_cnf_systems = {"filter": satellite, "op": "=="},
-                                                          groups = {"filter": ["L0_DS", "L1B_DS"], "op": "in"},
-                                                          annotation_value_filters = [{"name": {"filter": "sensing_identifier", "op": "=="}, "type": "text", "value": {"op": "==", "filter": sensing_identifier}}])
-
-                upper_level_ers_same_satellite = [er.explicit_ref for er in upper_level_ers if er.explicit_ref[0:3] == satellite]
-
-                return [er.explicit_ref for er in upper_level_ers]
-            # end def
-            i = 0
-            upper_level_ers = get_upper_level_ers()
-            # Wait till the upper level production has been processed 10 minutes
-            while len(upper_level_ers) == 0 and i < 10*60:
-                time.sleep(10)
-                i += 10
-                upper_level_ers = get_upper_level_ers()
-            # end while
-            upper_level_er = [er for er in upper_level_ers if er[13:16] == "L1B"]
-            if len(upper_level_er) == 0:
-                upper_level_er = [er for er in upper_level_ers if er[13:16] == "L0_"]
-            # end if
-            if len(upper_level_er) > 0:
-                er = upper_level_er[0]
-
+            upper_level_er = functions.get_upper_level_datastrip(query, satellite, sensing_identifier)
+            if upper_level_er != None:
                 processing_validity_events = query.get_events(gauge_names = {"filter": ["PROCESSING_VALIDITY"], "op": "in"},
-                                                                    explicit_refs = {"filter": er, "op": "=="})
+                                                              explicit_refs = {"filter": upper_level_er, "op": "=="})
 
                 functions.L1C_L2A_processing(source_processing, engine, query, list_of_events_for_processing, processing_validity_events, datastrip_id, list_of_operations, system, version, os.path.basename(__file__), satellite)
+            else:
+                # The upper level production has not been processed yet. Park the L1C/L2A processing till it is ingested
+                pending_ingestions.park(satellite, sensing_identifier, os.path.basename(__file__), {
+                    "source": source_processing,
+                    "datastrip": datastrip_id,
+                    "system": system,
+                    "version": version
+                }, list_of_annotations_for_processing)
             # end if
         # end if
 
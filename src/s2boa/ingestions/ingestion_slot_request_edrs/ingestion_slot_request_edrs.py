@@ -22,6 +22,9 @@ from eboa.engine.query import Query
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.schedule_matching as schedule_matching
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -40,6 +43,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -66,7 +70,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -99,29 +103,31 @@ def process_file(file_path, engine, query, reception_time):
     
     # Extract the slots
     slots = xpath_xml("/Earth_Explorer_File/Data_Block/List_of_Sessions/Session")
+
+    # Obtain the planned playbacks for all the slots at once
+    planned_playbacks = schedule_matching.PlannedPlaybacks(query, [(xpath_functions.evaluate(slot, "LEO_Satellite_ID")[0].text,
+                                                                    xpath_functions.evaluate(slot, "Start_Time")[0].text.split("=")[1],
+                                                                    xpath_functions.evaluate(slot, "Stop_Time")[0].text.split("=")[1]) for slot in slots])
+    playback_values = {}
+
     for slot in slots:
-        start = slot.xpath("Start_Time")[0].text.split("=")[1]
-        stop = slot.xpath("Stop_Time")[0].text.split("=")[1]
-        session_id = slot.xpath("Session_ID")[0].text
-        sentinel = slot.xpath("LEO_Satellite_ID")[0].text
-        orbit_node = slot.xpath("LEO_Absolute_Orbit")
+        start = xpath_functions.evaluate(slot, "Start_Time")[0].text.split("=")[1]
+        stop = xpath_functions.evaluate(slot, "Stop_Time")[0].text.split("=")[1]
+        session_id = xpath_functions.evaluate(slot, "Session_ID")[0].text
+        sentinel = xpath_functions.evaluate(slot, "LEO_Satellite_ID")[0].text
+        orbit_node = xpath_functions.evaluate(slot, "LEO_Absolute_Orbit")
         orbit = -1
         if orbit_node:
             orbit = orbit_node[0].text
         # end if
 
         # Get the associated planned playback in the NPPF
-        playbacks = query.get_linked_events(gauge_names = {"filter": "PLANNED_PLAYBACK_CORRECTION", "op": "=="},
-                                                 gauge_systems = {"filter": sentinel, "op": "=="},
-                                                 start_filters = [{"date": start, "op": ">"}],
-                                                 stop_filters = [{"date": stop, "op": "<"}],
-                                                 link_names = {"filter": ["TIME_CORRECTION"], "op": "in"},
-                                                 return_prime_events = False)
+        playbacks = planned_playbacks.match(sentinel, start, stop)
 
         status = "NO_MATCHED_PLAYBACK"
         links = []
-        if len(playbacks["linked_events"]) > 0:
-            for playback in playbacks["linked_events"]:
+        if len(playbacks) > 0:
+            for playback in playbacks:
                 # Get the planned playback mean
                 planned_playback_mean_uuids = [link.event_uuid_link for link in playback.eventLinks if link.name == "PLANNED_PLAYBACK_MEAN"]
                 if len(planned_playback_mean_uuids) > 0:
@@ -143,9 +149,7 @@ def process_file(file_path, engine, query, reception_time):
                                         "type": "text",
                                         "value": "EDRS"}]
                         }
-                        engine.insert_event_values(playback.event_uuid, value)
-                        planned_playback_correction_uuid = [event_link.event_uuid_link for event_link in playback.eventLinks if event_link.name == "TIME_CORRECTION"][0]
-                        engine.insert_event_values(planned_playback_correction_uuid, value)
+                        schedule_matching.add_playback_value(playback_values, playback, value)
 
                         value = {
                             "name": "dfep_schedule",
@@ -154,9 +158,7 @@ def process_file(file_path, engine, query, reception_time):
                                         "type": "text",
                                         "value": "EDRS"}]
                         }
-                        engine.insert_event_values(playback.event_uuid, value)
-                        planned_playback_correction_uuid = [event_link.event_uuid_link for event_link in playback.eventLinks if event_link.name == "TIME_CORRECTION"][0]
-                        engine.insert_event_values(planned_playback_correction_uuid, value)
+                        schedule_matching.add_playback_value(playback_values, playback, value)
 
                     # end if
                 # end if
@@ -217,6 +219,9 @@ def process_file(file_path, engine, query, reception_time):
         "events": list_of_events
     }]}
 
+    # Insert the values into the matched planned playbacks once the file has been processed
+    schedule_matching.insert_playback_values(engine, playback_values)
+
     functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
 
     query.close_session()    
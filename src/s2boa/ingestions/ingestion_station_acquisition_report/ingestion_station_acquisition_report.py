@@ -20,6 +20,8 @@ from lxml import etree
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
 import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.schedule_matching as schedule_matching
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import debugging
 from eboa.debugging import debug
@@ -35,6 +37,7 @@ logger = logging_module.logger
 
 version = "1.0"
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """
     Function to process the file and insert its relevant information
@@ -59,7 +62,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/File_Name")[0].text[0:3]
 
@@ -117,18 +120,14 @@ def process_file(file_path, engine, query, reception_time):
 
     functions.insert_ingestion_progress(session_progress, general_source_progress, 10)
     
-    playbacks = query.get_linked_events(gauge_names = {"filter":"PLANNED_PLAYBACK_CORRECTION","op":"=="},
-                                         gauge_systems = {"filter":[satellite],"op":"in"},
-                                         start_filters = [{"date":start,"op":">"}], stop_filters = [{"date":stop, "op":"<"}],
-                                         link_names = {"filter":["TIME_CORRECTION"],"op":"in"},
-                                         return_prime_events = False)
+    playbacks = schedule_matching.PlannedPlaybacks(query, [(satellite, start, stop)]).match(satellite, start, stop)
 
     links = []
     status = "MATCHED_PLAYBACK"
-    if len(playbacks["linked_events"]) == 0:
+    if len(playbacks) == 0:
         status = "NO_MATCHED_PLAYBACK"
     else:
-        for playback in playbacks["linked_events"]:
+        for playback in playbacks:
             links.append({
                 "link": str(playback.event_uuid),
                 "link_mode": "by_uuid",
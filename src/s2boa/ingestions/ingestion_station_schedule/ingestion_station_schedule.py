@@ -19,6 +19,9 @@ from lxml import etree
 # Import ingestion_functions.helpers
 import eboa.ingestion.functions as ingestion_functions
 import s2boa.ingestions.functions as functions
+import s2boa.ingestions.xpath_functions as xpath_functions
+import s2boa.ingestions.schedule_matching as schedule_matching
+import s2boa.ingestions.profiling as profiling_functions
 
 # Import query
 from eboa.engine.query import Query
@@ -38,7 +41,8 @@ logger = logging_module.logger
 version = "1.0"
 
 @debug
-def _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_events):
+@profiling_functions.stage
+def _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_events, playback_values):
     """
     Method to generate the events of the station schedule files
 
@@ -48,33 +52,36 @@ def _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_
     :type xpath_xml: dict
     :param list_of_events: list to store the events to be inserted into the eboa
     :type list_of_events: list
+    :param playback_values: values to be inserted into the matched planned playbacks (see schedule_matching.add_playback_value)
+    :type playback_values: dict
     """
 
     satellite = source["name"][0:3]
     station = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/File_Type")[0].text[6:]
     # schedulings
     schedulings = xpath_xml("/Earth_Explorer_File/Data_Block/SCHEDULE/ACQ")
+
+    # Obtain the planned playbacks for all the schedulings at once
+    planned_playbacks = schedule_matching.PlannedPlaybacks(query, [(satellite,
+                                                                    xpath_functions.evaluate(schedule, "Data_Start")[0].text.split("=")[1],
+                                                                    xpath_functions.evaluate(schedule, "Data_Stop")[0].text.split("=")[1]) for schedule in schedulings])
+
     for schedule in schedulings:
 
-        data_start = schedule.xpath("Data_Start")[0].text.split("=")[1]
-        data_stop = schedule.xpath("Data_Stop")[0].text.split("=")[1]
+        data_start = xpath_functions.evaluate(schedule, "Data_Start")[0].text.split("=")[1]
+        data_stop = xpath_functions.evaluate(schedule, "Data_Stop")[0].text.split("=")[1]
 
-        acquisition_start = schedule.xpath("Acquisition_Start")[0].text.split("=")[1]
-        acquisition_stop = schedule.xpath("Acquisition_Stop")[0].text.split("=")[1]
+        acquisition_start = xpath_functions.evaluate(schedule, "Acquisition_Start")[0].text.split("=")[1]
+        acquisition_stop = xpath_functions.evaluate(schedule, "Acquisition_Stop")[0].text.split("=")[1]
 
-        playbacks = query.get_linked_events(gauge_names = {"filter": "PLANNED_PLAYBACK_CORRECTION", "op": "=="},
-                                            gauge_systems = {"filter": satellite, "op": "=="},
-                                            start_filters = [{"date": data_start, "op": ">"}],
-                                            stop_filters = [{"date": data_stop, "op": "<"}],
-                                            link_names = {"filter": "TIME_CORRECTION", "op": "=="},
-                                            return_prime_events = False)
+        playbacks = planned_playbacks.match(satellite, data_start, data_stop)
 
         status = "MATCHED_PLAYBACK"
         links = []
-        if len(playbacks["linked_events"]) == 0:
+        if len(playbacks) == 0:
             status = "NO_MATCHED_PLAYBACK"
         else:
-            for playback in playbacks["linked_events"]:
+            for playback in playbacks:
                 links.append({
                     "link": str(playback.event_uuid),
                     "link_mode": "by_uuid",
@@ -88,15 +95,13 @@ def _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_
                                 "type": "text",
                                 "value": station}]
                 }
-                engine.insert_event_values(playback.event_uuid, value)
-                planned_playback_correction_uuid = [event_link.event_uuid_link for event_link in playback.eventLinks if event_link.name == "TIME_CORRECTION"][0]
-                engine.insert_event_values(planned_playback_correction_uuid, value)
+                schedule_matching.add_playback_value(playback_values, playback, value)
             # end for
         # end if
 
         # TODO: This could be a place to create an alert as the Station schedule would not cover correctly the planned playbacks
 
-        orbit = schedule.xpath("Orbit_Number")[0].text
+        orbit = xpath_functions.evaluate(schedule, "Orbit_Number")[0].text
         # Station schedule event
         station_schedule_event = {
             "gauge": {
@@ -142,6 +147,7 @@ def _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_
 
     return
 
+@profiling_functions.profile_ingestion
 def process_file(file_path, engine, query, reception_time):
     """Function to process the file and insert its relevant information
     into the DDBB of the eboa
@@ -156,6 +162,7 @@ def process_file(file_path, engine, query, reception_time):
     :type reception_time: str
     """
     list_of_events = []
+    playback_values = {}
     file_name = os.path.basename(file_path)
 
     # Remove namespaces
@@ -166,7 +173,7 @@ def process_file(file_path, engine, query, reception_time):
 
     # Parse file
     parsed_xml = etree.parse(new_file_path)
-    xpath_xml = etree.XPathEvaluator(parsed_xml)
+    xpath_xml = xpath_functions.XPathEvaluator(parsed_xml)
 
     satellite = file_name[0:3]
     generation_time = xpath_xml("/Earth_Explorer_File/Earth_Explorer_Header/Fixed_Header/Source/Creation_Date")[0].text.split("=")[1]
@@ -198,7 +205,7 @@ def process_file(file_path, engine, query, reception_time):
     functions.insert_ingestion_progress(session_progress, general_source_progress, 10)
     
     # Generate station schedule events
-    _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_events)
+    _generate_station_schedule_events(xpath_xml, source, engine, query, list_of_events, playback_values)
 
     functions.insert_ingestion_progress(session_progress, general_source_progress, 60)
     
@@ -214,6 +221,9 @@ def process_file(file_path, engine, query, reception_time):
         "events": list_of_events
     }]}
 
+    # Insert the values into the matched planned playbacks once the file has been processed
+    schedule_matching.insert_playback_values(engine, playback_values)
+
     functions.insert_ingestion_progress(session_progress, general_source_progress, 100)
 
     query.close_session()
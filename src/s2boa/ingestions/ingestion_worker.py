@@ -0,0 +1,222 @@
+"""
+Persistent worker for the ingestion of files of Sentinel-2
+
+Launching a process per file (eboa_ingestion.py) implies importing lxml, numpy, SQLAlchemy,
+the engine of EBOA and the ingestion module, and connecting to the DDBB, for every file.
+For small files this startup dominates the ingestion. The worker imports all the ingestion
+modules of s2boa once, keeps the pool of connections to the DDBB of the process and ingests
+in-process the files received through a Unix socket (one request per connection, processed
+in order of arrival)
+
+Request (one line in JSON format): {"file_path": path to the file, "processor": ingestion module (optional, obtained from the triggering rules by default)}
+Response (one line in JSON format): {"file_path": ..., "processor": ..., "statuses": ..., "error": ..., "processing_time": seconds}
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import sys
+import argparse
+import importlib
+import json
+import pkgutil
+import socket
+import socketserver
+import time
+
+# Import engine
+import eboa.engine.engine as eboa_engine
+from eboa.engine.query import Query
+
+# Import helpers
+import s2boa.ingestions
+import s2boa.ingestions.batch_ingestion as batch_ingestion
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+def preload_ingestion_modules():
+    """
+    Method to import all the ingestion modules of s2boa (s2boa.ingestions.ingestion_*)
+
+    :return: list of the imported modules
+    :rtype: list
+    """
+    modules = []
+    for module_info in pkgutil.walk_packages(s2boa.ingestions.__path__, s2boa.ingestions.__name__ + "."):
+        # Modules of the packages of the ingestions (s2boa.ingestions.ingestion_*.*)
+        name_parts = module_info.name.split(".")
+        if module_info.ispkg or len(name_parts) != 4 or not name_parts[2].startswith("ingestion_"):
+            continue
+        # end if
+        try:
+            importlib.import_module(module_info.name)
+            modules.append(module_info.name)
+        except Exception as e:
+            logger.warning("The ingestion module {} could not be preloaded: {}".format(module_info.name, e))
+        # end try
+    # end for
+
+    return modules
+
+class IngestionWorker():
+    """
+    Worker ingesting files in-process after loading the ingestion modules and the connections to the DDBB once
+    """
+
+    def __init__(self, triggering_path = None):
+        """
+        :param triggering_path: path to the triggering configuration (triggering.xml in the resources path by default)
+        :type triggering_path: str
+        """
+        start = time.perf_counter()
+        self.modules = preload_ingestion_modules()
+        imports_time = time.perf_counter() - start
+
+        # Open a connection of the pool of the process, so that it is ready for the first ingestion
+        start = time.perf_counter()
+        query = Query()
+        query.close_session()
+        connection_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_ingestion.initialize_worker()
+        self.rules = batch_ingestion.read_triggering_rules(triggering_path)
+        configuration_time = time.perf_counter() - start
+
+        # Startup time which is not paid per file anymore
+        self.startup_times = {
+            "imports": imports_time,
+            "connection": connection_time,
+            "configuration": configuration_time
+        }
+        self.processing_time = 0
+        self.ingested_files = 0
+
+        logger.info("The ingestion worker has preloaded {} ingestion modules (startup: imports {:.3f} s, connection to the DDBB {:.3f} s, configuration {:.3f} s)".format(len(self.modules), imports_time, connection_time, configuration_time))
+
+    def ingest(self, file_path, processor = None):
+        """
+        Method to ingest a file in-process
+
+        :param file_path: path to the file
+        :type file_path: str
+        :param processor: ingestion module (obtained from the triggering rules when not provided)
+        :type processor: str
+
+        :return: result of the ingestion ({"file_path", "processor", "statuses", "error", "processing_time"})
+        :rtype: dict
+        """
+        if processor == None:
+            rule = batch_ingestion.get_rule(self.rules, file_path)
+            if rule == None or rule["skip"] or rule["processor"] == None:
+                return {"file_path": file_path, "processor": None, "statuses": None,
+                        "error": "No ingestion is configured for the file", "processing_time": 0}
+            # end if
+            processor = rule["processor"]
+        # end if
+
+        (statuses, error, processing_time) = batch_ingestion.ingest_file(processor, file_path)
+        self.processing_time += processing_time
+        self.ingested_files += 1
+
+        logger.info("The file {} has been ingested by {} in {:.3f} s ({} files ingested, processing {:.3f} s, startup {:.3f} s)".format(file_path, processor, processing_time, self.ingested_files, self.processing_time, sum(self.startup_times.values())))
+
+        return {"file_path": file_path, "processor": processor, "statuses": statuses,
+                "error": error, "processing_time": processing_time}
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode())
+            result = self.server.worker.ingest(request["file_path"], request.get("processor"))
+        except (ValueError, KeyError) as e:
+            result = {"error": "Wrong request: {}".format(e)}
+        # end try
+        self.wfile.write((json.dumps(result) + "\n").encode())
+
+def serve(socket_path, worker):
+    """
+    Method to ingest the files received through the Unix socket until the process is stopped
+
+    :param socket_path: path to the Unix socket
+    :type socket_path: str
+    :param worker: ingestion worker
+    :type worker: IngestionWorker
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # end if
+    with socketserver.UnixStreamServer(socket_path, _RequestHandler) as server:
+        server.worker = worker
+        logger.info("The ingestion worker is listening on {}".format(socket_path))
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+        # end try
+    # end with
+
+def submit(socket_path, file_path, processor = None):
+    """
+    Method to request the ingestion of a file to a worker and wait for the result
+
+    :param socket_path: path to the Unix socket of the worker
+    :type socket_path: str
+    :param file_path: path to the file
+    :type file_path: str
+    :param processor: ingestion module (obtained from the triggering rules by the worker when not provided)
+    :type processor: str
+
+    :return: result of the ingestion (see IngestionWorker.ingest)
+    :rtype: dict
+    """
+    request = {"file_path": os.path.abspath(file_path)}
+    if processor != None:
+        request["processor"] = processor
+    # end if
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode())
+        with client.makefile("rb") as response:
+            return json.loads(response.readline().decode())
+        # end with
+    # end with
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Persistent worker for the ingestion of files of Sentinel-2")
+    args_parser.add_argument("-s", dest="socket_path", type=str, nargs=1,
+                             help="path to the Unix socket of the worker", required=True)
+    args_parser.add_argument("-f", dest="file_paths", type=str, nargs="+",
+                             help="files to be ingested by a running worker (the worker is launched when not provided)", default=[])
+    args_parser.add_argument("-p", dest="processor", type=str, nargs=1,
+                             help="ingestion module for the files (obtained from the triggering rules by default)", default=[None])
+    args_parser.add_argument("-t", dest="triggering_path", type=str, nargs=1,
+                             help="path to the triggering configuration", default=[None])
+    args = args_parser.parse_args()
+
+    if len(args.file_paths) == 0:
+        serve(args.socket_path[0], IngestionWorker(args.triggering_path[0]))
+        return 0
+    # end if
+
+    exit_status = 0
+    for file_path in args.file_paths:
+        result = submit(args.socket_path[0], file_path, args.processor[0])
+        print(json.dumps(result))
+        if result.get("error") != None or any([status != eboa_engine.exit_codes["OK"]["status"] for status in result["statuses"]]):
+            exit_status = 1
+        # end if
+    # end for
+
+    return exit_status
+
+if __name__ == "__main__":
+    sys.exit(main())
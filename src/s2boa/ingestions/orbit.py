@@ -0,0 +1,207 @@
+"""
+Helper module for the orbit computations of Sentinel-2
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import numpy
+
+# Import xml parser
+from lxml import etree
+
+# Import helpers
+import s2boa.ingestions.dates as date_functions
+
+# Rotation rate of the Earth (rad/s)
+EARTH_ROTATION_RATE = 7.292115146706979e-5
+# Rotation rate of the ascending node of a sun-synchronous orbit (rad/s)
+NODAL_PRECESSION_RATE = 2 * numpy.pi / (365.2421897 * 86400)
+# WGS84 ellipsoid
+WGS84_SEMI_MAJOR_AXIS = 6378137.0
+WGS84_FLATTENING = 1 / 298.257223563
+WGS84_SEMI_MINOR_AXIS = WGS84_SEMI_MAJOR_AXIS * (1 - WGS84_FLATTENING)
+WGS84_ECCENTRICITY_SQUARED = WGS84_FLATTENING * (2 - WGS84_FLATTENING)
+
+def mean_ops_angle(angle):
+    """
+    Method to obtain the mean OPS angle related to the OPS angle following Berthyl's algorithm
+    :param angle: OPS angle (degrees from the ascending node)
+    :type angle: float or numpy.ndarray
+
+    :return: mean OPS angle (degrees)
+    :rtype: float or numpy.ndarray
+
+    """
+    sin1 = numpy.sin(numpy.radians(angle))
+    sin2 = numpy.sin(numpy.radians(2*angle))
+    cos1 = numpy.cos(numpy.radians(angle))
+    cos2 = numpy.cos(numpy.radians(2*angle))
+    cos3 = numpy.cos(numpy.radians(3*angle))
+
+    return angle - 0.13175612 - 2*(-0.0001529)*sin1 - 2*(-0.0660818)*cos1 - 2*0.16855853*sin2 - 2*(-0.0007759)*cos2 - 2*0.0009872*cos3 - 2*0.00687159*sin2
+
+def read_orbpre_file(orbpre_file_path):
+    """
+    Method to read the OSVs of an ORBPRE file
+    :param orbpre_file_path: path to the ORBPRE file
+    :type orbpre_file_path: str
+
+    :return: osvs -> dictionary of arrays sorted by time (utc in MJD2000, orbit, x, y, z, vx, vy, vz)
+    :rtype: dict
+
+    """
+    parsed_xml = etree.parse(orbpre_file_path)
+    osv_nodes = parsed_xml.xpath("/*[local-name()='Earth_Explorer_File']/*[local-name()='Data_Block']/*[local-name()='List_of_OSVs']/*[local-name()='OSV']")
+
+    values = {}
+    for field in ["UTC", "Absolute_Orbit", "X", "Y", "Z", "VX", "VY", "VZ"]:
+        values[field] = [osv_node.xpath("string(*[local-name()='" + field + "'])") for osv_node in osv_nodes]
+    # end for
+
+    return build_osvs([utc.split("=")[1] for utc in values["UTC"]], values["Absolute_Orbit"], values["X"], values["Y"], values["Z"], values["VX"], values["VY"], values["VZ"])
+
+def build_osvs(utcs, orbits, xs, ys, zs, vxs, vys, vzs):
+    """
+    Method to build the arrays of OSVs from lists of values
+    :param utcs: UTC times in ISO 8601 format
+    :type utcs: list
+    :param orbits: absolute orbits
+    :type orbits: list
+    :param xs, ys, zs: positions in the Earth fixed frame (m)
+    :type xs, ys, zs: list
+    :param vxs, vys, vzs: velocities in the Earth fixed frame (m/s)
+    :type vxs, vys, vzs: list
+
+    :return: osvs -> dictionary of arrays sorted by time (utc in MJD2000, orbit, position, velocity)
+    :rtype: dict
+
+    """
+    utc = date_functions.dates_to_mjd2000(utcs)
+    order = numpy.argsort(utc, kind="stable")
+
+    return {
+        "utc": utc[order],
+        "orbit": numpy.array(orbits, dtype=float)[order],
+        "position": numpy.array([xs, ys, zs], dtype=float).T[order],
+        "velocity": numpy.array([vxs, vys, vzs], dtype=float).T[order]
+    }
+
+def propagate(osvs, times):
+    """
+    Method to propagate the OSVs of the ascending nodes to the requested times
+    The orbit is propagated as a circular orbit in the plane defined at the previous ascending node,
+    where the position along the orbit is obtained from the period between consecutive ascending nodes
+    :param osvs: OSVs at the ascending nodes (see build_osvs)
+    :type osvs: dict
+    :param times: times in MJD2000
+    :type times: numpy.ndarray
+
+    :return: positions and velocities in the Earth fixed frame (m, m/s)
+    :rtype: tuple
+
+    """
+    times = numpy.asarray(times, dtype=float)
+    number_of_osvs = len(osvs["utc"])
+
+    # OSV of the previous ascending node (the first and last OSVs are used for extrapolation)
+    indexes = numpy.clip(numpy.searchsorted(osvs["utc"], times, side="right") - 1, 0, number_of_osvs - 2)
+    seconds_since_anx = (times - osvs["utc"][indexes]) * 86400.0
+    orbital_periods = (osvs["utc"][indexes + 1] - osvs["utc"][indexes]) * 86400.0
+
+    r0 = osvs["position"][indexes]
+    v0 = osvs["velocity"][indexes]
+
+    # Velocity in the inertial frame aligned with the Earth fixed frame at the ascending node
+    earth_rotation = numpy.array([0.0, 0.0, EARTH_ROTATION_RATE])
+    v0_inertial = v0 + numpy.cross(earth_rotation, r0)
+
+    radius = numpy.linalg.norm(r0, axis=1)
+    p = r0 / radius[:, None]
+    h = numpy.cross(r0, v0_inertial)
+    h = h / numpy.linalg.norm(h, axis=1)[:, None]
+    q = numpy.cross(h, p)
+
+    # Argument of latitude (uniform motion over the orbit)
+    u = numpy.radians(360.0 * seconds_since_anx / orbital_periods)
+    cos_u = numpy.cos(u)[:, None]
+    sin_u = numpy.sin(u)[:, None]
+    position_inertial = radius[:, None] * (cos_u * p + sin_u * q)
+    direction_inertial = -sin_u * p + cos_u * q
+    speed = 2 * numpy.pi * radius / orbital_periods
+    velocity_inertial = speed[:, None] * direction_inertial
+
+    # Rotation to the Earth fixed frame (the node rotates with the sun-synchronous precession)
+    theta = (EARTH_ROTATION_RATE - NODAL_PRECESSION_RATE) * seconds_since_anx
+    position = _rotate_z(position_inertial, -theta)
+    velocity = _rotate_z(velocity_inertial, -theta) - numpy.cross(earth_rotation, position)
+
+    return (position, velocity)
+
+def _rotate_z(vectors, angles):
+    cos_angles = numpy.cos(angles)
+    sin_angles = numpy.sin(angles)
+    return numpy.stack([cos_angles * vectors[:, 0] - sin_angles * vectors[:, 1],
+                        sin_angles * vectors[:, 0] + cos_angles * vectors[:, 1],
+                        vectors[:, 2]], axis=1)
+
+def intersect_ellipsoid(positions, directions):
+    """
+    Method to obtain the points of the WGS84 ellipsoid hit by the lines of sight
+    :param positions: positions of the observer in the Earth fixed frame (m)
+    :type positions: numpy.ndarray
+    :param directions: unit vectors of the lines of sight in the Earth fixed frame
+    :type directions: numpy.ndarray
+
+    :return: longitudes and geodetic latitudes (degrees)
+    :rtype: tuple
+
+    """
+    scale = numpy.array([WGS84_SEMI_MAJOR_AXIS, WGS84_SEMI_MAJOR_AXIS, WGS84_SEMI_MINOR_AXIS])
+    scaled_positions = positions / scale
+    scaled_directions = directions / scale
+
+    a = numpy.sum(scaled_directions * scaled_directions, axis=1)
+    b = 2 * numpy.sum(scaled_positions * scaled_directions, axis=1)
+    c = numpy.sum(scaled_positions * scaled_positions, axis=1) - 1
+    discriminant = numpy.clip(b * b - 4 * a * c, 0, None)
+    distance = (-b - numpy.sqrt(discriminant)) / (2 * a)
+
+    points = positions + distance[:, None] * directions
+    longitudes = numpy.degrees(numpy.arctan2(points[:, 1], points[:, 0]))
+    latitudes = numpy.degrees(numpy.arctan2(points[:, 2], (1 - WGS84_ECCENTRICITY_SQUARED) * numpy.hypot(points[:, 0], points[:, 1])))
+
+    return (longitudes, latitudes)
+
+def get_swath_points(positions, velocities, azimuth, elevation):
+    """
+    Method to obtain the ground points seen with the given pointing by a yaw steered satellite
+    :param positions: positions in the Earth fixed frame (m)
+    :type positions: numpy.ndarray
+    :param velocities: velocities in the Earth fixed frame (m/s)
+    :type velocities: numpy.ndarray
+    :param azimuth: azimuth from the flight direction, clockwise (degrees)
+    :type azimuth: float
+    :param elevation: elevation from the plane perpendicular to the nadir (degrees, 90 is nadir)
+    :type elevation: float
+
+    :return: longitudes and geodetic latitudes (degrees)
+    :rtype: tuple
+
+    """
+    # Geodetic nadir
+    scale = numpy.array([WGS84_SEMI_MAJOR_AXIS**2, WGS84_SEMI_MAJOR_AXIS**2, WGS84_SEMI_MINOR_AXIS**2])
+    nadir = -positions / scale
+    nadir = nadir / numpy.linalg.norm(nadir, axis=1)[:, None]
+
+    # Flight direction over the Earth fixed frame (yaw steering)
+    flight = velocities - numpy.sum(velocities * nadir, axis=1)[:, None] * nadir
+    flight = flight / numpy.linalg.norm(flight, axis=1)[:, None]
+    right = numpy.cross(nadir, flight)
+
+    azimuth = numpy.radians(azimuth)
+    elevation = numpy.radians(elevation)
+    directions = numpy.cos(elevation) * (numpy.cos(azimuth) * flight + numpy.sin(azimuth) * right) + numpy.sin(elevation) * nadir
+
+    return intersect_ellipsoid(positions, directions)
@@ -0,0 +1,321 @@
+"""
+Helper module for caching the orbit prediction of Sentinel-2 used for the generation of footprints
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import atexit
+import datetime
+import threading
+from collections import OrderedDict
+from tempfile import mkstemp
+
+# Import orbit helpers
+import s2boa.ingestions.orbit as orbit_functions
+
+# Default maximum number of orbit predictions kept in the cache
+DEFAULT_MAX_ENTRIES = 16
+
+ORBPRE_HEADER = '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+    <Earth_Explorer_File>
+
+    <Earth_Explorer_Header>
+    <Fixed_Header>
+    <File_Name>{}_OPER_MPL_ORBPRE_{}_{}_0001</File_Name>
+    <File_Description>FOS Predicted Orbit File</File_Description>
+    <Notes></Notes>
+    <Mission>SENTINEL {}</Mission>
+    <File_Class>OPER</File_Class>
+    <File_Type>MPL_ORBPRE</File_Type>
+    <Validity_Period>
+    <Validity_Start>UTC={}</Validity_Start>
+    <Validity_Stop>UTC={}</Validity_Stop>
+    </Validity_Period>
+    <File_Version>0001</File_Version>
+    <Source>
+    <System>FOS</System>
+    <Creator>NAPEOS</Creator>
+    <Creator_Version>3.0</Creator_Version>
+    <Creation_Date>UTC={}</Creation_Date>
+    </Source>
+    </Fixed_Header>
+    <Variable_Header>
+    <Ref_Frame>EARTH_FIXED</Ref_Frame>
+    <Time_Reference>UTC</Time_Reference>
+    </Variable_Header>
+    </Earth_Explorer_Header>
+    '''
+
+ORBPRE_DATABLOCK_BEGIN = '''
+        <Data_Block type="xml">
+        <List_of_OSVs count="{}">
+        '''
+
+ORBPRE_OSV = '''
+            <OSV>
+            <TAI>TAI={}</TAI>
+            <UTC>UTC={}</UTC>
+            <UT1>UT1={}</UT1>
+            <Absolute_Orbit>+{}</Absolute_Orbit>
+            <X unit="m">{}</X>
+            <Y unit="m">{}</Y>
+            <Z unit="m">{}</Z>
+            <VX unit="m/s">{}</VX>
+            <VY unit="m/s">{}</VY>
+            <VZ unit="m/s">{}</VZ>
+            <Quality>{}</Quality>
+            </OSV>
+            '''
+
+ORBPRE_END = '''
+    </List_of_OSVs>
+    </Data_Block>
+    </Earth_Explorer_File>
+    '''
+
+def write_orbpre_file(satellite, start, stop, osvs):
+    """
+    Method to write an ORBPRE file with the given OSVs
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param start: start of the validity period in ISO 8601 format
+    :type start: str
+    :param stop: stop of the validity period in ISO 8601 format
+    :type stop: str
+    :param osvs: list of tuples (tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality) sorted by utc
+    :type osvs: list
+
+    :return: orbpre_file_path
+    :rtype: str
+
+    """
+    (file_descriptor, orbpre_file_path) = mkstemp()
+
+    with os.fdopen(file_descriptor, "w") as f:
+        f.write(ORBPRE_HEADER.format(satellite, start, stop, satellite, start, stop, datetime.datetime.now().isoformat()))
+        if len(osvs) > 0:
+            f.write(ORBPRE_DATABLOCK_BEGIN.format(len(osvs)))
+            f.write("".join([ORBPRE_OSV.format(*osv) for osv in osvs]))
+        # end if
+        f.write(ORBPRE_END)
+    # end with
+
+    return orbpre_file_path
+
+class OrbitPrediction():
+    """
+    Orbit prediction of a satellite covering a window of time
+    The ORBPRE file and the OSV arrays are only materialized when requested
+    """
+
+    def __init__(self, satellite, start, stop, osvs, token = None):
+        """
+        :param satellite: satellite (S2A, S2B...)
+        :type satellite: str
+        :param start: start of the window covered
+        :type start: datetime
+        :param stop: stop of the window covered
+        :type stop: datetime
+        :param osvs: list of tuples (tai, utc, ut1, orbit, x, y, z, vx, vy, vz, quality) sorted by utc
+        :type osvs: list
+        :param token: identifier of the content of the DDBB the OSVs were obtained from
+        :type token: frozenset
+        """
+        self.satellite = satellite
+        self.start = start
+        self.stop = stop
+        self.osvs = osvs
+        self.token = token
+        if len(osvs) > 0:
+            self.orbit_range = (int(float(osvs[0][3])), int(float(osvs[-1][3])))
+        else:
+            self.orbit_range = (None, None)
+        # end if
+        self.orbpre_file_path = None
+        self.osv_arrays = None
+        self.users = 0
+        self.evicted = False
+        self.lock = threading.Lock()
+
+    def number_of_osvs(self):
+        return len(self.osvs)
+
+    def covers(self, satellite, start, stop):
+        """
+        Method to check whether the orbit prediction covers the requested window
+        """
+        return self.satellite == satellite and self.start <= start and stop <= self.stop
+
+    def get_orbpre_file_path(self):
+        """
+        Method to obtain the path to the ORBPRE file with the OSVs (written on the first request)
+        """
+        with self.lock:
+            if self.orbpre_file_path == None:
+                self.orbpre_file_path = write_orbpre_file(self.satellite, self.start.isoformat(), self.stop.isoformat(), self.osvs)
+            # end if
+        # end with
+
+        return self.orbpre_file_path
+
+    def get_osv_arrays(self):
+        """
+        Method to obtain the arrays of OSVs used by the orbit helpers (built on the first request)
+        """
+        with self.lock:
+            if self.osv_arrays == None:
+                self.osv_arrays = orbit_functions.build_osvs(*[[osv[i] for osv in self.osvs] for i in (1, 3, 4, 5, 6, 7, 8, 9)])
+            # end if
+        # end with
+
+        return self.osv_arrays
+
+    def remove_files(self):
+        """
+        Method to remove the materialized ORBPRE file
+        """
+        with self.lock:
+            if self.orbpre_file_path != None and os.path.isfile(self.orbpre_file_path):
+                os.remove(self.orbpre_file_path)
+            # end if
+            self.orbpre_file_path = None
+        # end with
+
+class OrbpreCache():
+    """
+    Process wide LRU cache of orbit predictions keyed by satellite and orbit range
+    """
+
+    def __init__(self, max_entries = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, satellite, start, stop):
+        """
+        Method to obtain an orbit prediction covering the requested window
+        The returned orbit prediction has to be released after use (see release)
+
+        :param satellite: satellite (S2A, S2B...)
+        :type satellite: str
+        :param start: start of the window
+        :type start: datetime
+        :param stop: stop of the window
+        :type stop: datetime
+
+        :return: orbit prediction or None if the window is not covered by the cache
+        :rtype: OrbitPrediction
+        """
+        with self.lock:
+            for key, orbit_prediction in self.entries.items():
+                if orbit_prediction.covers(satellite, start, stop):
+                    self.entries.move_to_end(key)
+                    orbit_prediction.users += 1
+                    return orbit_prediction
+                # end if
+            # end for
+        # end with
+
+        return None
+
+    def put(self, orbit_prediction):
+        """
+        Method to insert an orbit prediction into the cache
+        The inserted orbit prediction has to be released after use (see release)
+
+        :param orbit_prediction: orbit prediction
+        :type orbit_prediction: OrbitPrediction
+        """
+        with self.lock:
+            key = (orbit_prediction.satellite, orbit_prediction.orbit_range, orbit_prediction.start, orbit_prediction.stop)
+            if key in self.entries:
+                self._evict(key)
+            # end if
+            orbit_prediction.users += 1
+            self.entries[key] = orbit_prediction
+            while len(self.entries) > self.max_entries:
+                self._evict(next(iter(self.entries)))
+            # end while
+        # end with
+
+    def discard(self, orbit_prediction):
+        """
+        Method to remove an orbit prediction from the cache (e.g. when its content is outdated)
+        """
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry is orbit_prediction]:
+                self._evict(key)
+            # end for
+        # end with
+
+    def release(self, orbit_prediction):
+        """
+        Method to notify that the orbit prediction is not used anymore
+        The files of the evicted orbit predictions are removed once they are not used
+        """
+        with self.lock:
+            orbit_prediction.users -= 1
+            if orbit_prediction.evicted and orbit_prediction.users <= 0:
+                orbit_prediction.remove_files()
+            # end if
+        # end with
+
+    def invalidate(self, satellite = None):
+        """
+        Method to remove the orbit predictions of a satellite (all of them if satellite is None)
+
+        :param satellite: satellite (S2A, S2B...)
+        :type satellite: str
+        """
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if satellite == None or entry.satellite == satellite]:
+                self._evict(key)
+            # end for
+        # end with
+
+    def _evict(self, key):
+        orbit_prediction = self.entries.pop(key)
+        orbit_prediction.evicted = True
+        if orbit_prediction.users <= 0:
+            orbit_prediction.remove_files()
+        # end if
+
+    def __len__(self):
+        return len(self.entries)
+
+orbpre_cache = None
+orbpre_cache_lock = threading.Lock()
+
+def get_orbpre_cache(max_entries = DEFAULT_MAX_ENTRIES):
+    """
+    Method to obtain the process wide cache of orbit predictions
+
+    :param max_entries: maximum number of orbit predictions (used only when the cache is created)
+    :type max_entries: int
+
+    :return: orbpre_cache
+    :rtype: OrbpreCache
+    """
+    global orbpre_cache
+    with orbpre_cache_lock:
+        if orbpre_cache == None:
+            orbpre_cache = OrbpreCache(max_entries)
+            atexit.register(orbpre_cache.invalidate)
+        # end if
+    # end with
+
+    return orbpre_cache
+
+def invalidate(satellite = None):
+    """
+    Method to invalidate the orbit predictions of a satellite in the process wide cache
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    """
+    if orbpre_cache != None:
+        orbpre_cache.invalidate(satellite)
+    # end if
@@ -0,0 +1,311 @@
+"""
+Helper module for deferring the parts of the ingestions waiting for other ingestions of Sentinel-2
+
+The processing information of the L1C/L2A datastrips requires the processing
+information of the L0/L1B datastrips with the same sensing identifier. When this
+information is not yet available, the L1C/L2A part of the ingestion is parked in
+a queue of pending ingestions (one JSON file per entry) and the ingestion continues.
+The parked state is also recorded in the DDBB with the annotation PENDING_INGESTION
+of the datastrip (status PARKED, and RESUMED once the processing information is inserted).
+The entries are resumed, with the ingestion module s2boa.ingestions.ingestion_deferred,
+once the ingestion providing the L0/L1B datastrip has been committed. The entries being
+resumed are renamed to .resumed and they are put back in the queue when the resumption
+fails or does not finish in time
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import sys
+import atexit
+import argparse
+import datetime
+import json
+import glob
+import subprocess
+import time
+import uuid
+
+# Import helpers
+import s2boa.ingestions.functions as functions
+
+# Import query
+from eboa.engine.query import Query
+
+# Import resources path
+from eboa.engine.functions import get_resources_path
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+DEFERRED_INGESTION_PROCESSOR = "s2boa.ingestions.ingestion_deferred.ingestion_deferred"
+
+PENDING_INGESTION_ANNOTATION = "PENDING_INGESTION"
+
+# Default time after which a claimed entry not finished is put back in the queue (seconds)
+DEFAULT_RESUMED_TIMEOUT = 3600
+
+# Sensing identifiers whose pending ingestions have to be resumed at the end of the process
+sensing_identifiers_to_resume = set()
+
+def get_pending_ingestions_path():
+    """
+    Method to obtain the path to the queue of pending ingestions
+    The path is configured in s2boa.json (PENDING_INGESTIONS/PATH) and, by default, it is the
+    directory pending_ingestions of the resources path, so that the queue is kept across reboots
+
+    :return: path to the queue of pending ingestions
+    :rtype: str
+    """
+    pending_ingestions_path = functions.get_s2boa_conf().get("PENDING_INGESTIONS", {}).get("PATH", get_resources_path() + "/pending_ingestions")
+    os.makedirs(pending_ingestions_path, exist_ok = True)
+
+    return pending_ingestions_path
+
+def get_pending_ingestion_annotation(satellite, sensing_identifier, processor, datastrip, status):
+    """
+    Method to obtain the annotation recording the state of the processing of a datastrip parked
+    in the queue of pending ingestions
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param sensing_identifier: sensing identifier of the datastrips
+    :type sensing_identifier: str
+    :param processor: ingestion module which parked the ingestion
+    :type processor: str
+    :param datastrip: datastrip waiting for the upper level datastrips
+    :type datastrip: str
+    :param status: state of the processing (PARKED or RESUMED)
+    :type status: str
+
+    :return: annotation
+    :rtype: dict
+    """
+    return {
+        "explicit_reference": datastrip,
+        "annotation_cnf": {
+            "name": PENDING_INGESTION_ANNOTATION,
+            "system": satellite
+        },
+        "values": [
+            {"name": "status",
+             "type": "text",
+             "value": status
+            },
+            {"name": "sensing_identifier",
+             "type": "text",
+             "value": sensing_identifier
+            },
+            {"name": "processor",
+             "type": "text",
+             "value": processor
+            },
+            {"name": "satellite",
+             "type": "text",
+             "value": satellite
+            }]
+    }
+
+def park(satellite, sensing_identifier, processor, parameters, list_of_annotations = None):
+    """
+    Method to park an ingestion waiting for the datastrips of the sensing identifier
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param sensing_identifier: sensing identifier of the datastrips
+    :type sensing_identifier: str
+    :param processor: ingestion module which parks the ingestion
+    :type processor: str
+    :param parameters: information needed for resuming the ingestion (JSON serializable)
+    :type parameters: dict
+    :param list_of_annotations: annotations of the parking ingestion receiving the PENDING_INGESTION annotation (status PARKED) of the datastrip
+    :type list_of_annotations: list
+
+    :return: path to the entry of the queue
+    :rtype: str
+    """
+    entry = {
+        "satellite": satellite,
+        "sensing_identifier": sensing_identifier,
+        "processor": processor,
+        "parking_time": datetime.datetime.now().isoformat(),
+        "parameters": parameters
+    }
+
+    entry_path = get_pending_ingestions_path() + "/" + satellite + "_" + sensing_identifier + "_" + str(uuid.uuid1()) + ".json"
+    with open(entry_path + ".part", "w") as entry_file:
+        json.dump(entry, entry_file)
+    # end with
+    os.rename(entry_path + ".part", entry_path)
+
+    if list_of_annotations != None and "datastrip" in parameters:
+        list_of_annotations.append(get_pending_ingestion_annotation(satellite, sensing_identifier, processor, parameters["datastrip"], "PARKED"))
+    # end if
+
+    logger.info("The ingestion of {} by {} has been parked waiting for the datastrips with sensing identifier {} ({} pending ingestions)".format(parameters.get("source", {}).get("name"), processor, sensing_identifier, len(get_pending_ingestions())))
+
+    # The datastrips could be committed while parking
+    resume_at_exit(satellite, sensing_identifier)
+
+    return entry_path
+
+def get_pending_ingestions(satellite = None, sensing_identifier = None):
+    """
+    Method to obtain the entries of the queue of pending ingestions
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param sensing_identifier: sensing identifier of the datastrips
+    :type sensing_identifier: str
+
+    :return: list of tuples (path to the entry, entry)
+    :rtype: list
+    """
+    # The entries claimed by deferred ingestions which did not finish are pending again
+    release_stale_entries()
+
+    pattern = (satellite or "*") + "_" + (sensing_identifier or "*") + "_*.json"
+    pending_ingestions = []
+    for entry_path in sorted(glob.glob(get_pending_ingestions_path() + "/" + pattern)):
+        try:
+            with open(entry_path) as entry_file:
+                pending_ingestions.append((entry_path, json.load(entry_file)))
+            # end with
+        except (OSError, ValueError):
+            # The entry has been resumed meanwhile
+            continue
+        # end try
+    # end for
+
+    return pending_ingestions
+
+def release(resumed_entry_path):
+    """
+    Method to put back in the queue an entry claimed for its resumption (e.g. when the deferred ingestion fails)
+
+    :param resumed_entry_path: path to the claimed entry (.resumed)
+    :type resumed_entry_path: str
+
+    :return: path to the entry of the queue or None if the entry is not available
+    :rtype: str
+    """
+    entry_path = resumed_entry_path.replace(".resumed", ".json")
+    try:
+        os.rename(resumed_entry_path, entry_path)
+    except OSError:
+        return None
+    # end try
+    logger.info("The parked ingestion {} has been put back in the queue of pending ingestions".format(os.path.basename(entry_path)))
+
+    return entry_path
+
+def release_stale_entries(timeout = None):
+    """
+    Method to put back in the queue the entries claimed for their resumption longer ago than the timeout
+    (their deferred ingestion did not finish, e.g. the process was killed)
+    The timeout is configured in s2boa.json (PENDING_INGESTIONS/RESUMED_TIMEOUT)
+
+    :param timeout: time after which a claimed entry is put back in the queue (seconds)
+    :type timeout: float
+
+    :return: paths to the entries put back in the queue
+    :rtype: list
+    """
+    if timeout == None:
+        timeout = functions.get_s2boa_conf().get("PENDING_INGESTIONS", {}).get("RESUMED_TIMEOUT", DEFAULT_RESUMED_TIMEOUT)
+    # end if
+
+    now = time.time()
+    entry_paths = []
+    for resumed_entry_path in sorted(glob.glob(get_pending_ingestions_path() + "/*.resumed")):
+        try:
+            stale = now - os.path.getmtime(resumed_entry_path) > timeout
+        except OSError:
+            # The entry has been finished meanwhile
+            continue
+        # end try
+        if stale:
+            logger.warning("The resumption of the parked ingestion {} has not finished after {} seconds".format(os.path.basename(resumed_entry_path), timeout))
+            entry_path = release(resumed_entry_path)
+            if entry_path != None:
+                entry_paths.append(entry_path)
+            # end if
+        # end if
+    # end for
+
+    return entry_paths
+
+def resume_at_exit(satellite, sensing_identifier):
+    """
+    Method to request the resumption of the pending ingestions waiting for
+    the datastrips of the sensing identifier once the current ingestion
+    finishes (the data of the ingestion is committed before the process ends)
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param sensing_identifier: sensing identifier of the datastrips
+    :type sensing_identifier: str
+    """
+    if len(sensing_identifiers_to_resume) == 0:
+        atexit.register(resume_pending_ingestions)
+    # end if
+    sensing_identifiers_to_resume.add((satellite, sensing_identifier))
+
+def resume_pending_ingestions():
+    """
+    Method to launch the deferred ingestion of the pending ingestions whose datastrips are available
+    The deferred ingestions are launched in background, so that this process is not blocked
+    """
+    query = Query()
+    for (satellite, sensing_identifier) in sorted(sensing_identifiers_to_resume):
+        pending_ingestions = get_pending_ingestions(satellite, sensing_identifier)
+        if len(pending_ingestions) == 0 or functions.get_upper_level_datastrip(query, satellite, sensing_identifier) == None:
+            continue
+        # end if
+        for (entry_path, entry) in pending_ingestions:
+            # Claim the entry, so that it is resumed only once
+            resumed_entry_path = entry_path.replace(".json", ".resumed")
+            try:
+                os.rename(entry_path, resumed_entry_path)
+                # The time of the claim determines when the entry is considered stale
+                os.utime(resumed_entry_path)
+            except OSError:
+                continue
+            # end try
+            logger.info("The parked ingestion of {} waiting for the datastrips with sensing identifier {} is resumed".format(entry["parameters"].get("source", {}).get("name"), sensing_identifier))
+            try:
+                subprocess.Popen(["eboa_ingestion.py", "-p", DEFERRED_INGESTION_PROCESSOR, "-f", resumed_entry_path],
+                                 stdin = subprocess.DEVNULL, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, start_new_session = True)
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.error("The deferred ingestion of {} could not be launched: {}".format(os.path.basename(entry_path), e))
+                release(resumed_entry_path)
+            # end try
+        # end for
+    # end for
+    query.close_session()
+    sensing_identifiers_to_resume.clear()
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="List the queue of pending ingestions")
+    args_parser.add_argument("-s", dest="satellite", type=str, nargs=1,
+                             help="satellite", default=[None])
+    args = args_parser.parse_args()
+
+    now = datetime.datetime.now()
+    pending_ingestions = get_pending_ingestions(args.satellite[0])
+    for (entry_path, entry) in pending_ingestions:
+        print("{} {} {} (parked {} ago)".format(entry["sensing_identifier"], entry["parameters"].get("source", {}).get("name"), entry["processor"],
+                                               now - datetime.datetime.fromisoformat(entry["parking_time"])))
+    # end for
+    print("{} pending ingestions in {}".format(len(pending_ingestions), get_pending_ingestions_path()))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Helper module for profiling the ingestions of Sentinel-2
+
+The profiling is enabled in s2boa.json (PROFILING/ENABLED) and writes a profile in JSON format per
+ingested file into the configured directory (PROFILING/PATH). The profile contains the duration of
+the ingestion and of its stages, with the number of queries to the DDBB, the rows returned or modified
+by them, the XPATH evaluations and the subprocesses launched during each of them. The stages are:
+- the functions decorated with stage (the values of nested stages are included in the enclosing ones)
+- the periods between consecutive updates of the progress of the ingestion (see mark_progress)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import sys
+import argparse
+import datetime
+import functools
+import json
+import tempfile
+import threading
+import time
+
+# Import SQLAlchemy events
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+# Counters of the profiles
+COUNTERS = ["queries", "rows", "xpath_evaluations", "subprocesses"]
+
+# Profile of the ingestion running in each thread
+active_profiles = threading.local()
+
+class Profile():
+    """
+    Profile of the ingestion of a file
+    """
+
+    def __init__(self, processor, file_path):
+        """
+        :param processor: ingestion module
+        :type processor: str
+        :param file_path: path to the ingested file
+        :type file_path: str
+        """
+        self.processor = processor
+        self.file_path = file_path
+        self.start_date = datetime.datetime.now()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # Stages indexed by name (in order of first execution)
+        self.stages = {}
+        self.progress = []
+        self.last_progress = (None, self.start, dict(self.counters))
+
+    def count(self, counter, value = 1):
+        self.counters[counter] += value
+
+    def add_stage(self, name, duration, counters):
+        """
+        Method to accumulate the values of an execution of a stage
+        """
+        stage = self.stages.setdefault(name, dict({"name": name, "calls": 0, "duration": 0}, **dict.fromkeys(COUNTERS, 0)))
+        stage["calls"] += 1
+        stage["duration"] += duration
+        for counter in COUNTERS:
+            stage[counter] += self.counters[counter] - counters[counter]
+        # end for
+
+    def mark_progress(self, progress):
+        """
+        Method to close the period since the previous update of the progress
+        """
+        now = time.perf_counter()
+        (previous_progress, previous_time, counters) = self.last_progress
+        period = {"from": previous_progress, "to": progress, "duration": now - previous_time}
+        for counter in COUNTERS:
+            period[counter] = self.counters[counter] - counters[counter]
+        # end for
+        self.progress.append(period)
+        self.last_progress = (progress, now, dict(self.counters))
+
+    def finish(self, error = None):
+        self.duration = time.perf_counter() - self.start
+        self.error = error
+
+    def to_dict(self):
+        """
+        Method to obtain the profile in the structure written in JSON format
+
+        :return: profile
+        :rtype: dict
+        """
+        profile = {
+            "file": os.path.basename(self.file_path),
+            "file_path": self.file_path,
+            "processor": self.processor,
+            "start": self.start_date.isoformat(),
+            "duration": self.duration,
+            "error": self.error
+        }
+        profile.update(self.counters)
+        profile["stages"] = list(self.stages.values())
+        profile["progress"] = self.progress
+
+        return profile
+
+def get_active_profile():
+    """
+    Method to obtain the profile of the ingestion running in the current thread
+
+    :return: profile or None if the ingestion is not profiled
+    :rtype: Profile
+    """
+
+    return getattr(active_profiles, "profile", None)
+
+def count(counter, value = 1):
+    """
+    Method to increase a counter of the profile of the ingestion running in the current thread
+
+    :param counter: name of the counter (see COUNTERS)
+    :type counter: str
+    :param value: increment
+    :type value: int
+    """
+    profile = getattr(active_profiles, "profile", None)
+    if profile != None:
+        profile.count(counter, value)
+    # end if
+
+def mark_progress(progress):
+    """
+    Method to register an update of the progress of the ingestion running in the current thread
+
+    :param progress: progress of the ingestion (percentage)
+    :type progress: float
+    """
+    profile = getattr(active_profiles, "profile", None)
+    if profile != None:
+        profile.mark_progress(progress)
+    # end if
+
+def stage(function):
+    """
+    Decorator to register the executions of a function as a stage of the profiled ingestions
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = getattr(active_profiles, "profile", None)
+        if profile == None:
+            return function(*args, **kwargs)
+        # end if
+        counters = dict(profile.counters)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.add_stage(function.__name__, time.perf_counter() - start, counters)
+        # end try
+    # end def
+
+    return wrapper
+
+###
+# Hooks counting the queries and the subprocesses
+###
+hooks_installed = False
+hooks_lock = threading.Lock()
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(active_profiles, "profile", None)
+    if profile != None:
+        profile.count("queries")
+        if cursor.rowcount != None and cursor.rowcount > 0:
+            profile.count("rows", cursor.rowcount)
+        # end if
+    # end if
+
+def _count_subprocess(event_name, args):
+    if event_name == "subprocess.Popen" or event_name == "os.system":
+        count("subprocesses")
+    # end if
+
+def install_hooks():
+    """
+    Method to install the hooks counting the queries to the DDBB and the subprocesses (once per process)
+    """
+    global hooks_installed
+    with hooks_lock:
+        if not hooks_installed:
+            event.listen(Engine, "after_cursor_execute", _count_query)
+            # The audit hooks cannot be removed, but they only count when there is a profile in the thread
+            sys.addaudithook(_count_subprocess)
+            hooks_installed = True
+        # end if
+    # end with
+
+###
+# Profiling of the ingestions
+###
+def get_profiling_conf():
+    """
+    Method to obtain the configuration of the profiling (PROFILING in s2boa.json)
+
+    :return: tuple with the status of the profiling and the directory of the profiles
+    :rtype: tuple
+    """
+    # The helpers import this module, so they are imported when the configuration is requested
+    import s2boa.ingestions.functions as functions
+
+    profiling_conf = functions.get_s2boa_conf().get("PROFILING", {})
+
+    return (profiling_conf.get("ENABLED", False), profiling_conf.get("PATH", tempfile.gettempdir() + "/s2boa_profiles"))
+
+def write_profile(profile, profiles_path):
+    """
+    Method to write a profile in JSON format
+
+    :param profile: profile
+    :type profile: Profile
+    :param profiles_path: directory of the profiles
+    :type profiles_path: str
+
+    :return: path to the written profile
+    :rtype: str
+    """
+    os.makedirs(profiles_path, exist_ok = True)
+    profile_path = "{}/{}_{}_{}.json".format(profiles_path, os.path.basename(profile.file_path), profile.processor.split(".")[-1], profile.start_date.strftime("%Y%m%dT%H%M%S%f"))
+    with open(profile_path, "w") as profile_file:
+        json.dump(profile.to_dict(), profile_file, indent = 4)
+    # end with
+
+    return profile_path
+
+def profile_ingestion(function):
+    """
+    Decorator to profile the ingestion of files by a process_file function (process_file(file_path, engine, query, reception_time))
+    When an ingestion is already profiled in the thread (an ingestion module calling another one), the function is registered as a stage
+    """
+    processor = function.__module__
+    staged_function = stage(function)
+
+    @functools.wraps(function)
+    def wrapper(file_path, *args, **kwargs):
+        if get_active_profile() != None:
+            return staged_function(file_path, *args, **kwargs)
+        # end if
+        (enabled, profiles_path) = get_profiling_conf()
+        if not enabled:
+            return function(file_path, *args, **kwargs)
+        # end if
+
+        install_hooks()
+        profile = Profile(processor, file_path)
+        active_profiles.profile = profile
+        error = None
+        try:
+            return function(file_path, *args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            active_profiles.profile = None
+            profile.finish(error)
+            try:
+                profile_path = write_profile(profile, profiles_path)
+                logger.info("The profile of the ingestion of {} by {} has been written in {}".format(os.path.basename(file_path), processor, profile_path))
+            except Exception as e:
+                logger.error("The profile of the ingestion of {} by {} could not be written: {}".format(os.path.basename(file_path), processor, e))
+            # end try
+        # end try
+    # end def
+
+    return wrapper
+
+def summarize_profiles(profiles):
+    """
+    Method to obtain the mean values of the ingestions and of their stages per processor
+    The periods between updates of the progress are summarized as stages named "progress <from>-<to>%"
+
+    :param profiles: profiles (see Profile.to_dict)
+    :type profiles: list
+
+    :return: summary indexed by processor ({"files": ..., "duration": mean, counters: mean, "stages": {name: mean values per file}})
+    :rtype: dict
+    """
+    summary = {}
+    for profile in profiles:
+        processor = summary.setdefault(profile["processor"], dict({"files": 0, "duration": 0, "stages": {}}, **dict.fromkeys(COUNTERS, 0)))
+        processor["files"] += 1
+        for field in ["duration"] + COUNTERS:
+            processor[field] += profile[field]
+        # end for
+        progress_stages = [dict(period, name = "progress {}-{}%".format(period["from"] or 0, period["to"]), calls = 1) for period in profile["progress"]]
+        for profile_stage in profile["stages"] + progress_stages:
+            processor_stage = processor["stages"].setdefault(profile_stage["name"], dict({"calls": 0, "duration": 0}, **dict.fromkeys(COUNTERS, 0)))
+            for field in ["calls", "duration"] + COUNTERS:
+                processor_stage[field] += profile_stage[field]
+            # end for
+        # end for
+    # end for
+
+    for processor in summary.values():
+        for values in [processor] + list(processor["stages"].values()):
+            for field in values:
+                if field != "files" and field != "stages":
+                    values[field] /= processor["files"]
+                # end if
+            # end for
+        # end for
+    # end for
+
+    return summary
+
+def main():
+
+    args_parser = argparse.ArgumentParser(description="Summary per processor and stage of the profiles of the ingestions")
+    args_parser.add_argument("-d", dest="profiles_path", type=str, nargs=1,
+                             help="directory of the profiles", required=True)
+    args = args_parser.parse_args()
+
+    profiles_path = args.profiles_path[0]
+    profiles = []
+    for file_name in sorted(os.listdir(profiles_path)):
+        if file_name.endswith(".json"):
+            with open(profiles_path + "/" + file_name) as profile_file:
+                profiles.append(json.load(profile_file))
+            # end with
+        # end if
+    # end for
+
+    header = "{:<50} {:>10} {:>10} {:>10} {:>10} {:>10}"
+    row = "{:<50} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}"
+    for (processor_name, processor) in sorted(summarize_profiles(profiles).items()):
+        print("{} ({} files, mean per file)".format(processor_name, processor["files"]))
+        print(header.format("stage", "time (s)", "queries", "rows", "xpaths", "processes"))
+        print(row.format("total", *[processor[field] for field in ["duration"] + COUNTERS]))
+        for (stage_name, processor_stage) in sorted(processor["stages"].items(), key = lambda item: item[1]["duration"], reverse = True):
+            print(row.format(stage_name, *[processor_stage[field] for field in ["duration"] + COUNTERS]))
+        # end for
+        print()
+    # end for
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Helper module for reporting the progress of the ingestions of Sentinel-2
+
+The progress of the sources is written to the DDBB by a background thread of the process, so the
+ingestion does not wait for a commit per update. The updates received while waiting for the next
+write are coalesced (only the last progress of each source is written) and the writes are limited
+to one per interval, except for the completion of a source (100%) which is written as soon as possible.
+The time between consecutive updates of a source is recorded as the duration of the stage, so the
+progress doubles as a profile per stage of the ingestion
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+# Import datamodel
+from eboa.datamodel.sources import Source
+
+# Import query interface
+from eboa.engine.query import Query
+
+# Import logging
+from eboa.logging import Log
+
+logging_module = Log(name = __name__)
+logger = logging_module.logger
+
+# Minimum time between writes to the DDBB (seconds)
+DEFAULT_WRITE_INTERVAL = 1.0
+
+# Maximum number of profiles of completed sources kept by the reporter
+MAX_PROFILES = 1000
+
+# Maximum number of sources being ingested tracked by the reporter (the least recently updated are dropped)
+MAX_STAGES = 1000
+
+def write_progresses(query, progresses):
+    """
+    Method to write the progress of several sources to the DDBB in one transaction
+
+    :param query: query interface owning the session used for writing
+    :type query: Query
+    :param progresses: progress indexed by source uuid
+    :type progresses: dict
+    """
+    for source_uuid, progress in progresses.items():
+        query.session.query(Source).filter(Source.source_uuid == source_uuid).update({"processor_progress": progress}, synchronize_session = False)
+    # end for
+    query.session.commit()
+
+class ProgressReporter():
+    """
+    Process wide writer of the progress of the ingestions running in background
+    """
+
+    def __init__(self, write_interval = DEFAULT_WRITE_INTERVAL, write = None):
+        """
+        :param write_interval: minimum time between writes to the DDBB (seconds)
+        :type write_interval: float
+        :param write: function receiving the progresses to write indexed by source uuid (written to the DDBB by default)
+        :type write: function
+        """
+        self.write_interval = write_interval
+        self.write = write
+        self.query = None
+        self.condition = threading.Condition()
+        # Progress pending to be written indexed by source uuid
+        self.pending = {}
+        self.urgent = False
+        self.writing = False
+        self.last_write = None
+        # Stages of the sources being ingested (in order of update) and of the last completed ones indexed by source uuid
+        self.stages = OrderedDict()
+        self.profiles = OrderedDict()
+        self.thread = None
+        self.stopped = False
+
+    def report(self, source_uuid, progress):
+        """
+        Method to register the progress of the ingestion of a source (it does not wait for the write)
+
+        :param source_uuid: identifier of the source
+        :type source_uuid: uuid
+        :param progress: progress of the ingestion (percentage)
+        :type progress: float
+        """
+        now = time.perf_counter()
+        with self.condition:
+            stages = self.stages.setdefault(source_uuid, {"progress": None, "time": now, "stages": [], "thread": threading.get_ident()})
+            self.stages.move_to_end(source_uuid)
+            while len(self.stages) > MAX_STAGES:
+                (dropped_source_uuid, dummy) = self.stages.popitem(last = False)
+                logger.debug("The stages of the ingestion of the source {} have been dropped as it has not been completed".format(dropped_source_uuid))
+            # end while
+            if stages["progress"] != None:
+                stages["stages"].append({"from": stages["progress"], "to": progress, "duration": now - stages["time"]})
+            # end if
+            stages["progress"] = progress
+            stages["time"] = now
+            if progress >= 100:
+                self._complete(source_uuid)
+                self.urgent = True
+            # end if
+
+            self.pending[source_uuid] = progress
+            if self.thread == None:
+                self.thread = threading.Thread(target = self._run, name = "progress_reporter", daemon = True)
+                self.thread.start()
+            # end if
+            self.condition.notify_all()
+        # end with
+
+    def _complete(self, source_uuid):
+        """
+        Method to move the stages of a completed source to the profiles
+        """
+        stages = self.stages.pop(source_uuid)["stages"]
+        self.profiles[source_uuid] = stages
+        while len(self.profiles) > MAX_PROFILES:
+            self.profiles.popitem(last = False)
+        # end while
+        logger.debug("The ingestion of the source {} has been completed with the stages {}".format(source_uuid, ", ".join(["{}-{}%: {:.3f} s".format(stage["from"], stage["to"], stage["duration"]) for stage in stages])))
+
+    def discard(self, thread = None):
+        """
+        Method to drop the stages of the sources not completed by the ingestions of a thread
+        (used once the ingestions finish, so that the failed ones do not remain in the reporter)
+
+        :param thread: identifier of the thread (the current one by default)
+        :type thread: int
+
+        :return: identifiers of the dropped sources
+        :rtype: list
+        """
+        if thread == None:
+            thread = threading.get_ident()
+        # end if
+        with self.condition:
+            source_uuids = [source_uuid for source_uuid, stages in self.stages.items() if stages["thread"] == thread]
+            for source_uuid in source_uuids:
+                del self.stages[source_uuid]
+            # end for
+        # end with
+        if len(source_uuids) > 0:
+            logger.debug("The stages of the ingestion of the sources {} have been dropped as they have not been completed".format(", ".join([str(source_uuid) for source_uuid in source_uuids])))
+        # end if
+
+        return source_uuids
+
+    def get_profile(self, source_uuid):
+        """
+        Method to obtain the duration of the stages of the ingestion of a source
+
+        :param source_uuid: identifier of the source
+        :type source_uuid: uuid
+
+        :return: list of stages ({"from": progress, "to": progress, "duration": seconds}) or None if the source has not been reported
+        :rtype: list
+        """
+        with self.condition:
+            if source_uuid in self.profiles:
+                return list(self.profiles[source_uuid])
+            elif source_uuid in self.stages:
+                return list(self.stages[source_uuid]["stages"])
+            # end if
+        # end with
+
+        return None
+
+    def _write(self, progresses):
+        """
+        Method to write the progresses from the background thread
+        """
+        if self.write != None:
+            self.write(progresses)
+            return
+        # end if
+
+        # The session is created by the background thread, as the sessions cannot be shared between threads
+        if self.query == None:
+            self.query = Query()
+        # end if
+        try:
+            write_progresses(self.query, progresses)
+        except Exception:
+            self.query.session.rollback()
+            raise
+        # end try
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while len(self.pending) == 0 and not self.stopped:
+                    self.condition.wait()
+                # end while
+                if len(self.pending) == 0:
+                    break
+                # end if
+                # Wait for the end of the interval coalescing the updates
+                while self.last_write != None and not self.urgent and not self.stopped:
+                    remaining = self.last_write + self.write_interval - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    # end if
+                    self.condition.wait(remaining)
+                # end while
+                progresses = self.pending
+                self.pending = {}
+                self.urgent = False
+                self.writing = True
+            # end with
+
+            try:
+                self._write(progresses)
+            except Exception as e:
+                logger.error("The progress of the ingestions {} could not be written: {}".format(progresses, e))
+            # end try
+
+            with self.condition:
+                self.writing = False
+                self.last_write = time.perf_counter()
+                self.condition.notify_all()
+            # end with
+        # end while
+        if self.query != None:
+            self.query.close_session()
+        # end if
+
+    def flush(self, timeout = None):
+        """
+        Method to wait until the progress reported so far has been written
+
+        :param timeout: maximum time to wait (seconds)
+        :type timeout: float
+
+        :return: True if all the progress has been written
+        :rtype: bool
+        """
+        with self.condition:
+            self.urgent = True
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: len(self.pending) == 0 and not self.writing, timeout)
+        # end with
+
+    def stop(self, timeout = None):
+        """
+        Method to write the pending progress and finish the background thread
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        # end with
+        if self.thread != None:
+            self.thread.join(timeout)
+        # end if
+
+progress_reporter = None
+progress_reporter_lock = threading.Lock()
+
+def get_progress_reporter():
+    """
+    Method to obtain the process wide reporter of the progress of the ingestions
+
+    :return: progress_reporter
+    :rtype: ProgressReporter
+    """
+    global progress_reporter
+    with progress_reporter_lock:
+        if progress_reporter == None:
+            progress_reporter = ProgressReporter()
+            # The pending progress is written before the process ends
+            atexit.register(progress_reporter.stop)
+        # end if
+    # end with
+
+    return progress_reporter
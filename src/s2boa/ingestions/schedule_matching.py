@@ -0,0 +1,130 @@
+"""
+Helper module for matching the schedules of Sentinel-2 (station, DFEP and EDRS slot requests
+and station acquisition reports) with the planned playbacks
+
+The corrected planned playbacks covering all the entries of the file are obtained with a
+single query and indexed by start, so that each entry of the schedule is matched in memory.
+The values to be added to the matched playbacks are collected and inserted once the file has
+been processed. The engine writes them per event, so they are committed before the operations
+returned by the ingestion are inserted and they are kept if that insertion fails
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import bisect
+from dateutil import parser
+
+class PlannedPlaybacks():
+    """
+    Index of the planned playbacks (PLANNED_PLAYBACK) by the period of their corrections (PLANNED_PLAYBACK_CORRECTION)
+    """
+
+    def __init__(self, query, entries):
+        """
+        :param query: Query instance
+        :type query: Query
+        :param entries: list of tuples (satellite, start, stop) of the schedule entries to match
+        :type entries: list
+        """
+        playbacks = {"prime_events": [], "linked_events": []}
+        if len(entries) > 0:
+            # The window covers all the entries of the file
+            playbacks = query.get_linked_events(gauge_names = {"filter": "PLANNED_PLAYBACK_CORRECTION", "op": "=="},
+                                                gauge_systems = {"filter": list(set([entry[0] for entry in entries])), "op": "in"},
+                                                start_filters = [{"date": min([entry[1] for entry in entries], key = parser.parse), "op": ">"}],
+                                                stop_filters = [{"date": max([entry[2] for entry in entries], key = parser.parse), "op": "<"}],
+                                                link_names = {"filter": "TIME_CORRECTION", "op": "=="},
+                                                return_prime_events = True)
+        # end if
+
+        linked_events = {playback.event_uuid: playback for playback in playbacks["linked_events"]}
+
+        # Corrections sorted by start with their planned playbacks
+        self.corrections = []
+        for correction in sorted(playbacks["prime_events"], key = lambda correction: correction.start):
+            correction_playbacks = [linked_events[link.event_uuid_link] for link in correction.eventLinks if link.name == "TIME_CORRECTION" and link.event_uuid_link in linked_events]
+            self.corrections.append((correction.start, correction.stop, correction.gauge.system, correction_playbacks))
+        # end for
+        self.starts = [correction[0] for correction in self.corrections]
+
+    def match(self, satellite, start, stop):
+        """
+        Method to obtain the planned playbacks whose correction is inside the period of the schedule entry
+        (as done by the query with start_filters > start and stop_filters < stop)
+
+        :param satellite: satellite of the schedule entry (S2A, S2B...)
+        :type satellite: str
+        :param start: start of the schedule entry
+        :type start: str
+        :param stop: stop of the schedule entry
+        :type stop: str
+
+        :return: planned playbacks
+        :rtype: list
+        """
+        start = parser.parse(start)
+        stop = parser.parse(stop)
+
+        playbacks = []
+        for (correction_start, correction_stop, system, correction_playbacks) in self.corrections[bisect.bisect_right(self.starts, start):]:
+            if correction_start >= stop:
+                break
+            # end if
+            if correction_stop < stop and system == satellite:
+                for playback in correction_playbacks:
+                    if playback not in playbacks:
+                        playbacks.append(playback)
+                    # end if
+                # end for
+            # end if
+        # end for
+
+        return playbacks
+
+def get_planned_playback_correction_uuid(playback):
+    """
+    Method to obtain the identifier of the correction of a planned playback
+
+    :param playback: planned playback
+    :type playback: Event
+
+    :return: identifier of the PLANNED_PLAYBACK_CORRECTION event
+    :rtype: uuid
+    """
+
+    return [event_link.event_uuid_link for event_link in playback.eventLinks if event_link.name == "TIME_CORRECTION"][0]
+
+def add_playback_value(playback_values, playback, value):
+    """
+    Method to register a value to be inserted into a planned playback and its correction
+    The same value (by name) is registered only once per event
+
+    :param playback_values: values to insert indexed by event identifier and value name
+    :type playback_values: dict
+    :param playback: planned playback
+    :type playback: Event
+    :param value: value in ingestion format
+    :type value: dict
+    """
+    for event_uuid in [playback.event_uuid, get_planned_playback_correction_uuid(playback)]:
+        playback_values.setdefault(event_uuid, {}).setdefault(value["name"], value)
+    # end for
+
+def insert_playback_values(engine, playback_values):
+    """
+    Method to insert the registered values into the planned playbacks and their corrections
+    The values are committed by the engine straight away (not with the operations returned by the ingestion)
+
+    :param engine: Engine instance
+    :type engine: Engine
+    :param playback_values: values to insert indexed by event identifier and value name (see add_playback_value)
+    :type playback_values: dict
+    """
+    for event_uuid in playback_values:
+        for value in playback_values[event_uuid].values():
+            engine.insert_event_values(event_uuid, value)
+        # end for
+    # end for
+    playback_values.clear()
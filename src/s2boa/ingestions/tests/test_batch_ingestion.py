@@ -0,0 +1,89 @@
+"""
+Automated tests for the ingestion of batches of files of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Import engine
+import eboa.engine.engine as eboa_engine
+
+# Import batch ingestion
+import s2boa.ingestions.batch_ingestion as batch_ingestion
+
+TRIGGERING_PATH = os.path.dirname(os.path.abspath(__file__)) + "/../../../boa_config/triggering.xml"
+
+NPPF = "S2A_OPER_MPL__NPPF__20180720T110000_20180806T140000_0001.EOF"
+ORBPRE = "S2A_OPER_MPL_ORBPRE_20180720T030221_20180730T030221_0001.EOF"
+REP_PASS_2 = "S2A_OPER_REP_PASS_2_MPS__20180721T104055_V20180721T103527_20180721T103739.EOF"
+REP_PASS_5 = "S2A_OPER_REP_PASS_5_MPS__20180721T104058_V20180721T103527_20180721T103739.EOF"
+DPC = "S2A_OPER_REP_OPDPC__SGS__20180721T104158_V20180721T085229_20180721T085229.EOF"
+DPC_MPC = "S2A_OPER_REP_OPDPC__MPC__20180721T104158_V20180721T085229_20180721T085229.EOF"
+DC = "S2A_OPER_REP_OPDC___SGS__20180721T104158_V20180721T085229_20180721T085229.EOF"
+UNKNOWN = "S2A_OPER_UNKNOWN.EOF"
+
+class TestBatchIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = batch_ingestion.read_triggering_rules(TRIGGERING_PATH)
+
+    def test_read_triggering_rules(self):
+
+        assert batch_ingestion.get_rule(self.rules, "/inputs/" + NPPF)["processor"] == "s2boa.ingestions.ingestion_nppf.ingestion_nppf"
+        assert batch_ingestion.get_rule(self.rules, REP_PASS_2)["source_type"] == "S2A_REP_PASS_2_5"
+        assert batch_ingestion.get_rule(self.rules, REP_PASS_2)["dependencies"] == ["S2A_MPL__NPPF", "S2A_MPL_ORBPRE"]
+        assert batch_ingestion.get_rule(self.rules, DPC_MPC)["skip"] == True
+        assert batch_ingestion.get_rule(self.rules, UNKNOWN) == None
+
+        blocking_source_types = batch_ingestion.get_blocking_source_types(self.rules)
+        assert blocking_source_types["S2A_MPL_ORBPRE"] == set(["S2A_MPL__NPPF"])
+        # The dependencies are followed transitively
+        assert blocking_source_types["S2A_REP_OPDPC"] == set(["S2A_MPL__NPPF", "S2A_MPL_ORBPRE", "S2A_REP_PASS_E", "S2A_REP_PASS_2_5",
+                                                               "SRA_EDRS", "S2B_MPL__NPPF", "S2B_MPL_ORBPRE"])
+        assert blocking_source_types["REP_OPDC"] == set()
+
+    def test_ingest_files(self):
+
+        events = []
+        lock = threading.Lock()
+        def ingest(processor, file_path):
+            with lock:
+                events.append(("start", os.path.basename(file_path)))
+            # end with
+            time.sleep(0.01)
+            with lock:
+                events.append(("stop", os.path.basename(file_path)))
+            # end with
+            return ([eboa_engine.exit_codes["OK"]["status"]], None, 0.01)
+
+        file_paths = ["/inputs/" + file_name for file_name in [DPC, DC, REP_PASS_5, ORBPRE, REP_PASS_2, NPPF, DPC_MPC, UNKNOWN]]
+        with ThreadPoolExecutor(max_workers = 4) as executor:
+            (results, not_ingested) = batch_ingestion.ingest_files(file_paths, self.rules, executor, ingest = ingest)
+        # end with
+
+        assert sorted([os.path.basename(result["file_path"]) for result in not_ingested]) == sorted([DPC_MPC, UNKNOWN])
+        assert len(results) == 6
+
+        # The files are ingested after the files of the source types they depend on
+        def position(event, file_name):
+            return events.index((event, file_name))
+        assert position("stop", NPPF) < position("start", ORBPRE)
+        assert position("stop", ORBPRE) < position("start", REP_PASS_2)
+        assert position("stop", ORBPRE) < position("start", REP_PASS_5)
+        assert position("stop", REP_PASS_2) < position("start", DPC)
+        assert position("stop", REP_PASS_5) < position("start", DPC)
+        # The files without dependencies are ingested concurrently with the rest
+        assert position("start", DC) < position("stop", NPPF)
+
+        report = batch_ingestion.get_report(results, 1)
+        assert report["files"] == 6
+        assert report["throughput"] == 360
+        assert report["processors"]["s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition"]["files"] == 2
+        assert report["processors"]["s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition"]["failed"] == 0
@@ -0,0 +1,52 @@
+"""
+Automated tests for the conversion of dates of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+import datetime
+
+# Import date helpers
+import s2boa.ingestions.dates as date_functions
+
+class TestDates(unittest.TestCase):
+
+    def test_three_letter(self):
+
+        assert date_functions.three_letter_to_iso_8601("21-JUL-2018 08:52:29.993268") == "2018-07-21T08:52:29.993268"
+        assert date_functions.parse_three_letter("21-JUL-2018 08:52:29.993268") == datetime.datetime(2018, 7, 21, 8, 52, 29, 993268)
+        assert date_functions.parse_three_letter("01-DEC-2018 23:59:59.5") == datetime.datetime(2018, 12, 1, 23, 59, 59, 500000)
+        assert date_functions.parse_three_letter("01-DEC-2018 23:59:59") == datetime.datetime(2018, 12, 1, 23, 59, 59)
+
+    def test_parse_iso_8601(self):
+
+        assert date_functions.parse_iso_8601("2018-07-21T08:52:29.993268") == datetime.datetime(2018, 7, 21, 8, 52, 29, 993268)
+        # Formats not supported by fromisoformat use the generic parser
+        assert date_functions.parse_iso_8601("20180721T085229") == datetime.datetime(2018, 7, 21, 8, 52, 29)
+
+    def test_gps_to_utc(self):
+
+        assert date_functions.gps_to_utc(datetime.datetime(2015, 6, 30, 12, 0, 0)) == datetime.datetime(2015, 6, 30, 11, 59, 44)
+        assert date_functions.gps_to_utc(datetime.datetime(2016, 7, 1, 12, 0, 0)) == datetime.datetime(2016, 7, 1, 11, 59, 43)
+        assert date_functions.gps_to_utc(datetime.datetime(2018, 7, 21, 8, 52, 29, 993268)) == datetime.datetime(2018, 7, 21, 8, 52, 11, 993268)
+        assert date_functions.gps_to_utc(datetime.datetime(2010, 1, 1)) == datetime.datetime(2009, 12, 31, 23, 59, 45)
+
+        # The offset changes when the leap second is reached in GPS time
+        assert date_functions.gps_to_utc(datetime.datetime(2017, 1, 1, 0, 0, 16, 999999)) == datetime.datetime(2016, 12, 31, 23, 59, 59, 999999)
+        assert date_functions.gps_to_utc(datetime.datetime(2017, 1, 1, 0, 0, 18)) == datetime.datetime(2017, 1, 1, 0, 0, 0)
+
+        assert date_functions.three_letter_gps_to_utc("21-JUL-2018 08:52:29.993268") == datetime.datetime(2018, 7, 21, 8, 52, 11, 993268)
+
+    def test_dates_to_mjd2000(self):
+
+        mjd2000_dates = date_functions.dates_to_mjd2000(["2000-01-01T00:00:00", "2018-07-21T12:00:00", "2016-12-31T12:00:00", "2017-01-01T00:00:00"])
+
+        assert mjd2000_dates[0] == 0
+        assert mjd2000_dates[1] == 6776.5
+        # The days ending with a leap second last 86401 seconds
+        assert mjd2000_dates[2] == 6209 + 43200 / 86401
+        assert mjd2000_dates[3] == 6210
+        assert len(date_functions.dates_to_mjd2000([])) == 0
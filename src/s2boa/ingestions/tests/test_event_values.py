@@ -0,0 +1,53 @@
+"""
+Automated tests for the access to the values of the events of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+from types import SimpleNamespace
+
+# Import event value helpers
+import s2boa.ingestions.event_values as event_values
+
+class TestEventValues(unittest.TestCase):
+
+    def test_index_values_ingestion_event(self):
+
+        event = {
+            "start": "2018-07-21T09:50:51.776833",
+            "stop": "2018-07-21T11:31:24.216133",
+            "values": [{"name": "orbit", "type": "double", "value": "16076"},
+                       {"name": "satellite", "type": "text", "value": "S2A"},
+                       {"name": "orbit", "type": "double", "value": "16077"},
+                       {"name": "footprint_details", "type": "object", "values": [{"name": "footprint", "type": "geometry", "value": "POLYGON((0 0,1 0,1 1,0 0))"}]}]
+        }
+
+        assert event_values.index_values(event) == {"orbit": "16076", "satellite": "S2A"}
+        assert event_values.index_values(event, ["text"]) == {"satellite": "S2A"}
+        assert event_values.index_values({"start": "2018-07-21T09:50:51.776833", "stop": "2018-07-21T11:31:24.216133"}) == {}
+
+    def test_index_values_ddbb_event(self):
+
+        event = SimpleNamespace(eventDoubles = [SimpleNamespace(name = "start_orbit", value = 16076.0),
+                                                SimpleNamespace(name = "start_angle", value = 10.5),
+                                                SimpleNamespace(name = "start_orbit", value = 16077.0)],
+                                eventTimestamps = [],
+                                eventTexts = [SimpleNamespace(name = "satellite", value = "S2A")],
+                                eventBooleans = [SimpleNamespace(name = "corrected", value = True)])
+
+        assert event_values.index_values(event) == {"start_orbit": 16076.0, "start_angle": 10.5, "satellite": "S2A", "corrected": True}
+        assert event_values.index_values(event, ["double"]) == {"start_orbit": 16076.0, "start_angle": 10.5}
+
+    def test_index_events_by_value(self):
+
+        events = [{"values": [{"name": "orbit", "type": "double", "value": "16076"}]},
+                  {"values": [{"name": "orbit", "type": "double", "value": "16077"}]},
+                  {"values": [{"name": "satellite", "type": "text", "value": "S2A"}]},
+                  {"values": [{"name": "orbit", "type": "double", "value": "16076"}]}]
+
+        events_by_orbit = event_values.index_events_by_value(events, "orbit")
+
+        assert events_by_orbit == {"16076": [events[0], events[3]], "16077": [events[1]]}
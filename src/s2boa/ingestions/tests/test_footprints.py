@@ -0,0 +1,67 @@
+"""
+Automated tests for the footprint helpers of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import unittest
+
+# Import footprint helpers
+import s2boa.ingestions.footprints as footprint_functions
+import s2boa.ingestions.orbit as orbit_functions
+import s2boa.ingestions.dates as date_functions
+
+class TestFootprints(unittest.TestCase):
+    def setUp(self):
+        self.orbpre_file_path = os.path.dirname(os.path.abspath(__file__)) + "/inputs/S2A_ORBPRE.EOF"
+        self.swath_definition_file_path = os.path.dirname(os.path.abspath(__file__)) + "/../../../boa_config/SDF_MSI.xml"
+
+    def test_read_swath_definition(self):
+
+        swath_definition = footprint_functions.read_swath_definition(self.swath_definition_file_path)
+
+        assert swath_definition == [(270.0, 79.7), (90.0, 90.0), (90.0, 79.7)]
+
+    def test_footprints_numpy_at_ascending_node(self):
+
+        osvs = orbit_functions.read_orbpre_file(self.orbpre_file_path)
+        swath_definition = footprint_functions.read_swath_definition(self.swath_definition_file_path)
+
+        # 2018-07-21T09:50:51.776833 (ascending node of the first OSV)
+        anx_mjd = date_functions.dates_to_mjd2000(["2018-07-21T09:50:51.776833"])[0]
+        footprints = footprint_functions.get_footprints_numpy([(anx_mjd, anx_mjd, 1)], osvs, swath_definition)
+
+        assert len(footprints) == 1
+
+        coordinates = [[float(value) for value in coordinate.split(",")] for coordinate in footprints[0].split(" ")]
+
+        # Values returned by the EOP CFI
+        expected_coordinates = [[-171.455147, -0.281921], [-168.925664, 0.281908]]
+
+        assert len(coordinates) == 2
+        for coordinate, expected_coordinate in zip(coordinates, expected_coordinates):
+            assert abs(coordinate[0] - expected_coordinate[0]) < 0.01
+            assert abs(coordinate[1] - expected_coordinate[1]) < 0.01
+        # end for
+
+    def test_footprints_numpy_batch(self):
+
+        osvs = orbit_functions.read_orbpre_file(self.orbpre_file_path)
+        swath_definition = footprint_functions.read_swath_definition(self.swath_definition_file_path)
+
+        (start_mjd, stop_mjd) = date_functions.dates_to_mjd2000(["2018-07-21T10:00:00", "2018-07-21T10:05:00"])
+        intervals = [(start_mjd, stop_mjd, 10), (start_mjd, stop_mjd, 1), (start_mjd, stop_mjd, 200)]
+
+        footprints = footprint_functions.get_footprints_numpy(intervals, osvs, swath_definition)
+
+        assert len(footprints) == 3
+        assert [len(footprint.split(" ")) for footprint in footprints] == [20, 2, 400]
+
+        # The footprints of the batch do not depend on the rest of intervals
+        assert footprints[0] == footprint_functions.get_footprints_numpy([intervals[0]], osvs, swath_definition)[0]
+        assert footprints[2] == footprint_functions.get_footprints_numpy([intervals[2]], osvs, swath_definition)[0]
+
+        assert footprint_functions.get_footprints_numpy([], osvs, swath_definition) == []
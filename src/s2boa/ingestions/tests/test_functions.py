@@ -22,6 +22,7 @@ import eboa.ingestion.eboa_ingestion as ingestion
 
 # Import functions
 import s2boa.ingestions.functions as s2boa_functions
+import s2boa.ingestions.dates as date_functions
 
 class TestS2boaFunctions(unittest.TestCase):
     def setUp(self):
@@ -494,3 +495,183 @@ class TestS2boaFunctions(unittest.TestCase):
                              "179.611531 -47.901043 180.0 "
                              "-48.7409196773976 180.0 "
                              "-57.990952831103854"}]}]}]
+
+    def test_associate_footprints_batch_matches_single_events(self):
+
+        filename = "S2A_ORBPRE.EOF"
+        file_path = os.path.dirname(os.path.abspath(__file__)) + "/inputs/" + filename
+
+        returned_value = ingestion.command_process_file("s2boa.ingestions.ingestion_orbpre.ingestion_orbpre", file_path, "2018-01-01T00:00:00")
+
+        assert returned_value[0]["status"] == eboa_engine.exit_codes["OK"]["status"]
+
+        events = [
+            {"start": "2018-07-21T09:50:51.776833",
+             "stop": "2018-07-21T09:50:51.776833"},
+            {"start": "2018-07-21T10:00:00",
+             "stop": "2018-07-21T10:05:00"},
+            {"start": "2018-07-21T11:10:51.776833",
+             "stop": "2018-07-21T12:20:51.776833"},
+            {"start": "2018-07-21T08:50:51.776833",
+             "stop": "2018-07-21T09:50:51.776833"}
+        ]
+
+        events_with_footprint_per_event = []
+        for event in events:
+            events_with_footprint_per_event += s2boa_functions.associate_footprints([event.copy()], "S2A")
+        # end for
+        events_with_footprint_per_event.sort(key=lambda x:x["start"])
+
+        events_with_footprint = s2boa_functions.associate_footprints([event.copy() for event in events], "S2A")
+
+        assert events_with_footprint == events_with_footprint_per_event
+
+    def test_get_linking_events_per_event(self):
+
+        data = {"operations": [{
+            "mode": "insert",
+            "dim_signature": {"name": "PROCESSING_S2A",
+                              "exec": "exec",
+                              "version": "1.0"},
+            "source": {"name": "source.xml",
+                       "reception_time": "2018-07-21T10:00:00",
+                       "generation_time": "2018-07-21T10:00:00",
+                       "validity_start": "2018-07-21T08:00:00",
+                       "validity_stop": "2018-07-21T09:00:00"},
+            "events": [{"link_ref": "PROCESSING_VALIDITY_1",
+                        "gauge": {"name": "PROCESSING_VALIDITY", "system": "S2A", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": "2018-07-21T08:00:00",
+                        "stop": "2018-07-21T08:10:00"},
+                       {"link_ref": "PROCESSING_VALIDITY_2",
+                        "gauge": {"name": "PROCESSING_VALIDITY", "system": "S2A", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": "2018-07-21T08:20:00",
+                        "stop": "2018-07-21T08:30:00"},
+                       {"gauge": {"name": "PROCESSING_GAP", "system": "S2A", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": "2018-07-21T08:01:00",
+                        "stop": "2018-07-21T08:02:00",
+                        "links": [{"link": "PROCESSING_VALIDITY_1", "link_mode": "by_ref", "name": "PROCESSING_GAP"}]},
+                       {"gauge": {"name": "ISP_VALIDITY", "system": "S2A", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": "2018-07-21T08:00:00",
+                        "stop": "2018-07-21T08:30:00",
+                        "links": [{"link": "PROCESSING_VALIDITY_1", "link_mode": "by_ref", "name": "ISP_VALIDITY"},
+                                  {"link": "PROCESSING_VALIDITY_2", "link_mode": "by_ref", "name": "ISP_VALIDITY"}]},
+                       {"gauge": {"name": "OTHER", "system": "S2A", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": "2018-07-21T08:20:00",
+                        "stop": "2018-07-21T08:30:00",
+                        "links": [{"link": "PROCESSING_VALIDITY_2", "link_mode": "by_ref", "name": "OTHER"}]}]
+        }]}
+
+        returned_value = self.engine_eboa.treat_data(data)
+
+        assert returned_value[0]["status"] == eboa_engine.exit_codes["OK"]["status"]
+
+        processing_validities = self.query_eboa.get_events(gauge_names = {"filter": "PROCESSING_VALIDITY", "op": "=="})
+        processing_validities.sort(key=lambda x:x.start)
+        processing_validity_uuids = [processing_validity.event_uuid for processing_validity in processing_validities]
+
+        linking_events_per_event = s2boa_functions.get_linking_events_per_event(self.query_eboa, processing_validity_uuids, ["PROCESSING_GAP", "PLANNED_IMAGING", "ISP_VALIDITY"])
+
+        for processing_validity_uuid in processing_validity_uuids:
+            expected_linking_events = self.query_eboa.get_linking_events(event_uuids = {"filter": [processing_validity_uuid], "op": "in"},
+                                                                         link_names = {"filter": ["PROCESSING_GAP", "PLANNED_IMAGING", "ISP_VALIDITY"], "op": "in"})["linking_events"]
+
+            assert set([event.event_uuid for event in linking_events_per_event[processing_validity_uuid]]) == set([event.event_uuid for event in expected_linking_events])
+        # end for
+
+        assert sorted([event.gauge.name for event in linking_events_per_event[processing_validity_uuids[0]]]) == ["ISP_VALIDITY", "PROCESSING_GAP"]
+        assert [event.gauge.name for event in linking_events_per_event[processing_validity_uuids[1]]] == ["ISP_VALIDITY"]
+
+        assert s2boa_functions.get_linking_events_per_event(self.query_eboa, [], ["ISP_VALIDITY"]) == {}
+
+    def test_processing_gaps_with_several_isp_gaps_per_detector(self):
+
+        # Two gaps during the reception of the detector 1 inside the same datablock
+        data = {"operations": [{
+            "mode": "insert",
+            "dim_signature": {"name": "RECEPTION_S2A",
+                              "exec": "exec",
+                              "version": "1.0"},
+            "source": {"name": "source.xml",
+                       "reception_time": "2018-07-21T10:00:00",
+                       "generation_time": "2018-07-21T10:00:00",
+                       "validity_start": "2018-07-21T08:00:00",
+                       "validity_stop": "2018-07-21T09:00:00"},
+            "events": [{"gauge": {"name": "ISP_GAP", "system": "SGS_", "insertion_type": "SIMPLE_UPDATE"},
+                        "start": start,
+                        "stop": stop,
+                        "values": [{"name": "satellite", "type": "text", "value": "S2A"},
+                                   {"name": "detector", "type": "double", "value": "1"}]}
+                       for (start, stop) in [("2018-07-21T08:01:00", "2018-07-21T08:01:10"),
+                                             ("2018-07-21T08:03:00", "2018-07-21T08:03:10")]]
+        }]}
+
+        returned_value = self.engine_eboa.treat_data(data)
+
+        assert returned_value[0]["status"] == eboa_engine.exit_codes["OK"]["status"]
+
+        # The detector 1 misses the granules between the ISP gaps, the detector 2 is complete
+        granule_timeline_per_detector = {
+            "1": [{"id": "GR_1", "start": parser.parse("2018-07-21T08:00:00"), "stop": parser.parse("2018-07-21T08:01:05")},
+                  {"id": "GR_2", "start": parser.parse("2018-07-21T08:03:05"), "stop": parser.parse("2018-07-21T08:10:00")}],
+            "2": [{"id": "GR_3", "start": parser.parse("2018-07-21T08:00:00"), "stop": parser.parse("2018-07-21T08:10:00")}]
+        }
+        granule_timeline = [granule for detector in granule_timeline_per_detector for granule in granule_timeline_per_detector[detector]]
+
+        list_of_events = []
+        s2boa_functions.L0_L1A_L1B_processing({}, self.engine_eboa, self.query_eboa, granule_timeline, list_of_events,
+                                              "S2A_OPER_MSI_L0__DS_MPS__20180721T103920_S20180721T080000_N02.06",
+                                              granule_timeline_per_detector, [], "MPS_", "02.06", "ingestion_dpc.py", "S2A")
+
+        processing_gaps = sorted([(event["start"], event["stop"], [value["value"] for value in event["values"] if value["name"] == "source"][0])
+                                  for event in list_of_events if event["gauge"]["name"] == "PROCESSING_GAP"])
+
+        # Both ISP gaps are taken into account to classify the processing gap of the detector 1
+        assert processing_gaps == [("2018-07-21T08:01:05", "2018-07-21T08:01:10", "reception"),
+                                   ("2018-07-21T08:01:10", "2018-07-21T08:03:00", "processing"),
+                                   ("2018-07-21T08:03:00", "2018-07-21T08:03:05", "reception")]
+
+    def test_apid_table(self):
+
+        apid_numbers = s2boa_functions.get_apid_numbers()
+
+        assert len(apid_numbers) == 156
+        assert apid_numbers[:13] == list(range(13))
+        assert apid_numbers[-13:] == list(range(336, 349))
+
+        # The APIDs are received as text from the XML files
+        assert s2boa_functions.get_band_detector("0") == {"detector": "12", "band": "1"}
+        assert s2boa_functions.get_band_detector(8) == {"detector": "12", "band": "8a"}
+        assert s2boa_functions.get_band_detector("92") == {"detector": "7", "band": "12"}
+        assert s2boa_functions.get_band_detector("258") == {"detector": "6", "band": "3"}
+        assert s2boa_functions.get_band_detector("345") == {"detector": "1", "band": "9"}
+
+        assert s2boa_functions.get_counter_threshold_from_apid("0") == 23
+        assert s2boa_functions.get_counter_threshold_from_apid("258") == 143
+        assert s2boa_functions.get_counter_threshold_from_apid(8) == 71
+
+        # APIDs out of the table are computed
+        assert s2boa_functions.get_band_detector("2047") == {"detector": "-105", "band": "15"}
+        assert s2boa_functions.get_counter_threshold_from_apid("2047") == 71
+
+        assert s2boa_functions.get_vcid_mode("21") == "NRT"
+        assert s2boa_functions.get_vcid_apid_configuration("4") == {"min_apid": 0, "max_apid": 92}
+        assert s2boa_functions.get_vcid_apid_configuration("22") == {"min_apid": 256, "max_apid": 348}
+
+    def test_dates_to_mjd2000(self):
+
+        # Import astropy for checking the conversion
+        from astropy.time import Time
+
+        dates = ["2000-01-01T00:00:00", "1999-12-31T23:59:59.999999", "2018-07-21T08:52:29.993268",
+                 "2015-06-30T18:00:00", "2016-12-31T12:00:00", "2016-12-31T23:59:59.999999", "2017-01-01T00:00:00",
+                 "2030-02-28T23:00:00.5"]
+
+        mjd2000_dates = date_functions.dates_to_mjd2000(dates)
+
+        t0 = Time("2000-01-01T00:00:00", format='isot', scale='utc')
+        for (date, mjd2000_date) in zip(dates, mjd2000_dates.tolist()):
+            assert abs(mjd2000_date - (Time(date, format='isot', scale='utc').mjd - t0.mjd)) * 86400 < 1e-6
+        # end for
+
+        assert mjd2000_dates[0] == 0
+        assert len(date_functions.dates_to_mjd2000([])) == 0
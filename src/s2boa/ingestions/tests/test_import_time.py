@@ -0,0 +1,49 @@
+"""
+Automated tests for the time spent importing the helpers of the S2BOA submodule and the S2VBOA application
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+import subprocess
+import sys
+import time
+
+# Maximum wall time of the cold import of the helpers (seconds)
+IMPORT_TIME_CEILING = 1
+
+class TestImportTime(unittest.TestCase):
+
+    def import_module(self, module, loaded_module = "astropy.time"):
+        start = time.perf_counter()
+        completed_process = subprocess.run([sys.executable, "-c", "import sys; import " + module + "; print('" + loaded_module + "' in sys.modules)"], stdout = subprocess.PIPE, universal_newlines = True)
+        wall_time = time.perf_counter() - start
+
+        assert completed_process.returncode == 0
+
+        return (wall_time, completed_process.stdout.strip())
+
+    def test_import_functions(self):
+
+        (wall_time, astropy_loaded) = self.import_module("s2boa.ingestions.functions")
+
+        # astropy is not required by the helpers
+        assert astropy_loaded == "False"
+        assert wall_time < IMPORT_TIME_CEILING
+
+    def test_import_ingestion_module(self):
+
+        (wall_time, astropy_loaded) = self.import_module("s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition")
+
+        assert astropy_loaded == "False"
+        assert wall_time < IMPORT_TIME_CEILING
+
+    def test_import_s2vboa(self):
+
+        (wall_time, views_loaded) = self.import_module("s2vboa", "s2vboa.views.acquisition")
+
+        # The views are imported when the application is created
+        assert views_loaded == "False"
+        assert wall_time < IMPORT_TIME_CEILING
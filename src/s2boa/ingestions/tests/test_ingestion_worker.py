@@ -0,0 +1,75 @@
+"""
+Automated tests for the persistent ingestion worker of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import unittest
+import tempfile
+import threading
+import time
+
+# Import engine of the DDBB
+import eboa.engine.engine as eboa_engine
+from eboa.engine.engine import Engine
+from eboa.engine.query import Query
+
+# Import ingestion worker
+import s2boa.ingestions.ingestion_worker as ingestion_worker
+
+STATION_ACQUISITION_REPORT_PROCESSOR = "s2boa.ingestions.ingestion_station_acquisition_report.ingestion_station_acquisition_report"
+STATION_ACQUISITION_REPORT_INPUTS = os.path.dirname(os.path.abspath(__file__)) + "/../ingestion_station_acquisition_report/tests/inputs/"
+
+class TestIngestionWorker(unittest.TestCase):
+    def setUp(self):
+        # Create the engine to manage the data
+        self.engine_eboa = Engine()
+        self.query_eboa = Query()
+
+        # Clear all tables before executing the test
+        self.query_eboa.clear_db()
+
+    def tearDown(self):
+        # Close connections to the DDBB
+        self.engine_eboa.close_session()
+        self.query_eboa.close_session()
+
+    def test_preload_ingestion_modules(self):
+
+        modules = ingestion_worker.preload_ingestion_modules()
+
+        assert "s2boa.ingestions.ingestion_nppf.ingestion_nppf" in modules
+        assert "s2boa.ingestions.ingestion_nppf.ingestion_nppf_tgz" in modules
+        assert STATION_ACQUISITION_REPORT_PROCESSOR in modules
+        assert len([module for module in modules if ".tests." in module]) == 0
+
+    def test_ingest_through_socket(self):
+
+        worker = ingestion_worker.IngestionWorker()
+        socket_path = tempfile.gettempdir() + "/s2boa_ingestion_worker_test.sock"
+        thread = threading.Thread(target = ingestion_worker.serve, args = (socket_path, worker), daemon = True)
+        thread.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        # end while
+
+        # Several files are ingested by the same process
+        for filename in ["REPORT_CONTAINING_ALL_DATA_TO_BE_PROCESS.EOF", "REPORT_WITH_NOK_CHARATERIZED_STATUS.EOF"]:
+            result = ingestion_worker.submit(socket_path, STATION_ACQUISITION_REPORT_INPUTS + filename, STATION_ACQUISITION_REPORT_PROCESSOR)
+
+            assert result["error"] == None
+            assert result["statuses"][0] == eboa_engine.exit_codes["OK"]["status"]
+        # end for
+
+        sources = self.query_eboa.get_sources()
+
+        assert len([source for source in sources if source.processor == "ingestion_station_acquisition_report.py"]) == 2
+        assert worker.ingested_files == 2
+
+        # The files without ingestion are rejected
+        result = ingestion_worker.submit(socket_path, STATION_ACQUISITION_REPORT_INPUTS + "FILE_WITH_LINKS.EOF")
+
+        assert result["error"] == "No ingestion is configured for the file"
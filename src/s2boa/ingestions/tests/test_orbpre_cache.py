@@ -0,0 +1,102 @@
+"""
+Automated tests for the cache of orbit predictions of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import unittest
+import datetime
+
+# Import orbit helpers
+import s2boa.ingestions.orbit as orbit_functions
+import s2boa.ingestions.orbpre_cache as orbpre_cache_functions
+
+class TestOrbpreCache(unittest.TestCase):
+    def setUp(self):
+        self.osvs = [("2018-07-21T09:51:28.776833", "2018-07-21T09:50:51.776833", "2018-07-21T09:50:51.802400", "16076",
+                      "-7100511.606", "-1198306.408", "0.023", "-276.063175", "1629.749795", "7358.720211", "0"),
+                     ("2018-07-21T11:32:01.216133", "2018-07-21T11:31:24.216133", "2018-07-21T11:31:24.241700", "16077",
+                      "-7047587.463", "1626432.193", "0.023", "374.689373", "1617.927616", "7358.722049", "0")]
+
+    def build_orbit_prediction(self, satellite, start, stop):
+        return orbpre_cache_functions.OrbitPrediction(satellite, datetime.datetime.fromisoformat(start), datetime.datetime.fromisoformat(stop), self.osvs)
+
+    def test_orbit_prediction_materialization(self):
+
+        orbit_prediction = self.build_orbit_prediction("S2A", "2018-07-21T06:30:00", "2018-07-21T14:50:00")
+
+        assert orbit_prediction.orbit_range == (16076, 16077)
+
+        orbpre_file_path = orbit_prediction.get_orbpre_file_path()
+        assert orbit_prediction.get_orbpre_file_path() == orbpre_file_path
+
+        osvs = orbit_functions.read_orbpre_file(orbpre_file_path)
+        osv_arrays = orbit_prediction.get_osv_arrays()
+        for field in ["utc", "orbit", "position", "velocity"]:
+            assert (osvs[field] == osv_arrays[field]).all()
+        # end for
+
+        orbit_prediction.remove_files()
+        assert not os.path.isfile(orbpre_file_path)
+
+    def test_cache_covering_window(self):
+
+        orbpre_cache = orbpre_cache_functions.OrbpreCache(2)
+        orbit_prediction = self.build_orbit_prediction("S2A", "2018-07-21T06:30:00", "2018-07-21T14:50:00")
+        orbpre_cache.put(orbit_prediction)
+        orbpre_cache.release(orbit_prediction)
+
+        assert orbpre_cache.get("S2A", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14)) is orbit_prediction
+        orbpre_cache.release(orbit_prediction)
+        assert orbpre_cache.get("S2B", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14)) == None
+        assert orbpre_cache.get("S2A", datetime.datetime(2018, 7, 21, 6), datetime.datetime(2018, 7, 21, 14)) == None
+
+    def test_cache_eviction(self):
+
+        orbpre_cache = orbpre_cache_functions.OrbpreCache(2)
+        orbit_predictions = [self.build_orbit_prediction("S2A", "2018-07-21T06:30:00", "2018-07-21T14:50:00"),
+                             self.build_orbit_prediction("S2B", "2018-07-21T06:30:00", "2018-07-21T14:50:00"),
+                             self.build_orbit_prediction("S2A", "2018-07-22T06:30:00", "2018-07-22T14:50:00")]
+
+        for orbit_prediction in orbit_predictions[0:2]:
+            orbpre_cache.put(orbit_prediction)
+            orbit_prediction.get_orbpre_file_path()
+            orbpre_cache.release(orbit_prediction)
+        # end for
+
+        # The first orbit prediction is the most recently used
+        orbpre_cache.get("S2A", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14))
+        orbpre_cache.release(orbit_predictions[0])
+
+        # The second orbit prediction is in use when evicted
+        orbpre_cache.get("S2B", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14))
+        orbpre_cache.get("S2A", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14))
+        orbpre_cache.release(orbit_predictions[0])
+        orbpre_file_path = orbit_predictions[1].orbpre_file_path
+
+        orbpre_cache.put(orbit_predictions[2])
+        orbpre_cache.release(orbit_predictions[2])
+
+        assert len(orbpre_cache) == 2
+        assert orbpre_cache.get("S2B", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14)) == None
+        assert os.path.isfile(orbpre_file_path)
+
+        orbpre_cache.release(orbit_predictions[1])
+        assert not os.path.isfile(orbpre_file_path)
+
+    def test_cache_invalidation(self):
+
+        orbpre_cache = orbpre_cache_functions.OrbpreCache(4)
+        for satellite in ["S2A", "S2B"]:
+            orbit_prediction = self.build_orbit_prediction(satellite, "2018-07-21T06:30:00", "2018-07-21T14:50:00")
+            orbpre_cache.put(orbit_prediction)
+            orbpre_cache.release(orbit_prediction)
+        # end for
+
+        orbpre_cache.invalidate("S2A")
+
+        assert len(orbpre_cache) == 1
+        assert orbpre_cache.get("S2A", datetime.datetime(2018, 7, 21, 7), datetime.datetime(2018, 7, 21, 14)) == None
@@ -0,0 +1,137 @@
+"""
+Automated tests for the queue of pending ingestions of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Import pending ingestions helpers
+import s2boa.ingestions.pending_ingestions as pending_ingestions
+
+# Import ingestion module
+import s2boa.ingestions.ingestion_deferred.ingestion_deferred as ingestion_deferred
+
+class TestPendingIngestions(unittest.TestCase):
+    def setUp(self):
+        self.sensing_identifier = "S99991231T235959"
+        self.parameters = {
+            "source": {"name": "S2A_OPER_REP_OPDPC_L1C.EOF",
+                       "reception_time": "2018-07-21T10:00:00",
+                       "generation_time": "2018-07-21T09:00:00",
+                       "validity_start": "2018-07-21T08:00:00",
+                       "validity_stop": "2018-07-21T09:00:00"},
+            "datastrip": "S2A_OPER_MSI_L1C_DS_MPS__20180721T100000_" + self.sensing_identifier + "_N02.06",
+            "system": "MPS_",
+            "version": "1.0"
+        }
+        # The queue of pending ingestions is kept in a temporary directory
+        self.pending_ingestions_path = tempfile.mkdtemp()
+        self.conf_patcher = mock.patch.object(pending_ingestions.functions, "get_s2boa_conf", return_value = {"PENDING_INGESTIONS": {"PATH": self.pending_ingestions_path}})
+        self.conf_patcher.start()
+
+    def tearDown(self):
+        self.conf_patcher.stop()
+        shutil.rmtree(self.pending_ingestions_path)
+        pending_ingestions.sensing_identifiers_to_resume.clear()
+
+    def test_park(self):
+
+        entry_path = pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_dpc.py", self.parameters)
+
+        assert os.path.isfile(entry_path)
+        assert ("S2A", self.sensing_identifier) in pending_ingestions.sensing_identifiers_to_resume
+
+        pending = pending_ingestions.get_pending_ingestions("S2A", self.sensing_identifier)
+        assert len(pending) == 1
+        assert pending[0][0] == entry_path
+        assert pending[0][1]["processor"] == "ingestion_dpc.py"
+        assert pending[0][1]["parameters"] == self.parameters
+
+        assert len(pending_ingestions.get_pending_ingestions("S2B", self.sensing_identifier)) == 0
+
+    def test_park_records_parked_state(self):
+
+        list_of_annotations = []
+        pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_dpc.py", self.parameters, list_of_annotations)
+
+        assert len(list_of_annotations) == 1
+        assert list_of_annotations[0]["explicit_reference"] == self.parameters["datastrip"]
+        assert list_of_annotations[0]["annotation_cnf"] == {"name": "PENDING_INGESTION", "system": "S2A"}
+        assert {value["name"]: value["value"] for value in list_of_annotations[0]["values"]} == {
+            "status": "PARKED",
+            "sensing_identifier": self.sensing_identifier,
+            "processor": "ingestion_dpc.py",
+            "satellite": "S2A"
+        }
+
+    def test_default_path_is_persistent(self):
+
+        with mock.patch.object(pending_ingestions.functions, "get_s2boa_conf", return_value = {}), mock.patch.object(pending_ingestions.os, "makedirs") as makedirs:
+            pending_ingestions_path = pending_ingestions.get_pending_ingestions_path()
+        # end with
+
+        assert pending_ingestions_path == pending_ingestions.get_resources_path() + "/pending_ingestions"
+        makedirs.assert_called_once_with(pending_ingestions_path, exist_ok = True)
+
+    def test_claimed_entries_are_not_pending(self):
+
+        entry_path = pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_rep_arc.py", self.parameters)
+        resumed_entry_path = entry_path.replace(".json", ".resumed")
+        os.rename(entry_path, resumed_entry_path)
+
+        assert len(pending_ingestions.get_pending_ingestions("S2A", self.sensing_identifier)) == 0
+
+        os.remove(resumed_entry_path)
+
+    def test_failed_launch(self):
+
+        entry_path = pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_dpc.py", self.parameters)
+
+        with mock.patch.object(pending_ingestions, "Query"), \
+             mock.patch.object(pending_ingestions.functions, "get_upper_level_datastrip", return_value = "S2A_OPER_MSI_L0__DS"), \
+             mock.patch.object(pending_ingestions.subprocess, "Popen", side_effect = FileNotFoundError("eboa_ingestion.py")):
+            pending_ingestions.resume_pending_ingestions()
+        # end with
+
+        # The entry is put back in the queue
+        assert [pending_entry_path for (pending_entry_path, entry) in pending_ingestions.get_pending_ingestions("S2A", self.sensing_identifier)] == [entry_path]
+
+    def test_stale_claimed_entries(self):
+
+        entry_path = pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_dpc.py", self.parameters)
+        resumed_entry_path = entry_path.replace(".json", ".resumed")
+        os.rename(entry_path, resumed_entry_path)
+
+        # The claimed entry is not pending till the timeout expires
+        assert pending_ingestions.release_stale_entries(timeout = 3600) == []
+        assert os.path.isfile(resumed_entry_path)
+
+        claim_time = time.time() - 7200
+        os.utime(resumed_entry_path, (claim_time, claim_time))
+
+        pending = pending_ingestions.get_pending_ingestions("S2A", self.sensing_identifier)
+        assert [pending_entry_path for (pending_entry_path, entry) in pending] == [entry_path]
+        assert not os.path.exists(resumed_entry_path)
+
+    def test_failed_deferred_ingestion(self):
+
+        entry_path = pending_ingestions.park("S2A", self.sensing_identifier, "ingestion_dpc.py", self.parameters)
+        resumed_entry_path = entry_path.replace(".json", ".resumed")
+        os.rename(entry_path, resumed_entry_path)
+
+        with mock.patch.object(ingestion_deferred, "process_entry", side_effect = Exception("The DDBB is not available")):
+            with self.assertRaises(Exception):
+                ingestion_deferred.process_file(resumed_entry_path, None, None, "2018-07-21T10:00:00")
+            # end with
+        # end with
+
+        # The entry is put back in the queue
+        assert [pending_entry_path for (pending_entry_path, entry) in pending_ingestions.get_pending_ingestions("S2A", self.sensing_identifier)] == [entry_path]
@@ -0,0 +1,137 @@
+"""
+Automated tests for the profiling of the ingestions of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Import xml parser
+from lxml import etree
+
+# Import profiling helpers
+import s2boa.ingestions.profiling as profiling_functions
+
+# Import helpers
+import s2boa.ingestions.functions as functions
+
+# Import xpath helpers
+import s2boa.ingestions.xpath_functions as xpath_functions
+
+@profiling_functions.stage
+def _read_names(xpath_xml):
+    time.sleep(0.05)
+    return [name.text for name in xpath_xml("/files/file/name")]
+
+@profiling_functions.stage
+def _count_files(xpath_xml):
+    return (len(_read_names(xpath_xml)), xpath_xml("count(/files/file)"))
+
+@profiling_functions.profile_ingestion
+def process_file(file_path, engine, query, reception_time):
+    return _count_files(xpath_functions.XPathEvaluator(etree.fromstring("<files><file><name>A</name></file><file><name>B</name></file></files>").getroottree()))
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.profile = profiling_functions.Profile("s2boa.ingestions.ingestion_test.ingestion_test", "/inputs/FILE.xml")
+        profiling_functions.active_profiles.profile = self.profile
+        self.profiles_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        profiling_functions.active_profiles.profile = None
+        shutil.rmtree(self.profiles_path)
+
+    def test_stages(self):
+
+        assert process_file("/inputs/FILE.xml", None, None, None) == (2, 2.0)
+        profiling_functions.mark_progress(50)
+        profiling_functions.install_hooks()
+        subprocess.run([sys.executable, "-c", "pass"])
+        profiling_functions.mark_progress(100)
+        self.profile.finish()
+
+        profile = self.profile.to_dict()
+
+        assert profile["file"] == "FILE.xml"
+        assert profile["processor"] == "s2boa.ingestions.ingestion_test.ingestion_test"
+        assert profile["xpath_evaluations"] == 2
+        assert profile["subprocesses"] == 1
+        assert profile["error"] == None
+
+        # The ingestion module called with a profile in the thread is registered as a stage
+        # and the values of the nested stages are included in the enclosing ones
+        stages = {stage["name"]: stage for stage in profile["stages"]}
+        assert list(stages) == ["_read_names", "_count_files", "process_file"]
+        assert [stages[name]["xpath_evaluations"] for name in stages] == [1, 2, 2]
+        assert [stages[name]["calls"] for name in stages] == [1, 1, 1]
+        assert stages["_read_names"]["duration"] >= 0.05
+        assert stages["process_file"]["duration"] >= stages["_count_files"]["duration"] >= stages["_read_names"]["duration"]
+
+        assert [(period["from"], period["to"], period["xpath_evaluations"], period["subprocesses"]) for period in profile["progress"]] == [(None, 50, 2, 0), (50, 100, 0, 1)]
+
+    def test_write_and_summarize_profiles(self):
+
+        process_file("/inputs/FILE.xml", None, None, None)
+        profiling_functions.mark_progress(100)
+        self.profile.finish()
+
+        profile_path = profiling_functions.write_profile(self.profile, self.profiles_path)
+        with open(profile_path) as profile_file:
+            profile = json.load(profile_file)
+        # end with
+        assert profile == json.loads(json.dumps(self.profile.to_dict()))
+
+        summary = profiling_functions.summarize_profiles([profile, profile])
+
+        assert list(summary) == ["s2boa.ingestions.ingestion_test.ingestion_test"]
+        processor = summary["s2boa.ingestions.ingestion_test.ingestion_test"]
+        assert processor["files"] == 2
+        assert processor["xpath_evaluations"] == 2
+        assert sorted(processor["stages"]) == ["_count_files", "_read_names", "process_file", "progress 0-100%"]
+        assert processor["stages"]["_read_names"]["calls"] == 1
+        assert processor["stages"]["progress 0-100%"]["xpath_evaluations"] == 2
+
+    def test_without_profile(self):
+
+        profiling_functions.active_profiles.profile = None
+
+        assert _count_files(xpath_functions.XPathEvaluator(etree.fromstring("<files/>").getroottree())) == (0, 0.0)
+        profiling_functions.count("queries")
+        profiling_functions.mark_progress(10)
+
+        assert self.profile.counters == dict.fromkeys(profiling_functions.COUNTERS, 0)
+        assert self.profile.stages == {}
+        assert self.profile.progress == []
+
+    def test_configuration_loaded_once(self):
+
+        s2boa_conf_path = self.profiles_path + "/s2boa.json"
+        with open(s2boa_conf_path, "w") as s2boa_conf_file:
+            json.dump({"PROFILING": {"ENABLED": False, "PATH": self.profiles_path}}, s2boa_conf_file)
+        # end with
+
+        with mock.patch.object(functions, "get_resources_path", return_value = self.profiles_path), mock.patch.object(json, "load", wraps = json.load) as load:
+            for i in range(5):
+                assert profiling_functions.get_profiling_conf() == (False, self.profiles_path)
+            # end for
+            assert load.call_count == 1
+
+            # The configuration is reloaded when the file changes
+            with open(s2boa_conf_path, "w") as s2boa_conf_file:
+                json.dump({"PROFILING": {"ENABLED": True, "PATH": self.profiles_path}}, s2boa_conf_file)
+            # end with
+            os.utime(s2boa_conf_path, (time.time() + 10, time.time() + 10))
+
+            assert profiling_functions.get_profiling_conf() == (True, self.profiles_path)
+            assert load.call_count == 2
+        # end with
@@ -0,0 +1,141 @@
+"""
+Automated tests for the reporting of the progress of the ingestions of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+import threading
+import time
+from unittest import mock
+
+# Import progress helpers
+import s2boa.ingestions.progress as progress_functions
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.writes = []
+        self.write_started = threading.Event()
+        self.write_delay = 0
+
+    def write(self, progresses):
+        self.write_started.set()
+        time.sleep(self.write_delay)
+        self.writes.append(progresses)
+
+    def test_coalesced_updates(self):
+
+        progress_reporter = progress_functions.ProgressReporter(write_interval = 60, write = self.write)
+
+        progress_reporter.report("SOURCE_1", 10)
+        assert self.write_started.wait(5)
+
+        # The updates received within the interval are coalesced
+        for progress in [30, 45, 70]:
+            progress_reporter.report("SOURCE_1", progress)
+            progress_reporter.report("SOURCE_2", progress)
+        # end for
+        time.sleep(0.2)
+        assert self.writes == [{"SOURCE_1": 10}]
+
+        # The completion is written without waiting for the end of the interval
+        progress_reporter.report("SOURCE_1", 100)
+        assert progress_reporter.flush(5)
+        assert self.writes == [{"SOURCE_1": 10}, {"SOURCE_1": 100, "SOURCE_2": 70}]
+
+        progress_reporter.stop(5)
+        assert not progress_reporter.thread.is_alive()
+
+    def test_report_does_not_wait_for_the_write(self):
+
+        self.write_delay = 0.5
+        progress_reporter = progress_functions.ProgressReporter(write = self.write)
+
+        start = time.perf_counter()
+        for progress in [10, 30, 45, 70, 80, 95, 100]:
+            progress_reporter.report("SOURCE_1", progress)
+        # end for
+        assert time.perf_counter() - start < 0.25
+
+        progress_reporter.stop(5)
+        assert self.writes[-1] == {"SOURCE_1": 100}
+
+    def test_profile(self):
+
+        progress_reporter = progress_functions.ProgressReporter(write = self.write)
+
+        assert progress_reporter.get_profile("SOURCE_1") == None
+
+        progress_reporter.report("SOURCE_1", 10)
+        time.sleep(0.1)
+        progress_reporter.report("SOURCE_1", 45)
+
+        profile = progress_reporter.get_profile("SOURCE_1")
+        assert [(stage["from"], stage["to"]) for stage in profile] == [(10, 45)]
+        assert profile[0]["duration"] >= 0.1
+
+        progress_reporter.report("SOURCE_1", 100)
+
+        profile = progress_reporter.get_profile("SOURCE_1")
+        assert [(stage["from"], stage["to"]) for stage in profile] == [(10, 45), (45, 100)]
+        assert progress_reporter.stages == {}
+
+        progress_reporter.stop(5)
+
+    def test_failed_write(self):
+
+        def write(progresses):
+            self.writes.append(progresses)
+            if len(self.writes) == 1:
+                raise Exception("The DDBB is not available")
+            # end if
+        # end def
+
+        progress_reporter = progress_functions.ProgressReporter(write_interval = 0, write = write)
+
+        progress_reporter.report("SOURCE_1", 10)
+        assert progress_reporter.flush(5)
+        progress_reporter.report("SOURCE_1", 100)
+        assert progress_reporter.flush(5)
+
+        assert self.writes == [{"SOURCE_1": 10}, {"SOURCE_1": 100}]
+
+        progress_reporter.stop(5)
+
+    def test_failed_ingestion(self):
+
+        progress_reporter = progress_functions.ProgressReporter(write = self.write)
+
+        # Source being ingested by another thread
+        thread = threading.Thread(target = progress_reporter.report, args = ("SOURCE_2", 10))
+        thread.start()
+        thread.join()
+
+        # The ingestion of the source fails before its completion
+        progress_reporter.report("SOURCE_1", 10)
+        progress_reporter.report("SOURCE_1", 45)
+
+        assert progress_reporter.discard() == ["SOURCE_1"]
+        assert list(progress_reporter.stages) == ["SOURCE_2"]
+        assert progress_reporter.get_profile("SOURCE_1") == None
+
+        progress_reporter.stop(5)
+
+    def test_bounded_stages(self):
+
+        progress_reporter = progress_functions.ProgressReporter(write = self.write)
+
+        with mock.patch.object(progress_functions, "MAX_STAGES", 2):
+            for source in ["SOURCE_1", "SOURCE_2", "SOURCE_3"]:
+                progress_reporter.report(source, 10)
+            # end for
+            progress_reporter.report("SOURCE_2", 45)
+            progress_reporter.report("SOURCE_4", 10)
+        # end with
+
+        # The least recently updated sources are dropped
+        assert list(progress_reporter.stages) == ["SOURCE_2", "SOURCE_4"]
+
+        progress_reporter.stop(5)
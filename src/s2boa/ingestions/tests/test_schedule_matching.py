@@ -0,0 +1,99 @@
+"""
+Automated tests for the matching of the schedules with the planned playbacks of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+import datetime
+from types import SimpleNamespace
+
+# Import schedule matching helpers
+import s2boa.ingestions.schedule_matching as schedule_matching
+
+class QueryLinkedEvents():
+    """
+    Query returning the given prime and linked events and keeping the filters requested
+    """
+
+    def __init__(self, prime_events, linked_events):
+        self.prime_events = prime_events
+        self.linked_events = linked_events
+        self.requests = []
+
+    def get_linked_events(self, **filters):
+        self.requests.append(filters)
+        return {"prime_events": self.prime_events, "linked_events": self.linked_events}
+
+def planned_playback(uuid, correction_uuid):
+    return SimpleNamespace(event_uuid = uuid,
+                           eventLinks = [SimpleNamespace(name = "TIME_CORRECTION", event_uuid_link = correction_uuid)])
+
+def planned_playback_correction(uuid, playback_uuid, satellite, start, stop):
+    return SimpleNamespace(event_uuid = uuid,
+                           start = datetime.datetime.fromisoformat(start),
+                           stop = datetime.datetime.fromisoformat(stop),
+                           gauge = SimpleNamespace(system = satellite),
+                           eventLinks = [SimpleNamespace(name = "TIME_CORRECTION", event_uuid_link = playback_uuid)])
+
+class TestScheduleMatching(unittest.TestCase):
+
+    def setUp(self):
+        self.playbacks = [planned_playback("PLAYBACK_1", "CORRECTION_1"),
+                          planned_playback("PLAYBACK_2", "CORRECTION_2"),
+                          planned_playback("PLAYBACK_3", "CORRECTION_3")]
+        self.corrections = [planned_playback_correction("CORRECTION_2", "PLAYBACK_2", "S2A", "2018-07-21T12:10:00", "2018-07-21T12:20:00"),
+                            planned_playback_correction("CORRECTION_1", "PLAYBACK_1", "S2A", "2018-07-21T10:35:32.524661", "2018-07-21T10:37:08.530863"),
+                            planned_playback_correction("CORRECTION_3", "PLAYBACK_3", "S2B", "2018-07-21T10:36:00", "2018-07-21T10:37:00")]
+
+    def test_match(self):
+
+        query = QueryLinkedEvents(self.corrections, self.playbacks)
+
+        planned_playbacks = schedule_matching.PlannedPlaybacks(query, [("S2A", "2018-07-21T10:33:30.609", "2018-07-21T10:37:39.611"),
+                                                                       ("S2A", "2018-07-21T12:00:00", "2018-07-21T12:30:00"),
+                                                                       ("S2B", "2018-07-21T10:30:00", "2018-07-21T10:40:00")])
+
+        # One query for all the entries
+        assert len(query.requests) == 1
+        assert sorted(query.requests[0]["gauge_systems"]["filter"]) == ["S2A", "S2B"]
+        assert query.requests[0]["start_filters"] == [{"date": "2018-07-21T10:30:00", "op": ">"}]
+        assert query.requests[0]["stop_filters"] == [{"date": "2018-07-21T12:30:00", "op": "<"}]
+
+        assert planned_playbacks.match("S2A", "2018-07-21T10:33:30.609", "2018-07-21T10:37:39.611") == [self.playbacks[0]]
+        assert planned_playbacks.match("S2A", "2018-07-21T12:00:00", "2018-07-21T12:30:00") == [self.playbacks[1]]
+        assert planned_playbacks.match("S2B", "2018-07-21T10:30:00", "2018-07-21T10:40:00") == [self.playbacks[2]]
+        assert planned_playbacks.match("S2A", "2018-07-21T10:30:00", "2018-07-21T12:30:00") == [self.playbacks[0], self.playbacks[1]]
+
+        # The limits are exclusive
+        assert planned_playbacks.match("S2A", "2018-07-21T10:35:32.524661", "2018-07-21T10:40:00") == []
+        assert planned_playbacks.match("S2A", "2018-07-21T10:30:00", "2018-07-21T10:37:08.530863") == []
+
+    def test_match_without_entries(self):
+
+        query = QueryLinkedEvents(self.corrections, self.playbacks)
+
+        planned_playbacks = schedule_matching.PlannedPlaybacks(query, [])
+
+        assert len(query.requests) == 0
+        assert planned_playbacks.match("S2A", "2018-07-21T10:30:00", "2018-07-21T12:30:00") == []
+
+    def test_insert_playback_values(self):
+
+        inserted_values = []
+        engine = SimpleNamespace(insert_event_values = lambda event_uuid, value: inserted_values.append((event_uuid, value["name"])))
+
+        value = {"name": "station_schedule", "type": "object", "values": [{"name": "station", "type": "text", "value": "MPS_"}]}
+        playback_values = {}
+        schedule_matching.add_playback_value(playback_values, self.playbacks[0], value)
+        # A playback matched twice receives the value once
+        schedule_matching.add_playback_value(playback_values, self.playbacks[0], value)
+        schedule_matching.add_playback_value(playback_values, self.playbacks[1], value)
+
+        schedule_matching.insert_playback_values(engine, playback_values)
+
+        assert inserted_values == [("PLAYBACK_1", "station_schedule"), ("CORRECTION_1", "station_schedule"),
+                                   ("PLAYBACK_2", "station_schedule"), ("CORRECTION_2", "station_schedule")]
+        assert playback_values == {}
@@ -0,0 +1,87 @@
+"""
+Automated tests for the operations on timelines of the S2BOA submodule
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import unittest
+import datetime
+
+# Import timeline helpers
+import s2boa.ingestions.timeline as timeline_functions
+
+def date(seconds):
+    return datetime.datetime(2018, 7, 21, 8, 52, 30) + datetime.timedelta(seconds=seconds)
+
+def segment(id, start, stop):
+    return {"id": id, "start": date(start), "stop": date(stop)}
+
+class TestTimeline(unittest.TestCase):
+
+    def test_merge_timeline(self):
+
+        timeline = [segment("GR_3", 20, 25), segment("GR_1", 0, 5), segment("GR_2", 3.608, 8.608), segment("GR_4", 25, 30), segment("GR_5", 26, 27)]
+
+        assert timeline_functions.merge_timeline(timeline) == [
+            {"id": ["GR_1", "GR_2"], "start": date(0), "stop": date(8.608)},
+            {"id": ["GR_3", "GR_4", "GR_5"], "start": date(20), "stop": date(30)}
+        ]
+        assert timeline_functions.merge_timeline([]) == []
+
+    def test_intersect_timelines(self):
+
+        timeline1 = [segment("DATABLOCK_2", 30, 40), segment("DATABLOCK_1", 0, 20)]
+        timeline2 = [segment("GAP_1", 5, 10), segment("GAP_2", 15, 35), segment("GAP_3", 20, 30), segment("GAP_4", 50, 60)]
+
+        assert timeline_functions.intersect_timelines(timeline1, timeline2) == [
+            {"id1": "DATABLOCK_1", "id2": "GAP_1", "start": date(5), "stop": date(10)},
+            {"id1": "DATABLOCK_1", "id2": "GAP_2", "start": date(15), "stop": date(20)},
+            {"id1": "DATABLOCK_2", "id2": "GAP_2", "start": date(30), "stop": date(35)}
+        ]
+        assert timeline_functions.intersect_timelines(timeline1, []) == []
+
+    def test_difference_timelines(self):
+
+        timeline1 = [segment("covered_sensing", 0, 40)]
+        timeline2 = [segment("GAP_1", 5, 10), segment("GAP_2", 8, 15), segment("GAP_3", 35, 45)]
+
+        # Parts of timeline1 not covered by timeline2 followed by the parts of timeline2 not covered by timeline1
+        assert timeline_functions.difference_timelines(timeline1, timeline2) == [
+            {"id": "covered_sensing", "start": date(0), "stop": date(5)},
+            {"id": "covered_sensing", "start": date(15), "stop": date(35)},
+            {"id": "GAP_3", "start": date(40), "stop": date(45)}
+        ]
+        assert timeline_functions.difference_timelines(timeline1, []) == [segment("covered_sensing", 0, 40)]
+
+    def test_operations_per_key(self):
+
+        granules_per_detector = {
+            "01": [segment("GR_01_1", 0, 5), segment("GR_01_2", 3.608, 8.608)],
+            "02": [segment("GR_02_1", 0, 5), segment("GR_02_2", 7.216, 12.216)],
+            "03": []
+        }
+        datablocks_per_detector = timeline_functions.merge_timelines_per_key(granules_per_detector)
+
+        assert datablocks_per_detector == {
+            "01": [{"id": ["GR_01_1", "GR_01_2"], "start": date(0), "stop": date(8.608)}],
+            "02": [{"id": ["GR_02_1"], "start": date(0), "stop": date(5)}, {"id": ["GR_02_2"], "start": date(7.216), "stop": date(12.216)}],
+            "03": []
+        }
+
+        datablock_per_detector = {detector: [segment("DATABLOCK", 0, 12.216)] for detector in granules_per_detector}
+        intersected_per_detector = timeline_functions.intersect_timelines_per_key(datablock_per_detector, datablocks_per_detector)
+
+        assert intersected_per_detector == {
+            "01": [{"id1": "DATABLOCK", "id2": ["GR_01_1", "GR_01_2"], "start": date(0), "stop": date(8.608)}],
+            "02": [{"id1": "DATABLOCK", "id2": ["GR_02_1"], "start": date(0), "stop": date(5)}, {"id1": "DATABLOCK", "id2": ["GR_02_2"], "start": date(7.216), "stop": date(12.216)}],
+            "03": []
+        }
+
+        # The keys of the operations are resolved independently
+        assert timeline_functions.difference_timelines_per_key(intersected_per_detector, datablock_per_detector) == {
+            "01": [{"id": "DATABLOCK", "start": date(8.608), "stop": date(12.216)}],
+            "02": [{"id": "DATABLOCK", "start": date(5), "stop": date(7.216)}],
+            "03": [segment("DATABLOCK", 0, 12.216)]
+        }
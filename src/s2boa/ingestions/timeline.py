@@ -0,0 +1,311 @@
+"""
+Helper module for the operations on timelines used by the completeness analysis of Sentinel-2
+
+The timelines use the segment format of eboa.ingestion.functions ({"id": ..., "start": datetime, "stop": datetime})
+and the operations return the same structures:
+- merge: {"id": [ids of the merged segments], "start": ..., "stop": ...}
+- intersection: {"id1": id of the segment of the first timeline, "id2": id of the segment of the second timeline, "start": ..., "stop": ...}
+- difference: {"id": id of the segment the remaining part comes from, "start": ..., "stop": ...}
+
+The segments are converted into sorted arrays of microseconds, so that the operations are resolved with
+numpy instead of comparing the segments one by one. The operations per key (per APID, per detector...)
+are resolved at once for all the keys: the timelines of each key are shifted to a separate
+region of the time axis, so that segments of different keys never overlap nor touch
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2boa
+"""
+# Import python utilities
+import datetime
+import numpy
+
+EPOCH = numpy.datetime64("1970-01-01T00:00:00", "us")
+EPOCH_DATETIME = datetime.datetime(1970, 1, 1)
+
+# Separation between the regions of the time axis of consecutive keys
+KEY_SEPARATION = 2
+
+# Limit for the shifted values (int64)
+MAX_SHIFTED_VALUE = 2**62
+
+def _to_microseconds(dates):
+    """
+    Method to convert datetimes into microseconds since the epoch
+    (the arithmetic on the timedeltas is faster than the conversion of numpy for lists of datetimes)
+    """
+    microseconds = []
+    for date in dates:
+        delta = date - EPOCH_DATETIME
+        microseconds.append(delta.days * 86400000000 + delta.seconds * 1000000 + delta.microseconds)
+    # end for
+
+    return numpy.array(microseconds, dtype=numpy.int64)
+
+def _to_datetimes(microseconds):
+    return (microseconds.astype("timedelta64[us]") + EPOCH).astype(datetime.datetime).tolist()
+
+class _Timelines():
+    """
+    Segments of a set of timelines indexed by key
+    """
+
+    def __init__(self, timelines, keys):
+        self.segments = [segment for key in keys for segment in timelines.get(key, [])]
+        self.key_indexes = numpy.repeat(numpy.arange(len(keys), dtype=numpy.int64), [len(timelines.get(key, [])) for key in keys])
+        self.starts = _to_microseconds([segment["start"] for segment in self.segments])
+        self.stops = _to_microseconds([segment["stop"] for segment in self.segments])
+        self.base = 0
+        self.span = 0
+
+    def shift(self, base, span):
+        """
+        Method to shift the segments of each key to a separate region of the time axis and sort them by start
+        (keeping the original order of the segments with the same start)
+        """
+        self.base = base
+        self.span = span
+        shift = self.key_indexes * span - base
+        starts = self.starts + shift
+        order = numpy.argsort(starts, kind="stable")
+        self.segments = [self.segments[i] for i in order.tolist()]
+        self.key_indexes = self.key_indexes[order]
+        self.starts = starts[order]
+        self.stops = (self.stops + shift)[order]
+
+def _prepare(keys, *timelines_list):
+    """
+    Method to build the shifted segments of several sets of timelines sharing the same regions per key
+    """
+    shifted_list = [_Timelines(timelines, keys) for timelines in timelines_list]
+    values = numpy.concatenate([numpy.concatenate((shifted.starts, shifted.stops)) for shifted in shifted_list])
+    base = 0
+    span = 0
+    if len(values) > 0:
+        base = int(values.min())
+        span = int(values.max()) - base + KEY_SEPARATION
+    # end if
+    if len(keys) * span >= MAX_SHIFTED_VALUE:
+        raise ValueError("The timelines cover a period too long to be resolved at once for {} keys".format(len(keys)))
+    # end if
+    for shifted in shifted_list:
+        shifted.shift(base, span)
+    # end for
+
+    return shifted_list
+
+def _split_per_key(keys, key_indexes, segments):
+    """
+    Method to distribute the resulting segments per key (keeping their order)
+    """
+    timelines = {key: [] for key in keys}
+    for (key_index, segment) in zip(key_indexes.tolist(), segments):
+        timelines[keys[key_index]].append(segment)
+    # end for
+
+    return timelines
+
+def _merge(starts, stops):
+    """
+    Method to obtain the groups of overlapping or contiguous segments sorted by start
+
+    :return: tuple with the index of the group per segment, the starts and the stops of the groups
+    :rtype: tuple
+    """
+    if len(starts) == 0:
+        return (numpy.array([], dtype=numpy.int64), starts, stops)
+    # end if
+    running_stops = numpy.maximum.accumulate(stops)
+    new_group = numpy.concatenate(([True], starts[1:] > running_stops[:-1]))
+    groups = numpy.cumsum(new_group) - 1
+    group_starts = starts[new_group]
+    group_stops = running_stops[numpy.concatenate((new_group[1:], [True]))]
+
+    return (groups, group_starts, group_stops)
+
+def _intersect(starts1, stops1, starts2, stops2):
+    """
+    Method to obtain the pairs of overlapping segments of two timelines sorted by start
+
+    :return: tuple with the indexes of the segments of the first timeline, the indexes of the segments of the second timeline, the starts and the stops of the intersections
+    :rtype: tuple
+    """
+    if len(starts1) == 0 or len(starts2) == 0:
+        empty = numpy.array([], dtype=numpy.int64)
+        return (empty, empty, empty, empty)
+    # end if
+
+    # Candidates of the second timeline: start before the stop and (running) stop after the start
+    running_stops2 = numpy.maximum.accumulate(stops2)
+    lower = numpy.searchsorted(running_stops2, starts1, side="right")
+    upper = numpy.searchsorted(starts2, stops1, side="left")
+    counts = numpy.maximum(upper - lower, 0)
+    indexes1 = numpy.repeat(numpy.arange(len(starts1)), counts)
+    offsets = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    indexes2 = numpy.arange(counts.sum()) - offsets + numpy.repeat(lower, counts)
+
+    overlapping = stops2[indexes2] > starts1[indexes1]
+    indexes1 = indexes1[overlapping]
+    indexes2 = indexes2[overlapping]
+
+    return (indexes1, indexes2, numpy.maximum(starts1[indexes1], starts2[indexes2]), numpy.minimum(stops1[indexes1], stops2[indexes2]))
+
+def _subtract(timelines1, timelines2):
+    """
+    Method to obtain the parts of the segments of timelines1 not covered by timelines2
+
+    :return: tuple with the indexes of the segments of timelines1, the starts and the stops of the remaining parts
+    :rtype: tuple
+    """
+    (_, covered_starts, covered_stops) = _merge(timelines2.starts, timelines2.stops)
+    # Complement of the covered periods
+    lowest = numpy.iinfo(numpy.int64).min
+    highest = numpy.iinfo(numpy.int64).max
+    uncovered_starts = numpy.concatenate(([lowest], covered_stops))
+    uncovered_stops = numpy.concatenate((covered_starts, [highest]))
+    (indexes, _, starts, stops) = _intersect(timelines1.starts, timelines1.stops, uncovered_starts, uncovered_stops)
+    non_empty = starts < stops
+
+    return (indexes[non_empty], starts[non_empty], stops[non_empty])
+
+def _build_segments(shifted, key_indexes, starts, stops, ids):
+    """
+    Method to build the resulting segments undoing the shift of the keys
+
+    :return: list of segments with the identifiers and the period
+    :rtype: list
+    """
+    shift = key_indexes * shifted.span - shifted.base
+
+    return [dict(segment_ids, start = start, stop = stop) for (segment_ids, start, stop) in zip(ids, _to_datetimes(starts - shift), _to_datetimes(stops - shift))]
+
+def sort_timeline_by_start(timeline):
+    """
+    Method to sort the segments of a timeline by start
+
+    :param timeline: list of segments
+    :type timeline: list
+
+    :return: sorted timeline
+    :rtype: list
+    """
+
+    return sorted(timeline, key = lambda segment: segment["start"])
+
+def merge_timelines_per_key(timelines):
+    """
+    Method to merge the overlapping or contiguous segments of several timelines
+
+    :param timelines: timelines indexed by key
+    :type timelines: dict
+
+    :return: merged timelines indexed by key
+    :rtype: dict
+    """
+    keys = list(timelines)
+    (shifted,) = _prepare(keys, timelines)
+    (groups, starts, stops) = _merge(shifted.starts, shifted.stops)
+    key_indexes = shifted.key_indexes[numpy.concatenate(([True], groups[1:] != groups[:-1]))] if len(groups) > 0 else groups
+
+    ids = [{"id": []} for i in range(len(starts))]
+    for (group, segment) in zip(groups.tolist(), shifted.segments):
+        ids[group]["id"].append(segment.get("id"))
+    # end for
+
+    return _split_per_key(keys, key_indexes, _build_segments(shifted, key_indexes, starts, stops, ids))
+
+def intersect_timelines_per_key(timelines1, timelines2):
+    """
+    Method to intersect the timelines of the same key
+
+    :param timelines1: timelines indexed by key
+    :type timelines1: dict
+    :param timelines2: timelines indexed by key
+    :type timelines2: dict
+
+    :return: intersected timelines indexed by the keys of timelines1
+    :rtype: dict
+    """
+    keys = list(timelines1)
+    (shifted1, shifted2) = _prepare(keys, timelines1, timelines2)
+    (indexes1, indexes2, starts, stops) = _intersect(shifted1.starts, shifted1.stops, shifted2.starts, shifted2.stops)
+    key_indexes = shifted1.key_indexes[indexes1]
+
+    ids = [{"id1": shifted1.segments[index1].get("id"), "id2": shifted2.segments[index2].get("id")} for (index1, index2) in zip(indexes1.tolist(), indexes2.tolist())]
+
+    return _split_per_key(keys, key_indexes, _build_segments(shifted1, key_indexes, starts, stops, ids))
+
+def difference_timelines_per_key(timelines1, timelines2):
+    """
+    Method to obtain the difference of the timelines of the same key
+    The difference contains the parts of timelines1 not covered by timelines2
+    followed by the parts of timelines2 not covered by timelines1
+
+    :param timelines1: timelines indexed by key
+    :type timelines1: dict
+    :param timelines2: timelines indexed by key
+    :type timelines2: dict
+
+    :return: difference timelines indexed by the keys of timelines1 and timelines2
+    :rtype: dict
+    """
+    keys = list(timelines1) + [key for key in timelines2 if key not in timelines1]
+    (shifted1, shifted2) = _prepare(keys, timelines1, timelines2)
+
+    differences = {key: [] for key in keys}
+    for (shifted, other) in [(shifted1, shifted2), (shifted2, shifted1)]:
+        (indexes, starts, stops) = _subtract(shifted, other)
+        key_indexes = shifted.key_indexes[indexes]
+        ids = [{"id": shifted.segments[index].get("id")} for index in indexes.tolist()]
+        for (key, key_segments) in _split_per_key(keys, key_indexes, _build_segments(shifted, key_indexes, starts, stops, ids)).items():
+            differences[key] += key_segments
+        # end for
+    # end for
+
+    return differences
+
+def merge_timeline(timeline):
+    """
+    Method to merge the overlapping or contiguous segments of a timeline
+    (drop-in replacement of eboa.ingestion.functions.merge_timeline)
+
+    :param timeline: list of segments
+    :type timeline: list
+
+    :return: merged timeline
+    :rtype: list
+    """
+
+    return merge_timelines_per_key({None: timeline})[None]
+
+def intersect_timelines(timeline1, timeline2):
+    """
+    Method to intersect two timelines
+    (drop-in replacement of eboa.ingestion.functions.intersect_timelines)
+
+    :param timeline1: list of segments
+    :type timeline1: list
+    :param timeline2: list of segments
+    :type timeline2: list
+
+    :return: intersected timeline
+    :rtype: list
+    """
+
+    return intersect_timelines_per_key({None: timeline1}, {None: timeline2})[None]
+
+def difference_timelines(timeline1, timeline2):
+    """
+    Method to obtain the difference of two timelines
+    (drop-in replacement of eboa.ingestion.functions.difference_timelines)
+
+    :param timeline1: list of segments
+    :type timeline1: list
+    :param timeline2: list of segments
+    :type timeline2: list
+
+    :return: difference timeline
+    :rtype: list
+    """
+
+    return difference_timelines_per_key({None: timeline1}, {None: timeline2})[None]
@@ -6,6 +6,12 @@ Written by DEIMOS Space S.L. (dibb)
 module eboa
 """
 
+# Import python utilities
+import threading
+
+# Import xml parser
+from lxml import etree
+
 # Import debugging
 from eboa.debugging import debug
 
@@ -15,6 +21,76 @@ import eboa.ingestion.functions as ingestion_functions
 # S2 funcions
 import s2boa.ingestions.functions as s2_functions
 
+# Import profiling helpers
+import s2boa.ingestions.profiling as profiling_functions
+
+###
+# Registry of compiled XPATH expressions
+###
+
+# Compiled XPATH expressions indexed by the expression
+xpaths = {}
+xpaths_lock = threading.Lock()
+
+def get_xpath(expression):
+    """
+    Method to obtain the compiled XPATH of an expression
+    The expression is compiled on the first request and reused by the following ones
+
+    :param expression: XPATH expression
+    :type expression: str
+
+    :return: compiled XPATH
+    :rtype: etree.XPath
+    """
+    xpath = xpaths.get(expression)
+    if xpath == None:
+        with xpaths_lock:
+            xpath = xpaths.get(expression)
+            if xpath == None:
+                xpath = etree.XPath(expression)
+                xpaths[expression] = xpath
+            # end if
+        # end with
+    # end if
+
+    return xpath
+
+def evaluate(node, expression, **variables):
+    """
+    Method to evaluate an XPATH expression on a node using the registry of compiled XPATH expressions
+
+    :param node: document or element
+    :type node: etree._ElementTree or etree._Element
+    :param expression: XPATH expression
+    :type expression: str
+    :param variables: values of the variables used in the expression
+    :type variables: dict
+
+    :return: result of the evaluation
+    :rtype: list, str, float or bool
+    """
+
+    profiling_functions.count("xpath_evaluations")
+
+    return get_xpath(expression)(node, **variables)
+
+class XPathEvaluator():
+    """
+    Evaluator of XPATH expressions on a document using the registry of compiled XPATH expressions
+    It replaces etree.XPathEvaluator, which compiles the expression on every call
+    """
+
+    def __init__(self, tree):
+        """
+        :param tree: parsed document
+        :type tree: etree._ElementTree
+        """
+        self.tree = tree
+
+    def __call__(self, expression, **variables):
+        return evaluate(self.tree, expression, **variables)
+
 ###
 # Date helpers
 ###
@@ -15,12 +15,6 @@ import jinja2
 
 # Import vboa
 import vboa
-from s2vboa.views import planning
-from s2vboa.views import hktm_workflow
-from s2vboa.views import acquisition
-from s2vboa.views import tracking
-from s2vboa.views import sensing_data_volumes
-from s2vboa.views import archive_data_volumes
 
 def create_app():
     """
@@ -28,6 +22,14 @@ def create_app():
     """
     app = vboa.create_app()
 
+    # The views are imported when the application is created, so that importing s2vboa is cheap
+    from s2vboa.views import planning
+    from s2vboa.views import hktm_workflow
+    from s2vboa.views import acquisition
+    from s2vboa.views import tracking
+    from s2vboa.views import sensing_data_volumes
+    from s2vboa.views import archive_data_volumes
+
     app.register_blueprint(planning.bp)
     app.register_blueprint(hktm_workflow.bp)
     app.register_blueprint(acquisition.bp)
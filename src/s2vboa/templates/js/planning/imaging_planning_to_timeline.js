@@ -1,16 +1,12 @@
 
 var imaging_events = [
-    {% for imaging in events %}
-    {% set correction_uuid = imaging.eventLinks|selectattr("name", "equalto", "TIME_CORRECTION")|map(attribute='event_uuid_link')|first %}
-    {% if correction_uuid %}
-    {% set event = planning_events["imaging"]["linked_events"]|selectattr("event_uuid", "equalto", correction_uuid)|first %}
-    {% else %}
-    {% set event = imaging %}
-    {% endif %}
-    {% set satellite = imaging.eventTexts|selectattr("name", "equalto", "satellite")|map(attribute='value')|first|string %}
-    {% set orbit = imaging.eventDoubles|selectattr("name", "equalto", "start_orbit")|map(attribute='value')|first|int %}
-    {% set imaging_mode = imaging.eventTexts|selectattr("name", "equalto", "imaging_mode")|map(attribute='value')|first|string %}
-    {% set record_type = imaging.eventTexts|selectattr("name", "equalto", "record_type")|map(attribute='value')|first|string %}
+    {% for row in rows %}
+    {% set imaging = row["prime_event"] %}
+    {% set event = row["event"] %}
+    {% set satellite = row["satellite"] %}
+    {% set orbit = row["start_orbit"] %}
+    {% set imaging_mode = row["imaging_mode"] %}
+    {% set record_type = row["record_type"] %}
     {
         "id": "{{ imaging.event_uuid }}",
         "group": "{{ satellite }}",
@@ -0,0 +1,210 @@
+"""
+Automated tests for the view model of the acquisition view
+
+The rows built by build_acquisition_view_model are compared with the grouping done
+by the templates of the view before the view model (joins per row over the whole lists)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import datetime
+import unittest
+from unittest import mock
+import uuid
+
+# Import acquisition view
+import s2vboa.views.acquisition as acquisition
+
+START = datetime.datetime(2018, 7, 21, 0, 0, 0)
+
+class Value():
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self.position = 0
+        self.parent_level = -1
+        self.parent_position = 0
+
+class Link():
+    def __init__(self, name, event_uuid_link):
+        self.name = name
+        self.event_uuid_link = event_uuid_link
+
+class Event():
+    """
+    Event with the attributes of the datamodel of EBOA used by the acquisition view
+    """
+    def __init__(self, start, stop, texts = {}, doubles = {}, explicit_ref = None):
+        self.event_uuid = uuid.uuid1()
+        self.start = start
+        self.stop = stop
+        self.eventTexts = [Value(name, value) for name, value in texts.items()]
+        self.eventDoubles = [Value(name, value) for name, value in doubles.items()]
+        self.eventObjects = [Value("parameters", None)]
+        self.eventLinks = []
+        self.explicitRef = Value(None, None)
+        self.explicitRef.explicit_ref = explicit_ref
+
+    def get_structured_values(self, position = 0, parent_level = -1, parent_position = 0):
+        return [{"name": "parameters", "values": [{"name": "channel", "type": "double", "value": 1}]}]
+
+    def link(self, name, event):
+        self.eventLinks.append(Link(name, event.event_uuid))
+
+def build_acquisition_events(number_of_playbacks):
+    """
+    Method to build the events returned by query_acquisition_events for the given number of playbacks
+    (one of each 5 playbacks is not received, one of each 3 has gaps, one of each 4 misses packets and
+    one of each 6 is scheduled by EDRS)
+    """
+    events = {name: [] for name in ["playback_correction", "playback", "playback_completeness_channel", "playback_validity", "station_report",
+                                    "station_schedule", "dfep_schedule", "slot_request_edrs", "planned_playbacks_gaps_msi", "playback_gaps",
+                                    "raw_isp_validity_events_with_packet_status_nok"]}
+    for i in range(number_of_playbacks):
+        start = START - datetime.timedelta(seconds = i * 3000)
+        stop = start + datetime.timedelta(seconds = 600)
+        playback = Event(start, stop, {"satellite": "S2" + "AB"[i % 2], "station": "SGS_", "playback_type": "NOMINAL", "playback_mean": "XBAND"}, {"start_orbit": 16000 + i})
+        correction = Event(start + datetime.timedelta(seconds = 1), stop + datetime.timedelta(seconds = 1))
+        correction.link("PLANNED_EVENT", playback)
+        events["playback_correction"].append(correction)
+        events["playback"].append(playback)
+
+        if i % 6 == 0:
+            slot_request = Event(start - datetime.timedelta(seconds = 5), stop + datetime.timedelta(seconds = 5))
+            playback.link("SLOT_REQUEST_EDRS", slot_request)
+            events["slot_request_edrs"].append(slot_request)
+        else:
+            for (name, schedules) in [("STATION_SCHEDULE", events["station_schedule"]), ("DFEP_SCHEDULE", events["dfep_schedule"])]:
+                schedule = Event(start - datetime.timedelta(seconds = 5), stop + datetime.timedelta(seconds = 5))
+                playback.link(name, schedule)
+                schedules.append(schedule)
+            # end for
+        # end if
+
+        if i % 5 == 0:
+            continue
+        # end if
+        validity = Event(start + datetime.timedelta(seconds = 2), stop, explicit_ref = "DCS_" + str(i))
+        playback.link("PLAYBACK_VALIDITY", validity)
+        events["playback_validity"].append(validity)
+        for channel in [1, 2]:
+            status = "INCOMPLETE" if i % 3 == 0 and channel == 2 else "RECEIVED"
+            completeness = Event(start, stop, {"status": status})
+            completeness.link("PLANNED_PLAYBACK", playback)
+            playback.link("PLAYBACK_COMPLETENESS", completeness)
+            events["playback_completeness_channel"].append(completeness)
+        # end for
+        if i % 3 == 0:
+            events["planned_playbacks_gaps_msi"].append(playback)
+        # end if
+        if i % 4 == 0:
+            events["raw_isp_validity_events_with_packet_status_nok"].append(Event(start, stop, doubles = {"diff_expected_received": 10}, explicit_ref = "DCS_" + str(i)))
+        # end if
+        station_report = Event(start, stop, {"status": "OK"})
+        playback.link("STATION_ACQUISITION_REPORT", station_report)
+        events["station_report"].append(station_report)
+    # end for
+
+    return events
+
+def first(events):
+    return events[0] if len(events) > 0 else None
+
+def linked_uuids(event, name):
+    return [link.event_uuid_link for link in event.eventLinks if link.name.startswith(name)]
+
+class TestAcquisitionViewModel(unittest.TestCase):
+    def setUp(self):
+        self.events = build_acquisition_events(30)
+
+    def test_playback_rows(self):
+
+        acquisition.build_acquisition_view_model(self.events)
+
+        events = self.events
+        assert list(events["playbacks"].keys()) == [correction.eventLinks[0].event_uuid_link for correction in events["playback_correction"]]
+        for correction in events["playback_correction"]:
+            # Joins of the legacy template (acquisition_content.html) for each correction
+            original_playback = first([event for event in events["playback"] if event.event_uuid == linked_uuids(correction, "PLANNED_EVENT")[0]])
+            playback_validity_uuids = linked_uuids(original_playback, "PLAYBACK_VALIDITY")
+            playback_validity = first([event for event in events["playback_validity"] if len(playback_validity_uuids) > 0 and event.event_uuid == playback_validity_uuids[0]])
+            explicit_refs = []
+            for event in events["playback_validity"]:
+                if event.event_uuid in playback_validity_uuids and event.explicitRef.explicit_ref not in explicit_refs:
+                    explicit_refs.append(event.explicitRef.explicit_ref)
+                # end if
+            # end for
+            raw_isp_validities = [event for event in events["raw_isp_validity_events_with_packet_status_nok"] if event.explicitRef.explicit_ref in explicit_refs]
+            completeness = [event for event in events["playback_completeness_channel"] if event.event_uuid in linked_uuids(original_playback, "PLAYBACK_COMPLETENESS")]
+            statuses = [value.value for event in completeness for value in event.eventTexts if value.name == "status"]
+            if len(playback_validity_uuids) == 0:
+                playback_status = "MISSING"
+            elif "MISSING" in statuses:
+                playback_status = "PARTIAL"
+            elif "INCOMPLETE" in statuses:
+                playback_status = "GAPS"
+            else:
+                playback_status = "RECEIVED"
+            # end if
+            slot_request = first([event for event in events["slot_request_edrs"] if event.event_uuid in linked_uuids(original_playback, "SLOT_REQUEST_EDRS")])
+            station_schedule = first([event for event in events["station_schedule"] if event.event_uuid in linked_uuids(original_playback, "STATION_SCHEDULE")]) or slot_request
+            dfep_schedule = first([event for event in events["dfep_schedule"] if event.event_uuid in linked_uuids(original_playback, "DFEP_SCHEDULE")]) or slot_request
+            station_report = first([event for event in events["station_report"] if event.event_uuid in linked_uuids(original_playback, "STATION_ACQUISITION_REPORT")])
+
+            row = events["playbacks"][original_playback.event_uuid]
+            assert row["playback"] is original_playback
+            assert row["correction"] is correction
+            assert row["playback_validity"] is playback_validity
+            assert row["playback_validity_explicit_refs"] == explicit_refs
+            assert row["raw_isp_validities_with_packet_status_nok"] == raw_isp_validities
+            assert row["missing_packets"] == 10 * len(raw_isp_validities)
+            assert row["gaps_msi"] == (original_playback in events["planned_playbacks_gaps_msi"])
+            assert row["playback_completeness"] == completeness
+            assert row["playback_status"] == playback_status
+            assert row["station_schedule"] is station_schedule
+            assert row["dfep_schedule"] is dfep_schedule
+            assert row["station_report"] is station_report
+            assert (row["satellite"], row["station"], row["playback_type"], row["start_orbit"]) == (original_playback.eventTexts[0].value, "SGS_", "NOMINAL", original_playback.eventDoubles[0].value)
+        # end for
+
+    def test_completeness_rows(self):
+
+        acquisition.build_acquisition_view_model(self.events)
+
+        events = self.events
+        for status in ["RECEIVED", "INCOMPLETE"]:
+            # Grouping of the legacy scripts (events_group_by_text_value("status") joined with the planned playbacks)
+            legacy_rows = []
+            for event in events["playback_completeness_channel"]:
+                if [value.value for value in event.eventTexts if value.name == "status"][0] == status:
+                    original_playback = first([playback for playback in events["playback"] if playback.event_uuid in linked_uuids(event, "PLANNED_PLAYBACK")])
+                    legacy_rows.append((event, original_playback))
+                # end if
+            # end for
+
+            assert [(row["event"], row["playback"]["playback"]) for row in events["completeness_rows"][status]] == legacy_rows
+        # end for
+
+        # The planned playbacks without validity are shown with their corrections
+        missing_corrections = [correction for correction in events["playback_correction"] if len(linked_uuids(events["playbacks"][linked_uuids(correction, "PLANNED_EVENT")[0]]["playback"], "PLAYBACK_VALIDITY")) == 0]
+        assert [row["event"] for row in events["completeness_rows"]["MISSING"]] == missing_corrections
+        assert [row["correction"] for row in events["missing_playbacks"]] == sorted(missing_corrections, key = lambda event: event.start, reverse = True)
+        assert events["unmatched_completeness"] == []
+
+    def test_unmatched_completeness(self):
+
+        # Completeness of a planned playback not returned by the query
+        planned_playback = Event(START, START + datetime.timedelta(seconds = 600))
+        completeness = Event(START, START + datetime.timedelta(seconds = 600), {"status": "RECEIVED"})
+        completeness.link("PLANNED_PLAYBACK", planned_playback)
+        self.events["playback_completeness_channel"].append(completeness)
+
+        with mock.patch.object(acquisition, "current_app") as current_app:
+            acquisition.build_acquisition_view_model(self.events)
+        # end with
+
+        assert self.events["unmatched_completeness"] == [completeness]
+        assert current_app.logger.debug.call_count == 1
+        assert completeness not in [row["event"] for row in self.events["completeness_rows"]["RECEIVED"]]
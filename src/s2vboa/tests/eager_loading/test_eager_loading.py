@@ -0,0 +1,123 @@
+"""
+Automated tests for the eager loading of the relationships used by the views
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import os
+import unittest
+
+# Import SQLAlchemy events
+from sqlalchemy import event
+
+# Import engine of the DDBB
+import eboa.engine.engine as eboa_engine
+import eboa.ingestion.eboa_ingestion as ingestion
+from eboa.engine.engine import Engine
+from eboa.engine.query import Query
+from eboa.datamodel.base import Session, engine, Base
+
+# Import application
+import s2vboa
+
+# Maximum number of SQL statements per rendering of each view (independent of the number of events)
+MAX_STATEMENTS = {
+    "/views/planning": 40,
+    "/views/acquisition": 50,
+    "/views/hktm-workflow": 60,
+    "/views/sensing-data-volumes": 40,
+    "/views/archive-data-volumes": 40
+}
+
+# Values of the query form of the views
+FORM = {
+    "mission": "S2A",
+    "start": "2018-07-20T00:00:14",
+    "stop": "2018-07-24T23:59:59",
+    "start_orbit": "",
+    "stop_orbit": "",
+    "limit": "",
+    "show_planning_timeline": "on",
+    "show_planning_x_time_evolution": "on",
+    "show_planning_table_details": "on",
+    "show_planning_map": "on",
+    "show_acquisition_table_details": "on",
+    "show_acquisition_map": "on",
+    "show_acquisition_station_reports": "on",
+    "show_sensing_data_volumes_table_details": "on",
+    "show_sensing_data_volumes_map": "on",
+    "show_sensing_data_volumes_evolution": "on",
+    "show_archive_data_volumes_table_details": "on",
+    "show_archive_data_volumes_map": "on",
+    "show_archive_data_volumes_evolution": "on"
+}
+
+class TestEagerLoading(unittest.TestCase):
+    def setUp(self):
+        # Create the engine to manage the data
+        self.engine_eboa = Engine()
+        self.query_eboa = Query()
+
+        # Create session to connect to the database
+        self.session = Session()
+
+        # Clear all tables before executing the test
+        self.query_eboa.clear_db()
+
+        self.client = s2vboa.create_app().test_client()
+
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(engine, "before_cursor_execute", self.count_statement)
+
+        # Close connections to the DDBB
+        self.engine_eboa.close_session()
+        self.query_eboa.close_session()
+        self.session.close()
+
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def ingest(self, inputs, processor, filename):
+        file_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/" + inputs + "/inputs/" + filename
+
+        returned_value = ingestion.command_process_file(processor, file_path, "2018-01-01T00:00:00")
+
+        assert returned_value[0]["status"] == eboa_engine.exit_codes["OK"]["status"]
+
+    def render(self, view):
+        self.statements = []
+        response = self.client.post(view, data = FORM)
+
+        assert response.status_code == 200
+
+        return len(self.statements)
+
+    def test_statements_per_view(self):
+
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_nppf.ingestion_nppf", "S2A_NPPF.EOF")
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_orbpre.ingestion_orbpre", "S2A_ORBPRE.EOF")
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_dfep_acquisition.ingestion_dfep_acquisition", "S2A_REP_PASS.EOF")
+
+        for view in MAX_STATEMENTS:
+            statements = self.render(view)
+
+            assert statements <= MAX_STATEMENTS[view], "The rendering of {} executed {} SQL statements (maximum {})".format(view, statements, MAX_STATEMENTS[view])
+        # end for
+
+    def test_statements_do_not_depend_on_the_events(self):
+
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_nppf.ingestion_nppf", "S2A_NPPF.EOF")
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_orbpre.ingestion_orbpre", "S2A_ORBPRE.EOF")
+
+        statements_planning = self.render("/views/planning")
+
+        # A second plan adds events to the period but no statements to the rendering
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_nppf.ingestion_nppf", "S2A_NPPF_2.EOF")
+        self.ingest("acquisition", "s2boa.ingestions.ingestion_orbpre.ingestion_orbpre", "S2A_ORBPRE_2.EOF")
+
+        assert self.render("/views/planning") == statements_planning
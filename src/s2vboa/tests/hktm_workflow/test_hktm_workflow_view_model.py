@@ -0,0 +1,160 @@
+"""
+Automated tests for the view model of the HKTM workflow view
+
+The rows built by build_hktm_workflow_view_model are compared with the grouping done
+by the templates of the view before the view model (joins per row over the whole lists)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import datetime
+import unittest
+from unittest import mock
+import uuid
+
+# Import HKTM workflow view
+import s2vboa.views.hktm_workflow as hktm_workflow
+
+START = datetime.datetime(2018, 7, 21, 0, 0, 0)
+
+class Value():
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+class Link():
+    def __init__(self, name, event_uuid_link):
+        self.name = name
+        self.event_uuid_link = event_uuid_link
+
+class Event():
+    """
+    Event with the attributes of the datamodel of EBOA used by the HKTM workflow view
+    """
+    def __init__(self, start, stop, texts = {}, doubles = {}):
+        self.event_uuid = uuid.uuid1()
+        self.start = start
+        self.stop = stop
+        self.eventTexts = [Value(name, value) for name, value in texts.items()]
+        self.eventDoubles = [Value(name, value) for name, value in doubles.items()]
+        self.eventLinks = []
+
+    def link(self, name, event):
+        self.eventLinks.append(Link(name, event.event_uuid))
+
+def build_hktm_workflow_events(number_of_playbacks):
+    """
+    Method to build the events returned by query_hktm_workflow_events for the given number of playbacks
+    and the predicted orbits covering them (one of each 4 playbacks is not produced and one of each 3
+    has no station report)
+    """
+    events = {name: [] for name in ["playback", "hktm_production", "station_report", "distribution_status", "dfep_acquisition_validity"]}
+    orbpre_events = []
+    for i in range(number_of_playbacks):
+        satellite = "S2" + "AB"[i % 2]
+        start = START + datetime.timedelta(seconds = i * 3000)
+        stop = start + datetime.timedelta(seconds = 600)
+        playback = Event(start, stop, {"satellite": satellite, "playback_type": "HKTM"}, {"start_orbit": 16000 + i})
+        events["playback"].append(playback)
+
+        # Two predicted orbits intersect each playback
+        orbpre_events.append(Event(start - datetime.timedelta(seconds = 6000), start + datetime.timedelta(seconds = 100), {"satellite": satellite}, {"orbit": 16000 + i}))
+        orbpre_events.append(Event(start + datetime.timedelta(seconds = 100), start + datetime.timedelta(seconds = 5400), {"satellite": satellite}, {"orbit": 16000 + i}))
+
+        if i % 4 != 0:
+            for j in range(2):
+                hktm_production = Event(start, stop, {"status": "OK"})
+                playback.link("HKTM_PRODUCTION", hktm_production)
+                events["hktm_production"].append(hktm_production)
+            # end for
+            distribution_status = Event(start, stop, {"completeness_status": "OK"})
+            playback.link("DISTRIBUTION_STATUS", distribution_status)
+            events["distribution_status"].append(distribution_status)
+        # end if
+        if i % 3 != 0:
+            station_report = Event(start, stop, {"comments": "Station report " + str(i)})
+            playback.link("STATION_ACQUISITION_REPORT", station_report)
+            events["station_report"].append(station_report)
+        # end if
+    # end for
+
+    # The predicted orbits are returned sorted by start
+    return (events, sorted(orbpre_events, key = lambda event: event.start))
+
+def first(events):
+    return events[0] if len(events) > 0 else None
+
+def linked_uuids(event, name):
+    return [link.event_uuid_link for link in event.eventLinks if link.name == name]
+
+def get_text(event, name):
+    return first([value.value for value in event.eventTexts if value.name == name])
+
+def intersect(event1, event2):
+    return event1.start < event2.stop and event2.start < event1.stop
+
+class TestHktmWorkflowViewModel(unittest.TestCase):
+    def setUp(self):
+        (self.events, self.orbpre_events) = build_hktm_workflow_events(20)
+
+    def test_playback_rows(self):
+
+        hktm_workflow.build_hktm_workflow_view_model(self.events, self.orbpre_events)
+
+        events = self.events
+        assert len(events["playbacks"]) == len(events["playback"])
+        for event in events["playback"]:
+            # Joins of the legacy templates (hktm_workflow_status.html and hktm_workflow_content_table.html) for each playback
+            satellite = get_text(event, "satellite")
+            hktm_production_events = [hktm_production for hktm_production in events["hktm_production"] if hktm_production.event_uuid in linked_uuids(event, "HKTM_PRODUCTION")]
+            distribution_status_events = [distribution_status for distribution_status in events["distribution_status"] if distribution_status.event_uuid in linked_uuids(event, "DISTRIBUTION_STATUS")]
+            station_report_event = first([station_report for station_report in events["station_report"] if station_report.event_uuid in linked_uuids(event, "STATION_ACQUISITION_REPORT")])
+            comments = get_text(station_report_event, "comments") if station_report_event != None else ""
+            orbpre_event = first([orbpre_event for orbpre_event in self.orbpre_events if get_text(orbpre_event, "satellite") == satellite and intersect(event, orbpre_event)])
+
+            row = events["playbacks"][event.event_uuid]
+            assert row["playback"] is event
+            assert row["satellite"] == satellite
+            assert row["start_orbit"] == event.eventDoubles[0].value
+            assert row["hktm_production"] == hktm_production_events
+            assert row["distribution_status"] == distribution_status_events
+            assert row["station_report"] is station_report_event
+            assert row["comments"] == comments
+            assert row["orbpre_event"] is orbpre_event
+        # end for
+
+    def test_orbpre_playbacks(self):
+
+        hktm_workflow.build_hktm_workflow_view_model(self.events, self.orbpre_events)
+
+        events = self.events
+        for orbpre_event in self.orbpre_events:
+            # Intersection of the legacy template (hktm_workflow_content.html) for each predicted orbit
+            playback = first([event for event in events["playback"] if get_text(event, "satellite") == get_text(orbpre_event, "satellite") and intersect(event, orbpre_event)])
+
+            row = events["orbpre_playbacks"].get(orbpre_event.event_uuid)
+            if playback == None:
+                assert row == None
+            else:
+                assert row["playback"] is playback
+            # end if
+        # end for
+
+    def test_unmatched_events(self):
+
+        # HKTM production and station report of a planned playback not returned by the query
+        hktm_production = Event(START, START + datetime.timedelta(seconds = 600))
+        station_report = Event(START, START + datetime.timedelta(seconds = 600), {"comments": ""})
+        self.events["hktm_production"].append(hktm_production)
+        self.events["station_report"].append(station_report)
+
+        with mock.patch.object(hktm_workflow, "current_app") as current_app:
+            hktm_workflow.build_hktm_workflow_view_model(self.events, self.orbpre_events)
+        # end with
+
+        # One message per kind of unmatched events
+        assert current_app.logger.debug.call_count == 2
+        assert self.events["unmatched_events"] == {"hktm_production": [hktm_production], "station_report": [station_report], "distribution_status": []}
+        assert hktm_production not in [event for row in self.events["playbacks"].values() for event in row["hktm_production"]]
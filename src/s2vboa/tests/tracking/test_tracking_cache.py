@@ -0,0 +1,106 @@
+"""
+Automated tests for the cache of footprints of the tracking view
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import datetime
+import threading
+import time
+import unittest
+
+# Import cache of footprints
+import s2vboa.views.tracking_cache as tracking_cache
+
+class TestTrackingCache(unittest.TestCase):
+    def setUp(self):
+        self.computed_segments = []
+        self.cache = tracking_cache.TrackingCache()
+        self.token = frozenset(["ORBPRE_1"])
+
+    def get_token(self, query, satellite, start, stop):
+        return self.token
+
+    def compute(self, satellite, segments):
+        self.computed_segments.append(segments)
+        time.sleep(0.1)
+        return {segment: [{"name": "footprint_details", "type": "object", "values": [{"name": "footprint", "type": "geometry", "value": satellite + " " + segment[0].isoformat() + " " + segment[1].isoformat()}]}] for segment in segments}
+
+    def test_segments(self):
+
+        segments = tracking_cache.get_segments(datetime.datetime(2018, 7, 21, 10, 5, 30), datetime.datetime(2018, 7, 21, 10, 31, 0))
+
+        assert segments == [(datetime.datetime(2018, 7, 21, 10, 5, 30), datetime.datetime(2018, 7, 21, 10, 10, 0)),
+                            (datetime.datetime(2018, 7, 21, 10, 10, 0), datetime.datetime(2018, 7, 21, 10, 20, 0)),
+                            (datetime.datetime(2018, 7, 21, 10, 20, 0), datetime.datetime(2018, 7, 21, 10, 30, 0)),
+                            (datetime.datetime(2018, 7, 21, 10, 30, 0), datetime.datetime(2018, 7, 21, 10, 31, 0))]
+
+    def test_tracking(self):
+
+        trackings = tracking_cache.get_tracking("S2A", "2018-07-21T10:05:31.123", "2018-07-21T10:31:04.456", None, self.cache, self.compute, self.get_token)
+
+        assert [(tracking["id"], tracking["start"], tracking["stop"]) for tracking in trackings] == [("COMPLETE", "2018-07-21T10:05:30", "2018-07-21T10:31:00"),
+                                                                                                   ("HEAD", "2018-07-21T10:30:30", "2018-07-21T10:31:00")]
+        assert [value["name"] for value in trackings[0]["values"]] == ["footprint_details_0", "footprint_details_1", "footprint_details_2", "footprint_details_3"]
+        assert trackings[1]["values"] == [{"name": "footprint_details", "type": "object", "values": [{"name": "footprint", "type": "geometry", "value": "S2A 2018-07-21T10:30:30 2018-07-21T10:31:00"}]}]
+        assert len(self.computed_segments) == 1
+
+        # The next poll only computes the edges of the window and the HEAD
+        tracking_cache.get_tracking("S2A", "2018-07-21T10:06:31", "2018-07-21T10:32:04", None, self.cache, self.compute, self.get_token)
+
+        assert self.computed_segments[1] == [(datetime.datetime(2018, 7, 21, 10, 6, 30), datetime.datetime(2018, 7, 21, 10, 10, 0)),
+                                             (datetime.datetime(2018, 7, 21, 10, 30, 0), datetime.datetime(2018, 7, 21, 10, 32, 0)),
+                                             (datetime.datetime(2018, 7, 21, 10, 31, 30), datetime.datetime(2018, 7, 21, 10, 32, 0))]
+
+    def test_new_orbpre(self):
+
+        tracking_cache.get_tracking("S2A", "2018-07-21T10:05:31", "2018-07-21T10:31:04", None, self.cache, self.compute, self.get_token)
+        tracking_cache.get_tracking("S2A", "2018-07-21T10:05:31", "2018-07-21T10:31:04", None, self.cache, self.compute, self.get_token)
+
+        assert len(self.computed_segments) == 1
+
+        # The footprints are computed again when the ORBPRE sources change
+        self.token = frozenset(["ORBPRE_1", "ORBPRE_2"])
+        tracking_cache.get_tracking("S2A", "2018-07-21T10:05:31", "2018-07-21T10:31:04", None, self.cache, self.compute, self.get_token)
+
+        assert len(self.computed_segments) == 2
+        assert self.computed_segments[1] == self.computed_segments[0]
+
+    def test_concurrent_viewers(self):
+
+        threads = [threading.Thread(target = tracking_cache.get_tracking, args = ("S2A", "2018-07-21T10:05:31", "2018-07-21T10:31:04", None, self.cache, self.compute, self.get_token)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        # end for
+        for thread in threads:
+            thread.join()
+        # end for
+
+        assert len(self.computed_segments) == 1
+
+    def test_without_footprint(self):
+
+        def compute(satellite, segments):
+            self.computed_segments.append(segments)
+            return {}
+        # end def
+
+        for i in range(2):
+            trackings = tracking_cache.get_tracking("S2B", "2018-07-21T10:05:31", "2018-07-21T10:31:04", None, self.cache, compute, self.get_token)
+        # end for
+
+        # The segments without footprint are not kept
+        assert not "values" in trackings[0]
+        assert len(self.computed_segments) == 2
+        assert len(self.cache) == 0
+
+    def test_too_large_window(self):
+
+        trackings = tracking_cache.get_tracking("S2A", "2018-07-21T00:00:00", "2018-07-22T00:00:00", None, self.cache, self.compute, self.get_token)
+
+        # Only the HEAD of the windows of 100 minutes or more has footprint
+        assert not "values" in trackings[0]
+        assert len(trackings[1]["values"]) == 1
+        assert self.computed_segments == [[(datetime.datetime(2018, 7, 21, 23, 59, 30), datetime.datetime(2018, 7, 22, 0, 0, 0))]]
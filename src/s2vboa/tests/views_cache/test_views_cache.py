@@ -0,0 +1,65 @@
+"""
+Automated tests for the cache of the renderings of the views
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import unittest
+
+# Import cache of the views
+import s2vboa.views.cache as views_cache
+
+class TestViewsCache(unittest.TestCase):
+
+    def test_round_window(self):
+
+        (start_filter, stop_filter) = views_cache.round_window({"date": "2018-07-21T10:15:42.123456", "operator": "<="},
+                                                               {"date": "2018-07-20T10:15:42.123456", "operator": ">="}, 60)
+
+        assert start_filter == {"date": "2018-07-21T10:16:00", "operator": "<="}
+        assert stop_filter == {"date": "2018-07-20T10:15:00", "operator": ">="}
+
+        # The refreshes within the granularity share the window
+        assert views_cache.round_window({"date": "2018-07-21T10:15:59", "operator": "<="},
+                                        {"date": "2018-07-20T10:15:01", "operator": ">="}, 60) == (start_filter, stop_filter)
+
+        # The dates at the granularity are not changed
+        assert views_cache.round_date("2018-07-21T10:00:00", 3600, up = True) == "2018-07-21T10:00:00"
+
+    def test_token(self):
+
+        cache = views_cache.ViewsCache(max_entries = 2)
+        key = ("planning", "2018-07-21T10:16:00", "2018-07-20T10:15:00", "{}")
+        token = frozenset([("SOURCE_1", 100)])
+
+        assert cache.get(key, token) == None
+
+        cache.put(key, token, "RENDERING")
+
+        assert cache.get(key, token) == "RENDERING"
+
+        # A new source (or the progress of the ingestion of a source) discards the rendering
+        assert cache.get(key, frozenset([("SOURCE_1", 100), ("SOURCE_2", 10)])) == None
+        assert len(cache) == 0
+
+    def test_eviction(self):
+
+        cache = views_cache.ViewsCache(max_entries = 2)
+        token = frozenset()
+
+        cache.put(("planning", 1), token, "RENDERING_1")
+        cache.put(("planning", 2), token, "RENDERING_2")
+        assert cache.get(("planning", 1), token) == "RENDERING_1"
+        cache.put(("acquisition", 3), token, "RENDERING_3")
+
+        # The least recently used rendering is evicted
+        assert cache.get(("planning", 2), token) == None
+        assert cache.get(("planning", 1), token) == "RENDERING_1"
+        assert cache.get(("acquisition", 3), token) == "RENDERING_3"
+
+        cache.invalidate("planning")
+
+        assert cache.get(("planning", 1), token) == None
+        assert len(cache) == 1
@@ -23,9 +23,11 @@ from eboa.engine.engine import Engine
 
 # Import views functions
 from s2vboa.views import functions as s2vboa_functions
+from s2vboa.views import cache as views_cache
 
 bp = Blueprint("acquisition", __name__, url_prefix="/views")
-query = Query()
+# The connection to the DDBB is created on the first request
+query = s2vboa_functions.LazyInstance(Query)
 
 @bp.route("/acquisition", methods=["GET", "POST"])
 def show_acquisition():
@@ -252,19 +254,25 @@ def define_what_to_show_acquisition(show):
 
 def query_acquisition_and_render(start_filter = None, stop_filter = None, mission = None, show = None, sliding_window = None, filters = None, corrected_planned_playback_uuid = None):
 
-    acquisition_events = query_acquisition_events(start_filter, stop_filter, mission, filters, corrected_planned_playback_uuid)
+    def render(start_filter, stop_filter):
 
-    orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+        acquisition_events = query_acquisition_events(start_filter, stop_filter, mission, filters, corrected_planned_playback_uuid)
 
-    reporting_start = stop_filter["date"]
-    reporting_stop = start_filter["date"]
+        orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+
+        reporting_start = stop_filter["date"]
+        reporting_stop = start_filter["date"]
     
-    route = "views/acquisition/acquisition.html"
-    if corrected_planned_playback_uuid != None:
-        route = "views/acquisition/specific_acquisition.html"
-    # end if
+        route = "views/acquisition/acquisition.html"
+        if corrected_planned_playback_uuid != None:
+            route = "views/acquisition/specific_acquisition.html"
+        # end if
 
-    return render_template(route, acquisition_events=acquisition_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+        return render_template(route, acquisition_events=acquisition_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+    # end def
+
+    # The renderings are cached, rounding the windows relative to the current time (sliding windows)
+    return views_cache.render_view("acquisition", query, start_filter, stop_filter, {"mission": mission, "show": show, "sliding_window": sliding_window, "filters": filters, "corrected_planned_playback_uuid": corrected_planned_playback_uuid, "path": request.path}, render, round_window_to_granularity = sliding_window != None)
 
 def query_acquisition_events(start_filter = None, stop_filter = None, mission = None, filters = None, corrected_planned_playback_uuid = None):
     """
@@ -329,7 +337,7 @@ def query_acquisition_events(start_filter = None, stop_filter = None, mission =
     events["slot_request_edrs"] = planned_playback_events["linking_events"]["SLOT_REQUEST_EDRS"]
 
     ## Get PLANNED_PLAYBACK events with gaps at reception
-    incomplete_playbacks = [event for event in events["playback_completeness_channel"] for value in event.eventTexts if value.name == "status" and value.value == "INCOMPLETE"]
+    incomplete_playbacks = [event for event in events["playback_completeness_channel"] if s2vboa_functions.get_event_values(event, text_names = ["status"])["status"] == "INCOMPLETE"]
     incomplete_planned_playback_uuids = [link.event_uuid_link for event in incomplete_playbacks for link in event.eventLinks if link.name == "PLANNED_PLAYBACK"]
     unique_incomplete_planned_playback_uuids = set(incomplete_planned_playback_uuids)
     events["planned_playbacks_gaps_reception"] = [event for event in events["playback"] if event.event_uuid in unique_incomplete_planned_playback_uuids]
@@ -368,4 +376,163 @@ def query_acquisition_events(start_filter = None, stop_filter = None, mission =
                                                                        "value": {"op": "!=", "filter": "OK"}
                                                      }])
 
+    # Load the relationships used by the view in bulk
+    s2vboa_functions.eager_load_events(query, [event for key in events for event in events[key]], "acquisition")
+
+    # Build the view model of the playbacks, so the templates do not join the events per row
+    build_acquisition_view_model(events)
+
     return events
+
+def get_playback_status(received, completeness_events):
+    """
+    Method to obtain the status of a planned playback (MISSING, RECEIVED, PARTIAL or GAPS) and its class in the views
+
+    :param received: flag indicating if the planned playback is linked to a playback validity
+    :type received: bool
+    :param completeness_events: completeness events of the planned playback
+    :type completeness_events: list
+
+    :return: tuple with the status and its class
+    :rtype: tuple
+    """
+    if not received:
+        return ("MISSING", "bold-red")
+    # end if
+    statuses = set([s2vboa_functions.get_event_values(event, text_names = ["status"])["status"] for event in completeness_events])
+    if "MISSING" in statuses:
+        return ("PARTIAL", "bold-red")
+    elif "INCOMPLETE" in statuses:
+        return ("GAPS", "bold-orange")
+    # end if
+
+    return ("RECEIVED", "bold-green")
+
+def build_acquisition_view_model(events):
+    """
+    Method to attach to each planned playback its correction, completeness, validity, gaps,
+    station report and schedules, indexed by UUID.
+    The following entries are added to the events:
+    - playbacks: rows of the planned playbacks indexed by the UUID of the planned playback (in the order of the corrections)
+    - missing_playbacks: rows of the missing or partial playbacks (sorted by start descending)
+    - completeness_rows: rows of the timeline and the map ({"event": event shown, "playback": row of the planned playback})
+    indexed by status (RECEIVED, INCOMPLETE and MISSING, including the corrections of the playbacks not received)
+    - unmatched_completeness: completeness events whose planned playback is not in the list of playbacks (not shown by the timeline and the map)
+
+    :param events: events returned by query_acquisition_events
+    :type events: dict
+    """
+    playbacks_by_uuid = s2vboa_functions.index_events(events["playback"])
+    completeness_by_uuid = s2vboa_functions.index_events(events["playback_completeness_channel"])
+    station_reports_by_uuid = s2vboa_functions.index_events(events["station_report"])
+    station_schedules_by_uuid = s2vboa_functions.index_events(events["station_schedule"])
+    dfep_schedules_by_uuid = s2vboa_functions.index_events(events["dfep_schedule"])
+    slot_requests_by_uuid = s2vboa_functions.index_events(events["slot_request_edrs"])
+    # Validities indexed by UUID with their position, to keep the order of the list in the joins
+    validities_by_uuid = {event.event_uuid: (i, event) for i, event in enumerate(events["playback_validity"])}
+    raw_isp_validities_by_explicit_ref = {}
+    for i, event in enumerate(events["raw_isp_validity_events_with_packet_status_nok"]):
+        raw_isp_validities_by_explicit_ref.setdefault(event.explicitRef.explicit_ref, []).append((i, event))
+    # end for
+    planned_playbacks_gaps_msi_uuids = set([event.event_uuid for event in events["planned_playbacks_gaps_msi"]])
+
+    playbacks = {}
+    for correction in events["playback_correction"]:
+        planned_playback_uuids = s2vboa_functions.get_linked_uuids(correction, "PLANNED_EVENT")
+        if len(planned_playback_uuids) == 0 or planned_playback_uuids[0] not in playbacks_by_uuid:
+            continue
+        # end if
+        playback = playbacks_by_uuid[planned_playback_uuids[0]]
+
+        row = {
+            "playback": playback,
+            "correction": correction,
+            "event_uuid": playback.event_uuid,
+            "start": correction.start.isoformat(),
+            "stop": correction.stop.isoformat(),
+            "duration": (correction.stop - correction.start).total_seconds(),
+            "gaps_msi": playback.event_uuid in planned_playbacks_gaps_msi_uuids
+        }
+        row.update(s2vboa_functions.get_event_values(playback, text_names = ["satellite", "station", "playback_type", "playback_mean"], double_names = ["start_orbit"]))
+        row["parameters"] = []
+        for event_object in playback.eventObjects:
+            if event_object.name == "parameters":
+                row["parameters"] = playback.get_structured_values(event_object.position, event_object.parent_level, event_object.parent_position)
+                break
+            # end if
+        # end for
+
+        # Validity and missing packets
+        validity_uuids = s2vboa_functions.get_linked_uuids(playback, "PLAYBACK_VALIDITY")
+        validities = sorted([validities_by_uuid[uuid] for uuid in validity_uuids if uuid in validities_by_uuid], key = lambda item: item[0])
+        row["playback_validity"] = None
+        if len(validity_uuids) > 0 and validity_uuids[0] in validities_by_uuid:
+            row["playback_validity"] = validities_by_uuid[validity_uuids[0]][1]
+        # end if
+        explicit_refs = []
+        for i, validity in validities:
+            if validity.explicitRef.explicit_ref not in explicit_refs:
+                explicit_refs.append(validity.explicitRef.explicit_ref)
+            # end if
+        # end for
+        row["playback_validity_explicit_refs"] = explicit_refs
+        raw_isp_validities = sorted([item for explicit_ref in explicit_refs for item in raw_isp_validities_by_explicit_ref.get(explicit_ref, [])], key = lambda item: item[0])
+        row["raw_isp_validities_with_packet_status_nok"] = [event for i, event in raw_isp_validities]
+        row["missing_packets"] = sum([value.value for event in row["raw_isp_validities_with_packet_status_nok"] for value in event.eventDoubles if value.name == "diff_expected_received"])
+
+        # Completeness
+        row["playback_completeness"] = [completeness_by_uuid[uuid] for uuid in s2vboa_functions.get_linked_uuids(playback, "PLAYBACK_COMPLETENESS") if uuid in completeness_by_uuid]
+        (row["playback_status"], row["playback_status_class"]) = get_playback_status(len(validity_uuids) > 0, row["playback_completeness"])
+
+        # Station report
+        station_report_uuids = [uuid for uuid in s2vboa_functions.get_linked_uuids(playback, "STATION_ACQUISITION_REPORT") if uuid in station_reports_by_uuid]
+        row["station_report"] = station_reports_by_uuid[station_report_uuids[0]] if len(station_report_uuids) > 0 else None
+
+        # Schedules (the slot request of EDRS replaces the station and DFEP schedules)
+        slot_request_uuids = s2vboa_functions.get_linked_uuids(playback, "SLOT_REQUEST_EDRS")
+        slot_request = slot_requests_by_uuid.get(slot_request_uuids[0]) if len(slot_request_uuids) > 0 else None
+        for (schedule, schedules_by_uuid) in [("station_schedule", station_schedules_by_uuid), ("dfep_schedule", dfep_schedules_by_uuid)]:
+            schedule_uuids = s2vboa_functions.get_linked_uuids(playback, schedule.upper())
+            if len(schedule_uuids) > 0:
+                row[schedule] = schedules_by_uuid.get(schedule_uuids[0])
+            else:
+                row[schedule] = slot_request
+            # end if
+            (row[schedule + "_status"], row[schedule + "_status_class"]) = ("OK", "bold-green") if row[schedule] != None else ("MISSING", "bold-red")
+        # end for
+
+        playbacks[playback.event_uuid] = row
+    # end for
+    events["playbacks"] = playbacks
+
+    # Playbacks missing (completeness MISSING or not received at all)
+    missing_playback_uuids = set()
+    completeness_rows = {"RECEIVED": [], "INCOMPLETE": [], "MISSING": []}
+    unmatched_completeness = []
+    for event in events["playback_completeness_channel"]:
+        status = s2vboa_functions.get_event_values(event, text_names = ["status"])["status"]
+        planned_playback_uuids = s2vboa_functions.get_linked_uuids(event, "PLANNED_PLAYBACK")
+        if status == "MISSING":
+            missing_playback_uuids.update(planned_playback_uuids)
+        # end if
+        if len(planned_playback_uuids) == 0 or planned_playback_uuids[0] not in playbacks:
+            unmatched_completeness.append(event)
+        elif status in completeness_rows:
+            completeness_rows[status].append({"event": event, "playback": playbacks[planned_playback_uuids[0]]})
+        # end if
+    # end for
+    if len(unmatched_completeness) > 0:
+        current_app.logger.debug("{} completeness events are not linked to the planned playbacks of the acquisition view: {}".format(len(unmatched_completeness), ", ".join([str(event.event_uuid) for event in unmatched_completeness])))
+    # end if
+    events["unmatched_completeness"] = unmatched_completeness
+    for row in playbacks.values():
+        if not any([link.name == "PLAYBACK_VALIDITY" for link in row["playback"].eventLinks]):
+            missing_playback_uuids.add(row["event_uuid"])
+            completeness_rows["MISSING"].append({"event": row["correction"], "playback": row})
+        # end if
+    # end for
+    events["completeness_rows"] = completeness_rows
+
+    missing_playbacks = [playbacks[event.event_uuid] for event in events["playback"] if event.event_uuid in missing_playback_uuids and event.event_uuid in playbacks]
+    missing_playbacks.sort(key = lambda row: row["playback"].start, reverse = True)
+    events["missing_playbacks"] = missing_playbacks
@@ -0,0 +1,253 @@
+"""
+Helper module for caching the renderings of the views of Sentinel-2
+
+The renderings are kept in a process wide LRU cache keyed by the view, the window and the parameters
+of the request (mission, what to show, sliding window, offset and limit...). The windows of the sliding
+views are rounded outwards to the configured granularity, so that the refreshes of the same window share
+the rendering. A rendering is discarded when the sources of the DIM signatures shown by the view and
+overlapping the window change (new sources or progress of their ingestion). The changes of data coming
+from other DIM signatures or from sources not overlapping the window (e.g. annotations of explicit references
+ingested later) are not detected, so the renderings can be outdated until they are evicted.
+For this reason the cache is disabled by default. It is configured in s2boa.json (VIEWS_CACHE/ENABLED,
+VIEWS_CACHE/MAX_ENTRIES and VIEWS_CACHE/GRANULARITY), loaded once per process and reloaded when the file changes
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import json
+import math
+import datetime
+import threading
+from collections import OrderedDict
+from dateutil import parser
+
+# Import SQLAlchemy utilities
+from sqlalchemy import or_
+
+# Import datamodel
+from eboa.datamodel.sources import Source
+from eboa.datamodel.dim_signatures import DimSignature
+
+# Default maximum number of renderings kept in the cache
+DEFAULT_MAX_ENTRIES = 64
+
+# Default granularity of the windows of the sliding views (seconds)
+DEFAULT_GRANULARITY = 60
+
+# DIM signatures (prefixes of the names) of the sources of the events shown by each view
+VIEW_DIM_SIGNATURES = {
+    "planning": ["NPPF_", "CORRECTED_NPPF_", "ORBPRE", "STATION_SCHEDULE_", "DFEP_SCHEDULE_", "SLOT_REQUEST_EDRS"],
+    "acquisition": ["NPPF_", "CORRECTED_NPPF_", "ORBPRE", "STATION_SCHEDULE_", "DFEP_SCHEDULE_", "SLOT_REQUEST_EDRS", "RECEPTION_", "STATION_REPORT_"],
+    "hktm_workflow": ["NPPF_", "CORRECTED_NPPF_", "ORBPRE", "RECEPTION_", "STATION_REPORT_", "PROCESSING_", "ARCHIVING", "CIRCULATION"],
+    "sensing_data_volumes": ["PROCESSING_", "INDEXING_", "ARCHIVING", "CATALOGING", "ORBPRE"],
+    "archive_data_volumes": ["PROCESSING_", "INDEXING_", "ARCHIVING", "CATALOGING", "ORBPRE"]
+}
+
+EPOCH = datetime.datetime(2000, 1, 1)
+
+class ViewsCache():
+    """
+    Process wide LRU cache of the renderings of the views keyed by view, window and parameters
+    """
+
+    def __init__(self, max_entries = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Tuples (token, rendering) indexed by key (in order of use)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, token):
+        """
+        Method to obtain the rendering kept for the key
+        The rendering is discarded if it was obtained from other sources
+
+        :param key: key of the rendering
+        :type key: tuple
+        :param token: identifier of the sources available in the DDBB for the rendering
+        :type token: frozenset
+
+        :return: rendering or None if it is not available
+        :rtype: str
+        """
+        with self.lock:
+            if not key in self.entries:
+                return None
+            # end if
+            (entry_token, rendering) = self.entries[key]
+            if entry_token != token:
+                del self.entries[key]
+                return None
+            # end if
+            self.entries.move_to_end(key)
+        # end with
+
+        return rendering
+
+    def put(self, key, token, rendering):
+        """
+        Method to keep a rendering evicting the least recently used ones when the cache is full
+        """
+        with self.lock:
+            self.entries[key] = (token, rendering)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last = False)
+            # end while
+        # end with
+
+    def invalidate(self, view = None):
+        """
+        Method to remove the renderings of a view (all of them if view is None)
+
+        :param view: name of the view (see VIEW_DIM_SIGNATURES)
+        :type view: str
+        """
+        with self.lock:
+            for key in [key for key in self.entries if view == None or key[0] == view]:
+                del self.entries[key]
+            # end for
+        # end with
+
+    def __len__(self):
+        return len(self.entries)
+
+views_cache = None
+views_cache_lock = threading.Lock()
+
+def get_views_cache(max_entries = DEFAULT_MAX_ENTRIES):
+    """
+    Method to obtain the process wide cache of renderings of the views
+
+    :param max_entries: maximum number of renderings (used only when the cache is created)
+    :type max_entries: int
+
+    :return: views_cache
+    :rtype: ViewsCache
+    """
+    global views_cache
+    with views_cache_lock:
+        if views_cache == None:
+            views_cache = ViewsCache(max_entries)
+        # end if
+    # end with
+
+    return views_cache
+
+def get_views_cache_conf():
+    """
+    Method to obtain the configuration of the cache (VIEWS_CACHE in s2boa.json, disabled by default)
+
+    :return: tuple with the status of the cache, the maximum number of renderings and the granularity of the windows
+    :rtype: tuple
+    """
+    # The configuration is shared with the ingestions, so their helpers are imported when the configuration is requested
+    import s2boa.ingestions.functions as functions
+
+    cache_conf = functions.get_s2boa_conf().get("VIEWS_CACHE", {})
+
+    return (cache_conf.get("ENABLED", False), cache_conf.get("MAX_ENTRIES", DEFAULT_MAX_ENTRIES), cache_conf.get("GRANULARITY", DEFAULT_GRANULARITY))
+
+def round_date(date, granularity, up = False):
+    """
+    Method to round a date to the granularity
+
+    :param date: date in ISO 8601 format
+    :type date: str
+    :param granularity: granularity (seconds)
+    :type granularity: float
+    :param up: flag to round up (round down otherwise)
+    :type up: bool
+
+    :return: rounded date in ISO 8601 format
+    :rtype: str
+    """
+    seconds = (parser.parse(date) - EPOCH).total_seconds() / granularity
+    if up:
+        seconds = math.ceil(seconds)
+    else:
+        seconds = math.floor(seconds)
+    # end if
+
+    return (EPOCH + datetime.timedelta(seconds = seconds * granularity)).isoformat()
+
+def round_window(start_filter, stop_filter, granularity):
+    """
+    Method to round outwards the window of a view to the granularity
+    The start filter limits the start of the events (upper limit of the window) and
+    the stop filter limits the stop of the events (lower limit of the window)
+
+    :return: tuple with the rounded start and stop filters
+    :rtype: tuple
+    """
+    start_filter = dict(start_filter, date = round_date(start_filter["date"], granularity, up = True))
+    stop_filter = dict(stop_filter, date = round_date(stop_filter["date"], granularity))
+
+    return (start_filter, stop_filter)
+
+def get_sources_token(query, view, start, stop):
+    """
+    Method to obtain the identifier of the sources of the DIM signatures shown by the view overlapping the window
+
+    :param query: query interface
+    :type query: Query
+    :param view: name of the view (see VIEW_DIM_SIGNATURES)
+    :type view: str
+    :param start: start of the window in ISO 8601 format
+    :type start: str
+    :param stop: stop of the window in ISO 8601 format
+    :type stop: str
+
+    :return: set of tuples (source uuid, progress of the ingestion)
+    :rtype: frozenset
+    """
+    sources = query.session.query(Source.source_uuid, Source.processor_progress).join(DimSignature).filter(or_(*[DimSignature.dim_signature.like(name + "%") for name in VIEW_DIM_SIGNATURES[view]]),
+                                                                                                         Source.validity_start <= stop,
+                                                                                                         Source.validity_stop >= start).all()
+
+    return frozenset([(str(source_uuid), processor_progress) for (source_uuid, processor_progress) in sources])
+
+def render_view(view, query, start_filter, stop_filter, parameters, render, round_window_to_granularity = False):
+    """
+    Method to obtain the rendering of a view from the cache, rendering it when it is not available
+
+    :param view: name of the view (see VIEW_DIM_SIGNATURES)
+    :type view: str
+    :param query: query interface
+    :type query: Query
+    :param start_filter: filter on the start of the events (upper limit of the window)
+    :type start_filter: dict
+    :param stop_filter: filter on the stop of the events (lower limit of the window)
+    :type stop_filter: dict
+    :param parameters: rest of parameters of the request determining the rendering
+    :type parameters: dict
+    :param render: function rendering the view for the window (receives the start and stop filters)
+    :type render: function
+    :param round_window_to_granularity: flag to round the window to the configured granularity (for the windows relative to the current time)
+    :type round_window_to_granularity: bool
+
+    :return: rendering
+    :rtype: str
+    """
+    (enabled, max_entries, granularity) = get_views_cache_conf()
+    if not enabled:
+        return render(start_filter, stop_filter)
+    # end if
+
+    if round_window_to_granularity:
+        (start_filter, stop_filter) = round_window(start_filter, stop_filter, granularity)
+    # end if
+
+    key = (view, start_filter["date"], stop_filter["date"], json.dumps(parameters, sort_keys = True, default = str))
+    # The token is obtained before rendering, so the sources ingested meanwhile discard the rendering in the next request
+    token = get_sources_token(query, view, stop_filter["date"], start_filter["date"])
+
+    cache = get_views_cache(max_entries)
+    rendering = cache.get(key, token)
+    if rendering == None:
+        rendering = render(start_filter, stop_filter)
+        cache.put(key, token, rendering)
+    # end if
+
+    return rendering
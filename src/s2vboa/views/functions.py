@@ -8,9 +8,120 @@ module s2vboa
 # Import python utilities
 import sys
 import json
+import threading
 import datetime
 from dateutil import parser
 
+# Import SQLAlchemy loading strategies
+from sqlalchemy.orm import selectinload
+
+# Import datamodel
+from eboa.datamodel.events import Event
+
+# Import helpers for accessing the values of the events
+import s2boa.ingestions.event_values as event_values
+
+# Relationships of the events used by the views showing the values of the events
+EVENT_RELATIONSHIPS = ["gauge", "source", "explicitRef", "eventTexts", "eventDoubles", "eventTimestamps", "eventObjects", "eventGeometries", "eventLinks"]
+
+# Relationships of the annotations of the explicit references used by the views showing them
+ANNOTATION_RELATIONSHIPS = ["explicitRef.annotations.annotationCnf", "explicitRef.annotations.annotationTexts", "explicitRef.annotations.annotationDoubles", "explicitRef.annotations.annotationTimestamps", "explicitRef.annotations.annotationGeometries"]
+
+# Eager loading profiles: relationships (paths from the event) touched by the templates of each view
+EAGER_LOADING_PROFILES = {
+    "orbpre": ["gauge", "eventTexts", "eventDoubles"],
+    "planning": EVENT_RELATIONSHIPS,
+    "acquisition": EVENT_RELATIONSHIPS,
+    "hktm_workflow": EVENT_RELATIONSHIPS + ANNOTATION_RELATIONSHIPS,
+    "data_volumes": EVENT_RELATIONSHIPS + ANNOTATION_RELATIONSHIPS
+}
+
+# Maximum number of events loaded per statement
+EAGER_LOADING_CHUNK = 1000
+
+class LazyInstance():
+    """
+    Instance created on first use (e.g. Query or Engine), so that importing the views does not connect to the DDBB
+    """
+
+    def __init__(self, factory):
+        """
+        :param factory: class or function creating the instance
+        :type factory: callable
+        """
+        self.factory = factory
+        self.instance = None
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self.instance == None:
+            # The requests served by several threads create a single instance
+            with self.lock:
+                if self.instance == None:
+                    self.instance = self.factory()
+                # end if
+            # end with
+        # end if
+
+        return getattr(self.instance, name)
+
+def get_loader_options(profile):
+    """
+    Method to obtain the loader options of the relationships of an eager loading profile
+
+    :param profile: name of the profile (see EAGER_LOADING_PROFILES)
+    :type profile: str
+
+    :return: list of selectin loaders
+    :rtype: list
+    """
+    options = []
+    for path in EAGER_LOADING_PROFILES[profile]:
+        entity = Event
+        loader = None
+        for name in path.split("."):
+            attribute = getattr(entity, name)
+            if loader == None:
+                loader = selectinload(attribute)
+            else:
+                loader = loader.selectinload(attribute)
+            # end if
+            entity = attribute.property.mapper.class_
+        # end for
+        options.append(loader)
+    # end for
+
+    return options
+
+def eager_load_events(query, events, profile):
+    """
+    Method to load in bulk the relationships of the events touched by the templates of a view,
+    so the rendering does not lazy load them per event (one statement per relationship and event).
+    The relationships are loaded with one statement per relationship and chunk of events
+    into the instances already present in the session of the query.
+
+    :param query: query interface owning the session of the events
+    :type query: Query
+    :param events: events to load
+    :type events: list
+    :param profile: name of the profile (see EAGER_LOADING_PROFILES)
+    :type profile: str
+
+    :return: events
+    :rtype: list
+    """
+    event_uuids = list(set([event.event_uuid for event in events]))
+    if len(event_uuids) == 0:
+        return events
+    # end if
+
+    options = get_loader_options(profile)
+    for i in range(0, len(event_uuids), EAGER_LOADING_CHUNK):
+        query.session.query(Event).filter(Event.event_uuid.in_(event_uuids[i:i + EAGER_LOADING_CHUNK])).options(*options).populate_existing().all()
+    # end for
+
+    return events
+
 def query_orbpre_events(query, current_app, start_filter = None, stop_filter = None, mission = None, limit = None, offset = None, descending = False):
     """
     Query predicted orbit events.
@@ -54,6 +165,8 @@ def query_orbpre_events(query, current_app, start_filter = None, stop_filter = N
     kwargs["gauge_names"] = {"filter": ["ORBIT_PREDICTION"], "op": "in"}
     events = query.get_events(**kwargs)
 
+    eager_load_events(query, events, "orbpre")
+
     return events
 
 def get_start_stop_filters(query, current_app, request, window_size, mission, filters):
@@ -140,3 +253,118 @@ def get_start_stop_filters(query, current_app, request, window_size, mission, fi
     # end if
 
     return start_filter, stop_filter
+
+def get_event_values(event, text_names = [], double_names = []):
+    """
+    Method to extract the values of an event once, instead of looking them up in the templates
+    The first value with each name is taken. The missing text values are set to "" and the missing
+    double values to 0 (as rendered by the filters string and int of the templates)
+
+    :param event: event
+    :type event: Event
+    :param text_names: names of the text values to extract
+    :type text_names: list
+    :param double_names: names of the double values to extract (converted to integer)
+    :type double_names: list
+
+    :return: values indexed by name
+    :rtype: dict
+    """
+    # The values of each type are indexed by name once (see s2boa.ingestions.event_values)
+    texts = event_values.index_values(event, ["text"]) if len(text_names) > 0 else {}
+    doubles = event_values.index_values(event, ["double"]) if len(double_names) > 0 else {}
+    values = {name: str(texts[name]) if name in texts else "" for name in text_names}
+    values.update({name: int(doubles[name]) if name in doubles else 0 for name in double_names})
+
+    return values
+
+def build_event_rows(linked_events, text_names = [], double_names = [], object_names = []):
+    """
+    Method to build the rows shown by the views for the prime events of a query of linked events
+    Each row contains the prime event, the event to show (the event linked as TIME_CORRECTION, with the
+    times corrected with the latest predicted orbit information, or the prime event if it is not corrected),
+    its period and the values of the prime event, so the templates only iterate over the rows
+
+    :param linked_events: linked events ({"prime_events": list, "linked_events": list} as returned by get_linked_events)
+    :type linked_events: dict
+    :param text_names: names of the text values to extract (see get_event_values)
+    :type text_names: list
+    :param double_names: names of the double values to extract (see get_event_values)
+    :type double_names: list
+    :param object_names: names of the objects to extract as structured values (empty list if missing)
+    :type object_names: list
+
+    :return: rows indexed by the UUID of the prime event (in the order of the prime events)
+    :rtype: dict
+    """
+    linked_events_by_uuid = {event.event_uuid: event for event in linked_events["linked_events"]}
+
+    rows = {}
+    for prime_event in linked_events["prime_events"]:
+        event = prime_event
+        for link in prime_event.eventLinks:
+            if link.name == "TIME_CORRECTION":
+                event = linked_events_by_uuid.get(link.event_uuid_link, prime_event)
+                break
+            # end if
+        # end for
+
+        row = {
+            "prime_event": prime_event,
+            "event": event,
+            "event_uuid": prime_event.event_uuid,
+            "start": event.start.isoformat(),
+            "stop": event.stop.isoformat(),
+            "duration": (event.stop - event.start).total_seconds()
+        }
+        row.update(get_event_values(prime_event, text_names, double_names))
+
+        for object_name in object_names:
+            row[object_name] = []
+            for event_object in prime_event.eventObjects:
+                if event_object.name == object_name:
+                    row[object_name] = prime_event.get_structured_values(event_object.position, event_object.parent_level, event_object.parent_position)
+                    break
+                # end if
+            # end for
+        # end for
+
+        rows[prime_event.event_uuid] = row
+    # end for
+
+    return rows
+
+def index_events(events):
+    """
+    Method to index events by UUID, so the joins of the views are resolved with O(1) lookups
+
+    :param events: list of events
+    :type events: list
+
+    :return: events indexed by UUID
+    :rtype: dict
+    """
+
+    return {event.event_uuid: event for event in events}
+
+def get_linked_uuids(event, link_name_prefix):
+    """
+    Method to obtain the UUIDs of the events linked by an event with links named starting with the given prefix
+    (as selected in the templates with selectattr("name", "match", link_name_prefix))
+
+    :param event: event
+    :type event: Event
+    :param link_name_prefix: prefix of the name of the links
+    :type link_name_prefix: str
+
+    :return: UUIDs of the linked events (without duplicates, in the order of the links)
+    :rtype: list
+    """
+    uuids = []
+    for link in event.eventLinks:
+        if link.name.startswith(link_name_prefix) and link.event_uuid_link not in uuids:
+            uuids.append(link.event_uuid_link)
+        # end if
+    # end for
+
+    return uuids
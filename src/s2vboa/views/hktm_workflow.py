@@ -20,12 +20,15 @@ from flask import jsonify
 from eboa.engine.query import Query
 import eboa.engine.engine as eboa_engine
 from eboa.engine.engine import Engine
+import eboa.ingestion.functions as ingestion_functions
 
 # Import views functions
 from s2vboa.views import functions as s2vboa_functions
+from s2vboa.views import cache as views_cache
 
 bp = Blueprint("hktm_workflow", __name__, url_prefix="/views")
-query = Query()
+# The connection to the DDBB is created on the first request
+query = s2vboa_functions.LazyInstance(Query)
 
 @bp.route("/hktm-workflow", methods=["GET", "POST"])
 def show_hktm_workflow():
@@ -176,29 +179,35 @@ def show_sliding_hktm_workflow():
 
 def query_hktm_workflow_and_render(start_filter = None, stop_filter = None, mission = None, sliding_window = None, filters = None):
 
-    # Set offset and limit for the query
-    offset = None
-    if filters and "offset" in filters and filters["offset"][0] != "":
-        offset = filters["offset"][0]
-    # end if
-    limit = None
-    if filters and "limit" in filters and filters["limit"][0] != "":
-        limit = filters["limit"][0]
-    # end if
+    def render(start_filter, stop_filter):
+
+        # Set offset and limit for the query
+        offset = None
+        if filters and "offset" in filters and filters["offset"][0] != "":
+            offset = filters["offset"][0]
+        # end if
+        limit = None
+        if filters and "limit" in filters and filters["limit"][0] != "":
+            limit = filters["limit"][0]
+        # end if
     
-    orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+        orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+
+        descending = True
+        orbpre_events_limit = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission, limit, offset, descending)
 
-    descending = True
-    orbpre_events_limit = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission, limit, offset, descending)
+        reporting_start = stop_filter["date"]
+        reporting_stop = start_filter["date"]
 
-    reporting_start = stop_filter["date"]
-    reporting_stop = start_filter["date"]
+        hktm_workflow_events = query_hktm_workflow_events(orbpre_events_limit, filters)
 
-    hktm_workflow_events = query_hktm_workflow_events(orbpre_events_limit, filters)
+        route = "views/hktm_workflow/hktm_workflow.html"
 
-    route = "views/hktm_workflow/hktm_workflow.html"
+        return render_template(route, hktm_workflow_events=hktm_workflow_events, orbpre_events=orbpre_events, orbpre_events_limit=orbpre_events_limit, request=request, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+    # end def
 
-    return render_template(route, hktm_workflow_events=hktm_workflow_events, orbpre_events=orbpre_events, orbpre_events_limit=orbpre_events_limit, request=request, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+    # The renderings are cached, rounding the windows relative to the current time (sliding windows)
+    return views_cache.render_view("hktm_workflow", query, start_filter, stop_filter, {"mission": mission, "sliding_window": sliding_window, "filters": filters, "path": request.path}, render, round_window_to_granularity = sliding_window != None)
 
 def query_hktm_workflow_events(orbpre_events, filters = None):
     """
@@ -264,5 +273,97 @@ def query_hktm_workflow_events(orbpre_events, filters = None):
         events["distribution_status"] += planned_playback_events["linking_events"]["DISTRIBUTION_STATUS"]
         events["dfep_acquisition_validity"] += planned_playback_events["linking_events"]["DFEP_ACQUISITION_VALIDITY"]
     # end for
-        
+
+    # Load the relationships used by the view in bulk
+    s2vboa_functions.eager_load_events(query, [event for key in events for event in events[key]], "hktm_workflow")
+
+    # Build the view model of the playbacks, so the templates do not join the events per row
+    build_hktm_workflow_view_model(events, orbpre_events)
+
     return events
+
+def get_linked_events(event, link_name, events_by_uuid):
+    """
+    Method to obtain the events linked by an event through the links with the given name (in the order of the list of events)
+    """
+    linked_events = [events_by_uuid[uuid] for uuid in s2vboa_functions.get_linked_uuids(event, link_name) if uuid in events_by_uuid]
+
+    return [event for i, event in sorted(linked_events, key = lambda item: item[0])]
+
+def build_hktm_workflow_view_model(events, orbpre_events):
+    """
+    Method to attach to each planned playback its HKTM productions, station report,
+    distribution status and predicted orbit, indexed by UUID.
+    The following entries are added to the events:
+    - playbacks: rows of the planned playbacks indexed by the UUID of the planned playback
+    - orbpre_playbacks: rows of the planned playbacks indexed by the UUID of the predicted orbit intersecting them
+    - unmatched_events: HKTM productions, station reports and distribution statuses not linked by the planned playbacks,
+    indexed by the name of their list (not shown by the view)
+
+    :param events: events returned by query_hktm_workflow_events
+    :type events: dict
+    :param orbpre_events: predicted orbit events
+    :type orbpre_events: list
+    """
+    # Events indexed by UUID with their position, to keep the order of the lists in the joins
+    hktm_productions_by_uuid = {event.event_uuid: (i, event) for i, event in enumerate(events["hktm_production"])}
+    station_reports_by_uuid = {event.event_uuid: (i, event) for i, event in enumerate(events["station_report"])}
+    distribution_statuses_by_uuid = {event.event_uuid: (i, event) for i, event in enumerate(events["distribution_status"])}
+
+    playbacks = {}
+    for playback in events["playback"]:
+        row = {
+            "playback": playback,
+            "hktm_production": get_linked_events(playback, "HKTM_PRODUCTION", hktm_productions_by_uuid),
+            "distribution_status": get_linked_events(playback, "DISTRIBUTION_STATUS", distribution_statuses_by_uuid),
+            "orbpre_event": None
+        }
+        row.update(s2vboa_functions.get_event_values(playback, text_names = ["satellite"], double_names = ["start_orbit"]))
+        station_reports = get_linked_events(playback, "STATION_ACQUISITION_REPORT", station_reports_by_uuid)
+        row["station_report"] = None
+        row["comments"] = ""
+        if len(station_reports) > 0:
+            row["station_report"] = station_reports[0]
+            row["comments"] = s2vboa_functions.get_event_values(station_reports[0], text_names = ["comments"])["comments"]
+        # end if
+        playbacks[playback.event_uuid] = row
+    # end for
+    events["playbacks"] = playbacks
+
+    # Events not linked by the planned playbacks
+    linked_uuids = set()
+    for playback in events["playback"]:
+        for link_name in ["HKTM_PRODUCTION", "STATION_ACQUISITION_REPORT", "DISTRIBUTION_STATUS"]:
+            linked_uuids.update(s2vboa_functions.get_linked_uuids(playback, link_name))
+        # end for
+    # end for
+    unmatched_events = {}
+    for name in ["hktm_production", "station_report", "distribution_status"]:
+        unmatched_events[name] = [event for event in events[name] if event.event_uuid not in linked_uuids]
+        if len(unmatched_events[name]) > 0:
+            current_app.logger.debug("{} events of {} are not linked to the planned playbacks of the HKTM workflow view: {}".format(len(unmatched_events[name]), name, ", ".join([str(event.event_uuid) for event in unmatched_events[name]])))
+        # end if
+    # end for
+    events["unmatched_events"] = unmatched_events
+
+    # Intersect the playbacks with the predicted orbits of the same satellite once,
+    # taking the first intersecting event on each side
+    orbpre_events_by_uuid = s2vboa_functions.index_events(orbpre_events)
+    orbpre_playbacks = {}
+    satellites = set([row["satellite"] for row in playbacks.values()])
+    orbpre_satellites = {event.event_uuid: s2vboa_functions.get_event_values(event, text_names = ["satellite"])["satellite"] for event in orbpre_events}
+    for satellite in satellites:
+        playback_segments = [{"id": row["playback"].event_uuid, "start": row["playback"].start, "stop": row["playback"].stop} for row in playbacks.values() if row["satellite"] == satellite]
+        orbpre_segments = [{"id": event.event_uuid, "start": event.start, "stop": event.stop} for event in orbpre_events if orbpre_satellites[event.event_uuid] == satellite]
+        for segment in ingestion_functions.intersect_timelines(playback_segments, orbpre_segments):
+            row = playbacks[segment["id1"]]
+            orbpre_event = orbpre_events_by_uuid[segment["id2"]]
+            if row["orbpre_event"] == None or orbpre_event.start < row["orbpre_event"].start:
+                row["orbpre_event"] = orbpre_event
+            # end if
+            if segment["id2"] not in orbpre_playbacks or row["playback"].start < orbpre_playbacks[segment["id2"]]["playback"].start:
+                orbpre_playbacks[segment["id2"]] = row
+            # end if
+        # end for
+    # end for
+    events["orbpre_playbacks"] = orbpre_playbacks
@@ -23,9 +23,11 @@ from eboa.engine.engine import Engine
 
 # Import views functions
 from s2vboa.views import functions as s2vboa_functions
+from s2vboa.views import cache as views_cache
 
 bp = Blueprint("planning", __name__, url_prefix="/views")
-query = Query()
+# The connection to the DDBB is created on the first request
+query = s2vboa_functions.LazyInstance(Query)
 
 @bp.route("/planning", methods=["GET", "POST"])
 def show_planning():
@@ -218,18 +220,25 @@ def define_what_to_show_planning(show):
 
 def query_planning_and_render(start_filter = None, stop_filter = None, mission = None, show = None, sliding_window = None, filters = None):
 
-    planning_events = query_planning_events(start_filter, stop_filter, mission, filters)
+    def render(start_filter, stop_filter):
 
-    orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+        planning_events = query_planning_events(start_filter, stop_filter, mission, filters)
 
-    reporting_start = stop_filter["date"]
-    reporting_stop = start_filter["date"]
+        orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
 
-    return render_template("views/planning/planning.html", planning_events=planning_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+        reporting_start = stop_filter["date"]
+        reporting_stop = start_filter["date"]
+
+        return render_template("views/planning/planning.html", planning_events=planning_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+    # end def
+
+    # The renderings are cached, rounding the windows relative to the current time (sliding windows)
+    return views_cache.render_view("planning", query, start_filter, stop_filter, {"mission": mission, "show": show, "sliding_window": sliding_window, "filters": filters, "path": request.path}, render, round_window_to_granularity = sliding_window != None)
 
 def query_planning_events(start_filter = None, stop_filter = None, mission = None, filters = None):
     """
     Query planning events.
+    The imaging and playback events contain the rows of the view indexed by the UUID of the planned event (see build_event_rows).
     """
     current_app.logger.debug("Query planning events")
 
@@ -293,6 +302,14 @@ def query_planning_events(start_filter = None, stop_filter = None, mission = Non
     kwargs_playback["link_names"] = {"filter": ["PLANNED_EVENT"], "op": "in"}
     playback_events = query.get_linked_events(**kwargs_playback)
 
+    # Load the relationships used by the view in bulk
+    s2vboa_functions.eager_load_events(query, imaging_events["prime_events"] + imaging_events["linked_events"] + playback_events["prime_events"] + playback_events["linked_events"], "planning")
+
+    # Build the rows shown by the view, so the template does not look up
+    # the corrected event and the values per row
+    imaging_events["rows"] = s2vboa_functions.build_event_rows(imaging_events, text_names = ["satellite", "imaging_mode", "record_type"], double_names = ["start_orbit"], object_names = ["parameters"])
+    playback_events["rows"] = s2vboa_functions.build_event_rows(playback_events, text_names = ["satellite", "station", "playback_type", "playback_mean"], double_names = ["start_orbit"], object_names = ["parameters"])
+
     events = {}
     events["imaging"] = imaging_events
     events["playback"] = playback_events
@@ -23,9 +23,11 @@ from eboa.engine.engine import Engine
 
 # Import views functions
 from s2vboa.views import functions as s2vboa_functions
+from s2vboa.views import cache as views_cache
 
 bp = Blueprint("sensing_data_volumes", __name__, url_prefix="/views")
-query = Query()
+# The connection to the DDBB is created on the first request
+query = s2vboa_functions.LazyInstance(Query)
 
 @bp.route("/sensing-data-volumes", methods=["GET", "POST"])
 def show_sensing_data_volumes():
@@ -211,14 +213,20 @@ def define_what_to_show_sensing_data_volumes(show):
 
 def query_datastrips_and_render(start_filter = None, stop_filter = None, mission = None, show = None, sliding_window = None, filters = None):
 
-    datastrip_events = query_datastrip_events(start_filter, stop_filter, mission, filters)
+    def render(start_filter, stop_filter):
 
-    orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
+        datastrip_events = query_datastrip_events(start_filter, stop_filter, mission, filters)
 
-    reporting_start = stop_filter["date"]
-    reporting_stop = start_filter["date"]
+        orbpre_events = s2vboa_functions.query_orbpre_events(query, current_app, start_filter, stop_filter, mission)
 
-    return render_template("views/sensing_data_volumes/sensing_data_volumes.html", datastrip_events=datastrip_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+        reporting_start = stop_filter["date"]
+        reporting_stop = start_filter["date"]
+
+        return render_template("views/sensing_data_volumes/sensing_data_volumes.html", datastrip_events=datastrip_events, orbpre_events=orbpre_events, request=request, show=show, reporting_start=reporting_start, reporting_stop=reporting_stop, sliding_window=sliding_window, filters = filters)
+    # end def
+
+    # The renderings are cached, rounding the windows relative to the current time (sliding windows)
+    return views_cache.render_view("sensing_data_volumes", query, start_filter, stop_filter, {"mission": mission, "show": show, "sliding_window": sliding_window, "filters": filters, "path": request.path}, render, round_window_to_granularity = sliding_window != None)
 
 def query_datastrip_events(start_filter = None, stop_filter = None, mission = None, filters = None):
     """
@@ -266,4 +274,7 @@ def query_datastrip_events(start_filter = None, stop_filter = None, mission = No
 
     events = query.get_events(**kwargs)
 
+    # Load the relationships used by the view in bulk
+    s2vboa_functions.eager_load_events(query, events, "data_volumes")
+
     return events
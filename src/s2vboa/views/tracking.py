@@ -21,15 +21,14 @@ from eboa.engine.query import Query
 import eboa.engine.engine as eboa_engine
 from eboa.engine.engine import Engine
 
-# Import s2boa functions
-from s2boa.ingestions import functions as s2boa_functions
-
 # Import views functions
 from s2vboa.views import functions as s2vboa_functions
+from s2vboa.views import tracking_cache
 
 bp = Blueprint("tracking", __name__, url_prefix="/views")
-query = Query()
-engine = Engine()
+# The connection to the DDBB is created on the first request
+query = s2vboa_functions.LazyInstance(Query)
+engine = s2vboa_functions.LazyInstance(Engine)
 
 @bp.route("/tracking", methods=["GET", "POST"])
 def show_tracking():
@@ -183,21 +182,8 @@ def query_tracking():
     
     for mission_to_track in missions:
 
-        events = [
-            {
-                "id": "COMPLETE",
-                "start": start,
-                "stop": stop
-            },
-            {
-                "id": "HEAD",
-                "start": (parser.parse(stop) - datetime.timedelta(seconds=30)).isoformat(),
-                "stop": stop
-            }            
-        ]
-        events_with_footprint = s2boa_functions.associate_footprints(events, mission_to_track, return_polygon_format = True)
-
-        trackings[mission_to_track] = events_with_footprint
+        # The footprints are obtained from the tiles cached for all the viewers (see tracking_cache)
+        trackings[mission_to_track] = tracking_cache.get_tracking(mission_to_track, start, stop, query)
     # end for
 
     return jsonify(trackings)
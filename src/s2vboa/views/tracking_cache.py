@@ -0,0 +1,309 @@
+"""
+Helper module for caching the footprints of the ground track of Sentinel-2 shown by the tracking view
+
+The footprints are obtained per satellite in segments: the tiles of fixed duration (TILE_DURATION,
+aligned to 2000-01-01) covered by the requested window and the partial tiles at its edges. The
+requested windows are rounded to GRANULARITY, so that the viewers polling the same window share
+all the segments, and only the segments not available yet (usually the partial tiles at the edges
+and the HEAD) are computed, with one execution of the footprint helpers per request.
+The segments are kept in a process wide LRU cache with the identifier of the ORBPRE sources covering
+the requested window (see get_orbpre_token in s2boa), and they are computed again when the ORBPRE
+sources change, so that the footprints follow the ingestion of new orbit predictions.
+The cache is configured in s2boa.json (TRACKING_CACHE/MAX_ENTRIES)
+
+Written by DEIMOS Space S.L. (dibb)
+
+module s2vboa
+"""
+# Import python utilities
+import math
+import datetime
+import threading
+from collections import OrderedDict
+from dateutil import parser
+
+# Duration of the tiles (seconds)
+TILE_DURATION = 600
+
+# Granularity of the requested windows (seconds)
+GRANULARITY = 10
+
+# Duration of the last part of the window shown as the current position of the satellite (seconds)
+HEAD_DURATION = 30
+
+# Maximum duration of the windows with footprint (the footprint helpers discard the segments of 100 minutes or more)
+MAX_WINDOW_DURATION = 0.0695 * 86400
+
+# Default maximum number of segments kept in the cache
+DEFAULT_MAX_ENTRIES = 1024
+
+EPOCH = datetime.datetime(2000, 1, 1)
+
+def round_date(date, granularity):
+    """
+    Method to round down a date to the granularity
+
+    :param date: date
+    :type date: datetime
+    :param granularity: granularity (seconds)
+    :type granularity: float
+
+    :return: rounded date
+    :rtype: datetime
+    """
+    return EPOCH + datetime.timedelta(seconds = math.floor((date - EPOCH).total_seconds() / granularity) * granularity)
+
+def get_segments(start, stop):
+    """
+    Method to split a window into the tiles it covers (the tiles at the edges are cut to the window)
+
+    :param start: start of the window
+    :type start: datetime
+    :param stop: stop of the window
+    :type stop: datetime
+
+    :return: list of tuples (start, stop)
+    :rtype: list
+    """
+    segments = []
+    tile_start = round_date(start, TILE_DURATION)
+    while tile_start < stop:
+        tile_stop = tile_start + datetime.timedelta(seconds = TILE_DURATION)
+        segments.append((max(start, tile_start), min(stop, tile_stop)))
+        tile_start = tile_stop
+    # end while
+
+    return segments
+
+def compute_footprints(satellite, segments):
+    """
+    Method to compute the footprints of the segments of a satellite with the footprint helpers of s2boa
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param segments: list of tuples (start, stop)
+    :type segments: list
+
+    :return: footprints (values of the events returned by associate_footprints) indexed by segment
+    :rtype: dict
+    """
+    # Import s2boa functions (the footprint helpers are loaded on the first request)
+    from s2boa.ingestions import functions as s2boa_functions
+
+    events = [{"id": str(i), "start": start.isoformat(), "stop": stop.isoformat()} for i, (start, stop) in enumerate(segments)]
+    events_with_footprint = s2boa_functions.associate_footprints(events, satellite, return_polygon_format = True)
+
+    return {segments[int(event["id"])]: event.get("values", []) for event in events_with_footprint}
+
+def get_orbpre_token(query, satellite, start, stop):
+    """
+    Method to obtain the identifier of the ORBPRE sources used for computing the footprints of a window
+    (the sources covering the window of the orbit prediction used by associate_footprints)
+
+    :param query: query interface
+    :type query: Query
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param start: start of the window
+    :type start: datetime
+    :param stop: stop of the window
+    :type stop: datetime
+
+    :return: set of identifiers of the ORBPRE sources
+    :rtype: frozenset
+    """
+    # Import s2boa functions (the footprint helpers are loaded on the first request)
+    from s2boa.ingestions import functions as s2boa_functions
+
+    return s2boa_functions.get_orbpre_token(query, satellite, start - s2boa_functions.ORBPRE_WINDOW_MARGIN, stop + s2boa_functions.ORBPRE_WINDOW_MARGIN)
+
+class TrackingCache():
+    """
+    Process wide LRU cache of the footprints of the segments of the ground track keyed by satellite and segment
+    """
+
+    def __init__(self, max_entries = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Tuples (ORBPRE token, footprints) indexed by (satellite, start, stop) (in order of use)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Locks serializing the computations of each satellite
+        self.satellite_locks = {}
+
+    def _get_satellite_lock(self, satellite):
+        with self.lock:
+            return self.satellite_locks.setdefault(satellite, threading.Lock())
+        # end with
+
+    def _get(self, key, token):
+        with self.lock:
+            if not key in self.entries:
+                return None
+            # end if
+            (entry_token, footprints) = self.entries[key]
+            if entry_token != token:
+                del self.entries[key]
+                return None
+            # end if
+            self.entries.move_to_end(key)
+        # end with
+
+        return footprints
+
+    def _put(self, key, token, footprints):
+        with self.lock:
+            self.entries[key] = (token, footprints)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last = False)
+            # end while
+        # end with
+
+    def get_footprints(self, satellite, segments, token, compute = compute_footprints):
+        """
+        Method to obtain the footprints of the segments of a satellite computing the ones not available
+        or computed from other ORBPRE sources
+        The computations of a satellite are serialized, so the concurrent requests of the same segments compute them once
+
+        :param satellite: satellite (S2A, S2B...)
+        :type satellite: str
+        :param segments: list of tuples (start, stop)
+        :type segments: list
+        :param token: identifier of the ORBPRE sources available in the DDBB for the segments (see get_orbpre_token)
+        :type token: frozenset
+        :param compute: function computing the footprints of a list of segments (see compute_footprints)
+        :type compute: function
+
+        :return: footprints indexed by segment
+        :rtype: dict
+        """
+        with self._get_satellite_lock(satellite):
+            footprints = {}
+            missing_segments = []
+            for segment in segments:
+                segment_footprints = self._get((satellite,) + segment, token)
+                if segment_footprints == None:
+                    missing_segments.append(segment)
+                else:
+                    footprints[segment] = segment_footprints
+                # end if
+            # end for
+
+            if len(missing_segments) > 0:
+                computed_footprints = compute(satellite, missing_segments)
+                for segment in missing_segments:
+                    footprints[segment] = computed_footprints.get(segment, [])
+                    # The segments without footprint (e.g. without orbit prediction) are computed again in the next request
+                    if len(footprints[segment]) > 0:
+                        self._put((satellite,) + segment, token, footprints[segment])
+                    # end if
+                # end for
+            # end if
+        # end with
+
+        return footprints
+
+    def invalidate(self, satellite = None):
+        """
+        Method to remove the segments of a satellite (all of them if satellite is None)
+
+        :param satellite: satellite (S2A, S2B...)
+        :type satellite: str
+        """
+        with self.lock:
+            for key in [key for key in self.entries if satellite == None or key[0] == satellite]:
+                del self.entries[key]
+            # end for
+        # end with
+
+    def __len__(self):
+        return len(self.entries)
+
+tracking_cache = None
+tracking_cache_lock = threading.Lock()
+
+def get_tracking_cache():
+    """
+    Method to obtain the process wide cache of footprints of the ground track (configured with TRACKING_CACHE in s2boa.json)
+
+    :return: tracking_cache
+    :rtype: TrackingCache
+    """
+    global tracking_cache
+    with tracking_cache_lock:
+        if tracking_cache == None:
+            # The configuration is shared with the ingestions, so their helpers are imported when the cache is created
+            import s2boa.ingestions.functions as functions
+
+            cache_conf = functions.get_s2boa_conf().get("TRACKING_CACHE", {})
+            tracking_cache = TrackingCache(cache_conf.get("MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        # end if
+    # end with
+
+    return tracking_cache
+
+def get_tracking(satellite, start, stop, query, cache = None, compute = compute_footprints, get_token = get_orbpre_token):
+    """
+    Method to obtain the tracking of a satellite: the window (COMPLETE) and its last 30 seconds (HEAD)
+    with their footprints, in the structure of the events returned by associate_footprints
+    The footprint of the COMPLETE window is made of the polygons of the tiles it covers
+
+    :param satellite: satellite (S2A, S2B...)
+    :type satellite: str
+    :param start: start of the window in ISO 8601 format
+    :type start: str
+    :param stop: stop of the window in ISO 8601 format
+    :type stop: str
+    :param query: query interface
+    :type query: Query
+    :param cache: cache of footprints (the process wide cache by default)
+    :type cache: TrackingCache
+    :param compute: function computing the footprints of a list of segments (see compute_footprints)
+    :type compute: function
+    :param get_token: function obtaining the identifier of the ORBPRE sources of a window (see get_orbpre_token)
+    :type get_token: function
+
+    :return: list with the COMPLETE and HEAD events
+    :rtype: list
+    """
+    if cache == None:
+        cache = get_tracking_cache()
+    # end if
+
+    start = round_date(parser.parse(start), GRANULARITY)
+    stop = round_date(parser.parse(stop), GRANULARITY)
+    windows = [("COMPLETE", start, stop),
+               ("HEAD", stop - datetime.timedelta(seconds = HEAD_DURATION), stop)]
+
+    segments_per_window = {}
+    for (window_id, window_start, window_stop) in windows:
+        segments_per_window[window_id] = []
+        if window_start < window_stop and (window_stop - window_start).total_seconds() < MAX_WINDOW_DURATION:
+            segments_per_window[window_id] = get_segments(window_start, window_stop)
+        # end if
+    # end for
+
+    segments = sorted(set([segment for window_segments in segments_per_window.values() for segment in window_segments]))
+    footprints = {}
+    if len(segments) > 0:
+        token = get_token(query, satellite, segments[0][0], segments[-1][1])
+        footprints = cache.get_footprints(satellite, segments, token, compute)
+    # end if
+
+    trackings = []
+    for (window_id, window_start, window_stop) in windows:
+        tracking = {
+            "id": window_id,
+            "start": window_start.isoformat(),
+            "stop": window_stop.isoformat()
+        }
+        values = [value for segment in segments_per_window[window_id] for value in footprints[segment]]
+        if len(values) == 1:
+            tracking["values"] = [dict(values[0], name = "footprint_details")]
+        elif len(values) > 1:
+            tracking["values"] = [dict(value, name = "footprint_details_" + str(j)) for j, value in enumerate(values)]
+        # end if
+        trackings.append(tracking)
+    # end for
+
+    return trackings
@@ -18,7 +18,7 @@ setup(name="s2boa",
       python_requires='>=3',
       install_requires=[
           "vboa",
-          "astropy",
+          "numpy",
           "massedit"
       ],
       test_suite='nose.collector')